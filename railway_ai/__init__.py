@@ -0,0 +1 @@
+"""Planning engines behind the RailwayAI Copilot views."""
@@ -0,0 +1,191 @@
+"""Date-partitioned store of operated train movements for Analytics & Reports.
+
+Every completed service day is "operated" once by the block-section
+microsimulator (seeded by its date, as the Operations Dashboard rollups
+are) and written to its own partition, ``<store>/YYYY/MM/DD/``, holding one
+``.npy`` file per column and a ``meta.json`` with the row count and the
+line and station names the integer columns code into. Partitions are
+written to a temporary directory and renamed into place, so readers never
+see half a day, and are immutable afterwards. A partition written before a
+column was added lacks its file, so it counts as missing and is operated
+again. The rows also serve as the history the delay model is trained on
+(:mod:`railway_ai.delays`).
+
+:meth:`OperationsStore.scan` pushes a report's predicates down to the
+files: the date range selects partition directories by path without
+listing the store, a line filter skips partitions whose ``meta.json`` lists
+none of the lines, and only the requested columns are opened, memory-mapped.
+:func:`performance_report` folds the scanned partitions one at a time into
+fixed-size accumulators with ``np.bincount``, so a year of history costs a
+few array operations per day and never more memory than one partition.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from .microsim import Microsimulator
+from .rollups import ON_TIME_MINUTES, SEVERE_MINUTES, is_on_time
+from .timetable import day_date
+
+# Column name -> dtype of a partition file. Each row is a train's run from its previous stop
+# (``origin``, where it arrived ``upstream`` minutes late) to ``station``, scheduled to take ``run`` minutes.
+COLUMNS = {"line": np.int16, "station": np.int32, "scheduled": np.int16, "delay": np.float32,
+           "origin": np.int32, "upstream": np.float32, "run": np.int16}
+
+# Arrival delay (minutes) up to which a movement counts as right on time
+RIGHT_TIME_MINUTES = 1
+BREAKDOWN = ("On-Time", f"Delays < {ON_TIME_MINUTES}min", f"Delays ≥ {ON_TIME_MINUTES}min", "Cancelled")
+# Upper edges of the delay histogram buckets; the last bucket is open-ended
+DELAY_EDGES = (0, 1, 3, 5, 10, 15, 30)
+DELAY_LABELS = ("0 or early", "0-1 min", "1-3 min", "3-5 min", "5-10 min", "10-15 min", "15-30 min", "30+ min")
+
+
+def operate_day(timetable, day):
+    """Arrival events of one service day: the :data:`COLUMNS`, with NaN delays where not run."""
+    delays = Microsimulator(timetable).run(24, start_minute=0, seed=int(day))["delays"][0] if len(timetable) \
+        else np.empty(0)
+    # Each arrival's previous stop of the same train
+    order = np.lexsort((timetable.seq, timetable.train))
+    same = timetable.train[order][1:] == timetable.train[order][:-1]
+    previous = np.full(len(timetable), -1, dtype=np.int64)
+    previous[order[1:][same]] = order[:-1][same]
+    arrivals = np.flatnonzero((timetable.seq > 0) & (previous >= 0))
+    before = previous[arrivals]
+    return {
+        "line": timetable.line[arrivals],
+        "station": timetable.station[arrivals],
+        "scheduled": timetable.arrival[arrivals],
+        "delay": delays[arrivals],
+        "origin": timetable.station[before],
+        "upstream": delays[before],
+        "run": timetable.arrival[arrivals] - timetable.departure[before],
+    }
+
+
+def categorize(delay):
+    """Codes into :data:`BREAKDOWN` of arrival delays (NaN for movements that did not run)."""
+    return np.where(np.isnan(delay), 3,
+                    np.where(delay <= RIGHT_TIME_MINUTES, 0, np.where(is_on_time(delay), 1, 2)))
+
+
+class OperationsStore:
+    """Operated movements partitioned by service day under ``root``."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def partition(self, day):
+        d = day_date(day)
+        return self.root / f"{d.year:04d}" / f"{d.month:02d}" / f"{d.day:02d}"
+
+    def has(self, day):
+        """Whether ``day`` is stored with every column; partitions of older versions lack some."""
+        part = self.partition(day)
+        return (part / "meta.json").exists() and all((part / f"{name}.npy").exists() for name in COLUMNS)
+
+    def missing(self, first_day, last_day):
+        """Day numbers from ``first_day`` to ``last_day`` (inclusive) without a complete partition."""
+        return [day for day in range(int(first_day), int(last_day) + 1) if not self.has(day)]
+
+    def write(self, day, timetable):
+        """Operate ``timetable`` as service day ``day`` and store it as that day's partition."""
+        events = operate_day(timetable, day)
+        target = self.partition(day)
+        staged = target.with_name(target.name + ".tmp")
+        shutil.rmtree(staged, ignore_errors=True)
+        staged.mkdir(parents=True)
+        for name, dtype in COLUMNS.items():
+            np.save(staged / f"{name}.npy", np.ascontiguousarray(events[name], dtype=dtype))
+        meta = {"day": int(day), "rows": len(events["delay"]), "lines": list(timetable.lines),
+                "stations": list(timetable.stations)}
+        (staged / "meta.json").write_text(json.dumps(meta))
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staged, target)
+        return meta["rows"]
+
+    def scan(self, first_day, last_day, columns, lines=None):
+        """Yield ``(day, meta, columns)`` for the stored days of a range, oldest first.
+
+        ``columns`` maps the requested names to memory-mapped arrays; with
+        ``lines`` (names), rows of other lines are filtered out and
+        partitions without any of them are skipped unopened.
+        """
+        wanted = set(lines) if lines else None
+        for day in range(int(first_day), int(last_day) + 1):
+            part = self.partition(day)
+            try:
+                meta = json.loads((part / "meta.json").read_text())
+            except FileNotFoundError:
+                continue
+            if wanted is not None and wanted.isdisjoint(meta["lines"]):
+                continue
+            data = {name: np.load(part / f"{name}.npy", mmap_mode="r") for name in columns}
+            if wanted is not None and not wanted.issuperset(meta["lines"]):
+                codes = [code for code, name in enumerate(meta["lines"]) if name in wanted]
+                keep = np.isin(np.load(part / "line.npy", mmap_mode="r"), codes)
+                data = {name: values[keep] for name, values in data.items()}
+            yield day, meta, data
+
+
+def materialize(store, days, timetable_for, progress=None):
+    """Write the partitions of ``days`` (day numbers); returns the number of movements stored."""
+    rows = 0
+    for i, day in enumerate(days):
+        if progress:
+            progress(i / len(days), f"Operating {day_date(day):%Y-%m-%d} ({i + 1} of {len(days)})")
+        rows += store.write(day, timetable_for(day_date(day)))
+    return rows
+
+
+def performance_report(store, first_day, last_day, lines=None):
+    """Service performance of the stored days from ``first_day`` to ``last_day``.
+
+    Returns totals (``movements``, ``on_time`` percent, ``mean_delay``,
+    ``severe``), the ``breakdown`` counts of :data:`BREAKDOWN`, the
+    ``delay_buckets`` counts of :data:`DELAY_LABELS`, the daily trend
+    (``days``, ``daily_movements``, ``daily_on_time``) and per line
+    ``line_movements`` and ``line_on_time``.
+    """
+    n_days = int(last_day) - int(first_day) + 1
+    daily = np.zeros((2, n_days))
+    breakdown = np.zeros(len(BREAKDOWN), dtype=np.int64)
+    buckets = np.zeros(len(DELAY_LABELS), dtype=np.int64)
+    per_line = {}
+    delay_total, severe = 0.0, 0
+    for day, meta, data in store.scan(first_day, last_day, ("line", "delay"), lines=lines):
+        delay = np.asarray(data["delay"], dtype=np.float64)
+        ran = ~np.isnan(delay)
+        breakdown += np.bincount(categorize(delay), minlength=len(BREAKDOWN))
+        buckets += np.bincount(np.searchsorted(DELAY_EDGES, delay[ran], side="left"), minlength=len(DELAY_LABELS))
+        delay_total += delay[ran].sum()
+        severe += int(np.count_nonzero(delay[ran] >= SEVERE_MINUTES))
+        on_time = is_on_time(delay)
+        daily[:, day - int(first_day)] = len(delay), on_time.sum()
+        n_lines = len(meta["lines"])
+        counts = np.bincount(data["line"], minlength=n_lines)
+        punctual = np.bincount(data["line"], weights=on_time, minlength=n_lines)
+        for code, name in enumerate(meta["lines"]):
+            if counts[code]:
+                totals = per_line.setdefault(name, [0, 0])
+                totals[0] += int(counts[code])
+                totals[1] += int(punctual[code])
+    movements = int(breakdown.sum())
+    ran = movements - int(breakdown[3])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily_on_time = 100 * daily[1] / daily[0]
+    return {
+        "movements": movements,
+        "on_time": 100 * int(breakdown[0] + breakdown[1]) / movements if movements else float("nan"),
+        "mean_delay": float(delay_total / ran) if ran else float("nan"),
+        "severe": severe,
+        "breakdown": dict(zip(BREAKDOWN, breakdown.tolist())),
+        "delay_buckets": dict(zip(DELAY_LABELS, buckets.tolist())),
+        "days": [day_date(day) for day in range(int(first_day), int(last_day) + 1)],
+        "daily_movements": daily[0].astype(np.int64),
+        "daily_on_time": daily_on_time,
+        "line_movements": {name: totals[0] for name, totals in sorted(per_line.items())},
+        "line_on_time": {name: 100 * totals[1] / totals[0] for name, totals in sorted(per_line.items())},
+    }
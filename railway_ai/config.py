@@ -0,0 +1,52 @@
+"""Locations of local data used by the engines, overridable through the environment."""
+import os
+from pathlib import Path
+
+DATA_DIR = Path(os.environ.get("RAILWAY_DATA_DIR", "data"))
+
+# GTFS-style national timetable feed (directory or .zip) and its columnar cache
+GTFS_FEED = Path(os.environ.get("RAILWAY_GTFS_FEED", DATA_DIR / "gtfs"))
+TIMETABLE_CACHE = DATA_DIR / "cache" / "timetable"
+
+# Memory budget of the data cache shared by all sessions (railway_ai.data)
+DATA_CACHE_BYTES = int(os.environ.get("RAILWAY_DATA_CACHE_MB", "512")) * 2**20
+
+# Memoized results of background simulation and optimization jobs
+JOB_CACHE = DATA_DIR / "cache" / "jobs"
+
+# Regulations, standards and manuals for Document Intelligence, and their search index
+DOCUMENTS_DIR = Path(os.environ.get("RAILWAY_DOCUMENTS", DATA_DIR / "documents"))
+SEARCH_INDEX = DATA_DIR / "cache" / "search"
+
+# Operated train movements partitioned by service day, behind Analytics & Reports
+ANALYTICS_STORE = DATA_DIR / "analytics"
+
+# Delay prediction model trained on that history (python -m railway_ai.delays)
+DELAY_MODEL = DATA_DIR / "models" / "delays.npz"
+
+# Monthly maintenance possession plans (python -m railway_ai.possessions) and the planner's time limit
+MAINTENANCE_PLANS = DATA_DIR / "maintenance"
+MAINTENANCE_TIME_LIMIT = float(os.environ.get("RAILWAY_MAINTENANCE_SECONDS", "10"))
+
+# Exported report files, recurring report definitions and the e-mail relay for reports. Without
+# an SMTP host, mail goes to the local stand-in (railway_ai.mock_smtp), which writes to OUTBOX_DIR.
+REPORTS_DIR = DATA_DIR / "reports"
+REPORT_SCHEDULES = REPORTS_DIR / "schedules.json"
+OUTBOX_DIR = DATA_DIR / "outbox"
+SMTP_HOST = os.environ.get("RAILWAY_SMTP_HOST", "")
+SMTP_PORT = int(os.environ.get("RAILWAY_SMTP_PORT", "25"))
+REPORT_SENDER = os.environ.get("RAILWAY_REPORT_SENDER", "reports@railway-ai.local")
+
+# AI Assistant conversation transcripts
+CONVERSATIONS_DIR = DATA_DIR / "conversations"
+
+# OpenAI-compatible chat endpoints behind the "Primary AI Model" setting. A backend
+# without a URL is served by the local stand-in server (railway_ai.mock_llm).
+LLM_BACKENDS = {
+    "GPT-4": {"url": os.environ.get("RAILWAY_GPT4_URL", ""), "model": "gpt-4",
+              "api_key": os.environ.get("OPENAI_API_KEY", "")},
+    "Claude 3": {"url": os.environ.get("RAILWAY_CLAUDE_URL", ""), "model": "claude-3-sonnet",
+                 "api_key": os.environ.get("RAILWAY_CLAUDE_API_KEY", "")},
+    "Custom Fine-tuned Model": {"url": os.environ.get("RAILWAY_LLM_URL", ""), "model": "railway-copilot",
+                                "api_key": os.environ.get("RAILWAY_LLM_API_KEY", "")},
+}
@@ -0,0 +1,259 @@
+"""Platform and headway conflict detection.
+
+Two kinds of shared resource are checked:
+
+* a platform (day, station, platform) -- two trains whose
+  arrival-to-departure intervals overlap double-occupy it;
+* a directed track section (day, from station, to station) -- consecutive
+  trains entering it less than ``min_headway`` minutes apart violate the
+  headway, and a train leaving it before the one that entered ahead of it
+  is an overtaking conflict.
+
+Both checks sort the events of each resource once and sweep them, so a
+full day costs O(n log n). :class:`ConflictDetector` keeps the events
+grouped by resource so that an edit re-checks only the resources touched
+by the edited trains.
+"""
+import numpy as np
+import pandas as pd
+
+from .timetable import format_minutes
+
+MIN_HEADWAY = 3
+
+PLATFORM = "Platform"
+HEADWAY = "Headway"
+OVERTAKING = "Overtaking"
+
+
+def sweep_overlaps(group, start, end):
+    """Find intervals that start before an earlier interval of the same group ends.
+
+    Intervals are sorted by (group, start) and swept while keeping the
+    latest-ending interval seen so far in the group. Returns index arrays
+    ``(holder, intruder, overlap)``; every interval overlapping an earlier
+    one is reported once, against the earlier interval that ends last.
+    """
+    n = len(start)
+    if n < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    start = np.asarray(start, dtype=np.int64)
+    end = np.asarray(end, dtype=np.int64)
+    order = np.lexsort((start, group))
+    _, rank = np.unique(np.asarray(group)[order], return_inverse=True)
+    s, e = start[order], end[order]
+
+    # Encode (group rank, end, position) into one int64 so a single
+    # maximum.accumulate tracks the running latest-ending holder per group.
+    lo = e.min()
+    span = int(e.max() - lo) + 1
+    key = (rank.astype(np.int64) * span + (e - lo)) * n + np.arange(n)
+    running = np.maximum.accumulate(key)[:-1]
+    holder = running % n
+    holder_end = (running // n) % span + lo
+    same_group = running // n // span == rank[1:]
+    hit = same_group & (s[1:] < holder_end)
+
+    intruder = np.nonzero(hit)[0] + 1
+    holder = holder[hit]
+    overlap = np.minimum(holder_end[hit], e[intruder]) - s[intruder]
+    return order[holder], order[intruder], overlap
+
+
+def headway_violations(group, entry, exit, min_headway=MIN_HEADWAY):
+    """Check consecutive entries into the same section.
+
+    Returns ``(leader, follower, kind, shortfall)`` where ``kind`` is
+    0 for a headway violation and 1 for overtaking inside the section.
+    """
+    if len(entry) < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    entry = np.asarray(entry, dtype=np.int64)
+    exit = np.asarray(exit, dtype=np.int64)
+    group = np.asarray(group)
+    order = np.lexsort((exit, entry, group))
+    same = group[order][1:] == group[order][:-1]
+    gap = entry[order][1:] - entry[order][:-1]
+    overtaking = same & (exit[order][1:] < exit[order][:-1])
+    headway = same & (gap < min_headway) & ~overtaking
+    hit = np.nonzero(headway | overtaking)[0]
+    kind = overtaking[hit].astype(np.int64)
+    shortfall = np.where(kind == 1, exit[order][hit] - exit[order][hit + 1], min_headway - gap[hit])
+    return order[hit], order[hit + 1], kind, shortfall
+
+
+def _group_members(keys):
+    """Map each distinct key to the array of positions holding it."""
+    order = np.argsort(keys, kind="stable")
+    unique, first = np.unique(keys[order], return_index=True)
+    return dict(zip(unique.tolist(), np.split(order, first[1:])))
+
+
+class ConflictDetector:
+    """Conflict index over one timetable with incremental re-checks.
+
+    ``detect()`` runs the full sweep; ``move_train``, ``set_times`` and
+    ``set_platform`` apply an edit and re-check only the affected platform
+    and section resources. ``conflicts()`` returns the current result.
+    """
+
+    def __init__(self, timetable, min_headway=MIN_HEADWAY):
+        self.timetable = timetable
+        self.min_headway = min_headway
+        self.arrival = timetable.arrival.copy()
+        self.departure = timetable.departure.copy()
+        self.platform = timetable.platform.copy()
+        self._station_count = max(len(timetable.stations), 1)
+        self._day0 = int(timetable.day.min()) if len(timetable) else 0
+
+        # Rows of each train, for edits
+        by_train = np.lexsort((timetable.seq, timetable.train, timetable.day))
+        self._train_rows = _group_members(timetable.train)
+
+        # Sections join consecutive stops of the same train on the same day
+        same = (
+            (timetable.train[by_train][1:] == timetable.train[by_train][:-1])
+            & (timetable.day[by_train][1:] == timetable.day[by_train][:-1])
+        )
+        self._sec_from = by_train[:-1][same]
+        self._sec_to = by_train[1:][same]
+        self._sec_key = self._section_key(self._sec_from, self._sec_to)
+        # Section leaving and entering each row (-1 at the ends of a run)
+        self._sec_out = np.full(len(timetable), -1, dtype=np.int64)
+        self._sec_in = np.full(len(timetable), -1, dtype=np.int64)
+        self._sec_out[self._sec_from] = np.arange(len(self._sec_from))
+        self._sec_in[self._sec_to] = np.arange(len(self._sec_to))
+
+        self._platforms = _group_members(self._platform_key(np.arange(len(timetable))))
+        self._sections = _group_members(self._sec_key)
+        self._found = {}
+
+    def _platform_key(self, rows):
+        tt = self.timetable
+        return (
+            (tt.day[rows].astype(np.int64) - self._day0) * self._station_count + tt.station[rows]
+        ) * 1000 + self.platform[rows]
+
+    def _section_key(self, from_rows, to_rows):
+        tt = self.timetable
+        n = self._station_count
+        return (
+            (tt.day[from_rows].astype(np.int64) - self._day0) * n + tt.station[from_rows]
+        ) * n + tt.station[to_rows]
+
+    def _check_platforms(self, rows):
+        rows = rows[self.platform[rows] > 0]
+        keys = self._platform_key(rows)
+        holder, intruder, overlap = sweep_overlaps(keys, self.arrival[rows], self.departure[rows])
+        return pd.DataFrame({
+            "kind": PLATFORM,
+            "resource": keys[intruder],
+            "row_a": rows[holder],
+            "row_b": rows[intruder],
+            "start": self.arrival[rows[intruder]],
+            "minutes": overlap,
+        })
+
+    def _check_sections(self, sections):
+        from_rows, to_rows = self._sec_from[sections], self._sec_to[sections]
+        keys = self._sec_key[sections]
+        leader, follower, kind, shortfall = headway_violations(
+            keys, self.departure[from_rows], self.arrival[to_rows], self.min_headway)
+        return pd.DataFrame({
+            "kind": np.where(kind == 1, OVERTAKING, HEADWAY),
+            "resource": keys[follower],
+            "row_a": from_rows[leader],
+            "row_b": from_rows[follower],
+            "start": self.departure[from_rows[follower]],
+            "minutes": shortfall,
+        })
+
+    def _store(self, kind, frame):
+        for resource, part in frame.groupby("resource", sort=False):
+            self._found[(kind, resource)] = part
+
+    def detect(self):
+        """Full O(n log n) check of every platform and section."""
+        self._found = {}
+        self._store("platform", self._check_platforms(np.arange(len(self.timetable))))
+        self._store("section", self._check_sections(np.arange(len(self._sec_key))))
+        return self.conflicts()
+
+    def _recheck(self, rows):
+        rows = np.asarray(rows)
+        touched = set(self._platform_key(rows).tolist())
+        sections = np.concatenate([self._sec_out[rows], self._sec_in[rows]])
+        touched_sections = set(self._sec_key[sections[sections >= 0]].tolist())
+
+        for key in touched:
+            self._found.pop(("platform", key), None)
+            members = self._platforms.get(key)
+            if members is not None:
+                self._store("platform", self._check_platforms(members))
+        for key in touched_sections:
+            self._found.pop(("section", key), None)
+            self._store("section", self._check_sections(self._sections[key]))
+        return len(touched) + len(touched_sections)
+
+    def set_times(self, rows, arrival=None, departure=None):
+        """Change arrival/departure of some stop events and re-check what they touch."""
+        rows = np.asarray(rows)
+        if arrival is not None:
+            self.arrival[rows] = arrival
+        if departure is not None:
+            self.departure[rows] = departure
+        return self._recheck(rows)
+
+    def set_platform(self, rows, platform):
+        """Reassign stop events to another platform and re-check old and new platforms."""
+        rows = np.asarray(rows)
+        old_keys = self._platform_key(rows)
+        for key in set(old_keys.tolist()):
+            self._platforms[key] = np.setdiff1d(self._platforms[key], rows)
+            self._found.pop(("platform", key), None)
+            if len(self._platforms[key]):
+                self._store("platform", self._check_platforms(self._platforms[key]))
+        self.platform[rows] = platform
+        for key, members in _group_members(self._platform_key(rows)).items():
+            self._platforms[key] = np.union1d(self._platforms.get(key, members[:0]), rows[members])
+        return self._recheck(rows)
+
+    def move_train(self, train, minutes):
+        """Shift every stop of ``train`` (name or code) by ``minutes``, as when dragged."""
+        code = self.timetable.trains.index(train) if isinstance(train, str) else int(train)
+        rows = self._train_rows.get(code)
+        if rows is None:
+            return 0
+        return self.set_times(rows, self.arrival[rows] + minutes, self.departure[rows] + minutes)
+
+    def conflicts(self):
+        """Current conflicts as a DataFrame sorted by start time."""
+        columns = ["Type", "Location", "Train A", "Train B", "Start", "Minutes"]
+        if not self._found:
+            return pd.DataFrame(columns=columns)
+        found = pd.concat(self._found.values(), ignore_index=True).sort_values("start", kind="stable")
+        tt = self.timetable
+        row_a = found["row_a"].to_numpy()
+        row_b = found["row_b"].to_numpy()
+        stations = np.asarray(tt.stations, dtype=object)
+        trains = np.asarray(tt.trains, dtype=object)
+        is_platform = (found["kind"] == PLATFORM).to_numpy()
+        next_station = np.full(len(found), "", dtype=object)
+        if (~is_platform).any():
+            n = self._station_count
+            next_station[~is_platform] = stations[found["resource"].to_numpy()[~is_platform] % n]
+        location = np.where(
+            is_platform,
+            stations[tt.station[row_b]] + " P" + self.platform[row_b].astype(str),
+            stations[tt.station[row_b]] + " → " + next_station,
+        )
+        return pd.DataFrame({
+            "Type": found["kind"].to_numpy(),
+            "Location": location,
+            "Train A": trains[tt.train[row_a]],
+            "Train B": trains[tt.train[row_b]],
+            "Start": format_minutes(found["start"].to_numpy()),
+            "Minutes": found["minutes"].to_numpy(),
+        })
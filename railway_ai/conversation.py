@@ -0,0 +1,172 @@
+"""Bounded chat history for the AI Assistant.
+
+A :class:`Conversation` appends every message to a JSON-lines file and
+keeps only the most recent ``MEMORY_MESSAGES`` in memory, with the byte
+offset of every line so older pages are read back with one seek. The page
+renders a window of the latest messages and grows it page by page on
+request, so a conversation kept open for a whole shift costs the same
+per rerun as a new one.
+
+The model is not sent the whole transcript either: :meth:`Conversation.context`
+fills a token budget with the most recent messages (newest first) and
+compresses everything older into a short digest -- one line per earlier
+message, newest first, kept within ``SUMMARY_TOKENS``. Digest lines are
+kept in memory for ``MAX_DIGESTS`` messages, well past the in-memory tail,
+and rebuilt from the file page by page if a summary reaches further back.
+Tokens are estimated at four characters each, which is close enough for
+budgeting.
+
+Conversation files older than ``RETENTION_DAYS`` are deleted when a new
+conversation starts.
+"""
+import json
+import re
+import time
+import uuid
+from array import array
+from collections import deque
+from pathlib import Path
+
+MEMORY_MESSAGES = 100
+PAGE_MESSAGES = 20
+# Model context budget, and the part of it the digest of older messages may use
+CONTEXT_TOKENS = 3000
+SUMMARY_TOKENS = 600
+DIGEST_CHARS = 160
+# Messages whose digest line is kept in memory: the tail plus as many lines as a default summary can hold
+MAX_DIGESTS = MEMORY_MESSAGES + SUMMARY_TOKENS // 2
+RETENTION_DAYS = 7
+
+_SPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(message):
+    """Rough token count of a message, tool calls and results included."""
+    size = len(message.get("content") or "")
+    for call in message.get("tools") or ():
+        size += len(call["arguments"]) + len(json.dumps(call["result"]))
+    return size // 4 + 4
+
+
+def digest(message):
+    """One line standing in for a message in the summary of older turns."""
+    text = _SPACE.sub(" ", message.get("content") or "").strip()
+    if len(text) > DIGEST_CHARS:
+        text = text[:DIGEST_CHARS].rsplit(" ", 1)[0] + "..."
+    used = {call["name"] for call in message.get("tools") or ()}
+    tools = f" (used {', '.join(sorted(used))})" if used else ""
+    return f"{message['role'].capitalize()}: {text}{tools}"
+
+
+class Conversation:
+    """Append-only chat transcript on disk with a bounded in-memory tail."""
+
+    def __init__(self, directory, conversation_id=None):
+        self.directory = Path(directory)
+        self.id = conversation_id or uuid.uuid4().hex
+        self.path = self.directory / f"{self.id}.jsonl"
+        self._offsets = array("q")
+        self._recent = deque(maxlen=MEMORY_MESSAGES)
+        self._digests = deque(maxlen=MAX_DIGESTS)
+        self._end = 0
+        if self.path.exists():
+            self._load()
+        else:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            prune(self.directory)
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                message = json.loads(line)
+                self._offsets.append(offset)
+                self._recent.append(message)
+                self._digests.append(digest(message))
+                offset += len(line)
+            self._end = offset
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def append(self, message):
+        line = (json.dumps(message, default=str) + "\n").encode()
+        with open(self.path, "ab") as f:
+            f.write(line)
+        self._offsets.append(self._end)
+        self._end += len(line)
+        self._recent.append(message)
+        self._digests.append(digest(message))
+
+    @property
+    def last(self):
+        return self._recent[-1] if self._recent else None
+
+    def messages(self, start, stop=None):
+        """Messages ``start`` up to ``stop`` (default the end), from memory or disk."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = max(start, 0)
+        first_in_memory = len(self) - len(self._recent)
+        if start >= first_in_memory:
+            return list(self._recent)[start - first_in_memory:stop - first_in_memory]
+        if start >= stop:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[start])
+            return [json.loads(f.readline()) for _ in range(stop - start)]
+
+    def window(self, count):
+        """The latest ``count`` messages."""
+        return self.messages(len(self) - count)
+
+    def context(self, budget=CONTEXT_TOKENS, summary_budget=SUMMARY_TOKENS):
+        """``(summary, recent)`` to send the model within a token budget.
+
+        ``recent`` are the newest messages that fit in ``budget`` minus
+        ``summary_budget`` (always at least the last one); ``summary`` is
+        the digest of the messages before them, newest kept first, or
+        ``None`` when nothing was left out.
+        """
+        recent, used = [], 0
+        for message in reversed(self._recent):
+            cost = estimate_tokens(message)
+            if recent and used + cost > budget - summary_budget:
+                break
+            recent.append(message)
+            used += cost
+        recent.reverse()
+        older = len(self) - len(recent)
+        if not older:
+            return None, recent
+        lines, used = [], 0
+        for line in self._digests_before(older):
+            cost = len(line) // 4 + 1
+            if used + cost > summary_budget:
+                break
+            lines.append(line)
+            used += cost
+        skipped = older - len(lines)
+        header = f"Summary of the earlier conversation ({older} messages"
+        header += f", the oldest {skipped} omitted):" if skipped else "):"
+        return "\n".join([header] + [f"- {line}" for line in reversed(lines)]), recent
+
+    def _digests_before(self, stop):
+        """Digest lines of the messages before ``stop``, newest first; older than the kept ones from disk."""
+        first_kept = len(self) - len(self._digests)
+        yield from reversed(list(self._digests)[:max(stop - first_kept, 0)])
+        stop = min(stop, first_kept)
+        while stop > 0:
+            start = max(stop - PAGE_MESSAGES, 0)
+            yield from reversed([digest(message) for message in self.messages(start, stop)])
+            stop = start
+
+
+def prune(directory, max_age_days=RETENTION_DAYS):
+    """Delete conversation files not written to for ``max_age_days``."""
+    cutoff = time.time() - max_age_days * 86400
+    for path in Path(directory).glob("*.jsonl"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
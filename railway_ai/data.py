@@ -0,0 +1,113 @@
+"""Data access for the views, through one cache shared by every session.
+
+The views ask this module for the timetable of a day, the Schedule table,
+the network or the user list instead of building them on every rerun.
+The Schedule table is served a page at a time: filters and sorting give
+cached row positions (:func:`schedule_rows`), and only the page shown is
+turned into a DataFrame. Everything is kept in :data:`data_cache`, a
+:class:`~railway_ai.datacache.DataCache` bounded by ``DATA_CACHE_BYTES``.
+Each data source has a namespace there. The sync actions call
+:func:`invalidate` with the source's name (see ``SOURCES``), so the next
+read loads fresh data. Keys also carry the timetable cache's manifest
+time, so a feed synced by another process is not served stale either.
+
+Cached values are shared: callers must not modify them.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import DATA_CACHE_BYTES, TIMETABLE_CACHE
+from .datacache import DataCache
+from .gantt import TrainGantt
+from .gtfs_import import has_cache, load_timetable
+from .network import load_network
+from .possessions import load_plan, plan_path
+from .timetable import Timetable, synthetic_day
+
+# Data source (as named on the Settings page) -> cache namespaces it feeds
+SOURCES = {
+    "National Timetable Database": ("timetable", "network"),
+    "Network Infrastructure DB": ("network",),
+    "Regulatory Database": ("documents",),
+    "Weather API": ("weather",),
+    "Maintenance Records": ("maintenance",),
+}
+
+data_cache = DataCache(DATA_CACHE_BYTES)
+
+
+def feed_version(cache_dir=TIMETABLE_CACHE):
+    """Identifies the synced feed behind the timetable and network (``None`` for the demo data)."""
+    manifest = Path(cache_dir) / "manifest.json"
+    return manifest.stat().st_mtime_ns if has_cache(cache_dir) else None
+
+
+def load_day_timetable(cache_dir, service_date):
+    """Timetable of a service day from the synced feed, or the demo timetable (uncached)."""
+    timetable = load_timetable(cache_dir, service_date) if has_cache(cache_dir) else None
+    return synthetic_day(service_date) if timetable is None else timetable
+
+
+def current_timetable(service_date):
+    """The shared timetable of a service day."""
+    return data_cache.get("timetable", (service_date, feed_version()),
+                          lambda: load_day_timetable(TIMETABLE_CACHE, service_date))
+
+
+def schedule_rows(service_date, line=None, station=None, status=None, sort_by="Arrival", descending=False):
+    """Positions in the day's timetable of the Schedule rows that pass the filters, in display order.
+
+    ``sort_by`` is a column of the Schedule table; ties are broken by
+    arrival and then train. Only these int32 positions are cached per
+    filter and sort, not the rows, so a page is cheap to cut out of them.
+    """
+    def load():
+        timetable = current_timetable(service_date)
+        rows = np.flatnonzero(timetable.mask(line=line, day=service_date, station=station, status=status))
+        key = timetable.sort_key(Timetable.FRAME_COLUMNS[sort_by])[rows].astype(np.int64)
+        order = np.lexsort((timetable.sort_key("train")[rows], timetable.arrival[rows], -key if descending else key))
+        return rows[order].astype(np.int32)
+
+    return data_cache.get("timetable", ("rows", service_date, line, station, status, sort_by, descending,
+                                        feed_version()), load)
+
+
+def schedule_page(service_date, rows, offset, limit):
+    """The Schedule table for ``rows[offset:offset + limit]`` of :func:`schedule_rows`."""
+    return current_timetable(service_date).take(rows[offset:offset + limit]).compact().to_frame()
+
+
+def timetable_gantt(service_date):
+    """The :class:`~railway_ai.gantt.TrainGantt` spans of a day's trains."""
+    return data_cache.get("timetable", ("gantt", service_date, feed_version()),
+                          lambda: TrainGantt(current_timetable(service_date), service_date))
+
+
+def current_network():
+    """The shared rail network of the synced feed, or the demo network."""
+    return data_cache.get("network", feed_version(), lambda: load_network(TIMETABLE_CACHE))
+
+
+def maintenance_plan(month):
+    """The saved possession plan of the month of ``month``, or ``None`` until one is planned."""
+    path = plan_path(month)
+    # Keyed by the file's time, so a plan saved by a job is picked up on the next read
+    version = path.stat().st_mtime_ns if path.exists() else None
+    return data_cache.get("maintenance", (f"{month:%Y-%m}", version), lambda: load_plan(month))
+
+
+def user_table():
+    """The User Management table."""
+    return data_cache.get("users", None, lambda: pd.DataFrame({
+        "Name": ["John Smith", "Emma Johnson", "Michael Brown", "Sarah Davis"],
+        "Role": ["Admin", "Planner", "Analyst", "Viewer"],
+        "Department": ["IT", "Operations", "Analytics", "Management"],
+        "Last Active": ["2 min ago", "1 hour ago", "3 hours ago", "1 day ago"],
+    }))
+
+
+def invalidate(source):
+    """Forget the cached data of a source in ``SOURCES``; returns the number of entries dropped."""
+    return data_cache.invalidate(*SOURCES[source])
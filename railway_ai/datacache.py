@@ -0,0 +1,114 @@
+"""Process-wide cache of loaded data, shared by every session of the server.
+
+:class:`DataCache` holds values under ``(namespace, key)`` in
+least-recently-used order and evicts the oldest once their estimated size
+exceeds ``max_bytes``. A value larger than the whole budget is returned but
+not kept. Concurrent requests for a missing entry share one load: the
+first caller runs the loader and the others wait for its value, so ten
+sessions opening the same day's timetable read it once.
+
+A namespace stands for one data source. :meth:`DataCache.invalidate`
+drops all of its entries. A load that was running when its namespace was
+invalidated is returned to its caller but not cached, so a sync is never
+undone by a slow reader that started before it.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_bytes(value):
+    """Approximate memory held by a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_bytes(item) for item in value)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + sum(item.nbytes for item in vars(value).values()
+                                          if isinstance(item, np.ndarray))
+    return sys.getsizeof(value)
+
+
+class _Load:
+    """A load in progress that other callers wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class DataCache:
+    """Size-bounded LRU cache of loaded values, grouped into invalidatable namespaces."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._loads = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key, load):
+        """The value under ``(namespace, key)``, calling ``load()`` once if it is missing."""
+        entry = (namespace, key)
+        with self._lock:
+            if entry in self._entries:
+                self._entries.move_to_end(entry)
+                self.hits += 1
+                return self._entries[entry][0]
+            self.misses += 1
+            pending = self._loads.get(entry)
+            owner = pending is None
+            if owner:
+                pending = self._loads[entry] = _Load()
+                generation = self._generations.get(namespace, 0)
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+        try:
+            pending.value = load()
+        except BaseException as exc:
+            pending.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._loads[entry]
+                if pending.error is None and self._generations.get(namespace, 0) == generation:
+                    self._store(entry, pending.value)
+            pending.done.set()
+        return pending.value
+
+    def _store(self, entry, value):
+        size = estimate_bytes(value)
+        if size > self.max_bytes:
+            return
+        self._entries[entry] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def invalidate(self, *namespaces):
+        """Drop every entry of ``namespaces``; returns the number dropped."""
+        with self._lock:
+            dropped = [entry for entry in self._entries if entry[0] in namespaces]
+            for entry in dropped:
+                self.bytes -= self._entries.pop(entry)[1]
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        return len(dropped)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,397 @@
+"""Online delay prediction for "Real-time Delay Predictions".
+
+The model predicts a train's arrival delay at its next stop from the delay
+it had at the stop it last reached. A movement (a train's run between two
+consecutive stops) is described by ``N_FEATURES`` numbers. The upstream
+delay comes with its hinges at ``HINGES`` minutes, which let a linear
+model learn that small delays are absorbed by dwell and running
+supplements while large ones carry through. The others are the scheduled
+running time, the mean delay gained so far on the section and on the
+line, and the hour of day as a point on a circle.
+
+:class:`DelayModel` is a ridge regression kept as its sufficient
+statistics (``X'X`` and ``X'y``). Every batch of observed movements
+updates it exactly, without revisiting history. The weights are re-solved
+(an ``N_FEATURES`` square system) only when asked for after an update.
+Its prior is "the delay persists", which holds until data says otherwise.
+Section and line gains are running means kept with the model. They are
+keyed by station and line names, so they carry across feed versions.
+
+:class:`LivePredictor` compiles a day's timetable once. Every stop event
+that has a next stop gets the static part of its movement's features
+cached: section, line, running time and scheduled arrival. The day is
+operated by the microsimulator (seeded by its date, like the dashboard
+rollups and the analytics store) to stand in for a live feed of actual
+arrivals. :meth:`LivePredictor.update` ingests the arrivals since the
+previous call, learns from the movements they complete and scores every
+active train with one matrix product. The model records how far into
+each day's feed it has learned, so replaying a day (a clock that moves
+back, or a predictor rebuilt for the same model) never learns an arrival
+twice.
+
+Offline, ``python -m railway_ai.delays`` trains a model on the history in
+the analytics store and operates any missing days first. It evaluates the
+model on the most recent days, held out from training, against the
+persistence baseline, and saves it to ``DELAY_MODEL``.
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import date
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from .analytics import COLUMNS, OperationsStore, materialize
+from .config import ANALYTICS_STORE, DELAY_MODEL, TIMETABLE_CACHE
+from .data import load_day_timetable
+from .microsim import Microsimulator
+from .timetable import day_date, day_number
+
+# Upstream delays (minutes) at which the delay's effect may change slope
+HINGES = (0.0, 2.0, 5.0, 10.0)
+# Bias, upstream delay, its hinges, running time, section and line gain, hour (sine and cosine)
+N_FEATURES = 2 + len(HINGES) + 5
+RIDGE = 10.0
+# Movements of prior weight behind a section's mean gain (toward its line's) and a line's (toward all)
+PRIOR_MOVEMENTS = 20
+TRAIN_DAYS = 30
+HOLDOUT_DAYS = 7
+# Evaluation figures saved with a model
+EVALUATION = ("movements", "mae", "rmse", "baseline_mae", "baseline_rmse")
+
+
+def features(upstream, run, scheduled, section_gain, line_gain):
+    """Feature matrix of movements, one row each."""
+    upstream = np.asarray(upstream, dtype=np.float64)
+    angle = 2 * np.pi * (np.asarray(scheduled, dtype=np.float64) % 1440) / 1440
+    return np.column_stack([
+        np.ones(len(upstream)), upstream, *(np.maximum(upstream - hinge, 0) for hinge in HINGES),
+        np.asarray(run, dtype=np.float64), section_gain, line_gain, np.sin(angle), np.cos(angle),
+    ])
+
+
+class DelayModel:
+    """Online ridge regression of next-stop arrival delays, with section and line gain means."""
+
+    def __init__(self):
+        self.xtx = np.zeros((N_FEATURES, N_FEATURES))
+        self.xty = np.zeros(N_FEATURES)
+        self.observations = 0
+        self.sections = {}
+        self.lines = {}
+        # Movements and delay gained: per section, per line and overall
+        self.section_stats = np.zeros((0, 2))
+        self.line_stats = np.zeros((0, 2))
+        self.total = np.zeros(2)
+        self.evaluation = None
+        # Live feed (service day) -> minute up to which its arrivals have been learned
+        self.learned_through = {}
+        self._weights = None
+        self._lock = threading.Lock()
+
+    def _intern(self, table, stats, keys):
+        codes = np.array([table.setdefault(key, len(table)) for key in keys], dtype=np.int64)
+        grown = getattr(self, stats)
+        if len(table) > len(grown):
+            setattr(self, stats, np.vstack([grown, np.zeros((len(table) - len(grown), 2))]))
+        return codes
+
+    def codes(self, origin, station, line, station_names, line_names):
+        """Section and line codes of movements whose stations and lines code into the name lists."""
+        with self._lock:
+            n = max(len(station_names), 1)
+            pairs, inverse = np.unique(np.asarray(origin, dtype=np.int64) * n + station, return_inverse=True)
+            sections = self._intern(self.sections, "section_stats",
+                                    [(station_names[p // n], station_names[p % n]) for p in pairs.tolist()])
+            lines = self._intern(self.lines, "line_stats", list(line_names))
+        return sections[inverse], lines[np.asarray(line, dtype=np.int64)]
+
+    def design(self, upstream, run, scheduled, sections, lines):
+        """Feature matrix of movements with the current section and line gains."""
+        with self._lock:
+            overall = self.total[1] / max(self.total[0], 1)
+            count, gained = self.line_stats[lines].T
+            line_gain = (gained + PRIOR_MOVEMENTS * overall) / (count + PRIOR_MOVEMENTS)
+            count, gained = self.section_stats[sections].T
+            section_gain = (gained + PRIOR_MOVEMENTS * line_gain) / (count + PRIOR_MOVEMENTS)
+        return features(upstream, run, scheduled, section_gain, line_gain)
+
+    def learn(self, upstream, run, scheduled, sections, lines, delay):
+        """Update the model with observed movements and their arrival ``delay``; returns the number used.
+
+        Movements are featurized with the gains from before this batch,
+        as they would have been when predicted.
+        """
+        upstream, delay = np.asarray(upstream, dtype=np.float64), np.asarray(delay, dtype=np.float64)
+        keep = np.isfinite(upstream) & np.isfinite(delay)
+        if not keep.all():
+            upstream, run, scheduled, sections, lines, delay = (
+                np.asarray(values)[keep] for values in (upstream, run, scheduled, sections, lines, delay))
+        if not len(delay):
+            return 0
+        x = self.design(upstream, run, scheduled, sections, lines)
+        gain = delay - upstream
+        with self._lock:
+            self.xtx += x.T @ x
+            self.xty += x.T @ delay
+            self.observations += len(delay)
+            for stats, codes in ((self.section_stats, sections), (self.line_stats, lines)):
+                stats[:, 0] += np.bincount(codes, minlength=len(stats))
+                stats[:, 1] += np.bincount(codes, weights=gain, minlength=len(stats))
+            self.total += len(delay), gain.sum()
+            self._weights = None
+        return len(delay)
+
+    def claim(self, feed, start, end):
+        """The part of ``(start, end]`` minutes of a live ``feed`` not learned from yet, now marked learned."""
+        with self._lock:
+            through = self.learned_through.get(feed, -np.inf)
+            self.learned_through[feed] = max(through, end)
+            return max(start, through), end
+
+    def weights(self):
+        with self._lock:
+            if self._weights is None:
+                prior = np.zeros(N_FEATURES)
+                prior[1] = 1.0
+                self._weights = np.linalg.solve(self.xtx + RIDGE * np.eye(N_FEATURES),
+                                                self.xty + RIDGE * prior)
+            return self._weights
+
+    def predict(self, x):
+        return x @ self.weights()
+
+    def save(self, path=DELAY_MODEL):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sections = sorted(self.sections, key=self.sections.get)
+        lines = sorted(self.lines, key=self.lines.get)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, xtx=self.xtx, xty=self.xty, observations=self.observations,
+                     section_from=np.array([a for a, _ in sections], dtype=str),
+                     section_to=np.array([b for _, b in sections], dtype=str),
+                     section_stats=self.section_stats, line_names=np.array(lines, dtype=str),
+                     line_stats=self.line_stats, total=self.total,
+                     evaluation=np.array([self.evaluation[k] for k in EVALUATION] if self.evaluation
+                                         else [np.nan] * len(EVALUATION)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=DELAY_MODEL):
+        model = cls()
+        with np.load(path) as saved:
+            model.xtx, model.xty = saved["xtx"], saved["xty"]
+            model.observations = int(saved["observations"])
+            model.sections = {(a, b): i for i, (a, b) in
+                              enumerate(zip(saved["section_from"].tolist(), saved["section_to"].tolist()))}
+            model.lines = {name: i for i, name in enumerate(saved["line_names"].tolist())}
+            model.section_stats, model.line_stats = saved["section_stats"], saved["line_stats"]
+            model.total = saved["total"]
+            scores = saved["evaluation"]
+            model.evaluation = dict(zip(EVALUATION, scores.tolist())) if np.isfinite(scores).all() else None
+        return model
+
+
+def _movements(model, meta, data):
+    sections, lines = model.codes(data["origin"], data["station"], data["line"], meta["stations"], meta["lines"])
+    return (np.asarray(data["upstream"], dtype=np.float64), data["run"], data["scheduled"], sections, lines,
+            np.asarray(data["delay"], dtype=np.float64))
+
+
+def train(store, first_day, last_day, model=None, progress=None):
+    """Fit ``model`` (a new one by default) on the stored days, one day's movements at a time."""
+    model = model or DelayModel()
+    n_days = int(last_day) - int(first_day) + 1
+    for day, meta, data in store.scan(first_day, last_day, tuple(COLUMNS)):
+        model.learn(*_movements(model, meta, data))
+        if progress:
+            progress((day - int(first_day) + 1) / n_days, f"Trained on {day_date(day):%Y-%m-%d}")
+    return model
+
+
+def evaluate(model, store, first_day, last_day):
+    """Errors of ``model`` and of the persistence baseline (no delay change) on the stored days."""
+    errors, baseline = [], []
+    for _, meta, data in store.scan(first_day, last_day, tuple(COLUMNS)):
+        upstream, run, scheduled, sections, lines, delay = _movements(model, meta, data)
+        known = np.isfinite(upstream) & np.isfinite(delay)
+        x = model.design(upstream[known], np.asarray(run)[known], np.asarray(scheduled)[known],
+                         sections[known], lines[known])
+        errors.append(model.predict(x) - delay[known])
+        baseline.append(upstream[known] - delay[known])
+    errors = np.concatenate(errors) if errors else np.empty(0)
+    baseline = np.concatenate(baseline) if baseline else np.empty(0)
+
+    def scores(e):
+        return (float(np.abs(e).mean()), float(np.sqrt((e ** 2).mean()))) if len(e) else (np.nan, np.nan)
+
+    return dict(zip(EVALUATION, (len(errors), *scores(errors), *scores(baseline))))
+
+
+def train_and_evaluate(store, timetable_for, last_day, days=TRAIN_DAYS, holdout=HOLDOUT_DAYS, progress=None):
+    """Train on ``days`` days before the ``holdout`` days that end at ``last_day`` and evaluate on those.
+
+    Days missing from the store are operated first. The returned model
+    is then updated with the held-out days too, and carries the
+    evaluation.
+    """
+    def report(offset, share):
+        return lambda fraction, message="": progress and progress(offset + fraction * share, message)
+
+    first_day = int(last_day) - days - holdout + 1
+    split = int(last_day) - holdout
+    missing = store.missing(first_day, last_day)
+    if missing:
+        materialize(store, missing, timetable_for, report(0.0, 0.6))
+    model = train(store, first_day, split, progress=report(0.6, 0.3))
+    model.evaluation = evaluate(model, store, split + 1, last_day)
+    train(store, split + 1, last_day, model, progress=report(0.9, 0.1))
+    return model
+
+
+_model = None
+_model_version = None
+_model_lock = threading.Lock()
+
+
+def delay_model(path=DELAY_MODEL):
+    """The process-wide model: the saved one (reloaded when the file changes) or a new one."""
+    global _model, _model_version
+    path = Path(path)
+    version = path.stat().st_mtime_ns if path.exists() else None
+    with _model_lock:
+        if _model is None or version != _model_version:
+            _model = DelayModel.load(path) if version is not None else DelayModel()
+            _model_version = version
+        return _model
+
+
+class LivePredictor:
+    """Predicted next-stop delays of a service day's running trains, learning from each arrival."""
+
+    def __init__(self, timetable, day, model):
+        self.timetable = timetable
+        self.day = int(day)
+        self.model = model
+        tt = timetable
+        order = np.lexsort((tt.seq, tt.train))
+        same = tt.train[order][1:] == tt.train[order][:-1]
+        self._next = np.full(len(tt), -1, dtype=np.int64)
+        self._next[order[:-1][same]] = order[1:][same]
+        self._previous = np.full(len(tt), -1, dtype=np.int64)
+        self._previous[order[1:][same]] = order[:-1][same]
+
+        # Static features of the movement that starts at each stop event
+        rows = np.flatnonzero(self._next >= 0)
+        following = self._next[rows]
+        self._run = np.zeros(len(tt))
+        self._scheduled = np.zeros(len(tt))
+        self._section = np.zeros(len(tt), dtype=np.int64)
+        self._line = np.zeros(len(tt), dtype=np.int64)
+        self._run[rows] = tt.arrival[following] - tt.departure[rows]
+        self._scheduled[rows] = tt.arrival[following]
+        self._section[rows], self._line[rows] = model.codes(tt.station[rows], tt.station[following], tt.line[rows],
+                                                            tt.stations, tt.lines)
+
+        # Actual arrivals of the operated day, in time order, stand in for the live feed
+        self._delay = Microsimulator(tt).run(24, start_minute=0, seed=int(day))["delays"][0] if len(tt) \
+            else np.empty(0)
+        reached = np.flatnonzero(~np.isnan(self._delay))
+        actual = tt.arrival[reached] + self._delay[reached]
+        order = np.argsort(actual, kind="stable")
+        self._events = reached[order]
+        self._event_minute = actual[order]
+
+        self._last_row = np.full(len(tt.trains), -1, dtype=np.int64)
+        self.watermark = -np.inf
+        self.learned = 0
+        self._lock = threading.Lock()
+
+    def update(self, minute):
+        """Learn from the arrivals up to ``minute`` (of the service day) and score the running trains.
+
+        Returns ``code`` (train codes), ``train``, ``next_station``,
+        ``scheduled`` (next arrival, minutes), ``delay`` (current) and
+        ``predicted`` (next arrival) arrays, the movements ``learned``
+        from and the scoring time in ``ms``.
+        """
+        tt = self.timetable
+        with self._lock:
+            if minute < self.watermark:
+                # The clock moved back: rebuild the trains' positions from the start of the feed
+                self._last_row[:] = -1
+                self.watermark = -np.inf
+            lo, hi = np.searchsorted(self._event_minute, [self.watermark, minute], side="right")
+            arrived = self._events[lo:hi]
+            # Events are in time order, so a train's latest arrival is written last
+            self._last_row[tt.train[arrived]] = arrived
+            # Only the arrivals this model has not learned from yet, whichever predictor saw them first
+            first, last = self.model.claim(self.day, self.watermark, minute)
+            new = arrived[(self._event_minute[lo:hi] > first) & (self._event_minute[lo:hi] <= last)]
+            completed = new[self._previous[new] >= 0]
+            start = self._previous[completed]
+            self.learned += self.model.learn(self._delay[start], self._run[start], self._scheduled[start],
+                                             self._section[start], self._line[start], self._delay[completed])
+            self.watermark = minute
+
+            t0 = time.perf_counter()
+            current = self._last_row[self._last_row >= 0]
+            active = current[self._next[current] >= 0]
+            x = self.model.design(self._delay[active], self._run[active], self._scheduled[active],
+                                  self._section[active], self._line[active])
+            predicted = self.model.predict(x)
+            elapsed = (time.perf_counter() - t0) * 1000
+        following = self._next[active]
+        return {
+            "code": tt.train[active],
+            "train": np.asarray(tt.trains, dtype=object)[tt.train[active]],
+            "next_station": np.asarray(tt.stations, dtype=object)[tt.station[following]],
+            "scheduled": tt.arrival[following],
+            "delay": self._delay[active],
+            "predicted": predicted,
+            "learned": len(completed),
+            "ms": elapsed,
+        }
+
+
+_predictors = {}
+
+
+def live_predictor(timetable, service_date):
+    """The shared :class:`LivePredictor` of a day's (cached) timetable with the current :func:`delay_model`."""
+    model = delay_model()
+    predictor = _predictors.get(service_date)
+    # The data cache hands out the same timetable object until the feed changes, so identity is enough
+    if predictor is None or predictor.model is not model or predictor.timetable is not timetable:
+        _predictors.clear()
+        predictor = _predictors[service_date] = LivePredictor(timetable, day_number(service_date), model)
+    return predictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and evaluate the delay prediction model.")
+    parser.add_argument("--days", type=int, default=TRAIN_DAYS, help="days of history to train on")
+    parser.add_argument("--holdout", type=int, default=HOLDOUT_DAYS, help="most recent days to evaluate on")
+    parser.add_argument("--end", type=date.fromisoformat, default=None,
+                        help="last service day used (default: yesterday)")
+    parser.add_argument("--store", default=str(ANALYTICS_STORE))
+    parser.add_argument("--model", default=str(DELAY_MODEL))
+    args = parser.parse_args()
+    last_day = int(day_number(args.end)) if args.end else int(day_number(date.today())) - 1
+    model = train_and_evaluate(OperationsStore(args.store), partial(load_day_timetable, TIMETABLE_CACHE),
+                               last_day, args.days, args.holdout,
+                               progress=lambda fraction, message="": print(f"{fraction:6.1%} {message}"))
+    model.save(args.model)
+    scores = model.evaluation
+    print(f"Held-out movements: {scores['movements']:,.0f}")
+    print(f"Model        MAE {scores['mae']:.2f} min, RMSE {scores['rmse']:.2f} min")
+    print(f"Persistence  MAE {scores['baseline_mae']:.2f} min, RMSE {scores['baseline_rmse']:.2f} min")
+    print(f"Saved to {args.model} ({model.observations:,} movements, {len(model.sections):,} sections)")
+
+
+if __name__ == "__main__":
+    main()
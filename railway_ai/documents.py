@@ -0,0 +1,175 @@
+"""Regulations, standards, procedures, manuals and reports for Document Intelligence.
+
+A document is a UTF-8 ``.txt`` or ``.md`` file under the documents
+directory, optionally starting with a header block::
+
+    Title: Railway Safety Regulations 2024 - Section 5.3
+    Type: Regulation
+    Date: 2024-03-15
+
+    Level crossing safety protocols require ...
+
+Without a header the title is the file name, the type is taken from the
+parent folder when it names a known type (``regulations/``, ``Manual/``)
+and the date is the file's modification date. Documents are split into
+overlapping word windows ("chunks"), the unit the search index scores.
+"""
+import re
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+DOC_TYPES = ("Regulation", "Standard", "Procedure", "Manual", "Report")
+DOC_SUFFIXES = (".txt", ".md")
+
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 30
+
+_HEADER = re.compile(r"^(title|type|date)\s*:\s*(.*)$", re.IGNORECASE)
+
+# Demo corpus used when no documents directory exists: (title, type, age in days, text)
+DEMO_DOCUMENTS = (
+    ("Railway Safety Regulations 2024 - Section 5.3", "Regulation", 210,
+     "Level crossing safety protocols require automated barrier systems with redundant sensors. "
+     "Every public level crossing on lines above 100 km/h shall be protected by full barriers "
+     "interlocked with the approach signals. Obstacle detection by radar or lidar is mandatory "
+     "where road traffic exceeds 2,000 vehicles a day. A barrier failure must place the protecting "
+     "signals at danger and be reported to the signaller within two minutes. Trains approaching a "
+     "crossing with failed barriers shall stop and proceed at caution after the crossing keeper "
+     "confirms the road is clear."),
+    ("Operational Manual - Track Maintenance Standards", "Manual", 400,
+     "Regular inspection intervals for level crossings must not exceed 30 days. Track geometry on "
+     "main lines is recorded by the measurement train every 8 weeks; twist faults above 1 in 300 "
+     "require an immediate speed restriction of 20 km/h. Rail grinding is planned when head checks "
+     "exceed 2 mm. Possessions for tamping are booked at least 12 weeks ahead and are taken at "
+     "night between 00:30 and 04:30 to minimize disruption to passenger services. After tamping "
+     "a temporary speed restriction applies until the track has consolidated."),
+    ("EU Directive 2023/847 - Railway Interoperability", "Standard", 700,
+     "Cross-border operations require compliance with unified safety standards. Rolling stock "
+     "authorized in one member state may operate in another when it conforms to the technical "
+     "specifications for interoperability. ETCS Level 2 is the reference train protection system "
+     "on the core network corridors, and national systems are maintained only as class B systems "
+     "during the migration period. Infrastructure managers publish a network statement describing "
+     "the conditions of access, including train path allocation and track access charges."),
+    ("Signalling Principles - Block Sections and Headways", "Standard", 95,
+     "A block section may be occupied by one train at a time. The minimum headway on a line is the "
+     "sum of the signal sighting time, the approach and block occupation times and the release "
+     "time of the route. With three-aspect signalling and 1,200 m blocks, 160 km/h traffic achieves "
+     "a planning headway of three minutes. Moving block signalling shortens headways further by "
+     "replacing fixed block sections with the braking distance of the following train."),
+    ("Timetable Planning Rules 2025", "Procedure", 40,
+     "Timetable planning rules define the minimum running times, dwell times, headways and junction "
+     "margins used when allocating train paths. Each path includes a running time supplement of "
+     "5 percent for recovery from minor delays. Platform reoccupation requires a minimum of three "
+     "minutes between a departing and an arriving train. Conflicting moves at flat junctions must "
+     "be separated by the junction margin, normally two minutes."),
+    ("Disruption Management Procedure", "Procedure", 12,
+     "When an incident blocks a line, the control office declares a disruption and activates the "
+     "contingency plan for the affected route. Trains may be rerouted over diversionary routes, "
+     "short-formed or cancelled to protect the remaining service. Passenger information must be "
+     "updated within five minutes of any change. The service recovery plan restores the timetable "
+     "by running empty stock moves to reposition trains and crews before the morning peak."),
+    ("Weather Resilience Manual", "Manual", 150,
+     "Adverse weather increases delays. Rail temperatures above 46 degrees Celsius trigger a heat "
+     "speed restriction on continuously welded rail. Leaf fall reduces adhesion, and railhead "
+     "treatment trains run daily during autumn on routes with known low adhesion sites. Points "
+     "heaters must be tested before the winter season. High winds above 90 km/h require speed "
+     "restrictions on exposed viaducts and embankments."),
+    ("Annual Punctuality Report", "Report", 5,
+     "On-time performance across the network reached 94.3 percent, an improvement of 2.1 points on "
+     "the previous year. Most delay minutes were caused by infrastructure faults, followed by "
+     "train operator causes and external factors such as weather and trespass. Reactionary delay "
+     "accounted for 62 percent of all delay minutes, showing how primary incidents propagate "
+     "through the timetable on congested routes."),
+    ("Station Dwell Time Study", "Report", 60,
+     "Dwell times at major hubs exceed the planned values in the peak because of crowding at the "
+     "doors. Platform staff dispatch and wider doors reduced the average dwell by 18 seconds. The "
+     "study recommends planning two-minute dwells at Central Station and North Terminal during "
+     "the morning peak and using platform-edge screens to spread boarding along the train."),
+    ("Level Crossing Risk Assessment Standard", "Standard", 330,
+     "Every level crossing is assessed for collision risk using road and rail traffic volumes, "
+     "sighting distances and the history of near misses. Crossings scoring above the risk "
+     "threshold are prioritized for closure, replacement by a bridge or upgrade to full barriers "
+     "with obstacle detection. The assessment is repeated at least every three years or after any "
+     "change in traffic."),
+    ("Maintenance Possession Planning Procedure", "Procedure", 25,
+     "Engineering possessions close a section of line to traffic so that track and signalling work "
+     "can be carried out safely. Possessions are planned to avoid the busiest hours and, where "
+     "possible, combined with other work on the same section. Trains affected by a possession are "
+     "diverted, replaced by buses or retimed. The possession plan is agreed with train operators "
+     "and published in the weekly operating notice."),
+    ("Energy Efficient Driving Guidance", "Manual", 120,
+     "Coasting before stations and using regenerative braking reduces traction energy by up to "
+     "15 percent. Driver advisory systems recommend coasting points from the timetable margin, so "
+     "trains arrive on time while using less energy. Timetables with evenly distributed recovery "
+     "time allow more coasting than those with large supplements concentrated at the end of the "
+     "journey."),
+)
+
+
+def _header(lines):
+    """Split ``Key: value`` header lines from the body."""
+    meta = {}
+    for i, line in enumerate(lines):
+        match = _HEADER.match(line.strip())
+        if match:
+            meta[match.group(1).lower()] = match.group(2).strip()
+        elif not line.strip() and meta:
+            return meta, lines[i + 1:]
+        else:
+            break
+    return meta, lines[len(meta):] if meta else lines
+
+
+def _doc_type(value):
+    """Canonical document type of a label such as "regulations" or "Manual"."""
+    label = value.strip().lower().rstrip("s")
+    return next((t for t in DOC_TYPES if t.lower() == label), None)
+
+
+def read_document(path, root):
+    """Parse one document file into a dict of ``id``, ``title``, ``type``, ``date`` and ``text``."""
+    path = Path(path)
+    meta, body = _header(path.read_text(encoding="utf-8", errors="replace").splitlines())
+    try:
+        when = date.fromisoformat(meta["date"])
+    except (KeyError, ValueError):
+        when = datetime.fromtimestamp(path.stat().st_mtime).date()
+    return {
+        "id": path.relative_to(root).as_posix(),
+        "title": meta.get("title") or path.stem.replace("_", " "),
+        "type": _doc_type(meta.get("type", "")) or _doc_type(path.parent.name) or "Report",
+        "date": when,
+        "text": "\n".join(body).strip(),
+    }
+
+
+def document_files(directory):
+    """Document files under ``directory``, sorted by path."""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return sorted(p for p in directory.rglob("*") if p.suffix.lower() in DOC_SUFFIXES and p.is_file())
+
+
+def load_documents(directory):
+    """All documents under ``directory``."""
+    return [read_document(path, directory) for path in document_files(directory)]
+
+
+def demo_documents(today=None):
+    """The demonstration corpus, dated relative to ``today``."""
+    today = today or date.today()
+    return [
+        {"id": f"demo/{i:03d}", "title": title, "type": doc_type,
+         "date": today - timedelta(days=age), "text": text}
+        for i, (title, doc_type, age, text) in enumerate(DEMO_DOCUMENTS)
+    ]
+
+
+def chunk_text(text, words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Split text into windows of ``words`` words, consecutive windows sharing ``overlap``."""
+    tokens = text.split()
+    if len(tokens) <= words:
+        return [" ".join(tokens)] if tokens else []
+    step = words - overlap
+    return [" ".join(tokens[i:i + words]) for i in range(0, len(tokens) - overlap, step)]
@@ -0,0 +1,285 @@
+"""Report files for Analytics & Reports: CSV, Excel and PDF, written as a stream.
+
+The movement-level part of a report is read from the analytics store one
+service day at a time and written in chunks of ``EXPORT_CHUNK_ROWS``, so an
+export of millions of movements holds one chunk in memory, never the
+table. :class:`CsvWriter` appends each chunk with ``DataFrame.to_csv``;
+:class:`XlsxWriter` streams the worksheet XML straight into the ``.xlsx``
+zip and continues on a new worksheet when one fills up. The PDF is the
+one-page-per-60-lines summary of :func:`summary_rows` in a built-in font.
+None of them needs a spreadsheet or PDF library.
+
+:func:`send_report` mails a finished file over SMTP; without a configured
+server it uses the local stand-in of :mod:`railway_ai.mock_smtp`, which
+drops the messages into the outbox directory.
+"""
+import smtplib
+import zipfile
+from email.message import EmailMessage
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from .analytics import BREAKDOWN, categorize
+from .config import REPORT_SENDER, SMTP_HOST, SMTP_PORT
+from .mock_smtp import start_stand_in
+from .timetable import day_date, format_minutes
+
+EXPORT_CHUNK_ROWS = 100_000
+# Data rows per worksheet; Excel's limit is 1,048,576 including the header
+SHEET_ROWS = 1_000_000
+PDF_LINES_PER_PAGE = 60
+
+MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+MOVEMENT_COLUMNS = ("Date", "Line", "Station", "Scheduled", "Delay (min)", "Category")
+
+
+def movement_chunks(store, first_day, last_day, lines=None, progress=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """DataFrames of ``MOVEMENT_COLUMNS`` covering the stored days, about ``chunk_rows`` each.
+
+    Days are buffered until a chunk is full, so small days do not pay the
+    per-chunk cost of the writers one by one.
+    """
+    n_days = int(last_day) - int(first_day) + 1
+    buffered, n_buffered = [], 0
+    for day, meta, data in store.scan(first_day, last_day, ("line", "station", "scheduled", "delay"), lines=lines):
+        if progress:
+            progress((day - int(first_day)) / n_days, f"Writing {day_date(day):%Y-%m-%d}")
+        line_names = np.asarray(meta["lines"], dtype=object)
+        station_names = np.asarray(meta["stations"], dtype=object)
+        for lo in range(0, len(data["delay"]), chunk_rows):
+            window = slice(lo, lo + chunk_rows)
+            delay = np.asarray(data["delay"][window], dtype=np.float64)
+            buffered.append(pd.DataFrame({
+                "Date": day_date(day).isoformat(),
+                "Line": line_names[data["line"][window]],
+                "Station": station_names[data["station"][window]],
+                "Scheduled": format_minutes(np.asarray(data["scheduled"][window])),
+                "Delay (min)": np.round(delay, 1),
+                "Category": np.asarray(BREAKDOWN, dtype=object)[categorize(delay)],
+            }, columns=MOVEMENT_COLUMNS))
+            n_buffered += len(delay)
+            if n_buffered >= chunk_rows:
+                yield pd.concat(buffered, ignore_index=True)
+                buffered, n_buffered = [], 0
+    if buffered:
+        yield pd.concat(buffered, ignore_index=True)
+
+
+def summary_rows(report):
+    """``(section, item, value)`` rows of a performance report, for the summary sheet and the PDF."""
+    rows = [
+        ("Key Performance Indicators", "Overall Performance (%)", round(report["on_time"], 2)),
+        ("Key Performance Indicators", "Train Arrivals", report["movements"]),
+        ("Key Performance Indicators", "Average Delay (min)", round(report["mean_delay"], 2)),
+        ("Key Performance Indicators", "Severe Delays", report["severe"]),
+    ]
+    rows += [("Service Performance Breakdown", label, n) for label, n in report["breakdown"].items()]
+    rows += [("Arrival Delay Distribution", label, n) for label, n in report["delay_buckets"].items()]
+    rows += [("Performance by Line (%)", line, round(value, 2)) for line, value in report["line_on_time"].items()]
+    rows += [("Daily Performance (%)", d.isoformat(), round(float(value), 2))
+             for d, value in zip(report["days"], report["daily_on_time"]) if not np.isnan(value)]
+    return rows
+
+
+class CsvWriter:
+    """One CSV table written chunk by chunk."""
+
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._header = True
+
+    def write(self, frame):
+        frame.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+def _cells(values):
+    """XML of one column of worksheet cells, as an object array."""
+    if pd.api.types.is_numeric_dtype(values):
+        text = pd.Series(values).astype(str)
+        return ("<c><v>" + text + "</v></c>").where(pd.notna(values), "<c/>").to_numpy()
+    # Text columns repeat few values (lines, stations, dates); each distinct value is escaped once
+    codes, uniques = pd.factorize(pd.Series(values, dtype=str))
+    cells = np.array(['<c t="inlineStr"><is><t>' + escape(value) + "</t></is></c>" for value in uniques] + ["<c/>"],
+                     dtype=object)
+    return cells[codes]
+
+
+class XlsxWriter:
+    """Streaming writer of an ``.xlsx`` workbook with inline-string worksheets.
+
+    :meth:`table` starts a worksheet; :meth:`write` appends DataFrame rows
+    to it, continuing on a new worksheet ("Name (2)", ...) every
+    ``sheet_rows`` rows.
+    """
+
+    def __init__(self, path, sheet_rows=SHEET_ROWS):
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self.sheet_rows = sheet_rows
+        self.sheets = []
+        self._stream = None
+        self._name = self._columns = None
+        self._rows = 0
+
+    def _open_sheet(self, name):
+        self._close_sheet()
+        self.sheets.append(name[:31])
+        self._stream = self._zip.open(f"xl/worksheets/sheet{len(self.sheets)}.xml", "w", force_zip64=True)
+        self._stream.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                           b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                           b"<sheetData>")
+        self._stream.write(("<row>" + "".join(_cells(pd.Series(self._columns, dtype=object))) + "</row>").encode())
+        self._rows = 0
+
+    def _close_sheet(self):
+        if self._stream is not None:
+            self._stream.write(b"</sheetData></worksheet>")
+            self._stream.close()
+            self._stream = None
+
+    def table(self, name, columns):
+        self._name, self._columns = name, list(columns)
+        self._open_sheet(name)
+
+    def write(self, frame):
+        start = 0
+        while start < len(frame):
+            if self._rows == self.sheet_rows:
+                self._open_sheet(f"{self._name} ({len([s for s in self.sheets if s.startswith(self._name)]) + 1})")
+            part = frame.iloc[start:start + self.sheet_rows - self._rows]
+            rows = np.full(len(part), "<row>", dtype=object)
+            for column in self._columns:
+                rows = rows + _cells(part[column].to_numpy())
+            self._stream.write(("</row>".join(rows) + "</row>").encode())
+            self._rows += len(part)
+            start += len(part)
+
+    def close(self):
+        self._close_sheet()
+        sheets = "".join(f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>'
+                         for i, name in enumerate(self.sheets, 1))
+        self._zip.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for i in range(1, len(self.sheets) + 1))
+            + "</Types>"))
+        self._zip.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+            'officeDocument" Target="xl/workbook.xml"/></Relationships>'))
+        self._zip.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f"<sheets>{sheets}</sheets></workbook>"))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                      f'relationships/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                      for i in range(1, len(self.sheets) + 1))
+            + "</Relationships>"))
+        self._zip.close()
+
+
+def _pdf_text(text):
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, title, lines):
+    """A plain-text PDF: ``title`` in bold on the first page, then ``lines``."""
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)] or [[]]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold >>"]
+    kids = []
+    for number, page in enumerate(pages):
+        text = ["BT", "/F2 14 Tf", "50 800 Td", f"({_pdf_text(title)}) Tj", "/F1 9 Tf", "0 -24 Td"] \
+            if number == 0 else ["BT", "/F1 9 Tf", "50 800 Td"]
+        for line in page:
+            text += [f"({_pdf_text(line)}) Tj", "0 -12 Td"]
+        stream = "\n".join(text + ["ET"])
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    body, offsets = b"%PDF-1.4\n", []
+    for number, content in enumerate(objects, 1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{content}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    Path(path).write_bytes(body)
+
+
+def write_report(path, fmt, title, report, chunks):
+    """Write a report file; ``chunks`` are movement DataFrames (unused for PDF). Returns the movement rows written."""
+    rows = 0
+    if fmt == "pdf":
+        lines, section = [], None
+        for heading, item, value in summary_rows(report):
+            if heading != section:
+                lines += ["", heading]
+                section = heading
+            lines.append(f"    {item}: {value:,}" if isinstance(value, (int, float)) else f"    {item}: {value}")
+        write_pdf(path, title, lines[1:])
+    elif fmt == "csv":
+        writer = CsvWriter(path)
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+                rows += len(chunk)
+        finally:
+            writer.close()
+    elif fmt == "xlsx":
+        writer = XlsxWriter(path)
+        try:
+            writer.table("Summary", ("Section", "Item", "Value"))
+            writer.write(pd.DataFrame(summary_rows(report), columns=["Section", "Item", "Value"]))
+            writer.table("Movements", MOVEMENT_COLUMNS)
+            for chunk in chunks:
+                writer.write(chunk)
+                rows += len(chunk)
+        finally:
+            writer.close()
+    else:
+        raise ValueError(f"unknown report format {fmt!r}")
+    return rows
+
+
+def send_report(path, recipients, subject, body):
+    """Mail ``path`` as an attachment to ``recipients``."""
+    message = EmailMessage()
+    message["From"] = REPORT_SENDER
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(body)
+    path = Path(path)
+    maintype, subtype = MIME_TYPES[path.suffix[1:]].split("/")
+    with open(path, "rb") as f:
+        message.add_attachment(f.read(), maintype=maintype, subtype=subtype, filename=path.name)
+    host, port = (SMTP_HOST, SMTP_PORT) if SMTP_HOST else start_stand_in()
+    with smtplib.SMTP(host, port, timeout=30) as smtp:
+        smtp.send_message(message)
@@ -0,0 +1,137 @@
+"""Batched, level-of-detail Gantt timeline for the Timetable Manager.
+
+Each train of a service day is one bar from its first arrival to its last
+departure. The spans are computed once per timetable and kept sorted by
+start time, so drawing the chart never looks at stop events again.
+
+A figure holds one data trace whatever the size of the day. In train
+detail, the trains overlapping the time window (plus ``PAN_MARGIN`` of the
+window on each side, so panning has data to show) are a single horizontal
+``Bar`` trace colored per bar, at most ``MAX_BARS`` rows of them from a
+row offset. Zoomed out, when the window holds more trains than that, they
+become per-line occupancy bands instead: one ``Heatmap`` of trains running
+per line and time bin, with at most ``MAX_BINS`` bins. The per-line legend
+entries of the bar chart are empty traces.
+"""
+import math
+
+import numpy as np
+import plotly.graph_objects as go
+
+from .timetable import format_minutes
+
+MAX_BARS = 300
+MAX_BINS = 288
+PAN_MARGIN = 0.5
+ROW_PX = 18
+BIN_MINUTES = (1, 2, 5, 10, 15, 30, 60)
+
+# Bar colors per line, by position in the timetable's line categories
+LINE_COLORS = ("#636efa", "#ef553b", "#00cc96", "#ab63fa", "#ffa15a", "#19d3f3", "#ff6692", "#b6e880")
+
+
+class TrainGantt:
+    """Train spans of one service day of a timetable, sorted by start time."""
+
+    def __init__(self, timetable, service_date):
+        self.timetable = timetable
+        self.service_date = service_date
+        rows = np.flatnonzero(timetable.mask(day=service_date))
+        rows = rows[np.argsort(timetable.train[rows], kind="stable")]
+        train = timetable.train[rows]
+        firsts = np.r_[0, np.flatnonzero(np.diff(train)) + 1] if len(rows) else np.empty(0, dtype=np.int64)
+        start = np.minimum.reduceat(timetable.arrival[rows], firsts) if len(rows) else np.empty(0, np.int32)
+        end = np.maximum.reduceat(timetable.departure[rows], firsts) if len(rows) else np.empty(0, np.int32)
+        order = np.lexsort((train[firsts], start))
+        self.train = train[firsts][order]
+        self.line = timetable.line[rows][firsts][order]
+        self.start = start[order]
+        self.end = end[order]
+        # Latest end among the spans up to each position, for cutting windows out of the sorted starts
+        self.end_max = np.maximum.accumulate(self.end) if len(self.end) else self.end
+
+    def __len__(self):
+        return len(self.start)
+
+    def window(self, start, end):
+        """Positions of the spans overlapping ``[start, end)`` minutes, in start order."""
+        stop = int(np.searchsorted(self.start, end, side="left"))
+        first = int(np.searchsorted(self.end_max[:stop], start, side="right"))
+        candidates = np.arange(first, stop)
+        return candidates[self.end[first:stop] > start]
+
+    def bars(self, start, end, offset=0, budget=MAX_BARS):
+        """Spans overlapping the window, ``budget`` of them from ``offset``, as rows of the bar trace."""
+        shown = self.window(start, end)[offset:offset + budget]
+        names = np.asarray(self.timetable.trains, dtype=object)
+        return {"train": names[self.train[shown]], "line": self.line[shown],
+                "start": self.start[shown], "end": self.end[shown]}
+
+    def occupancy(self, start, end, max_bins=MAX_BINS):
+        """Trains running per line and time bin over ``[start, end)``: ``(bin_minutes, bin_starts, counts)``."""
+        span = max(end - start, 1)
+        bin_minutes = next((b for b in BIN_MINUTES if span / b <= max_bins), math.ceil(span / max_bins))
+        n_bins = math.ceil(span / bin_minutes)
+        shown = self.window(start, end)
+        first = np.clip((self.start[shown] - start) // bin_minutes, 0, n_bins)
+        last = np.clip(-(-(self.end[shown] - start) // bin_minutes), 0, n_bins)
+        # Difference array per line: +1 where a train starts running, -1 after its last bin
+        diff = np.zeros((len(self.timetable.lines), n_bins + 1), dtype=np.int32)
+        np.add.at(diff, (self.line[shown], first), 1)
+        np.add.at(diff, (self.line[shown], last), -1)
+        counts = np.cumsum(diff, axis=1)[:, :n_bins]
+        return bin_minutes, start + np.arange(n_bins) * bin_minutes, counts
+
+    def _times(self, minutes):
+        return np.datetime64(self.service_date, "m") + np.asarray(minutes).astype("timedelta64[m]")
+
+    def figure(self, start, end, offset=0, detail="Auto", max_bars=MAX_BARS, max_bins=MAX_BINS):
+        """The timeline of ``[start, end)`` minutes after midnight.
+
+        ``detail`` is "Trains", "Occupancy" or "Auto", which shows trains
+        when the window holds at most ``max_bars`` of them. ``offset`` is
+        the first train row shown; ``stats["rows"]`` is the number of rows
+        it pages through. Returns the figure and a dict of rendering
+        statistics.
+        """
+        in_window = len(self.window(start, end))
+        lines = self.timetable.lines
+        fig = go.Figure()
+        if detail == "Occupancy" or (detail == "Auto" and in_window > max_bars):
+            bin_minutes, bins, counts = self.occupancy(start, end, max_bins)
+            used = np.flatnonzero(counts.any(axis=1))
+            fig.add_trace(go.Heatmap(
+                x=self._times(bins), y=[lines[i] for i in used], z=counts[used], colorscale="Blues",
+                colorbar=dict(title="Trains"), xperiod=bin_minutes * 60_000, xperiodalignment="start",
+                hovertemplate="%{y}<br>%{x|%H:%M}: %{z} trains<extra></extra>"
+            ))
+            height = max(300, 40 * len(used) + 120)
+            stats = {"mode": "occupancy", "trains": in_window, "rows": 0, "shown": 0, "bin_minutes": bin_minutes}
+        else:
+            margin = int((end - start) * PAN_MARGIN)
+            rows = len(self.window(start - margin, end + margin))
+            bars = self.bars(start - margin, end + margin, offset, max_bars)
+            fig.add_trace(go.Bar(
+                base=self._times(bars["start"]), x=(bars["end"] - bars["start"]).astype(np.int64) * 60_000,
+                y=bars["train"], orientation="h", showlegend=False,
+                marker=dict(color=np.asarray(LINE_COLORS, dtype=object)[bars["line"] % len(LINE_COLORS)]),
+                customdata=np.column_stack((np.asarray(lines, dtype=object)[bars["line"]],
+                                            format_minutes(bars["start"]), format_minutes(bars["end"]))),
+                hovertemplate="%{y} (%{customdata[0]})<br>%{customdata[1]} – %{customdata[2]}<extra></extra>"
+            ))
+            # Legend entries only; the bars are all in the trace above
+            for code in np.unique(bars["line"]):
+                fig.add_trace(go.Bar(x=[None], y=[None], name=lines[code], orientation="h",
+                                     marker=dict(color=LINE_COLORS[code % len(LINE_COLORS)])))
+            fig.update_yaxes(autorange="reversed", type="category")
+            height = max(300, ROW_PX * len(bars["train"]) + 120)
+            stats = {"mode": "trains", "trains": in_window, "rows": rows, "shown": len(bars["train"]),
+                     "bin_minutes": None}
+        fig.update_layout(
+            title="Train Schedule Timeline", height=min(height, 900), barmode="overlay", bargap=0.2,
+            margin=dict(t=40, b=20, l=20, r=20),
+            xaxis=dict(type="date", range=list(self._times([start, end]).astype(str))),
+            # Keep the user's pan and zoom while the same window is shown
+            uirevision=f"{self.service_date}-{start}-{end}-{offset}"
+        )
+        return fig, stats
@@ -0,0 +1,514 @@
+"""Streaming, incremental import of GTFS-style timetable feeds.
+
+A feed is a directory or ``.zip`` holding ``stops.txt``, ``routes.txt``,
+``trips.txt``, ``stop_times.txt`` and optionally ``calendar.txt`` and
+``calendar_dates.txt``. Files are read in row chunks and never held in memory
+as a whole: each chunk is written to the cache before the next is read.
+The small tables are cached as a sequence of pickled chunks
+(``<cache>/<file>.pkl``) that :func:`read_table` joins on load.
+
+``stop_times.txt`` is written to an on-disk columnar cache partitioned by
+trip: ``<cache>/stop_times/pNN/<segment>/<column>.npy``. A manifest records,
+per feed file, its size, mtime, content hash and a byte watermark. On the
+next sync a file is
+
+* skipped when size and mtime (or, failing that, its content hash) match,
+* appended when it only grew and the bytes up to the watermark still hash
+  to the recorded value -- only the tail past the watermark is parsed,
+* otherwise re-parsed, but only the partitions whose content hash changed
+  are swapped into the cache.
+"""
+import hashlib
+import io
+import json
+import os
+import pickle
+import shutil
+import zipfile
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .timetable import Timetable, day_number
+
+CHUNK_ROWS = 500_000
+N_PARTITIONS = 32
+HASH_BLOCK = 1 << 20
+
+SMALL_TABLES = ("stops.txt", "routes.txt", "trips.txt", "calendar.txt", "calendar_dates.txt")
+STOP_TIMES = "stop_times.txt"
+STOP_TIME_COLUMNS = ("trip", "stop", "seq", "arrival", "departure")
+
+_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+class Feed:
+    """Read-only access to the files of a feed directory or zip archive."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path) if self.path.suffix.lower() == ".zip" else None
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def names(self):
+        if self._zip is not None:
+            return {Path(info.filename).name: info.filename for info in self._zip.infolist()}
+        return {p.name: p.name for p in self.path.iterdir() if p.is_file()}
+
+    def stat(self, name):
+        """Return ``(size, mtime)`` of a feed file."""
+        if self._zip is not None:
+            info = self._zip.getinfo(self.names()[name])
+            return info.file_size, datetime(*info.date_time).timestamp()
+        st = (self.path / name).stat()
+        return st.st_size, st.st_mtime
+
+    def open(self, name):
+        if self._zip is not None:
+            return self._zip.open(self.names()[name])
+        return open(self.path / name, "rb")
+
+
+class _Dictionary:
+    """Append-only mapping of GTFS string ids to stable int32 codes, persisted as JSON."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.values = json.loads(self.path.read_text()) if self.path.exists() else []
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, values):
+        codes, uniques = pd.factorize(pd.Series(values, dtype=str))
+        mapped = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            mapped[i] = code
+        return mapped[codes]
+
+    def save(self):
+        _atomic_write(self.path, json.dumps(self.values))
+
+
+def _atomic_write(path, text):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def _digest(feed, name, watermark=None):
+    """Hash a feed file in blocks.
+
+    Returns ``(sha256, prefix_sha256, ends_with_newline)`` where the prefix
+    hash covers the first ``watermark`` bytes (``None`` when no watermark or
+    the file is shorter than it).
+    """
+    full = hashlib.sha256()
+    prefix = None
+    seen = 0
+    last = b""
+    with feed.open(name) as fh:
+        while block := fh.read(HASH_BLOCK):
+            if watermark is not None and prefix is None and seen + len(block) >= watermark:
+                cut = watermark - seen
+                full.update(block[:cut])
+                prefix = full.hexdigest()
+                full.update(block[cut:])
+            else:
+                full.update(block)
+            seen += len(block)
+            last = block[-1:]
+    if watermark is not None and prefix is None and seen == watermark:
+        prefix = full.hexdigest()
+    return full.hexdigest(), prefix, last == b"\n"
+
+
+def _read_chunks(fh, chunk_rows, names=None):
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    kwargs = {"header": None, "names": names} if names is not None else {}
+    return pd.read_csv(text, dtype=str, keep_default_na=False, chunksize=chunk_rows, **kwargs)
+
+
+def parse_times(values):
+    """Vectorized ``H:MM:SS`` to int32 minutes; empty strings become -1."""
+    parts = pd.Series(values, dtype=str).str.split(":", n=2, expand=True)
+    if parts.shape[1] < 2:
+        return np.full(len(values), -1, dtype=np.int32)
+    hours = pd.to_numeric(parts[0], errors="coerce")
+    minutes = pd.to_numeric(parts[1], errors="coerce")
+    return (hours * 60 + minutes).fillna(-1).to_numpy(dtype=np.int32)
+
+
+def _encode_stop_times(chunk, trips, stops):
+    arrival = parse_times(chunk["arrival_time"])
+    departure = parse_times(chunk["departure_time"])
+    arrival = np.where(arrival < 0, departure, arrival)
+    departure = np.where(departure < 0, arrival, departure)
+    return {
+        "trip": trips.encode(chunk["trip_id"]),
+        "stop": stops.encode(chunk["stop_id"]),
+        "seq": pd.to_numeric(chunk["stop_sequence"], errors="coerce").fillna(0).to_numpy(dtype=np.int32),
+        "arrival": arrival,
+        "departure": departure,
+    }
+
+
+class _PartitionWriter:
+    """Splits column chunks by trip partition and writes them as ``.npy`` segments."""
+
+    def __init__(self, root, first_segment=None):
+        self.root = Path(root)
+        self.next_segment = dict(first_segment or {})
+        self.digests = {}
+        self.rows = 0
+
+    def write(self, columns):
+        part = columns["trip"] % N_PARTITIONS
+        order = np.argsort(part, kind="stable")
+        bounds = np.searchsorted(part[order], np.arange(N_PARTITIONS + 1))
+        for p in range(N_PARTITIONS):
+            lo, hi = bounds[p], bounds[p + 1]
+            if lo == hi:
+                continue
+            idx = order[lo:hi]
+            key = f"p{p:02d}"
+            segment = self.next_segment.get(key, 0)
+            self.next_segment[key] = segment + 1
+            seg_dir = self.root / key / f"{segment:06d}"
+            seg_dir.mkdir(parents=True, exist_ok=True)
+            digest = self.digests.setdefault(key, hashlib.sha256())
+            for name in STOP_TIME_COLUMNS:
+                values = np.ascontiguousarray(columns[name][idx])
+                np.save(seg_dir / f"{name}.npy", values)
+                digest.update(values.tobytes())
+        self.rows += len(part)
+
+
+def _segments(part_dir):
+    return sorted(p for p in Path(part_dir).iterdir() if p.is_dir()) if Path(part_dir).exists() else []
+
+
+def _map_segments(part_dir):
+    """The memory-mapped columns of every segment of a partition; nothing is read yet."""
+    return [{name: np.load(seg / f"{name}.npy", mmap_mode="r") for name in STOP_TIME_COLUMNS}
+            for seg in _segments(part_dir)]
+
+
+def _load_partition(part_dir):
+    """One partition's columns, its segments copied into single arrays (``None`` when empty)."""
+    segments = _map_segments(part_dir)
+    if not segments:
+        return None
+    return {name: np.concatenate([seg[name] for seg in segments]) for name in STOP_TIME_COLUMNS}
+
+
+def _swap_partition(staged_dir, target_dir):
+    """Compact a staged partition into one segment and swap it in place of ``target_dir``."""
+    columns = _load_partition(staged_dir)
+    new_dir = target_dir.with_name(target_dir.name + ".new")
+    shutil.rmtree(new_dir, ignore_errors=True)
+    (new_dir / "000000").mkdir(parents=True)
+    for name, values in columns.items():
+        np.save(new_dir / "000000" / f"{name}.npy", values)
+    old_dir = target_dir.with_name(target_dir.name + ".old")
+    if target_dir.exists():
+        os.replace(target_dir, old_dir)
+    os.replace(new_dir, target_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _read_manifest(cache_dir):
+    path = Path(cache_dir) / "manifest.json"
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"files": {}, "partitions": {}}
+
+
+def sync_feed(feed_path, cache_dir, chunk_rows=CHUNK_ROWS):
+    """Bring the columnar cache at ``cache_dir`` up to date with a feed.
+
+    Returns a report dict listing the ``unchanged``, ``appended`` and
+    ``rebuilt`` files, the number of stop-time ``rows`` parsed and the
+    number of ``partitions`` rewritten.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(cache_dir)
+    report = {"unchanged": [], "appended": [], "rebuilt": [], "rows": 0, "partitions": 0}
+    trips = _Dictionary(cache_dir / "trip_ids.json")
+    stops = _Dictionary(cache_dir / "stop_ids.json")
+
+    with Feed(feed_path) as feed:
+        available = feed.names()
+        for name in SMALL_TABLES + (STOP_TIMES,):
+            if name not in available:
+                continue
+            size, mtime = feed.stat(name)
+            state = manifest["files"].get(name)
+            if state and state["size"] == size and state["mtime"] == mtime:
+                report["unchanged"].append(name)
+                continue
+            watermark = state.get("watermark") if state else None
+            sha, prefix, ends_with_newline = _digest(feed, name, watermark)
+            if state and sha == state["sha256"]:
+                state["mtime"] = mtime
+                report["unchanged"].append(name)
+                continue
+
+            new_state = {"size": size, "mtime": mtime, "sha256": sha,
+                         "watermark": size if ends_with_newline else None}
+            if name != STOP_TIMES:
+                _import_table(feed, name, cache_dir, chunk_rows)
+                report["rebuilt"].append(name)
+            elif state and prefix is not None and prefix == state["sha256"]:
+                new_state["columns"] = state["columns"]
+                report["rows"] += _append_stop_times(
+                    feed, cache_dir, manifest, state, trips, stops, chunk_rows)
+                report["appended"].append(name)
+            else:
+                columns, rows, rewritten = _rebuild_stop_times(
+                    feed, cache_dir, manifest, trips, stops, chunk_rows)
+                new_state["columns"] = columns
+                report["rows"] += rows
+                report["partitions"] += rewritten
+                report["rebuilt"].append(name)
+            manifest["files"][name] = new_state
+
+    trips.save()
+    stops.save()
+    _atomic_write(cache_dir / "manifest.json", json.dumps(manifest, indent=1))
+    return report
+
+
+def _import_table(feed, name, cache_dir, chunk_rows):
+    tmp = cache_dir / f"{name}.pkl.tmp"
+    with feed.open(name) as fh, open(tmp, "wb") as out:
+        for chunk in _read_chunks(fh, chunk_rows):
+            pickle.dump(chunk, out, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, cache_dir / f"{name}.pkl")
+
+
+def read_table(cache_dir, name):
+    """A cached small table (e.g. ``"trips.txt"``) as one DataFrame, joined from its pickled chunks."""
+    chunks = []
+    with open(Path(cache_dir) / f"{name}.pkl", "rb") as f:
+        while True:
+            try:
+                chunks.append(pickle.load(f))
+            except EOFError:
+                break
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def _rebuild_stop_times(feed, cache_dir, manifest, trips, stops, chunk_rows):
+    staging = cache_dir / "staging"
+    shutil.rmtree(staging, ignore_errors=True)
+    writer = _PartitionWriter(staging)
+    header = []
+    with feed.open(STOP_TIMES) as fh:
+        for chunk in _read_chunks(fh, chunk_rows):
+            header = list(chunk.columns)
+            writer.write(_encode_stop_times(chunk, trips, stops))
+
+    root = cache_dir / "stop_times"
+    root.mkdir(exist_ok=True)
+    partitions = manifest["partitions"]
+    rewritten = 0
+    for key, digest in writer.digests.items():
+        digest = digest.hexdigest()
+        if partitions.get(key, {}).get("sha256") != digest:
+            _swap_partition(staging / key, root / key)
+            rewritten += 1
+        partitions[key] = {"sha256": digest, "segments": 1}
+    for key in set(partitions) - set(writer.digests):
+        shutil.rmtree(root / key, ignore_errors=True)
+        del partitions[key]
+    shutil.rmtree(staging, ignore_errors=True)
+    return header, writer.rows, rewritten
+
+
+def _append_stop_times(feed, cache_dir, manifest, state, trips, stops, chunk_rows):
+    partitions = manifest["partitions"]
+    writer = _PartitionWriter(
+        cache_dir / "stop_times",
+        first_segment={key: info["segments"] for key, info in partitions.items()},
+    )
+    with feed.open(STOP_TIMES) as fh:
+        fh.seek(state["watermark"])
+        for chunk in _read_chunks(fh, chunk_rows, names=state["columns"]):
+            writer.write(_encode_stop_times(chunk, trips, stops))
+    for key, digest in writer.digests.items():
+        previous = partitions.get(key, {})
+        chained = hashlib.sha256((previous.get("sha256", "") + digest.hexdigest()).encode())
+        partitions[key] = {"sha256": chained.hexdigest(), "segments": writer.next_segment[key]}
+    return writer.rows
+
+
+def _active_services(cache_dir, service_date):
+    """Service ids running on ``service_date`` according to calendar and calendar_dates."""
+    active = set()
+    calendar_path = cache_dir / "calendar.txt.pkl"
+    day = service_date.strftime("%Y%m%d")
+    if calendar_path.exists():
+        calendar = read_table(cache_dir, "calendar.txt")
+        running = (
+            (calendar[_WEEKDAYS[service_date.weekday()]] == "1")
+            & (calendar["start_date"] <= day)
+            & (calendar["end_date"] >= day)
+        )
+        active.update(calendar.loc[running, "service_id"])
+    dates_path = cache_dir / "calendar_dates.txt.pkl"
+    if dates_path.exists():
+        dates = read_table(cache_dir, "calendar_dates.txt")
+        today = dates[dates["date"] == day]
+        active.update(today.loc[today["exception_type"] == "1", "service_id"])
+        active.difference_update(today.loc[today["exception_type"] == "2", "service_id"])
+    if not calendar_path.exists() and not dates_path.exists():
+        return None
+    return active
+
+
+def stop_stations(stops, stop_ids):
+    """The station of every stop in ``stop_ids``: ``(codes, names)`` with unique ``names``.
+
+    ``stops`` is the ``stops.txt`` table. A stop belongs to its
+    ``parent_station`` where the feed names one, and stops with the same
+    name are one station, since feeds that list each platform as a stop
+    name them after the station. Unnamed or unknown stops are named by id.
+    """
+    stops = stops.drop_duplicates("stop_id").set_index("stop_id")
+    own = stops["stop_name"].fillna("").astype(str) if "stop_name" in stops else pd.Series("", index=stops.index)
+    own = own.where(own != "", stops.index.to_series().astype(str))
+    if "parent_station" in stops:
+        parent = stops["parent_station"].fillna("").astype(str)
+        own = own.where(parent == "", parent.map(own).fillna(own))
+    ids = pd.Index(stop_ids)
+    names = own.reindex(ids)
+    names = names.where(names.notna(), ids.to_series(index=ids).astype(str))
+    codes, uniques = pd.factorize(names)
+    return codes, list(uniques)
+
+
+def has_cache(cache_dir):
+    return (Path(cache_dir) / "manifest.json").exists() and (Path(cache_dir) / "trips.txt.pkl").exists()
+
+
+def load_timetable(cache_dir, service_date=None):
+    """Load the cached feed as a :class:`Timetable` for one service day.
+
+    Trips not running on ``service_date`` are dropped; without calendar
+    files every trip is kept. Every segment of every partition is
+    memory-mapped and filtered, and only the rows kept are copied.
+    Stations are the unique stations of :func:`stop_stations`; each
+    stop's ``platform_code`` goes into the ``platform`` column.
+    """
+    cache_dir = Path(cache_dir)
+    service_date = service_date or date.today()
+    trip_ids = _Dictionary(cache_dir / "trip_ids.json").values
+    stop_ids = _Dictionary(cache_dir / "stop_ids.json").values
+    trips = read_table(cache_dir, "trips.txt").set_index("trip_id")
+    routes = read_table(cache_dir, "routes.txt").set_index("route_id")
+    stops = read_table(cache_dir, "stops.txt")
+
+    trip_index = pd.Index(trip_ids)
+    trips = trips.reindex(trip_index)
+    services = _active_services(cache_dir, service_date)
+    running = trips["service_id"].notna().to_numpy()
+    if services is not None:
+        running &= trips["service_id"].isin(services).to_numpy()
+
+    parts = []
+    for part_dir in sorted((cache_dir / "stop_times").glob("p[0-9][0-9]")):
+        for segment in _map_segments(part_dir):
+            keep = running[segment["trip"]]
+            if keep.any():
+                parts.append({name: values[keep] for name, values in segment.items()})
+    if not parts:
+        return None
+    columns = {name: np.concatenate([p[name] for p in parts]) for name in STOP_TIME_COLUMNS}
+
+    used_trips, train = np.unique(columns["trip"], return_inverse=True)
+    stop_station, station_names = stop_stations(stops, stop_ids)
+    used_stations, station = np.unique(stop_station[columns["stop"]], return_inverse=True)
+    trip_rows = trips.iloc[used_trips]
+    names = trip_rows.get("trip_short_name", pd.Series(index=trip_rows.index, dtype=str))
+    train_names = names.where(names.fillna("") != "", trip_rows.index.to_series()).tolist()
+
+    route_names = routes.get("route_long_name", pd.Series(dtype=str)).reindex(routes.index).fillna("")
+    short_names = routes.get("route_short_name", pd.Series(dtype=str)).reindex(routes.index).fillna("")
+    route_names = route_names.where(route_names != "", short_names)
+    route_codes, lines = pd.factorize(trip_rows["route_id"].map(route_names).fillna("Unknown"))
+
+    stop_rows = stops.drop_duplicates("stop_id").set_index("stop_id").reindex(pd.Index(stop_ids))
+    platform_code = stop_rows.get("platform_code", pd.Series(index=stop_rows.index, dtype=str))
+    platforms = pd.to_numeric(platform_code, errors="coerce").fillna(0).to_numpy(dtype=np.int16)
+
+    n = len(train)
+    return Timetable(
+        train_names, [station_names[i] for i in used_stations], list(lines),
+        train=train,
+        station=station,
+        line=route_codes[train],
+        seq=columns["seq"],
+        platform=platforms[columns["stop"]],
+        arrival=columns["arrival"],
+        departure=columns["departure"],
+        status=np.zeros(n),
+        day=np.full(n, day_number(service_date)),
+    )
+
+
+def load_stop_links(cache_dir):
+    """Distinct track links of the cached feed, for building the network graph.
+
+    Returns the stations of :func:`stop_stations` (``name`` and the mean
+    ``stop_lat``/``stop_lon`` of their stops, indexed by station code) and a
+    DataFrame of undirected links ``from``/``to`` (station codes, ``from <
+    to``) with the shortest scheduled running time over them in
+    ``minutes``. Consecutive stops of every trip, across all services, are
+    links. A trip's rows may span a partition's segments, so the partitions
+    are copied into memory one at a time.
+    """
+    cache_dir = Path(cache_dir)
+    stop_ids = _Dictionary(cache_dir / "stop_ids.json").values
+    stops = read_table(cache_dir, "stops.txt")
+    station_of, names = stop_stations(stops, stop_ids)
+    stops = stops.drop_duplicates("stop_id").set_index("stop_id").reindex(pd.Index(stop_ids))
+    missing = pd.Series(np.nan, index=stops.index)
+    stations = pd.DataFrame({
+        "station": station_of,
+        "stop_lat": pd.to_numeric(stops.get("stop_lat", missing), errors="coerce").to_numpy(),
+        "stop_lon": pd.to_numeric(stops.get("stop_lon", missing), errors="coerce").to_numpy(),
+    }).groupby("station").mean().reindex(np.arange(len(names)))
+    stations.insert(0, "name", names)
+
+    parts = []
+    for part_dir in sorted((cache_dir / "stop_times").glob("p[0-9][0-9]")):
+        columns = _load_partition(part_dir)
+        if columns is None:
+            continue
+        order = np.lexsort((columns["seq"], columns["trip"]))
+        trip = columns["trip"][order]
+        stop = columns["stop"][order]
+        same = trip[1:] == trip[:-1]
+        a, b = station_of[stop[:-1][same]], station_of[stop[1:][same]]
+        minutes = (columns["arrival"][order][1:] - columns["departure"][order][:-1])[same]
+        parts.append(pd.DataFrame({"from": np.minimum(a, b), "to": np.maximum(a, b), "minutes": minutes}))
+    links = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["from", "to", "minutes"])
+    links = links[links["from"] != links["to"]]
+    links = links.groupby(["from", "to"], as_index=False)["minutes"].min()
+    links["minutes"] = links["minutes"].clip(lower=1)
+    return stations, links
@@ -0,0 +1,291 @@
+"""Incremental, parallel ingestion of the document knowledge base.
+
+``sync_documents`` brings the segmented search index
+(:mod:`railway_ai.search`) up to date with the documents directory:
+
+1. Files whose size and mtime match the current generation are skipped.
+2. New and changed files are read, chunked, tokenized and hashed in a
+   spawned process pool.
+3. A changed document keeps every chunk whose content hash (of title and
+   text) it already had; only the chunks with new hashes are embedded and
+   indexed, into one new segment, and the chunks that disappeared are
+   masked out. A chunk repeated within a document is indexed once.
+4. Segments that have become small or mostly deleted are merged from
+   their stored postings and vectors -- nothing is re-tokenized or
+   re-embedded.
+5. The new generation is swapped in atomically; searches run on the
+   previous one until then.
+
+Without a documents directory the demo corpus is ingested instead.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from .documents import DOC_TYPES, chunk_text, demo_documents, document_files, read_document
+from .search import (
+    SearchIndex, Segment, build_postings, chunk_vectors, merge_columns, term_idf, tokenize, write_generation,
+    write_segment,
+)
+from .timetable import day_number
+
+MAX_WORKERS = 8
+# Files parsed in the calling process below this count; a pool is not worth starting
+POOL_MIN_FILES = 16
+MAX_SEGMENTS = 8
+# Segments with a smaller live fraction are compacted
+MIN_LIVE_FRACTION = 0.5
+# An ingestion lock older than this is considered abandoned
+LOCK_SECONDS = 3600
+# Seconds a first search waits for another process to build the index before giving up
+FIRST_INDEX_WAIT = 120
+
+
+class IngestionRunning(Exception):
+    """Raised when another ingestion holds the index lock."""
+
+
+def _chunk_hash(title, text):
+    digest = hashlib.blake2b(f"{title}\0{text}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _chunk_document(doc):
+    """A document with its unique chunks as ``(hash, text, tokens)``."""
+    title_tokens = tokenize(doc["title"])
+    chunks, seen = [], set()
+    for text in chunk_text(doc["text"]) or [""]:
+        key = _chunk_hash(doc["title"], text)
+        if key not in seen:
+            seen.add(key)
+            chunks.append((key, text, title_tokens + tokenize(text)))
+    return {"id": doc["id"], "title": doc["title"], "type": doc["type"], "date": doc["date"], "chunks": chunks}
+
+
+def _parse_file(path, root):
+    return _chunk_document(read_document(path, root))
+
+
+def _signature(path):
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class _Lock:
+    """Exclusive lock file of an index directory."""
+
+    def __init__(self, index_dir):
+        self.path = Path(index_dir) / "ingest.lock"
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if time.time() - self.path.stat().st_mtime < LOCK_SECONDS:
+                raise IngestionRunning(f"another ingestion is updating {self.path.parent}")
+            self.path.unlink(missing_ok=True)
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return self
+
+    def __exit__(self, *exc):
+        self.path.unlink(missing_ok=True)
+
+
+def _current(index_dir):
+    return SearchIndex(index_dir) if (Path(index_dir) / "current.json").exists() else None
+
+
+def pending_changes(documents_dir, index_dir):
+    """Number of document files added, changed or removed since the last sync."""
+    documents_dir = Path(documents_dir)
+    current = _current(index_dir)
+    files = {p.relative_to(documents_dir).as_posix(): _signature(p) for p in document_files(documents_dir)}
+    if not files:
+        files = {doc["id"]: "demo" for doc in demo_documents()}
+    known = current.manifest["files"] if current else {}
+    return sum(known.get(name) != sig for name, sig in files.items()) + len(known.keys() - files.keys())
+
+
+def sync_documents(documents_dir, index_dir, progress=None, workers=MAX_WORKERS, today=None):
+    """Apply added, changed and removed documents to the index. Returns a report dict."""
+    started = time.perf_counter()
+    documents_dir, index_dir = Path(documents_dir), Path(index_dir)
+    today = today or date.today()
+    with _Lock(index_dir):
+        current = _current(index_dir)
+        known = current.manifest["files"] if current else {}
+
+        paths = {p.relative_to(documents_dir).as_posix(): p for p in document_files(documents_dir)}
+        if paths:
+            files = {name: _signature(path) for name, path in paths.items()}
+        else:
+            demo = {doc["id"]: doc for doc in demo_documents(today)}
+            files = {name: "demo" for name in demo}
+        changed = [name for name, sig in files.items() if known.get(name) != sig]
+        removed = [name for name in known if name not in files]
+
+        # Parse, chunk and tokenize the changed files
+        parsed = []
+        if paths and len(changed) >= POOL_MIN_FILES and workers > 1:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(min(workers, os.cpu_count() or 1), mp_context=context) as pool:
+                batch = max(1, len(changed) // (workers * 8))
+                for doc in pool.map(_parse_file, [paths[n] for n in changed], [documents_dir] * len(changed),
+                                    chunksize=batch):
+                    parsed.append(doc)
+                    if progress and len(parsed) % batch == 0:
+                        progress(0.7 * len(parsed) / len(changed), f"Parsed {len(parsed):,} of {len(changed):,} files")
+        else:
+            for name in changed:
+                parsed.append(_parse_file(paths[name], documents_dir) if paths else _chunk_document(demo[name]))
+        if progress:
+            progress(0.7, "Indexing changed passages")
+
+        report = _apply(index_dir, current, parsed, removed, files, today)
+        report.update(files=len(files), changed=len(changed) - report["added"], unchanged=len(files) - len(changed),
+                      removed=len(removed), seconds=time.perf_counter() - started)
+        if progress:
+            progress(1.0, "Knowledge base synchronized")
+    return report
+
+
+def _apply(index_dir, current, parsed, removed, files, today):
+    """Write the segments and generation for the parsed and removed documents."""
+    documents = {"ids": [], "titles": [], "type": [], "date": [], "added": [], "updated": [], "live": []}
+    segments, live = [], []
+    if current is not None:
+        documents = {
+            "ids": current.doc_ids(), "titles": current.titles(),
+            "type": list(current.doc_type), "date": list(current.doc_date),
+            "added": list(current.doc_added), "updated": list(current.doc_updated), "live": list(current.doc_live),
+        }
+        segments = list(current.segments)
+        live = [np.array(mask) for mask in current.live]
+    number = {doc_id: i for i, doc_id in enumerate(documents["ids"])}
+    today_number = int(day_number(today))
+
+    # Document table
+    added = 0
+    for doc in parsed:
+        if doc["id"] not in number:
+            number[doc["id"]] = len(documents["ids"])
+            for column, value in (("ids", doc["id"]), ("titles", doc["title"]), ("type", 0), ("date", 0),
+                                  ("added", today_number), ("updated", today_number), ("live", True)):
+                documents[column].append(value)
+            added += 1
+        i = number[doc["id"]]
+        documents["titles"][i] = doc["title"]
+        documents["type"][i] = DOC_TYPES.index(doc["type"])
+        documents["date"][i] = int(day_number(doc["date"]))
+        documents["live"][i] = True
+    for name in removed:
+        documents["live"][number[name]] = False
+
+    # Keep the chunks a changed document still has; mask out the others
+    wanted = {(number[doc["id"]], key) for doc in parsed for key, _, _ in doc["chunks"]}
+    touched = np.array([number[doc["id"]] for doc in parsed] + [number[name] for name in removed], dtype=np.int64)
+    kept, deleted = set(), 0
+    for segment, mask in zip(segments, live):
+        affected = np.flatnonzero(mask & np.isin(segment.chunk_doc, touched))
+        for chunk, doc, key in zip(affected, segment.chunk_doc[affected], segment.chunk_hash[affected]):
+            if (int(doc), int(key)) in wanted:
+                kept.add((int(doc), int(key)))
+            else:
+                mask[chunk] = False
+                deleted += 1
+    new_chunks = [(number[doc["id"]], key, text, tokens)
+                  for doc in parsed for key, text, tokens in doc["chunks"] if (number[doc["id"]], key) not in kept]
+    for doc in parsed:
+        if any((number[doc["id"]], key) not in kept for key, _, _ in doc["chunks"]):
+            documents["updated"][number[doc["id"]]] = today_number
+
+    n_live = sum(int(mask.sum()) for mask in live) + len(new_chunks)
+    if new_chunks:
+        name = _new_segment(index_dir, segments, new_chunks, n_live)
+        segments.append(Segment(index_dir / "segments" / name))
+        live.append(np.ones(len(new_chunks), dtype=bool))
+    segments, live, merged = _merge(index_dir, segments, live)
+
+    total_length = sum(int(np.asarray(segment.chunk_len)[mask].sum()) for segment, mask in zip(segments, live))
+    manifest = {
+        "chunks": n_live, "documents": int(np.sum(documents["live"])),
+        "avg_length": total_length / max(n_live, 1), "files": files,
+        "synced": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    write_generation(index_dir, [segment.name for segment in segments], live, documents, manifest)
+    return {"added": added, "chunks_indexed": len(new_chunks), "chunks_reused": len(kept),
+            "chunks_deleted": deleted, "segments": len(segments), "merged": merged}
+
+
+def _new_segment(index_dir, segments, chunks, n_live):
+    """Index ``(doc, hash, text, tokens)`` chunks into a new segment and return its name."""
+    words, terms, rows, tfs = build_postings([tokens for _, _, _, tokens in chunks])
+    # Weight the new vectors by document frequencies over the whole index
+    df = np.bincount(terms, minlength=len(words)).astype(np.float64)
+    for segment in segments:
+        ids = segment.lookup(words)
+        df += np.where(ids >= 0, np.asarray(segment.df)[np.maximum(ids, 0)], 0) if len(segment.df) else 0
+    vectors = chunk_vectors(words, terms, rows, tfs, len(chunks), term_idf(df, max(n_live, 1)))
+    name = f"s{time.time_ns()}"
+    write_segment(
+        index_dir / "segments" / name, words, terms, rows, tfs,
+        chunk_len=[len(tokens) for _, _, _, tokens in chunks], chunk_doc=[doc for doc, _, _, _ in chunks],
+        chunk_hash=[key for _, key, _, _ in chunks], texts=[text for _, _, text, _ in chunks], vectors=vectors,
+    )
+    return name
+
+
+def _merge(index_dir, segments, live):
+    """Drop empty segments and merge sparse or surplus ones. Returns segments, masks and merge count."""
+    pairs = [(segment, mask) for segment, mask in zip(segments, live) if mask.any()]
+    sparse = [i for i, (segment, mask) in enumerate(pairs) if mask.mean() < MIN_LIVE_FRACTION]
+    by_size = sorted(range(len(pairs)), key=lambda i: int(pairs[i][1].sum()))
+    surplus = by_size[:len(pairs) - MAX_SEGMENTS // 2] if len(pairs) > MAX_SEGMENTS else []
+    chosen = sorted(set(sparse) | set(surplus))
+    if not chosen:
+        return [s for s, _ in pairs], [m for _, m in pairs], 0
+    columns = merge_columns([pairs[i][0].live_columns(pairs[i][1]) for i in chosen])
+    name = f"s{time.time_ns()}"
+    write_segment(index_dir / "segments" / name, **columns)
+    rest = [pairs[i] for i in range(len(pairs)) if i not in chosen]
+    merged = Segment(index_dir / "segments" / name)
+    return [s for s, _ in rest] + [merged], [m for _, m in rest] + [np.ones(len(merged), dtype=bool)], len(chosen)
+
+
+_opened = {}
+
+
+def load_search_index(documents_dir, index_dir):
+    """The current search index; the first call ingests the documents when there is none yet.
+
+    While another process builds the first index, waits up to
+    ``FIRST_INDEX_WAIT`` seconds for it, and takes over if that ingestion
+    ends without publishing one. Raises :class:`IngestionRunning` when
+    there is still no index after the wait.
+    """
+    index_dir = Path(index_dir)
+    deadline = time.monotonic() + FIRST_INDEX_WAIT
+    while not (index_dir / "current.json").exists():
+        try:
+            sync_documents(documents_dir, index_dir)
+        except IngestionRunning:
+            if time.monotonic() > deadline:
+                raise IngestionRunning(f"no search index in {index_dir} after waiting {FIRST_INDEX_WAIT} s "
+                                       f"for another ingestion")
+            time.sleep(0.2)
+    generation = json.loads((index_dir / "current.json").read_text())["generation"]
+    key = (str(index_dir), generation)
+    if key not in _opened:
+        _opened.clear()
+        _opened[key] = SearchIndex(index_dir)
+    return _opened[key]
@@ -0,0 +1,246 @@
+"""Background jobs for long-running simulations and optimizations.
+
+Each job runs in its own spawned worker process, so a Streamlit rerun
+never blocks on it and never restarts it. The worker reports progress
+through a shared value and polls a cancel event between steps. A finished
+result is written to the disk memo under a hash of the task, its
+parameters and the timetable, and a later submission with the same key
+is answered from the memo (or joins the job still computing it) instead
+of running again. The runner is shared by every session of the server.
+Polling a queued job starts it as soon as a worker slot is free, so a
+page following its job never waits for another submission.
+
+A spawned worker imports the app's main script (as ``__mp_main__``)
+before running its task; ``app.py`` draws the page only when run as
+``__main__``, so workers never render a page or submit its jobs.
+"""
+import hashlib
+import json
+import multiprocessing
+import pickle
+import threading
+import time
+import traceback
+import uuid
+
+from .config import JOB_CACHE
+
+MAX_RUNNING = 2
+CANCEL_GRACE = 2.0
+MESSAGE_BYTES = 256
+# Finished jobs are forgotten after this many seconds (their results stay memoized on disk)
+JOB_TTL = 3600
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job has been cancelled."""
+
+
+def job_key(task, params, timetable=None):
+    """Stable hash of a task name, its JSON-able parameters and the timetable contents."""
+    payload = {"task": f"{task.__module__}.{task.__qualname__}", "params": params}
+    if timetable is not None:
+        payload["timetable"] = timetable.fingerprint()
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _Reporter:
+    """Progress callback handed to a task inside the worker."""
+
+    def __init__(self, fraction, message, cancel):
+        self._fraction = fraction
+        self._message = message
+        self._cancel = cancel
+
+    def __call__(self, fraction, message=""):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self._fraction.value = min(max(float(fraction), 0.0), 1.0)
+        if message:
+            self._message.value = message.encode()[:MESSAGE_BYTES - 1]
+
+
+def _work(task, args, path, fraction, message, cancel, status):
+    try:
+        result = task(*args, progress=_Reporter(fraction, message, cancel))
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+        status.send((DONE, None))
+    except JobCancelled:
+        status.send((CANCELLED, None))
+    except Exception:
+        status.send((FAILED, traceback.format_exc()))
+
+
+class Job:
+    """Handle on one submitted job; ``poll()`` refreshes its state."""
+
+    def __init__(self, key, task, args, path, runner=None):
+        self.runner = runner
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.task = task
+        self.args = args
+        self.path = path
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.error = None
+        self.cached = False
+        self.finished_at = None
+        self._result = None
+        self._process = None
+        self._cancel_at = None
+        self._lock = threading.Lock()
+
+    def _start(self, ctx):
+        self._fraction = ctx.Value("d", 0.0, lock=False)
+        self._cancel = ctx.Event()
+        self._message = ctx.Array("c", MESSAGE_BYTES, lock=False)
+        self._status, child_status = ctx.Pipe(duplex=False)
+        self._process = ctx.Process(
+            target=_work, daemon=False,
+            args=(self.task, self.args, self.path, self._fraction, self._message, self._cancel, child_status),
+        )
+        self._process.start()
+        self.state = RUNNING
+
+    def poll(self):
+        with self._lock:
+            if self.state == RUNNING:
+                self._refresh()
+        if self.state == QUEUED and self.runner is not None:
+            self.runner._promote()
+        return self.state
+
+    def _refresh(self):
+        self.progress = self._fraction.value
+        self.message = self._message.value.decode(errors="ignore")
+        # Read liveness first: a worker that has exited has already sent its status
+        alive = self._process.is_alive()
+        status = None
+        if self._status.poll():
+            try:
+                status = self._status.recv()
+            except EOFError:
+                # The worker died before reporting; it is failed below
+                self._process.join()
+                alive = False
+        if status is not None:
+            self.state, self.error = status
+            self._process.join()
+            if self.state == DONE:
+                self.progress = 1.0
+        elif not alive:
+            self.state = CANCELLED if self._cancel.is_set() else FAILED
+            self.error = self.error or f"worker exited with code {self._process.exitcode}"
+        elif self._cancel_at is not None and time.monotonic() > self._cancel_at:
+            # The task did not reach a progress checkpoint in time
+            self._process.terminate()
+            self._process.join()
+            self.state = CANCELLED
+        if self.state != RUNNING:
+            self.finished_at = time.monotonic()
+
+    def cancel(self):
+        if self.state == QUEUED:
+            self.state = CANCELLED
+            self.finished_at = time.monotonic()
+        elif self.state == RUNNING:
+            self._cancel.set()
+            self._cancel_at = time.monotonic() + CANCEL_GRACE
+
+    @property
+    def finished(self):
+        return self.poll() in (DONE, FAILED, CANCELLED)
+
+    def result(self):
+        """The task's return value once the job is done (loaded from the memo)."""
+        if self._result is None and self.poll() == DONE:
+            with open(self.path, "rb") as f:
+                self._result = pickle.load(f)
+        return self._result
+
+
+class JobRunner:
+    """Runs at most ``max_running`` jobs at once and memoizes their results."""
+
+    def __init__(self, cache_dir=JOB_CACHE, max_running=MAX_RUNNING):
+        self.cache_dir = cache_dir
+        self.max_running = max_running
+        self._ctx = multiprocessing.get_context("spawn")
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, task, *args, params=None, timetable=None):
+        """Run ``task(*args, progress=...)`` in a worker, or reuse a memoized/in-flight result.
+
+        ``params`` and ``timetable`` form the memo key; they should cover
+        everything that changes the result.
+        """
+        key = job_key(task, params, timetable)
+        path = self.cache_dir / f"{key}.pkl"
+        with self._lock:
+            current = self._by_key.get(key)
+            if current is not None and current.poll() in (QUEUED, RUNNING, DONE) and \
+                    (current.state != DONE or path.exists()):
+                return current
+            job = Job(key, task, args, path, runner=self)
+            if path.exists():
+                job.state, job.progress, job.cached = DONE, 1.0, True
+                job.finished_at = time.monotonic()
+            else:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._schedule()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            self._schedule()
+        return job
+
+    def _promote(self):
+        """Start queued jobs if a slot is free; skipped while another thread is already scheduling."""
+        if self._lock.acquire(blocking=False):
+            try:
+                self._schedule()
+            finally:
+                self._lock.release()
+
+    def _schedule(self):
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > JOB_TTL:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+        running = [job for job in self._jobs.values() if job.state == RUNNING and job.poll() == RUNNING]
+        for job in self._jobs.values():
+            if len(running) >= self.max_running:
+                break
+            if job.state == QUEUED:
+                job._start(self._ctx)
+                running.append(job)
+
+
+_runner = None
+
+
+def get_runner():
+    """The process-wide runner shared by all sessions."""
+    global _runner
+    if _runner is None:
+        _runner = JobRunner()
+    return _runner
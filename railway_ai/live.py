@@ -0,0 +1,170 @@
+"""Live train positions for the Network Visualization page.
+
+:class:`LiveTrains` compiles a day's timetable against the network once:
+every movement between two located stops and every dwell becomes a row of
+flat arrays sorted by start time. A position query then only looks at the
+slice of rows that can be under way at that moment (bounded by the longest
+movement) and interpolates them in one vectorized step, so a refresh
+costs microseconds per running train rather than a pass over the day.
+
+Recent positions go into a fixed-capacity :class:`PositionBuffer` ring,
+which the map draws as short trails behind each train. The tracker is
+shared by all sessions of the server, like the job runner; a refresh that
+comes within ``MIN_SAMPLE_SECONDS`` of the last sample reuses it instead
+of appending again.
+"""
+import threading
+
+import numpy as np
+
+from .mapview import with_separators
+from .network import train_moves
+
+HISTORY_SAMPLES = 200_000
+TRAIL_MINUTES = 3.0
+MIN_SAMPLE_SECONDS = 1.0
+
+
+class PositionBuffer:
+    """Ring of the most recent ``(minute, train, lat, lon)`` samples.
+
+    Appending never allocates: when the ring is full the oldest samples
+    are overwritten.
+    """
+
+    def __init__(self, capacity=HISTORY_SAMPLES):
+        self.capacity = capacity
+        self.minute = np.full(capacity, np.nan)
+        self.train = np.full(capacity, -1, dtype=np.int64)
+        self.lat = np.full(capacity, np.nan)
+        self.lon = np.full(capacity, np.nan)
+        self.last_minute = None
+        self._head = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.minute)))
+
+    def append(self, minute, train, lat, lon):
+        """Add one snapshot: a train code and position per running train."""
+        train, lat, lon = train[-self.capacity:], lat[-self.capacity:], lon[-self.capacity:]
+        with self._lock:
+            slots = (self._head + np.arange(len(train))) % self.capacity
+            self.minute[slots] = minute
+            self.train[slots] = train
+            self.lat[slots] = lat
+            self.lon[slots] = lon
+            self._head = (self._head + len(train)) % self.capacity
+            self.last_minute = minute
+
+    def trails(self, since, until, trains=None):
+        """NaN-separated ``(lat, lon)`` paths of each train's samples in ``[since, until]``.
+
+        ``trains`` restricts the paths to those train codes.
+        """
+        with self._lock:
+            with np.errstate(invalid="ignore"):
+                index = np.flatnonzero((self.minute >= since) & (self.minute <= until))
+            if trains is not None:
+                index = index[np.isin(self.train[index], trains)]
+            index = index[np.lexsort((self.minute[index], self.train[index]))]
+            train = self.train[index]
+            lat, lon = self.lat[index], self.lon[index]
+        group = np.r_[0, np.cumsum(train[1:] != train[:-1])] if len(train) else train
+        n_groups = int(group[-1]) + 1 if len(group) else 0
+        return with_separators(lat, group, n_groups), with_separators(lon, group, n_groups)
+
+
+class LiveTrains:
+    """Positions of a day's trains over a network, with a history buffer."""
+
+    def __init__(self, network, timetable, history=HISTORY_SAMPLES):
+        self.network = network
+        self.timetable = timetable
+        self.train_names = np.asarray(timetable.trains, dtype=object)
+        self.line_names = np.asarray(timetable.lines, dtype=object)
+
+        rows_a, rows_b, a, b, _ = train_moves(network, timetable)
+        located = (a >= 0) & (b >= 0)
+        rows_a, rows_b, a, b = rows_a[located], rows_b[located], a[located], b[located]
+        order = np.argsort(timetable.departure[rows_a], kind="stable")
+        rows_a, rows_b, a, b = rows_a[order], rows_b[order], a[order], b[order]
+        self._move_start = timetable.departure[rows_a].astype(np.float64)
+        self._move_end = timetable.arrival[rows_b].astype(np.float64)
+        self._move_train = timetable.train[rows_a].astype(np.int64)
+        self._move_line = timetable.line[rows_a].astype(np.int64)
+        self._move_lat = network.lat[a]
+        self._move_dlat = network.lat[b] - network.lat[a]
+        self._move_lon = network.lon[a]
+        self._move_dlon = network.lon[b] - network.lon[a]
+        self._longest_move = float((self._move_end - self._move_start).max()) if len(a) else 0.0
+
+        node_of = np.array([network._index.get(name, -1) for name in timetable.stations], dtype=np.int64)
+        node = node_of[timetable.station]
+        dwell = np.flatnonzero((node >= 0) & (timetable.departure > timetable.arrival))
+        dwell = dwell[np.argsort(timetable.arrival[dwell], kind="stable")]
+        self._dwell_start = timetable.arrival[dwell].astype(np.float64)
+        self._dwell_end = timetable.departure[dwell].astype(np.float64)
+        self._dwell_train = timetable.train[dwell].astype(np.int64)
+        self._dwell_line = timetable.line[dwell].astype(np.int64)
+        self._dwell_lat = network.lat[node[dwell]]
+        self._dwell_lon = network.lon[node[dwell]]
+        self._longest_dwell = float((self._dwell_end - self._dwell_start).max()) if len(dwell) else 0.0
+
+        self.buffer = PositionBuffer(history)
+
+    @staticmethod
+    def _active(start, end, longest, minute):
+        """Indices of the rows with ``start <= minute < end``, given rows sorted by start."""
+        lo = np.searchsorted(start, minute - longest, side="left")
+        hi = np.searchsorted(start, minute, side="right")
+        return lo + np.flatnonzero(end[lo:hi] > minute)
+
+    def positions(self, minute):
+        """Where every running train is at ``minute`` (fractional minutes allowed).
+
+        A train dwelling at a stop is at the station; a train between stops
+        is placed along the straight line between them in proportion to
+        the elapsed running time. Returns a dict of ``code`` (train
+        indices), ``train`` and ``line`` (names), ``lat`` and ``lon`` arrays.
+        """
+        moving = self._active(self._move_start, self._move_end, self._longest_move, minute)
+        fraction = (minute - self._move_start[moving]) / np.maximum(
+            self._move_end[moving] - self._move_start[moving], 1)
+        dwelling = self._active(self._dwell_start, self._dwell_end, self._longest_dwell, minute)
+        code = np.concatenate([self._move_train[moving], self._dwell_train[dwelling]])
+        line = np.concatenate([self._move_line[moving], self._dwell_line[dwelling]])
+        return {
+            "code": code,
+            "train": self.train_names[code],
+            "line": self.line_names[line],
+            "lat": np.concatenate([self._move_lat[moving] + fraction * self._move_dlat[moving],
+                                   self._dwell_lat[dwelling]]),
+            "lon": np.concatenate([self._move_lon[moving] + fraction * self._move_dlon[moving],
+                                   self._dwell_lon[dwelling]]),
+        }
+
+    def update(self, minute):
+        """Positions at ``minute``, recorded in the history buffer."""
+        positions = self.positions(minute)
+        last = self.buffer.last_minute
+        if last is None or not 0 <= minute - last < MIN_SAMPLE_SECONDS / 60:
+            self.buffer.append(minute, positions["code"], positions["lat"], positions["lon"])
+        return positions
+
+    def trails(self, minute, trains=None, window=TRAIL_MINUTES):
+        """Recent paths of ``trains`` (codes, default all) up to ``minute``."""
+        return self.buffer.trails(minute - window, minute, trains)
+
+
+_tracker = None
+
+
+def live_trains(network, timetable):
+    """The shared :class:`LiveTrains` of a network and (cached) timetable, compiled once."""
+    global _tracker
+    tracker = _tracker
+    # The data cache hands out the same objects until the feed changes, so identity is enough
+    if tracker is None or tracker.network is not network or tracker.timetable is not timetable:
+        tracker = _tracker = LiveTrains(network, timetable)
+    return tracker
@@ -0,0 +1,229 @@
+"""Streaming chat clients for the AI Assistant.
+
+A :class:`ChatClient` talks to one OpenAI-compatible ``/chat/completions``
+endpoint over a pooled ``requests`` session with connect/read timeouts and
+retries (connection errors, 429 and 5xx, honouring ``Retry-After``), and
+yields the reply as it is generated, so the first words reach the chat
+while the rest are still being produced.
+
+Identical requests in flight at the same time -- the same backend, model,
+messages and temperature, typically from several sessions pressing the
+same quick prompt -- share one backend call: the first caller starts it in
+a background thread and every caller, early or late, replays the tokens
+received so far and then follows the stream. The backends behind the
+"Primary AI Model" setting are configured in
+:data:`railway_ai.config.LLM_BACKENDS`.
+"""
+import json
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import LLM_BACKENDS
+from .mock_llm import start_stand_in
+
+# Seconds to connect, and to wait for each part of a streamed reply
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+RETRIES = 3
+POOL_SIZE = 16
+
+SYSTEM_PROMPT = (
+    "You are RailwayAI Copilot, an assistant for railway planners and operators. Answer questions about "
+    "timetables, network capacity, delays, maintenance and regulations concisely, using Markdown."
+)
+
+
+class LLMError(Exception):
+    """Raised when a backend cannot be reached or rejects a request."""
+
+
+class _Flight:
+    """One backend call whose tokens any number of readers can follow.
+
+    The source yields content strings and tool-call deltas (dicts), which
+    are merged into ``tool_calls`` as they arrive.
+    """
+
+    def __init__(self):
+        self.tokens = []
+        self.tool_calls = []
+        self.done = False
+        self.error = None
+        self._changed = threading.Condition()
+
+    def _merge(self, delta):
+        while len(self.tool_calls) <= delta.get("index", 0):
+            self.tool_calls.append({"id": "", "name": "", "arguments": ""})
+        call = self.tool_calls[delta.get("index", 0)]
+        call["id"] = delta.get("id") or call["id"]
+        function = delta.get("function", {})
+        call["name"] += function.get("name") or ""
+        call["arguments"] += function.get("arguments") or ""
+
+    def feed(self, source):
+        try:
+            for token in source:
+                with self._changed:
+                    if isinstance(token, dict):
+                        self._merge(token)
+                    else:
+                        self.tokens.append(token)
+                    self._changed.notify_all()
+        except Exception as exc:
+            self.error = exc if isinstance(exc, LLMError) else LLMError(str(exc))
+        finally:
+            with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    def __iter__(self):
+        seen = 0
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: len(self.tokens) > seen or self.done)
+                new, done = self.tokens[seen:], self.done
+            yield from new
+            seen += len(new)
+            if done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class Reply:
+    """Iterator over the content tokens of a streamed reply.
+
+    Once exhausted, ``tool_calls`` lists the calls the model requested as
+    dicts of ``id``, ``name`` and ``arguments`` (a JSON string).
+    """
+
+    def __init__(self, flight):
+        self._flight = flight
+        self._tokens = iter(flight)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._tokens)
+
+    @property
+    def tool_calls(self):
+        return self._flight.tool_calls
+
+
+class ChatClient:
+    """Streaming client of one OpenAI-compatible chat completions endpoint."""
+
+    def __init__(self, base_url, model, api_key="", timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=None, respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _tokens(self, messages, temperature, tools):
+        """Content and tool-call deltas of one streamed completion."""
+        request = {"model": self.model, "messages": messages, "temperature": temperature, "stream": True}
+        if tools:
+            request["tools"] = tools
+        try:
+            response = self.session.post(f"{self.base_url}/chat/completions", timeout=self.timeout, stream=True,
+                                         json=request)
+        except requests.RequestException as exc:
+            raise LLMError(f"cannot reach {self.base_url}: {exc}") from exc
+        with response:
+            if response.status_code != 200:
+                raise LLMError(f"{self.base_url} answered {response.status_code}: {response.text[:200]}")
+            try:
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    for choice in json.loads(data).get("choices", ()):
+                        delta = choice.get("delta", {})
+                        if delta.get("content"):
+                            yield delta["content"]
+                        yield from delta.get("tool_calls") or ()
+            except requests.RequestException as exc:
+                raise LLMError(f"stream from {self.base_url} interrupted: {exc}") from exc
+
+    def stream(self, messages, temperature=0.7, tools=None):
+        """:class:`Reply` of the model, shared with identical requests already in flight.
+
+        ``tools`` are function schemas in the OpenAI format the model may call.
+        """
+        key = json.dumps([messages, temperature, tools], sort_keys=True)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                threading.Thread(target=self._run, args=(key, flight, messages, temperature, tools),
+                                 daemon=True).start()
+        return Reply(flight)
+
+    def _run(self, key, flight, messages, temperature, tools):
+        try:
+            flight.feed(self._tokens(messages, temperature, tools))
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def complete(self, messages, temperature=0.7):
+        """The whole reply as one string."""
+        return "".join(self.stream(messages, temperature))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(backend):
+    """The shared :class:`ChatClient` of a backend named in ``LLM_BACKENDS``."""
+    config = LLM_BACKENDS[backend]
+    with _clients_lock:
+        client = _clients.get(backend)
+        if client is None:
+            client = _clients[backend] = ChatClient(config["url"] or start_stand_in(), config["model"],
+                                                    config["api_key"])
+    return client
+
+
+def chat_messages(history, summary=None):
+    """Request messages for a chat history of ``{"role", "content"}`` dicts.
+
+    An assistant message may carry the ``tools`` it called (dicts of
+    ``id``, ``name``, ``arguments`` and ``result``); they are replayed as
+    the tool-call and tool-result messages that preceded its answer, so
+    follow-up questions can refer to the results. ``summary`` stands in
+    for older turns left out of ``history``.
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if summary:
+        messages.append({"role": "system", "content": summary})
+    for m in history:
+        if m.get("tools"):
+            messages += tool_messages(m["tools"])
+        messages.append({"role": m["role"], "content": m["content"]})
+    return messages
+
+
+def tool_messages(calls):
+    """The assistant tool-call message and the tool-result messages of executed ``calls``."""
+    return [{"role": "assistant", "content": None, "tool_calls": [
+        {"id": call["id"], "type": "function", "function": {"name": call["name"], "arguments": call["arguments"]}}
+        for call in calls]}] + [
+        {"role": "tool", "tool_call_id": call["id"], "content": json.dumps(call["result"])} for call in calls]
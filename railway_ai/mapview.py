@@ -0,0 +1,260 @@
+"""Batched, level-of-detail map layers for the Network Visualization page.
+
+A figure holds a handful of traces whatever the network size: all track
+geometry is one ``Scattermapbox`` line trace whose polylines are separated
+by NaN, stations are one trace per station type (or one cluster trace),
+and live trains are one marker trace plus one trail trace. The static
+layers are built once per view and the train layers are updated in place.
+
+Detail follows the zoom level. Only geometry overlapping the viewport is
+sent; track chains are decimated to every n-th station and stations are
+merged into grid clusters until each layer fits its share of
+``MAX_POINTS``. Coordinates are rounded to about a metre, which keeps the
+figure JSON small.
+"""
+import math
+
+import numpy as np
+import plotly.graph_objects as go
+
+MAX_POINTS = 20_000
+# Share of the point budget per layer
+TRACK_SHARE = 0.6
+STATION_SHARE = 0.25
+TRAIN_SHARE = 0.15
+
+VIEW_WIDTH_PX = 1200
+VIEW_HEIGHT_PX = 600
+VIEW_PADDING = 1.5
+STATION_DETAIL_ZOOM = 11
+CLUSTER_PX = 40
+COORD_DECIMALS = 5
+
+STATION_SIZES = {"Major Hub": 30, "Terminal": 20, "Junction": 15, "Station": 8}
+
+
+def viewport(center_lat, center_lon, zoom, width_px=VIEW_WIDTH_PX, height_px=VIEW_HEIGHT_PX):
+    """Approximate ``(lat_min, lat_max, lon_min, lon_max)`` visible at a Web Mercator zoom."""
+    degrees_per_px = 360 / (256 * 2 ** zoom)
+    half_lon = width_px / 2 * degrees_per_px * VIEW_PADDING
+    half_lat = height_px / 2 * degrees_per_px * math.cos(math.radians(center_lat)) * VIEW_PADDING
+    return center_lat - half_lat, center_lat + half_lat, center_lon - half_lon, center_lon + half_lon
+
+
+def _inside(lat, lon, view):
+    lat_min, lat_max, lon_min, lon_max = view
+    return (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+
+
+def with_separators(values, group, n_groups):
+    """Lay out ``values`` (sorted by ``group``) with a NaN after every group."""
+    out = np.full(len(values) + n_groups, np.nan)
+    out[np.arange(len(values)) + group] = values
+    return out
+
+
+class NetworkMap:
+    """Map layers of one network; the chain geometry is flattened once up front."""
+
+    def __init__(self, network):
+        self.network = network
+        chains = network.chains
+        lengths = np.array([len(c) for c in chains], dtype=np.int64)
+        self._nodes = np.concatenate(chains) if chains else np.empty(0, dtype=np.int64)
+        self._chain = np.repeat(np.arange(len(chains)), lengths)
+        self._pos = np.arange(len(self._nodes)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        self._last = np.repeat(lengths - 1, lengths)
+
+        # Chain bounding boxes, for viewport culling
+        lat = network.lat[self._nodes]
+        lon = network.lon[self._nodes]
+        starts = np.r_[0, np.cumsum(lengths)[:-1]] if len(chains) else np.empty(0, dtype=np.int64)
+        with np.errstate(invalid="ignore"):
+            self._box = tuple(
+                reduce(values, starts) if len(chains) else np.empty(0)
+                for reduce, values in ((np.fmin.reduceat, lat), (np.fmax.reduceat, lat),
+                                       (np.fmin.reduceat, lon), (np.fmax.reduceat, lon))
+            )
+
+    def tracks(self, view, budget):
+        """NaN-separated ``(lat, lon)`` of the visible track, decimated to fit ``budget`` points."""
+        lat_min, lat_max, lon_min, lon_max = view
+        box_lat_min, box_lat_max, box_lon_min, box_lon_max = self._box
+        visible = ((box_lat_max >= lat_min) & (box_lat_min <= lat_max)
+                   & (box_lon_max >= lon_min) & (box_lon_min <= lon_max))
+        on_visible = visible[self._chain]
+        n_chains = int(visible.sum())
+        points = int(on_visible.sum()) + n_chains
+        # Keep every stride-th station of a chain, and always both ends
+        stride = max(1, math.ceil(points / max(budget - 2 * n_chains, 1)))
+        keep = on_visible & ((self._pos % stride == 0) | (self._pos == self._last))
+        if n_chains * 3 > budget:
+            # Too many chains even end-to-end: draw the longest ones only
+            spans = (box_lat_max - box_lat_min) + (box_lon_max - box_lon_min)
+            spans = np.where(visible, spans, -1)
+            chosen = np.zeros_like(visible)
+            chosen[np.argsort(spans)[::-1][:budget // 3]] = True
+            keep &= chosen[self._chain] & ((self._pos == 0) | (self._pos == self._last))
+            visible &= chosen
+        rank = np.cumsum(visible) - 1
+        group = rank[self._chain[keep]]
+        nodes = self._nodes[keep]
+        n_groups = int(visible.sum())
+        return (with_separators(self.network.lat[nodes], group, n_groups),
+                with_separators(self.network.lon[nodes], group, n_groups))
+
+    def stations(self, view, zoom, budget):
+        """Visible stations, or grid clusters of them when zoomed out or over ``budget``.
+
+        Returns a dict with ``lat``, ``lon``, ``text``, ``size``, ``type``
+        arrays and ``clustered``.
+        """
+        network = self.network
+        index = np.flatnonzero(_inside(network.lat, network.lon, view))
+        kinds = np.asarray(network.kinds, dtype=object)
+        names = np.asarray(network.names, dtype=object)
+        if zoom >= STATION_DETAIL_ZOOM and len(index) <= budget:
+            kind = kinds[index]
+            return {
+                "lat": network.lat[index], "lon": network.lon[index], "text": names[index],
+                "size": np.array([STATION_SIZES.get(k, 8) for k in kind]), "type": kind,
+                "clustered": False,
+            }
+        cell = CLUSTER_PX * 360 / (256 * 2 ** zoom)
+        while True:
+            key = (np.floor(network.lat[index] / cell).astype(np.int64) * 1_000_003
+                   + np.floor(network.lon[index] / cell).astype(np.int64))
+            cells, cluster = np.unique(key, return_inverse=True)
+            if len(cells) <= budget:
+                break
+            cell *= 2
+        count = np.bincount(cluster, minlength=len(cells))
+        lat = np.bincount(cluster, weights=network.lat[index], minlength=len(cells)) / np.maximum(count, 1)
+        lon = np.bincount(cluster, weights=network.lon[index], minlength=len(cells)) / np.maximum(count, 1)
+        # Label each cluster after its best-connected station
+        order = np.lexsort((-network.degree[index], cluster))
+        first = order[np.r_[0, np.flatnonzero(np.diff(cluster[order])) + 1]] if len(order) else order
+        text = np.array([f"{name} (+{n - 1} more)" if n > 1 else name
+                         for name, n in zip(names[index[first]], count)], dtype=object)
+        return {
+            "lat": lat, "lon": lon, "text": text, "size": 8 + 4 * np.sqrt(count),
+            "type": np.full(len(cells), "Stations", dtype=object), "clustered": True,
+        }
+
+    def trains(self, positions, view, budget):
+        """Visible live trains, thinned evenly when over ``budget``."""
+        visible = np.flatnonzero(_inside(positions["lat"], positions["lon"], view))
+        shown = visible[::max(1, math.ceil(len(visible) / max(budget, 1)))]
+        return {
+            "code": positions["code"][shown], "lat": positions["lat"][shown],
+            "lon": positions["lon"][shown], "text": positions["train"][shown],
+            "hidden": len(visible) - len(shown),
+        }
+
+    def static_figure(self, center, zoom, highlight=None, max_points=MAX_POINTS, height=600):
+        """Track, stations and the highlighted route, with empty live-train layers on top.
+
+        ``center`` is ``(lat, lon)`` and ``highlight`` a list of node
+        indices drawn as the selected route. The figure is built once per
+        view; :meth:`update_trains` then refreshes only the train layers.
+        Returns the figure and a dict of rendering statistics.
+        """
+        view = viewport(center[0], center[1], zoom)
+        network = self.network
+        fig = go.Figure()
+
+        track_lat, track_lon = self.tracks(view, int(max_points * TRACK_SHARE))
+        fig.add_trace(go.Scattermapbox(
+            lat=_round(track_lat), lon=_round(track_lon), mode='lines',
+            line=dict(width=3, color='blue'), name='Track', hoverinfo='skip', connectgaps=False
+        ))
+
+        stations = self.stations(view, zoom, int(max_points * STATION_SHARE))
+        for kind in dict.fromkeys(stations["type"]):
+            chosen = stations["type"] == kind
+            fig.add_trace(go.Scattermapbox(
+                lat=_round(stations["lat"][chosen]), lon=_round(stations["lon"][chosen]),
+                mode='markers', marker=dict(size=stations["size"][chosen]),
+                text=stations["text"][chosen], name=kind, hoverinfo='text'
+            ))
+
+        if highlight:
+            fig.add_trace(go.Scattermapbox(
+                lat=_round(network.lat[highlight]), lon=_round(network.lon[highlight]), mode='lines',
+                line=dict(width=6, color='green'), name='Best route'
+            ))
+
+        fig.add_trace(go.Scattermapbox(
+            lat=[], lon=[], mode='lines', line=dict(width=2, color='orange'),
+            name='Train Trails', hoverinfo='skip', connectgaps=False, visible=False
+        ))
+        fig.add_trace(go.Scattermapbox(
+            lat=[], lon=[], mode='markers', marker=dict(size=9, color='orange'),
+            name='Live Trains', hoverinfo='text', visible=False
+        ))
+
+        fig.update_layout(
+            mapbox=dict(style="open-street-map", zoom=zoom, center=dict(lat=center[0], lon=center[1])),
+            height=height,
+            margin=dict(t=0, b=0, l=0, r=0),
+            # Keep the user's pan and zoom across live refreshes of the same view
+            uirevision=f"{center}-{zoom}"
+        )
+        stats = {
+            "track_points": int(np.isfinite(track_lat).sum()),
+            "stations": len(stations["lat"]),
+            "clustered": stations["clustered"],
+        }
+        return fig, stats
+
+    def update_trains(self, fig, positions, center, zoom, tracker=None, max_points=MAX_POINTS):
+        """Replace the train layers of a :meth:`static_figure` in place.
+
+        ``positions`` comes from :meth:`railway_ai.live.LiveTrains.positions`
+        (or ``None`` to hide the layers); with a ``tracker`` the shown trains
+        also get their recent trails. Returns train statistics.
+        """
+        trail_trace, train_trace = fig.data[-2:]
+        if positions is None:
+            trail_trace.visible = train_trace.visible = False
+            return {"trains": 0, "hidden_trains": 0}
+        budget = int(max_points * TRAIN_SHARE)
+        live = self.trains(positions, viewport(center[0], center[1], zoom), budget)
+        with fig.batch_update():
+            train_trace.update(lat=_round(live["lat"]), lon=_round(live["lon"]), text=live["text"], visible=True)
+            if tracker is not None:
+                trail_lat, trail_lon = tracker.trails(tracker.buffer.last_minute, trains=live["code"])
+                # Thin long trails to the train layer's budget
+                stride = max(1, math.ceil(len(trail_lat) / budget))
+                trail_trace.update(lat=_round(_thin(trail_lat, stride)), lon=_round(_thin(trail_lon, stride)),
+                                   visible=True)
+        return {"trains": len(live["lat"]), "hidden_trains": live["hidden"]}
+
+    def figure(self, center, zoom, trains=None, highlight=None, max_points=MAX_POINTS, height=600):
+        """One-off map figure: :meth:`static_figure` with ``trains`` positions filled in."""
+        fig, stats = self.static_figure(center, zoom, highlight, max_points, height)
+        stats.update(self.update_trains(fig, trains, center, zoom, max_points=max_points))
+        return fig, stats
+
+
+def _round(values):
+    return np.round(values, COORD_DECIMALS)
+
+
+def _thin(values, stride):
+    """Every ``stride``-th point of a NaN-separated path array, keeping the separators."""
+    if stride == 1:
+        return values
+    keep = np.isnan(values) | (np.arange(len(values)) % stride == 0)
+    return values[keep]
+
+
+_maps = {}
+
+
+def network_map(network):
+    """The :class:`NetworkMap` of a network, built once per network."""
+    if id(network) not in _maps or _maps[id(network)].network is not network:
+        _maps.clear()
+        _maps[id(network)] = NetworkMap(network)
+    return _maps[id(network)]
@@ -0,0 +1,282 @@
+"""Discrete-event block-section microsimulation for "Traffic Flow".
+
+Every directed section between two consecutive stops is split into
+``blocks_per_section`` signal blocks, and every (station, platform) pair
+is a platform; each holds one train at a time. A train advances by
+requesting the next resource. If it is occupied the train keeps what it
+holds and queues on the resource until it is released, so congestion
+spreads backwards through the network as it does on a signalled line.
+
+Events are ``(minute, train, kind)`` tuples in a ``heapq``. Train state
+lives in ``__slots__`` records and resource occupancy in flat arrays;
+primary delays are drawn up front with NumPy, so the event loop does no
+random sampling and never touches a DataFrame.
+
+A train holding a block while waiting for a platform, and a train holding
+that platform while waiting for a block, can wait on each other forever.
+Such cycles are broken the way dispatchers break them: a train kept
+waiting for a platform longer than ``MAX_PLATFORM_WAIT`` is taken onto an
+overflow track, and the number of overflows is reported.
+"""
+import heapq
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .montecarlo import HORIZON_HOURS, RUNNING_SUPPLEMENT, SCENARIOS, START_MINUTE, WEATHER_FACTOR
+
+BLOCKS_PER_SECTION = 3
+MIN_DWELL = 1.0
+ON_TIME_MINUTES = 5
+MAX_PLATFORM_WAIT = 10.0
+PROGRESS_EVENTS = 20_000
+
+# Event kinds
+_ARRIVE = 0  # wants the platform of the next stop (or of the origin)
+_DEPART = 1  # wants the first block of the next section
+_BLOCK = 2   # wants the next block of the current section
+_OVERFLOW = 3  # platform wait timed out
+
+
+class TrainRun:
+    """Mutable state of one train on one simulated day."""
+
+    __slots__ = ("rows", "platforms", "blocks", "arrival", "departure", "run",
+                 "day", "stop", "block", "holding", "pending", "waiting", "deadline")
+
+    def __init__(self, rows, platforms, blocks, arrival, departure, run, day):
+        self.rows = rows
+        self.platforms = platforms
+        self.blocks = blocks
+        self.arrival = arrival
+        self.departure = departure
+        self.run = run
+        self.day = day
+        self.stop = -1
+        self.block = -1
+        self.holding = -1
+        self.pending = _ARRIVE
+        self.waiting = -1
+        self.deadline = 0.0
+
+
+class Microsimulator:
+    """Block-section simulator over one day's timetable.
+
+    The network (platforms, sections and each train's resource sequence)
+    is compiled once; ``run`` can then be called for several scenarios.
+    """
+
+    def __init__(self, timetable, blocks_per_section=BLOCKS_PER_SECTION):
+        self.timetable = timetable
+        self.blocks_per_section = blocks_per_section
+        tt = timetable
+        n_stations = max(len(tt.stations), 1)
+
+        order = np.lexsort((tt.seq, tt.train))
+        train = tt.train[order]
+        starts = np.flatnonzero(np.r_[True, train[1:] != train[:-1]]) if len(order) else []
+        self._runs = np.split(order, starts[1:]) if len(order) else []
+
+        # One resource per (station, platform); platform 0 means unassigned and is not modelled
+        platform_key = tt.station.astype(np.int64) * 1000 + tt.platform
+        keys, platform_of = np.unique(platform_key, return_inverse=True)
+        self._platform_of = np.where(tt.platform > 0, platform_of, -1)
+        self.platform_names = [f"{tt.stations[k // 1000]} P{k % 1000}" for k in keys.tolist()]
+
+        # One group of consecutive block resources per directed station pair
+        self._section_of = np.full(len(tt), -1, dtype=np.int64)
+        if len(order):
+            first = order[:-1][train[1:] == train[:-1]]
+            second = order[1:][train[1:] == train[:-1]]
+            pair = tt.station[first].astype(np.int64) * n_stations + tt.station[second]
+            pairs, self._section_of[first] = np.unique(pair, return_inverse=True)
+        else:
+            pairs = np.empty(0, dtype=np.int64)
+        self.section_names = [
+            f"{tt.stations[k // n_stations]} → {tt.stations[k % n_stations]}" for k in pairs.tolist()
+        ]
+        self.n_platforms = len(keys)
+        self.n_sections = len(pairs)
+
+    def _draw(self, rng, size, p, mean):
+        hits = rng.random(size) < min(p, 1.0)
+        return np.where(hits, rng.exponential(mean, size), 0.0)
+
+    def run(self, horizon_hours=24, start_minute=None, seed=0, weather=False,
+            simulation_type="Traffic Flow", recovery_margin=0.0, progress=None):
+        """Simulate one replication of the horizon.
+
+        Horizons longer than a day repeat the day's timetable for every
+        day. Trains may run ``RUNNING_SUPPLEMENT + recovery_margin`` faster
+        than scheduled to recover lost time. Returns per-bucket arrivals,
+        on-time share and mean delay, the arrival delay of every stop event
+        (``(days, rows)``, NaN where not reached) and resource utilization.
+        ``progress`` is called with the simulated fraction of the horizon.
+        """
+        wall = time.perf_counter()
+        hours = HORIZON_HOURS[horizon_hours] if isinstance(horizon_hours, str) else horizon_hours
+        if start_minute is None:
+            start_minute = START_MINUTE if hours < 24 else 0
+        end = start_minute + hours * 60
+        days = max(int(-(-end // 1440)), 1)
+        scenario = SCENARIOS[simulation_type]
+        factor = WEATHER_FACTOR if weather else 1.0
+        rng = np.random.default_rng(seed)
+
+        tt = self.timetable
+        n_blocks = self.blocks_per_section
+        platform_base = self.n_platforms
+        arrival_of = tt.arrival.astype(np.float64)
+        departure_of = tt.departure.astype(np.float64)
+        technical = 1 - RUNNING_SUPPLEMENT - recovery_margin
+
+        trains = []
+        events = []
+        for day in range(days):
+            offset = day * 1440.0
+            origin_delay = self._draw(rng, len(self._runs), scenario["origin_p"] * factor,
+                                      scenario["origin_mean"] * factor)
+            section_delay = self._draw(rng, len(tt), scenario["section_p"] * factor,
+                                       scenario["section_mean"] * factor)
+            for rows, primary in zip(self._runs, origin_delay.tolist()):
+                first = arrival_of[rows[0]] + offset
+                if not start_minute <= first < end:
+                    continue
+                arrival = (arrival_of[rows] + offset).tolist()
+                departure = (departure_of[rows] + offset).tolist()
+                run = ((arrival_of[rows[1:]] - departure_of[rows[:-1]]) * technical
+                       + section_delay[rows[:-1]]) / n_blocks
+                trains.append(TrainRun(
+                    rows.tolist(),
+                    self._platform_of[rows].tolist(),
+                    (platform_base + self._section_of[rows[:-1]] * n_blocks).tolist(),
+                    arrival, departure, run.tolist(), day,
+                ))
+                events.append((first + primary, len(trains) - 1, _ARRIVE))
+        heapq.heapify(events)
+
+        n_resources = self.n_platforms + self.n_sections * n_blocks
+        occupant = [-1] * n_resources
+        busy_since = [0.0] * n_resources
+        busy = [0.0] * n_resources
+        waiting = {}
+        delays = np.full((days, len(tt)), np.nan)
+        push, pop = heapq.heappush, heapq.heappop
+
+        def acquire(resource, index, now, kind):
+            if resource < 0:
+                return True
+            if occupant[resource] < 0:
+                occupant[resource] = index
+                busy_since[resource] = now
+                return True
+            train = trains[index]
+            train.pending = kind
+            train.waiting = resource
+            waiting.setdefault(resource, deque()).append(index)
+            if kind == _ARRIVE:
+                train.deadline = now + MAX_PLATFORM_WAIT
+                push(events, (train.deadline, index, _OVERFLOW))
+            return False
+
+        def release(resource, now):
+            if resource < 0:
+                return
+            occupant[resource] = -1
+            busy[resource] += now - busy_since[resource]
+            queue = waiting.get(resource)
+            if queue:
+                woken = queue.popleft()
+                push(events, (now, woken, trains[woken].pending))
+
+        n_events = overflows = 0
+        while events:
+            now, index, kind = pop(events)
+            if now >= end:
+                break
+            n_events += 1
+            if progress and n_events % PROGRESS_EVENTS == 0:
+                progress((now - start_minute) / (end - start_minute))
+            train = trains[index]
+            if kind == _OVERFLOW:
+                if train.pending != _ARRIVE or train.waiting < 0 or now < train.deadline:
+                    continue
+                waiting[train.waiting].remove(index)
+                train.platforms[train.stop + 1] = -1
+                overflows += 1
+                kind = _ARRIVE
+            train.waiting = -1
+
+            if kind == _ARRIVE:
+                stop = train.stop + 1
+                platform = train.platforms[stop]
+                if not acquire(platform, index, now, _ARRIVE):
+                    continue
+                release(train.holding, now)
+                train.stop, train.block, train.holding = stop, -1, platform
+                delays[train.day, train.rows[stop]] = now - train.arrival[stop]
+                push(events, (max(now + MIN_DWELL, train.departure[stop]), index, _DEPART))
+
+            elif kind == _DEPART:
+                stop = train.stop
+                if stop == len(train.rows) - 1:
+                    release(train.holding, now)
+                    train.holding = -1
+                    continue
+                block = train.blocks[stop]
+                if not acquire(block, index, now, _DEPART):
+                    continue
+                release(train.holding, now)
+                train.block, train.holding = 0, block
+                push(events, (now + train.run[stop], index, _BLOCK if n_blocks > 1 else _ARRIVE))
+
+            else:
+                block = train.holding + 1
+                if not acquire(block, index, now, _BLOCK):
+                    continue
+                release(train.holding, now)
+                train.block += 1
+                train.holding = block
+                last = train.block == n_blocks - 1
+                push(events, (now + train.run[train.stop], index, _ARRIVE if last else _BLOCK))
+
+        for resource, holder in enumerate(occupant):
+            if holder >= 0:
+                busy[resource] += end - busy_since[resource]
+        result = self._summarize(delays, np.asarray(busy), start_minute, hours)
+        result.update(events=n_events, trains=len(trains), overflows=overflows, wall_seconds=time.perf_counter() - wall)
+        return result
+
+    def _summarize(self, delays, busy, start_minute, hours):
+        tt = self.timetable
+        days = delays.shape[0]
+        scheduled = tt.arrival[None, :] + 1440.0 * np.arange(days)[:, None]
+        size = 60 if hours <= 24 else 1440
+        n_buckets = max(int(hours * 60 // size), 1)
+        bucket = ((scheduled - start_minute) // size).astype(np.int64)
+        keep = ~np.isnan(delays) & (bucket >= 0) & (bucket < n_buckets)
+        b, d = bucket[keep], delays[keep]
+
+        arrivals = np.bincount(b, minlength=n_buckets)
+        on_time = np.bincount(b, weights=d < ON_TIME_MINUTES, minlength=n_buckets)
+        total = np.bincount(b, weights=np.maximum(d, 0), minlength=n_buckets)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            on_time_pct = np.where(arrivals > 0, 100 * on_time / arrivals, np.nan)
+            mean_delay = np.where(arrivals > 0, total / arrivals, np.nan)
+
+        span = max(hours * 60, 1)
+        section_busy = busy[self.n_platforms:].reshape(self.n_sections, self.blocks_per_section)
+        return {
+            "hours": (start_minute + np.arange(n_buckets) * size) / 60,
+            "arrivals": arrivals,
+            "on_time": on_time_pct,
+            "mean_delay": mean_delay,
+            "delays": delays,
+            "overall_on_time": float(100 * (d < ON_TIME_MINUTES).mean()) if len(d) else float("nan"),
+            "delay_minutes": float(np.maximum(d, 0).sum()),
+            "platform_utilization": pd.Series(busy[:self.n_platforms] / span, index=self.platform_names),
+            "section_utilization": pd.Series(section_busy.max(axis=1) / span, index=self.section_names),
+        }
@@ -0,0 +1,133 @@
+"""Local stand-in for an SMTP server, for report e-mail without a mail relay.
+
+It speaks enough SMTP (``EHLO``/``HELO``, ``MAIL``, ``RCPT``, ``DATA``,
+``RSET``, ``NOOP``, ``QUIT``) for :mod:`smtplib` and writes every message
+it accepts to ``<outbox>/<timestamp>-<id>.eml`` instead of delivering it,
+so exported and scheduled reports can be checked by opening the files.
+Run it standalone with::
+
+    python -m railway_ai.mock_smtp --port 8025
+
+and set ``RAILWAY_SMTP_HOST=127.0.0.1`` and ``RAILWAY_SMTP_PORT=8025``.
+Without a configured host, :func:`railway_ai.export.send_report` uses
+:func:`start_stand_in` instead.
+"""
+import argparse
+import socketserver
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from .config import OUTBOX_DIR
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sender, recipients = None, []
+        self._reply("220 railway-ai stand-in ESMTP")
+        try:
+            for raw in self.rfile:
+                command = raw.decode("utf-8", "replace").strip()
+                verb = command[:4].upper()
+                if verb == "EHLO":
+                    self._reply("250-railway-ai stand-in")
+                    self._reply("250 8BITMIME")
+                elif verb == "HELO":
+                    self._reply("250 railway-ai stand-in")
+                elif verb == "MAIL":
+                    sender, recipients = command.split(":", 1)[1].strip(), []
+                    self._reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.split(":", 1)[1].strip())
+                    self._reply("250 OK")
+                elif verb == "DATA":
+                    if sender is None or not recipients:
+                        self._reply("503 MAIL and RCPT first")
+                        continue
+                    self._reply("354 End data with <CR><LF>.<CR><LF>")
+                    self._save(self._read_data())
+                    sender, recipients = None, []
+                    self._reply("250 OK queued")
+                elif verb == "RSET":
+                    sender, recipients = None, []
+                    self._reply("250 OK")
+                elif verb == "NOOP":
+                    self._reply("250 OK")
+                elif verb == "QUIT":
+                    self._reply("221 Bye")
+                    return
+                else:
+                    self._reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+
+    def _read_data(self):
+        lines = []
+        for raw in self.rfile:
+            if raw in (b".\r\n", b".\n"):
+                break
+            # Undo dot-stuffing
+            lines.append(raw[1:] if raw.startswith(b"..") else raw)
+        return b"".join(lines)
+
+    def _save(self, data):
+        outbox = self.server.outbox
+        outbox.mkdir(parents=True, exist_ok=True)
+        path = outbox / f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.eml"
+        path.write_bytes(data)
+        with self.server.lock:
+            self.server.messages += 1
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(host="127.0.0.1", port=0, outbox=OUTBOX_DIR):
+    """A stand-in server bound to ``host:port`` (``port=0`` picks a free one), not yet serving.
+
+    ``server.messages`` counts the messages written to ``outbox``.
+    """
+    server = _Server((host, port), _Handler)
+    server.outbox = Path(outbox)
+    server.messages = 0
+    server.lock = threading.Lock()
+    return server
+
+
+_stand_in = None
+_stand_in_lock = threading.Lock()
+
+
+def start_stand_in():
+    """``(host, port)`` of the process-wide stand-in server, started in a daemon thread on first use."""
+    global _stand_in
+    with _stand_in_lock:
+        if _stand_in is None:
+            _stand_in = serve()
+            threading.Thread(target=_stand_in.serve_forever, name="mock-smtp", daemon=True).start()
+        return _stand_in.server_address[:2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--outbox", default=str(OUTBOX_DIR))
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.outbox)
+    print(f"Serving SMTP stand-in on {args.host}:{args.port}, writing messages to {args.outbox}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
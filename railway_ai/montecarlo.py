@@ -0,0 +1,249 @@
+"""Monte Carlo delay propagation.
+
+Each iteration draws primary delays (at the origin, on sections and at
+stops) and propagates them along every train, absorbing them in running
+time supplements and dwell slack. Trains of the same line leaving the
+same origin knock on to each other through the headway between them.
+
+All iterations of a shard are simulated together as
+``(iterations, trains)`` arrays, stop by stop. Knock-on between
+consecutive trains is the max-plus recursion
+``d[i] = max(p[i], d[i-1] - slack[i])``, which is evaluated without a
+loop over trains as ``maximum.accumulate(p + C) - C`` with ``C`` the
+cumulative slack. Large runs are split into shards with independent
+``SeedSequence`` children, so results depend only on the seed and not on
+the number of worker processes.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+HORIZON_HOURS = {"1 Hour": 1, "6 Hours": 6, "1 Day": 24, "1 Week": 168, "1 Month": 720}
+
+# Primary delay probabilities and mean sizes (minutes) per simulation type
+SCENARIOS = {
+    "Traffic Flow": {"origin_p": 0.15, "origin_mean": 4.0, "section_p": 0.05, "section_mean": 3.0,
+                     "dwell_p": 0.10, "dwell_mean": 1.0},
+    "Disruption Recovery": {"origin_p": 0.30, "origin_mean": 12.0, "section_p": 0.10, "section_mean": 6.0,
+                            "dwell_p": 0.15, "dwell_mean": 2.0},
+    "Capacity Planning": {"origin_p": 0.20, "origin_mean": 5.0, "section_p": 0.08, "section_mean": 3.0,
+                          "dwell_p": 0.20, "dwell_mean": 1.5},
+    "Energy Optimization": {"origin_p": 0.15, "origin_mean": 4.0, "section_p": 0.07, "section_mean": 3.0,
+                            "dwell_p": 0.10, "dwell_mean": 1.0},
+}
+WEATHER_FACTOR = 1.5
+
+RUNNING_SUPPLEMENT = 0.05
+MIN_DWELL = 1
+MIN_HEADWAY = 3
+ON_TIME_MINUTES = 5
+START_MINUTE = 6 * 60
+SHARD_ITERATIONS = 250
+
+
+def compile_timetable(timetable, horizon_hours=24, start_minute=START_MINUTE, recovery_margin=0.0):
+    """Turn a timetable into padded ``(trains, stops)`` arrays for the simulator.
+
+    Only trains whose first departure falls in the horizon window (wrapped
+    to one service day) are kept. ``recovery_margin`` adds that fraction of
+    running time as extra supplement, for what-if comparisons.
+    """
+    order = np.lexsort((timetable.seq, timetable.train))
+    train = timetable.train[order]
+    starts = np.flatnonzero(np.r_[True, train[1:] != train[:-1]])
+    lengths = np.diff(np.r_[starts, len(train)])
+    n_trains, n_stops = len(starts), int(lengths.max()) if len(starts) else 0
+
+    # Scatter stop events into a (trains, stops) grid
+    column = np.arange(len(train)) - np.repeat(starts, lengths)
+    row = np.repeat(np.arange(n_trains), lengths)
+    arrival = np.zeros((n_trains, n_stops))
+    departure = np.zeros((n_trains, n_stops))
+    valid = np.zeros((n_trains, n_stops), dtype=bool)
+    arrival[row, column] = timetable.arrival[order]
+    departure[row, column] = timetable.departure[order]
+    valid[row, column] = True
+
+    first = departure[:, 0]
+    window = min(horizon_hours, 24) * 60
+    keep = ((first - start_minute) % 1440) < window
+    arrival, departure, valid, first = arrival[keep], departure[keep], valid[keep], first[keep]
+    line = timetable.line[order][starts][keep]
+    origin = timetable.station[order][starts][keep]
+
+    run = np.zeros_like(arrival)
+    run[:, :-1] = np.where(valid[:, 1:], arrival[:, 1:] - departure[:, :-1], 0)
+    dwell = np.where(valid, departure - arrival, 0)
+
+    # Knock-on order: by (line, origin, first departure); slack to the train ahead
+    knock = np.lexsort((first, origin, line))
+    same = np.r_[False, (line[knock][1:] == line[knock][:-1]) & (origin[knock][1:] == origin[knock][:-1])]
+    gap = np.r_[0, np.diff(first[knock])]
+    slack = np.where(same, np.maximum(gap - MIN_HEADWAY, 0), 1e6)
+
+    return {
+        "arrival": arrival,
+        "valid": valid,
+        "run_slack": run * (RUNNING_SUPPLEMENT + recovery_margin),
+        "dwell_slack": np.clip(dwell - MIN_DWELL, 0, None),
+        "knock_order": knock,
+        "knock_slack": np.cumsum(slack),  # float64: boundaries add 1e6 each
+        "horizon_hours": horizon_hours,
+        "start_minute": start_minute,
+    }
+
+
+def _buckets(compiled):
+    """Bucket index of every (train, stop) and the bucket labels in hours."""
+    hours = compiled["horizon_hours"]
+    size = 5 if hours <= 1 else 60
+    offset = (compiled["arrival"] - compiled["start_minute"]) % 1440
+    n = max(int(min(hours, 24) * 60 // size), 1)
+    index = np.clip((offset // size).astype(np.int64), 0, n - 1)
+    return index, np.arange(n) * size / 60
+
+
+def _stop_plans(compiled):
+    """Per stop: valid trains sorted by bucket, with reduceat boundaries."""
+    bucket, labels = _buckets(compiled)
+    plans = []
+    for k in range(bucket.shape[1]):
+        trains = np.flatnonzero(compiled["valid"][:, k])
+        trains = trains[np.argsort(bucket[trains, k], kind="stable")]
+        ids, first = np.unique(bucket[trains, k], return_index=True)
+        plans.append((trains, ids, first))
+    return plans, len(labels)
+
+
+def simulate_shard(compiled, scenario, seed, iterations, weather=False):
+    """Simulate ``iterations`` replications of the horizon.
+
+    Returns ``on_time`` (share of arrivals within ``ON_TIME_MINUTES``) and
+    ``mean_delay`` per bucket, shape ``(iterations * days, buckets)`` in
+    iteration-major order, plus the total ``delay_minutes`` of each
+    simulated day. Only ``(iterations, trains)`` arrays are held, one stop
+    at a time.
+    """
+    rng = np.random.default_rng(seed)
+    factor = WEATHER_FACTOR if weather else 1.0
+    n_trains, n_stops = compiled["valid"].shape
+    days = max(compiled["horizon_hours"] // 24, 1)
+    plans, n_buckets = _stop_plans(compiled)
+    events = np.zeros(n_buckets)
+    for trains, ids, first in plans:
+        events[ids] += np.diff(np.r_[first, len(trains)])
+    has_events = events > 0
+
+    knock = compiled["knock_order"]
+    cum = compiled["knock_slack"]
+    dwell_slack = compiled["dwell_slack"].astype(np.float32)
+    run_slack = compiled["run_slack"].astype(np.float32)
+    shape = (iterations, n_trains)
+
+    def draw(p, mean):
+        # Sparse Bernoulli draw: pick the number of hits, then their positions,
+        # so the cost scales with p * size rather than size. A position picked
+        # twice keeps one delay, which lowers p by a negligible O(p^2).
+        out = np.zeros(shape, dtype=np.float32)
+        hits = rng.binomial(out.size, min(p * factor, 1.0))
+        out.reshape(-1)[rng.integers(0, out.size, hits)] = rng.exponential(mean * factor, hits)
+        return out
+
+    on_time = np.empty((iterations, days, n_buckets))
+    mean_delay = np.empty((iterations, days, n_buckets))
+    totals = np.empty((iterations, days))
+    for day in range(days):
+        # Knock-on between consecutive trains of a line at their origin
+        primary = draw(scenario["origin_p"], scenario["origin_mean"])
+        delay = np.empty(shape, dtype=np.float32)
+        delay[:, knock] = np.maximum.accumulate(primary[:, knock] + cum, axis=1) - cum
+
+        late = np.zeros((iterations, n_buckets))
+        total = np.zeros((iterations, n_buckets))
+        for k, (trains, ids, first) in enumerate(plans):
+            if len(trains):
+                at_stop = delay[:, trains]
+                late[:, ids] += np.add.reduceat(at_stop >= ON_TIME_MINUTES, first, axis=1)
+                total[:, ids] += np.add.reduceat(at_stop, first, axis=1)
+            delay += draw(scenario["dwell_p"], scenario["dwell_mean"]) - dwell_slack[:, k]
+            np.maximum(delay, 0, out=delay)
+            delay += draw(scenario["section_p"], scenario["section_mean"]) - run_slack[:, k]
+            np.maximum(delay, 0, out=delay)
+
+        on_time[:, day] = 1.0
+        on_time[:, day, has_events] = 1 - late[:, has_events] / events[has_events]
+        mean_delay[:, day] = 0.0
+        mean_delay[:, day, has_events] = total[:, has_events] / events[has_events]
+        totals[:, day] = total.sum(axis=1)
+
+    return {
+        "on_time": on_time.reshape(iterations * days, n_buckets),
+        "mean_delay": mean_delay.reshape(iterations * days, n_buckets),
+        "delay_minutes": totals.ravel(),
+    }
+
+
+def _band(samples, confidence):
+    tail = (100 - confidence) / 2
+    lower, median, upper = np.percentile(samples, [tail, 50, 100 - tail], axis=0)
+    return {"lower": lower, "median": median, "upper": upper}
+
+
+def run_monte_carlo(timetable, iterations=1000, seed=42, confidence=95, horizon="1 Day",
+                    simulation_type="Traffic Flow", weather=True, recovery_margin=0.0,
+                    workers=None, progress=None):
+    """Run the Monte Carlo engine and summarize it at ``confidence`` percent.
+
+    Returns the bucket positions in hours (``hours``), the on-time share and
+    mean delay as percentile bands, and the total-delay distribution.
+    ``progress`` is called with the completed fraction after each shard.
+    """
+    hours = HORIZON_HOURS[horizon] if isinstance(horizon, str) else horizon
+    compiled = compile_timetable(timetable, hours, recovery_margin=recovery_margin)
+    scenario = SCENARIOS[simulation_type]
+    n_shards = -(-iterations // SHARD_ITERATIONS)
+    sizes = [min(SHARD_ITERATIONS, iterations - i * SHARD_ITERATIONS) for i in range(n_shards)]
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+
+    workload = iterations * compiled["valid"].sum() * max(hours // 24, 1)
+    workers = workers or os.cpu_count() or 1
+    # Process start-up only pays off for large runs
+    workers = min(workers, n_shards, max(1, int(workload // 20_000_000)))
+
+    shards = []
+    if workers > 1:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [pool.submit(simulate_shard, compiled, scenario, s, n, weather)
+                       for s, n in zip(seeds, sizes)]
+            for done, future in enumerate(futures, 1):
+                shards.append(future.result())
+                if progress:
+                    progress(done / n_shards)
+    else:
+        for done, (s, n) in enumerate(zip(seeds, sizes), 1):
+            shards.append(simulate_shard(compiled, scenario, s, n, weather))
+            if progress:
+                progress(done / n_shards)
+
+    on_time = np.concatenate([s["on_time"] for s in shards]) * 100
+    mean_delay = np.concatenate([s["mean_delay"] for s in shards])
+    delay_minutes = np.concatenate([s["delay_minutes"] for s in shards])
+    days = max(hours // 24, 1)
+    _, bucket_hours = _buckets(compiled)
+    if days > 1:
+        # Report one point per simulated day
+        on_time = on_time.reshape(-1, days, on_time.shape[1]).mean(axis=2)
+        mean_delay = mean_delay.reshape(-1, days, mean_delay.shape[1]).mean(axis=2)
+        bucket_hours = np.arange(days) * 24.0
+    return {
+        "hours": bucket_hours + (0 if days > 1 else compiled["start_minute"] / 60),
+        "on_time": _band(on_time, confidence),
+        "mean_delay": _band(mean_delay, confidence),
+        "delay_minutes": _band(delay_minutes, confidence),
+        "trains": int(compiled["valid"].shape[0]),
+        "iterations": iterations,
+        "confidence": confidence,
+    }
@@ -0,0 +1,510 @@
+"""Railway network topology and routing.
+
+Stations are nodes and track links are undirected edges, compiled into a
+CSR adjacency (``indptr``, ``indices``, ``weight``, ``link``) so the
+neighbourhood of a node is a slice of flat arrays. Routes minimize
+scheduled running minutes.
+
+Point-to-point queries are A* searches with ALT potentials: exact
+distances from a few far-apart landmarks, computed once, bound the
+remaining distance from below by ``|d(L, t) - d(L, v)|`` (triangle
+inequality). Closing links only makes distances longer, so the bound
+stays valid around closures and the landmarks never need recomputing.
+``k_shortest_paths`` is Yen's algorithm on top of the same search.
+"""
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+from .gtfs_import import has_cache, load_stop_links
+
+N_LANDMARKS = 8
+DEMO_SPEED_KMH = 60
+EARTH_RADIUS_KM = 6371.0
+
+# Demo network: (name, lat, lon, type) and links between station names
+DEMO_STATIONS = (
+    ("Central Station", 40.7128, -74.0060, "Major Hub"),
+    ("North Terminal", 40.7580, -73.9855, "Terminal"),
+    ("South Plaza", 40.6892, -74.0445, "Terminal"),
+    ("East Junction", 40.7489, -73.9680, "Terminal"),
+    ("West End", 40.6892, -73.9900, "Terminal"),
+    ("Junction A", 40.7300, -73.9950, "Junction"),
+    ("Junction B", 40.7000, -74.0200, "Junction"),
+)
+DEMO_LINKS = (
+    ("Central Station", "North Terminal"), ("Central Station", "South Plaza"),
+    ("Central Station", "East Junction"), ("Central Station", "West End"),
+    ("North Terminal", "East Junction"), ("East Junction", "South Plaza"),
+    ("South Plaza", "West End"), ("East Junction", "West End"),
+    ("Central Station", "Junction A"), ("Junction A", "North Terminal"), ("Junction A", "East Junction"),
+    ("Central Station", "Junction B"), ("Junction B", "South Plaza"), ("Junction B", "West End"),
+)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in kilometres."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class Network:
+    """Station graph with shortest-path and reroute queries.
+
+    ``link_from``/``link_to`` are node indices of undirected links and
+    ``minutes`` their running times. Routes are returned as dicts with the
+    station ``names``, ``nodes``, ``links``, total ``minutes`` and ``km``.
+
+    Station names are the keys timetables are joined on, so they must be
+    unique. Searches run on the contracted core: runs of degree-2 stations between
+    junctions and termini are chains, each crossed as a single hop. A route
+    starting or ending inside a chain splits that chain into segment hops
+    for the one query.
+    """
+
+    def __init__(self, names, lat, lon, link_from, link_to, minutes, kinds=None, n_landmarks=N_LANDMARKS):
+        self.names = list(names)
+        n = len(self.names)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.link_from = np.asarray(link_from, dtype=np.int64)
+        self.link_to = np.asarray(link_to, dtype=np.int64)
+        self.minutes = np.asarray(minutes, dtype=np.float64)
+        self.length_km = haversine_km(self.lat[self.link_from], self.lon[self.link_from],
+                                      self.lat[self.link_to], self.lon[self.link_to])
+        self._index = {name: i for i, name in enumerate(self.names)}
+        if len(self._index) != n:
+            duplicates = sorted(pd.Series(self.names)[pd.Series(self.names).duplicated()].unique())
+            raise ValueError(f"duplicate station names: {', '.join(map(str, duplicates[:5]))}")
+
+        # CSR over both directions of every link
+        m = len(self.link_from)
+        src = np.concatenate([self.link_from, self.link_to])
+        dst = np.concatenate([self.link_to, self.link_from])
+        link = np.concatenate([np.arange(m), np.arange(m)])
+        order = np.argsort(src, kind="stable")
+        self.indptr = np.r_[0, np.cumsum(np.bincount(src, minlength=n))]
+        self.indices = dst[order]
+        self.link = link[order]
+        self.weight = self.minutes[self.link]
+        self.degree = np.diff(self.indptr)
+        if kinds is None:
+            kinds = np.where(self.degree >= 3, "Junction", np.where(self.degree <= 1, "Terminal", "Station"))
+        self.kinds = list(kinds)
+
+        self._contract()
+        self._n_landmarks = min(n_landmarks, len(self._core))
+        self._landmarks = None
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def track_km(self):
+        return float(np.nansum(self.length_km))
+
+    @property
+    def chains(self):
+        """Node sequences of the contracted chains; together they cover every link once."""
+        return [nodes for nodes, _, _ in self._chains]
+
+    # -- contraction --------------------------------------------------------
+
+    def _contract(self):
+        """Split the links into chains between core nodes and build the core CSR."""
+        n = len(self)
+        indptr, indices, links = self.indptr.tolist(), self.indices.tolist(), self.link.tolist()
+        minutes = self.minutes.tolist()
+        core = self.degree != 2
+        used = np.zeros(len(self.link_from), dtype=bool)
+        chains = []  # (nodes, links, cumulative minutes)
+
+        def walk(start):
+            for arc in range(indptr[start], indptr[start + 1]):
+                if used[links[arc]]:
+                    continue
+                nodes, path, cum = [start], [], [0.0]
+                prev_link, cur = links[arc], indices[arc]
+                while True:
+                    used[prev_link] = True
+                    nodes.append(cur)
+                    path.append(prev_link)
+                    cum.append(cum[-1] + minutes[prev_link])
+                    if core[cur]:
+                        break
+                    a, b = indptr[cur], indptr[cur] + 1
+                    nxt = b if links[a] == prev_link else a
+                    prev_link, cur = links[nxt], indices[nxt]
+                chains.append((nodes, path, cum))
+
+        for start in np.flatnonzero(core).tolist():
+            walk(start)
+        # Rings made only of degree-2 stations: promote one station per ring
+        for l in np.flatnonzero(~used).tolist():
+            if not used[l]:
+                start = int(self.link_from[l])
+                core[start] = True
+                walk(start)
+
+        self._core = np.flatnonzero(core)
+        self._chains = chains
+        self._chain_of_node = np.full(n, -1, dtype=np.int64)
+        self._pos_of_node = np.zeros(n, dtype=np.int64)
+        self._chain_of_link = np.zeros(len(self.link_from), dtype=np.int64)
+        self._pos_of_link = np.zeros(len(self.link_from), dtype=np.int64)
+        for c, (nodes, path, _) in enumerate(chains):
+            self._chain_of_node[nodes[1:-1]] = c
+            self._pos_of_node[nodes[1:-1]] = np.arange(1, len(nodes) - 1)
+            self._chain_of_link[path] = c
+            self._pos_of_link[path] = np.arange(len(path))
+
+        # Core adjacency: one arc per chain end, keyed by chain id
+        ends_a = [c[0][0] for c in chains]
+        ends_b = [c[0][-1] for c in chains]
+        totals = [c[2][-1] for c in chains]
+        adjacency = [[] for _ in range(n)]
+        for c, (a, b, w) in enumerate(zip(ends_a, ends_b, totals)):
+            adjacency[a].append((b, w, c))
+            adjacency[b].append((a, w, c))
+        self._adjacency = adjacency
+
+    def _overlay(self, source, target, closed):
+        """Per-query view: split chains holding an endpoint into segment hops.
+
+        Returns extra arcs by node, the blocked hop ids (closed chains and
+        segments, and split chains) and the segment table.
+        """
+        blocked = {int(self._chain_of_link[l]) for l in closed}
+        extra = {}
+        segments = {}
+        splits = {}
+        for node in (source, target):
+            chain = int(self._chain_of_node[node])
+            if chain >= 0:
+                splits.setdefault(chain, set()).add(int(self._pos_of_node[node]))
+        hop = len(self._chains)
+        for chain, cuts in splits.items():
+            nodes, path, cum = self._chains[chain]
+            blocked.add(chain)
+            bounds = sorted(cuts | {0, len(nodes) - 1})
+            for i, j in zip(bounds[:-1], bounds[1:]):
+                segments[hop] = (chain, i, j)
+                if any(l in closed for l in path[i:j]):
+                    blocked.add(hop)
+                w = cum[j] - cum[i]
+                extra.setdefault(nodes[i], []).append((nodes[j], w, hop))
+                extra.setdefault(nodes[j], []).append((nodes[i], w, hop))
+                hop += 1
+        return extra, blocked, segments
+
+    def _expand(self, hops, start, segments):
+        """Station nodes and links of a hop sequence walked from ``start``."""
+        nodes, links = [start], []
+        for hop in hops:
+            if hop in segments:
+                chain, i, j = segments[hop]
+            else:
+                chain, i, j = hop, 0, len(self._chains[hop][0]) - 1
+            chain_nodes, chain_links, _ = self._chains[chain]
+            if chain_nodes[i] == nodes[-1]:
+                nodes.extend(chain_nodes[i + 1:j + 1])
+                links.extend(chain_links[i:j])
+            else:
+                nodes.extend(chain_nodes[i:j][::-1])
+                links.extend(chain_links[i:j][::-1])
+        return nodes, links
+
+    # -- search -------------------------------------------------------------
+
+    def node(self, station):
+        """Node index of a station name (or index)."""
+        if isinstance(station, (int, np.integer)):
+            return int(station)
+        return self._index[station]
+
+    def link_between(self, a, b):
+        """Link id joining two stations, or ``None``."""
+        a, b = self.node(a), self.node(b)
+        for arc in range(self.indptr[a], self.indptr[a + 1]):
+            if self.indices[arc] == b:
+                return int(self.link[arc])
+        return None
+
+    def _closed_links(self, closed):
+        links = set()
+        for item in closed:
+            link = self.link_between(*item) if isinstance(item, tuple) else int(item)
+            if link is not None:
+                links.add(link)
+        return links
+
+    def _search(self, source, target=None, potential=None, extra=None, blocked_hops=(), blocked_nodes=()):
+        """Dijkstra over the core from ``source``, or A* to ``target`` with a ``potential`` dict."""
+        adjacency = self._adjacency
+        extra = extra or {}
+        dist = {source: 0.0}
+        parent = {source: None}
+        heap = [(0.0, source)]
+        settled = set()
+        pop, push, inf = heapq.heappop, heapq.heappush, math.inf
+        while heap:
+            _, u = pop(heap)
+            if u in settled:
+                continue
+            if u == target:
+                break
+            settled.add(u)
+            du = dist[u]
+            arcs = adjacency[u]
+            if u in extra:
+                arcs = arcs + extra[u]
+            for v, w, hop in arcs:
+                if v in settled or hop in blocked_hops or v in blocked_nodes:
+                    continue
+                nd = du + w
+                if nd < dist.get(v, inf):
+                    h = potential.get(v, 0.0) if potential else 0.0
+                    if h == inf:
+                        continue
+                    dist[v] = nd
+                    parent[v] = (u, hop)
+                    push(heap, (nd + h, v))
+        return dist, parent
+
+    def _ensure_landmarks(self):
+        """Pick core landmarks by farthest-point selection; store their distances to core nodes."""
+        if self._landmarks is not None:
+            return self._landmarks
+        core = self._core
+        rows = []
+        closest = np.full(len(core), np.inf)
+        start = int(core[np.argmax(self.degree[core])]) if len(core) else 0
+        for i in range(self._n_landmarks):
+            if i == 0:
+                # The farthest node from the busiest junction is a good first landmark
+                row = self._distance_row(self._search(start)[0])
+                landmark = int(core[np.argmax(np.where(np.isfinite(row), row, -1))])
+            else:
+                # Components no landmark reaches first, then the node farthest from all landmarks
+                unreached = np.flatnonzero(~np.isfinite(closest))
+                landmark = int(core[unreached[0] if len(unreached) else np.argmax(closest)])
+            row = self._distance_row(self._search(landmark)[0])
+            rows.append(row)
+            closest = np.minimum(closest, row)
+        self._landmarks = np.vstack(rows) if rows else np.empty((0, len(core)))
+        return self._landmarks
+
+    def _distance_row(self, dist):
+        full = np.full(len(self), np.inf)
+        full[np.fromiter(dist.keys(), dtype=np.int64, count=len(dist))] = np.fromiter(
+            dist.values(), dtype=np.float64, count=len(dist))
+        return full[self._core]
+
+    def _potential(self, target):
+        """ALT lower bounds on the remaining minutes to ``target`` for every core node."""
+        landmarks = self._ensure_landmarks()
+        chain = int(self._chain_of_node[target])
+        if chain < 0:
+            position = np.searchsorted(self._core, target)
+            to_target = landmarks[:, position]
+        else:
+            # Inside a chain: via whichever chain end is closer to the landmark
+            nodes, _, cum = self._chains[chain]
+            pos = int(self._pos_of_node[target])
+            a, b = np.searchsorted(self._core, [nodes[0], nodes[-1]])
+            to_target = np.minimum(landmarks[:, a] + cum[pos], landmarks[:, b] + cum[-1] - cum[pos])
+        useful = np.isfinite(to_target)
+        if not useful.any():
+            return None
+        bound = np.abs(landmarks[useful] - to_target[useful, None]).max(axis=0)
+        return dict(zip(self._core.tolist(), bound.tolist()))
+
+    def _route(self, source, target, potential, extra, segments, blocked_hops=(), blocked_nodes=()):
+        dist, parent = self._search(source, target, potential, extra, blocked_hops, blocked_nodes)
+        if target not in parent:
+            return None
+        cores, hops = [target], []
+        while parent[cores[-1]] is not None:
+            u, hop = parent[cores[-1]]
+            cores.append(u)
+            hops.append(hop)
+        cores.reverse()
+        hops.reverse()
+        return {"cores": cores, "hops": hops, "minutes": dist[target]}
+
+    def _finish(self, route, segments):
+        nodes, links = self._expand(route["hops"], route["cores"][0], segments)
+        return {
+            "names": [self.names[v] for v in nodes],
+            "nodes": nodes,
+            "links": links,
+            "minutes": route["minutes"],
+            "km": float(np.nansum(self.length_km[links])) if links else 0.0,
+        }
+
+    # -- queries ------------------------------------------------------------
+
+    def shortest_path(self, source, target, closed=()):
+        """Fastest route avoiding ``closed`` links (ids or station-name pairs), or ``None``."""
+        paths = self.k_shortest_paths(source, target, 1, closed)
+        return paths[0] if paths else None
+
+    def k_shortest_paths(self, source, target, k=3, closed=()):
+        """Up to ``k`` loop-free routes in order of running time (Yen's algorithm over hops)."""
+        source, target = self.node(source), self.node(target)
+        closed = self._closed_links(closed)
+        extra, blocked, segments = self._overlay(source, target, closed)
+        potential = self._potential(target)
+        first = self._route(source, target, potential, extra, segments, blocked)
+        if first is None:
+            return []
+        found = [first]
+        candidates = []
+        seen = {tuple(first["hops"])}
+        hop_minutes = {}
+        while len(found) < k:
+            previous = found[-1]
+            for j in range(len(previous["cores"]) - 1):
+                root_cores = previous["cores"][:j + 1]
+                root_hops = previous["hops"][:j]
+                blocked_here = set(blocked)
+                for route in found:
+                    if route["cores"][:j + 1] == root_cores:
+                        blocked_here.add(route["hops"][j])
+                spur = self._route(root_cores[-1], target, potential, extra, segments,
+                                   blocked_here, set(root_cores[:-1]))
+                if spur is None:
+                    continue
+                hops = root_hops + spur["hops"]
+                if tuple(hops) in seen:
+                    continue
+                seen.add(tuple(hops))
+                root_minutes = sum(hop_minutes.setdefault(h, self._hop_minutes(h, segments)) for h in root_hops)
+                heapq.heappush(candidates, (root_minutes + spur["minutes"], len(seen),
+                                            root_cores[:-1] + spur["cores"], hops))
+            if not candidates:
+                break
+            minutes, _, cores, hops = heapq.heappop(candidates)
+            found.append({"cores": cores, "hops": hops, "minutes": minutes})
+        return [self._finish(route, segments) for route in found]
+
+    def _hop_minutes(self, hop, segments):
+        if hop in segments:
+            chain, i, j = segments[hop]
+            cum = self._chains[chain][2]
+            return cum[j] - cum[i]
+        return self._chains[hop][2][-1]
+
+    def reroute(self, source, target, closed, k=3):
+        """Alternatives to the normal route between two stations while ``closed`` links are shut.
+
+        Returns the ``normal`` route and up to ``k`` ``alternatives``, each
+        with the ``extra_minutes`` it costs over the normal route.
+        """
+        normal = self.shortest_path(source, target)
+        alternatives = self.k_shortest_paths(source, target, k, closed)
+        for route in alternatives:
+            route["extra_minutes"] = route["minutes"] - normal["minutes"] if normal else math.nan
+        return {"normal": normal, "alternatives": alternatives}
+
+    def stations_frame(self):
+        return pd.DataFrame({"station": self.names, "lat": self.lat, "lon": self.lon,
+                             "type": self.kinds, "degree": self.degree})
+
+    def links_frame(self):
+        names = np.asarray(self.names, dtype=object)
+        return pd.DataFrame({"from": names[self.link_from], "to": names[self.link_to],
+                             "minutes": self.minutes, "km": self.length_km})
+
+
+def train_moves(network, timetable):
+    """Consecutive stops of every train as ``(row, next row, node, next node, link id)``.
+
+    Timetable stations are joined to network nodes by their station key,
+    the unique station name that both are built with. Nodes are -1 for
+    stations missing from the network, links -1 where no link joins the
+    two stops.
+    """
+    order = np.lexsort((timetable.seq, timetable.train))
+    same = timetable.train[order][1:] == timetable.train[order][:-1]
+    rows_a, rows_b = order[:-1][same], order[1:][same]
+    node_of = np.array([network._index.get(name, -1) for name in timetable.stations], dtype=np.int64)
+    a, b = node_of[timetable.station[rows_a]], node_of[timetable.station[rows_b]]
+    # Look links up by their sorted end pair
+    n = max(len(network), 1)
+    keys = np.minimum(network.link_from, network.link_to) * n + np.maximum(network.link_from, network.link_to)
+    order_keys = np.argsort(keys)
+    sorted_keys = keys[order_keys]
+    link = np.full(len(rows_a), -1, dtype=np.int64)
+    if len(keys):
+        wanted = np.minimum(a, b) * n + np.maximum(a, b)
+        pos = np.minimum(np.searchsorted(sorted_keys, wanted), len(keys) - 1)
+        found = (a >= 0) & (b >= 0) & (sorted_keys[pos] == wanted)
+        link[found] = order_keys[pos[found]]
+    return rows_a, rows_b, a, b, link
+
+
+def link_traffic(network, timetable):
+    """Number of train movements over every link in a timetable."""
+    link = train_moves(network, timetable)[4]
+    return np.bincount(link[link >= 0], minlength=len(network.link_from))
+
+
+def suggest_reroute(network, timetable, closed_link, after_minute=0, k=3):
+    """Detour for the next train scheduled over a closed link.
+
+    Picks the first movement over ``closed_link`` departing at or after
+    ``after_minute`` (or the day's first one) and searches ``k``
+    alternatives between its two stops. Returns ``None`` when no train
+    uses the link.
+    """
+    rows_a, rows_b, _, _, link = train_moves(network, timetable)
+    hit = np.flatnonzero(link == closed_link)
+    if not len(hit):
+        return None
+    departures = timetable.departure[rows_a[hit]]
+    later = hit[departures >= after_minute]
+    move = later[np.argmin(timetable.departure[rows_a[later]])] if len(later) else hit[np.argmin(departures)]
+    row_a, row_b = rows_a[move], rows_b[move]
+    source = timetable.stations[timetable.station[row_a]]
+    target = timetable.stations[timetable.station[row_b]]
+    plan = network.reroute(source, target, [closed_link], k)
+    plan.update(
+        train=timetable.trains[timetable.train[row_a]],
+        departure=int(timetable.departure[row_a]),
+        source=source,
+        target=target,
+    )
+    return plan
+
+
+def demo_network():
+    """The demonstration network used when no feed has been synced."""
+    names, lat, lon, kinds = zip(*DEMO_STATIONS)
+    index = {name: i for i, name in enumerate(names)}
+    link_from = np.array([index[a] for a, _ in DEMO_LINKS])
+    link_to = np.array([index[b] for _, b in DEMO_LINKS])
+    km = haversine_km(np.array(lat)[link_from], np.array(lon)[link_from],
+                      np.array(lat)[link_to], np.array(lon)[link_to])
+    minutes = np.maximum(np.round(km / DEMO_SPEED_KMH * 60), 1)
+    return Network(names, lat, lon, link_from, link_to, minutes, kinds)
+
+
+def network_from_cache(cache_dir):
+    """Network of every station and consecutive-stop link in the synced feed; a station's platforms are one node."""
+    stations, links = load_stop_links(cache_dir)
+    return Network(
+        stations["name"].tolist(), stations["stop_lat"], stations["stop_lon"],
+        links["from"].to_numpy(), links["to"].to_numpy(), links["minutes"].to_numpy(),
+    )
+
+
+def load_network(cache_dir):
+    """The synced feed's network, or the demo network without a synced feed.
+
+    The views read it through :func:`railway_ai.data.current_network`, which caches it.
+    """
+    return network_from_cache(cache_dir) if has_cache(cache_dir) else demo_network()
@@ -0,0 +1,497 @@
+"""Anytime local-search optimizer for a day's timetable.
+
+The search retimes whole trains by a few minutes and reassigns stop events
+to other platforms. The cost is a weighted sum of terms that decompose
+over pairs of events or over single trains, so a candidate move is scored
+from the events it shares a platform, section or minute with instead of by
+rescoring the whole timetable:
+
+* ``platform``   -- pairwise minutes of platform double-occupancy,
+* ``headway``    -- pairwise headway shortfall per section, plus
+  ``min_headway`` for every pair that overtakes inside the section,
+* ``deviation``  -- absolute retiming of each train,
+* ``lateness``   -- retiming later than planned,
+* ``peak``       -- sum over minutes of squared departures (traction power peaks),
+* ``regularity`` -- sum of squared departure gaps per line and station.
+
+Each ``optimization_goal`` of the Timetable Manager is a set of weights
+over these terms. :func:`optimize` is a generator that runs until its
+wall-clock budget is spent, yielding the best-so-far retimings as it goes.
+Candidate batches are scored in a process pool when ``workers > 1``; each
+submission carries only the accepted moves that the slowest worker has not
+applied yet, not the whole accepted-move log.
+"""
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .conflicts import MIN_HEADWAY, ConflictDetector
+from .timetable import Timetable
+
+GOALS = {
+    "Minimize Delays": {"platform": 10.0, "headway": 10.0, "deviation": 1.0, "lateness": 2.0},
+    "Maximize Throughput": {"platform": 5.0, "headway": 20.0, "deviation": 0.2},
+    "Energy Efficiency": {"platform": 10.0, "headway": 10.0, "deviation": 0.5, "peak": 1.0},
+    "Passenger Comfort": {"platform": 10.0, "headway": 10.0, "deviation": 0.5, "regularity": 0.05},
+}
+
+MAX_SHIFT = 15
+SHIFT_STEPS = (-5, -3, -2, -1, 1, 2, 3, 5)
+BATCH_PER_WORKER = 32
+
+
+def _members(keys):
+    order = np.argsort(keys, kind="stable")
+    unique, first = np.unique(keys[order], return_index=True)
+    return dict(zip(unique.tolist(), np.split(order, first[1:])))
+
+
+def _close_pairs(group, start, reach):
+    """Pairs ``(i, j)`` of the same group with ``start[i] <= start[j] < reach[i]``.
+
+    Sorted by start, each element is compared with its k-th next neighbour
+    for growing k until no element still reaches that far, so the work is
+    proportional to the number of close pairs rather than n squared.
+    """
+    n = len(start)
+    order = np.lexsort((start, group))
+    g, s, r = group[order], start[order], reach[order]
+    left, right = [], []
+    active = np.arange(n - 1)
+    k = 1
+    while active.size:
+        active = active[active + k < n]
+        j = active + k
+        close = (g[j] == g[active]) & (s[j] < r[active])
+        active, j = active[close], j[close]
+        left.append(order[active])
+        right.append(order[j])
+        k += 1
+    if not left:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(left), np.concatenate(right)
+
+
+def _overlap(a_start, a_end, b_start, b_end):
+    return np.clip(np.minimum(a_end, b_end) - np.maximum(a_start, b_start), 0, None)
+
+
+def _headway_cost(a_entry, a_exit, b_entry, b_exit, min_headway):
+    gap = np.abs(a_entry - b_entry)
+    flipped = (a_entry - b_entry) * (a_exit - b_exit) < 0
+    return np.clip(min_headway - gap, 0, None) + min_headway * flipped
+
+
+def _gap_change(deps, x, sign):
+    """Change in the sum of squared gaps when ``x`` is inserted into (sign 1)
+    or removed from (sign -1) the sorted ``deps``, which do not contain it."""
+    i = int(np.searchsorted(deps, x))
+    change = 0.0
+    if 0 < i < len(deps):
+        change -= float(deps[i] - deps[i - 1]) ** 2
+    if i > 0:
+        change += float(x - deps[i - 1]) ** 2
+    if i < len(deps):
+        change += float(deps[i] - x) ** 2
+    return sign * change
+
+
+class CostModel:
+    """Timetable state plus the weighted cost terms.
+
+    Moves are tuples ``("shift", train, minutes)`` or
+    ``("platform", row, platform)``. :meth:`delta` scores a move without
+    keeping it; :meth:`apply` commits it. ``row_cost`` holds each row's
+    share of the platform and headway terms and steers the search towards
+    conflicting trains.
+    """
+
+    def __init__(self, timetable, weights, min_headway=MIN_HEADWAY):
+        tt = timetable
+        n = len(tt)
+        self.timetable = tt
+        self.weights = weights
+        self.min_headway = min_headway
+        self.arrival = tt.arrival.astype(np.int64)
+        self.departure = tt.departure.astype(np.int64)
+        self.platform = tt.platform.astype(np.int64)
+        self.shift = np.zeros(len(tt.trains), dtype=np.int64)
+        self.max_platform = max(int(self.platform.max()) if n else 1, 1)
+        self.row_cost = np.zeros(n)
+        self._n_stations = max(len(tt.stations), 1)
+        self._day0 = int(tt.day.min()) if n else 0
+        self.train_rows = _members(tt.train)
+
+        # Sections join consecutive stops of the same train on the same day
+        order = np.lexsort((tt.seq, tt.train, tt.day))
+        same = (tt.train[order][1:] == tt.train[order][:-1]) & (tt.day[order][1:] == tt.day[order][:-1])
+        self.sec_from = order[:-1][same]
+        self.sec_to = order[1:][same]
+        self.sec_key = ((tt.day[self.sec_from].astype(np.int64) - self._day0) * self._n_stations
+                        + tt.station[self.sec_from]) * self._n_stations + tt.station[self.sec_to]
+        self.sec_out = np.full(n, -1, dtype=np.int64)
+        self.sec_in = np.full(n, -1, dtype=np.int64)
+        self.sec_out[self.sec_from] = np.arange(len(self.sec_from))
+        self.sec_in[self.sec_to] = np.arange(len(self.sec_to))
+
+        self.platform_members = _members(self._platform_key(np.arange(n)))
+        self.section_members = _members(self.sec_key)
+        self.terms = dict.fromkeys(("platform", "headway", "deviation", "lateness", "peak", "regularity"), 0.0)
+
+        rows = np.nonzero(self.platform > 0)[0]
+        a, b = _close_pairs(self._platform_key(rows), self.arrival[rows], self.departure[rows])
+        a, b = rows[a], rows[b]
+        cost = _overlap(self.arrival[a], self.departure[a], self.arrival[b], self.departure[b])
+        self.terms["platform"] = float(cost.sum())
+        np.add.at(self.row_cost, a, weights.get("platform", 0) * cost)
+        np.add.at(self.row_cost, b, weights.get("platform", 0) * cost)
+
+        entry, exit = self._section_times(np.arange(len(self.sec_from)))
+        a, b = _close_pairs(self.sec_key, entry, np.maximum(entry + min_headway, exit))
+        cost = _headway_cost(entry[a], exit[a], entry[b], exit[b], min_headway)
+        self.terms["headway"] = float(cost.sum())
+        np.add.at(self.row_cost, self.sec_from[a], weights.get("headway", 0) * cost)
+        np.add.at(self.row_cost, self.sec_from[b], weights.get("headway", 0) * cost)
+
+        self._minute_offset = int(self.departure.min()) - MAX_SHIFT - 1 if n else 0
+        size = int(self.departure.max()) - self._minute_offset + MAX_SHIFT + 2 if n else 1
+        self.departures_per_minute = np.bincount(self.departure - self._minute_offset, minlength=size)
+        self.terms["peak"] = float((self.departures_per_minute.astype(np.float64) ** 2).sum())
+
+        self.stop_key = ((tt.day.astype(np.int64) - self._day0) * 64 + tt.line) * self._n_stations + tt.station
+        self.stop_departures = {}
+        if weights.get("regularity"):
+            for key, members in _members(self.stop_key).items():
+                deps = np.sort(self.departure[members])
+                self.stop_departures[key] = deps
+                self.terms["regularity"] += float((np.diff(deps).astype(np.float64) ** 2).sum())
+
+        self.total = sum(weights.get(term, 0) * value for term, value in self.terms.items())
+
+    def _platform_key(self, rows, platform=None):
+        tt = self.timetable
+        platform = self.platform[rows] if platform is None else platform
+        return ((tt.day[rows].astype(np.int64) - self._day0) * self._n_stations + tt.station[rows]) * 1000 \
+            + platform
+
+    def _section_times(self, sections):
+        return self.departure[self.sec_from[sections]], self.arrival[self.sec_to[sections]]
+
+    def legal(self, move):
+        kind, target, value = move
+        if kind == "shift":
+            return abs(self.shift[target] + value) <= MAX_SHIFT
+        return value != self.platform[target] and 1 <= value <= self.max_platform
+
+    def _platform_delta(self, row, old_key, new_key, shift, exclude, updates):
+        """Pairwise overlap change of one row moving in time and/or between platforms."""
+        if self.platform[row] <= 0:
+            return 0.0
+        w = self.weights.get("platform", 0)
+        delta = 0.0
+        for key, sign, d in ((old_key, -1, 0), (new_key, 1, shift)):
+            members = self.platform_members.get(key)
+            if members is None or not len(members):
+                continue
+            members = members[~np.isin(members, exclude)]
+            cost = _overlap(self.arrival[row] + d, self.departure[row] + d,
+                            self.arrival[members], self.departure[members])
+            delta += sign * float(cost.sum())
+            updates.append((members, sign * w * cost))
+            updates.append((np.array([row]), np.array([sign * w * cost.sum()])))
+        return delta
+
+    def _section_delta(self, section, shift, exclude, updates):
+        """Pairwise headway change of one section when its train shifts."""
+        w = self.weights.get("headway", 0)
+        members = self.section_members[int(self.sec_key[section])]
+        members = members[~np.isin(members, exclude)]
+        entry, exit = self._section_times(members)
+        own_entry, own_exit = self._section_times(np.array([section]))
+        old = _headway_cost(own_entry, own_exit, entry, exit, self.min_headway)
+        new = _headway_cost(own_entry + shift, own_exit + shift, entry, exit, self.min_headway)
+        change = new - old
+        updates.append((self.sec_from[members], w * change))
+        updates.append((self.sec_from[[section]], np.array([w * change.sum()])))
+        return float(change.sum())
+
+    def _regularity_delta(self, rows, shift):
+        delta = 0.0
+        for row in rows.tolist():
+            deps = self.stop_departures[int(self.stop_key[row])]
+            old, new = self.departure[row], self.departure[row] + shift
+            rest = np.delete(deps, int(np.searchsorted(deps, old)))
+            delta += _gap_change(rest, old, -1) + _gap_change(rest, new, 1)
+        return delta
+
+    def _score(self, move):
+        """Return ``(delta, term_changes, row_cost_updates)`` for a move."""
+        kind, target, value = move
+        changes = dict.fromkeys(self.terms, 0.0)
+        updates = []
+        if kind == "platform":
+            changes["platform"] = self._platform_delta(
+                target, int(self._platform_key(target)), int(self._platform_key(target, value)),
+                0, [target], updates)
+        else:
+            rows = self.train_rows[target]
+            for row in rows.tolist():
+                key = int(self._platform_key(row))
+                changes["platform"] += self._platform_delta(row, key, key, value, rows, updates)
+            sections = np.concatenate([self.sec_out[rows], self.sec_in[rows]])
+            sections = np.unique(sections[sections >= 0])
+            for section in sections.tolist():
+                changes["headway"] += self._section_delta(section, value, sections, updates)
+            s = self.shift[target]
+            changes["deviation"] = abs(s + value) - abs(s)
+            changes["lateness"] = max(s + value, 0) - max(s, 0)
+            if self.weights.get("peak"):
+                old = self.departure[rows] - self._minute_offset
+                minutes = np.unique(np.concatenate([old, old + value]))
+                counts = self.departures_per_minute[minutes].astype(np.float64)
+                after = counts.copy()
+                np.subtract.at(after, np.searchsorted(minutes, old), 1)
+                np.add.at(after, np.searchsorted(minutes, old + value), 1)
+                changes["peak"] = float((after ** 2).sum() - (counts ** 2).sum())
+            if self.weights.get("regularity"):
+                changes["regularity"] = self._regularity_delta(rows, value)
+        delta = sum(self.weights.get(term, 0) * change for term, change in changes.items())
+        return delta, changes, updates
+
+    def delta(self, move):
+        """Change in total cost if ``move`` were applied."""
+        return self._score(move)[0]
+
+    def apply(self, move):
+        delta, changes, updates = self._score(move)
+        for rows, values in updates:
+            np.add.at(self.row_cost, rows, values)
+        for term, change in changes.items():
+            self.terms[term] += change
+        self.total += delta
+
+        kind, target, value = move
+        if kind == "platform":
+            old_key = int(self._platform_key(target))
+            members = self.platform_members[old_key]
+            self.platform_members[old_key] = members[members != target]
+            self.platform[target] = value
+            new_key = int(self._platform_key(target))
+            self.platform_members[new_key] = np.append(
+                self.platform_members.get(new_key, np.empty(0, dtype=np.int64)), target)
+            return
+        rows = self.train_rows[target]
+        np.subtract.at(self.departures_per_minute, self.departure[rows] - self._minute_offset, 1)
+        np.add.at(self.departures_per_minute, self.departure[rows] + value - self._minute_offset, 1)
+        if self.stop_departures:
+            for row in rows.tolist():
+                key = int(self.stop_key[row])
+                deps = self.stop_departures[key]
+                deps = np.delete(deps, np.searchsorted(deps, self.departure[row]))
+                new = self.departure[row] + value
+                self.stop_departures[key] = np.insert(deps, np.searchsorted(deps, new), new)
+        self.arrival[rows] += value
+        self.departure[rows] += value
+        self.shift[target] += value
+
+    def hot_rows(self):
+        """Rows that currently take part in a platform or headway conflict."""
+        return np.nonzero(self.row_cost > 1e-9)[0]
+
+    def to_timetable(self):
+        tt = self.timetable
+        columns = tt.columns()
+        columns.update(arrival=self.arrival, departure=self.departure, platform=self.platform)
+        return Timetable(tt.trains, tt.stations, tt.lines, **columns)
+
+
+def _random_move(model, hot, rng):
+    """Propose a move, mostly on a train or stop involved in a current conflict."""
+    if len(hot) and rng.random() < 0.9:
+        row = int(hot[rng.integers(len(hot))])
+    else:
+        row = int(rng.integers(len(model.timetable)))
+    if rng.random() < 0.3 and model.max_platform > 1 and model.platform[row] > 0:
+        return ("platform", row, int(rng.integers(1, model.max_platform + 1)))
+    train = int(model.timetable.train[row])
+    return ("shift", train, int(SHIFT_STEPS[rng.integers(len(SHIFT_STEPS))]))
+
+
+# Worker-side state for process-pool evaluation
+_worker_model = None
+_worker_applied = 0
+
+
+def _init_worker(trains, stations, lines, columns, weights, min_headway):
+    global _worker_model, _worker_applied
+    _worker_model = CostModel(Timetable(trains, stations, lines, **columns), weights, min_headway)
+    _worker_applied = 0
+
+
+def _evaluate_batch(offset, tail, moves):
+    """Bring the worker's state up to the accepted-move log, then score ``moves``.
+
+    ``tail`` is the log from position ``offset`` on. Returns the worker's
+    pid, the number of moves it has applied and the deltas, or ``None`` for
+    the deltas when it is behind ``offset`` and needs an earlier tail.
+    """
+    global _worker_applied
+    if _worker_applied < offset:
+        return os.getpid(), _worker_applied, None
+    for move in tail[_worker_applied - offset:]:
+        _worker_model.apply(move)
+    _worker_applied = offset + len(tail)
+    return os.getpid(), _worker_applied, [_worker_model.delta(move) for move in moves]
+
+
+class _Best:
+    """The best-so-far retimings and platform changes, kept up to date from the accepted-move log."""
+
+    def __init__(self, timetable):
+        self.timetable = timetable
+        self.length = 0
+        self.shift = {}
+        self.platform = {}
+
+    def advance(self, log, length):
+        """Move the best state forward to the first ``length`` accepted moves."""
+        for kind, target, value in log[self.length:length]:
+            if kind == "shift":
+                self.shift[target] = self.shift.get(target, 0) + value
+            else:
+                self.platform[target] = value
+        self.length = length
+
+    def retimed(self):
+        trains = self.timetable.trains
+        return {trains[t]: int(s) for t, s in sorted(self.shift.items()) if s}
+
+    def replatformed(self):
+        original = self.timetable.platform
+        return sum(1 for row, value in self.platform.items() if value != original[row])
+
+
+def _conflict_counts(timetable, min_headway):
+    found = ConflictDetector(timetable, min_headway).detect()
+    return found["Type"].value_counts().to_dict()
+
+
+def optimize(timetable, goal="Minimize Delays", time_budget=5.0, workers=None, seed=0,
+             report_every=0.25, min_headway=MIN_HEADWAY):
+    """Anytime simulated annealing over train retimings and platform changes.
+
+    Yields progress dicts while running, each with the best-so-far
+    ``retimed`` trains and ``replatformed`` stop count; the last one has
+    ``done=True`` and also carries the best timetable found as ``timetable``
+    and conflict counts before and after. ``workers`` defaults to all cores;
+    with one worker candidates are scored in-process.
+    """
+    weights = GOALS[goal]
+    start = time.monotonic()
+    rng = np.random.default_rng(seed)
+    model = CostModel(timetable, weights, min_headway)
+    initial = model.total
+    workers = workers or os.cpu_count() or 1
+    # Small timetables are not worth the process start-up cost
+    workers = min(workers, max(1, len(timetable) // 20_000))
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(timetable.trains, timetable.stations, timetable.lines,
+                      timetable.columns(), weights, min_headway),
+        )
+
+    log = []
+    # Accepted moves each worker process has applied, by pid
+    synced = {}
+    best = _Best(timetable)
+    best_cost, best_len = initial, 0
+    iterations = evaluated = 0
+    last_report = start
+    t0 = max(initial * 1e-4, 1.0)
+    try:
+        while True:
+            elapsed = time.monotonic() - start
+            if elapsed >= time_budget:
+                break
+            hot = model.hot_rows()
+            batch = []
+            while len(batch) < BATCH_PER_WORKER * workers:
+                move = _random_move(model, hot, rng)
+                if model.legal(move):
+                    batch.append(move)
+            if pool is not None:
+                chunks = [batch[i::workers] for i in range(workers)]
+                # Any worker may take any chunk, so send what the least up-to-date one seen so far is
+                # missing; a worker further behind (or new) asks for its chunk again with a longer tail
+                offset = min(synced.values(), default=0)
+                futures = [pool.submit(_evaluate_batch, offset, log[offset:], chunk) for chunk in chunks]
+                deltas = []
+                for future, chunk in zip(futures, chunks):
+                    pid, applied, scores = future.result()
+                    while scores is None:
+                        pid, applied, scores = pool.submit(_evaluate_batch, applied, log[applied:], chunk).result()
+                    synced[pid] = applied
+                    deltas.extend(zip(scores, chunk))
+            else:
+                deltas = [(model.delta(move), move) for move in batch]
+            evaluated += len(batch)
+            iterations += 1
+
+            delta, move = min(deltas, key=lambda item: item[0])
+            temperature = t0 * (1 - elapsed / time_budget)
+            # Zero-delta moves are rejected so the plan does not churn without gain
+            if delta < 0 or (delta > 0 and rng.random() < math.exp(-delta / max(temperature, 1e-9))):
+                model.apply(move)
+                log.append(move)
+                if model.total < best_cost - 1e-9:
+                    best_cost, best_len = model.total, len(log)
+
+            now = time.monotonic()
+            if now - last_report >= report_every:
+                last_report = now
+                best.advance(log, best_len)
+                yield _progress(now - start, time_budget, iterations, evaluated, log, initial, best_cost, best)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # Rebuild the best state from the accepted-move prefix
+    final = CostModel(timetable, weights, min_headway)
+    for move in log[:best_len]:
+        final.apply(move)
+    best.advance(log, best_len)
+    best_timetable = final.to_timetable()
+    result = _progress(time.monotonic() - start, time_budget, iterations, evaluated, log, initial, final.total, best)
+    result.update(
+        done=True,
+        timetable=best_timetable,
+        conflicts_before=_conflict_counts(timetable, min_headway),
+        conflicts_after=_conflict_counts(best_timetable, min_headway),
+    )
+    yield result
+
+
+def _progress(elapsed, budget, iterations, evaluated, log, initial, best_cost, best):
+    return {
+        "done": False,
+        "elapsed": elapsed,
+        "fraction": min(elapsed / budget, 1.0) if budget else 1.0,
+        "iterations": iterations,
+        "evaluated": evaluated,
+        "accepted": len(log),
+        "initial_cost": float(initial),
+        "best_cost": float(best_cost),
+        "improvement": float((initial - best_cost) / initial) if initial > 0 else 0.0,
+        "retimed": best.retimed(),
+        "replatformed": best.replatformed(),
+    }
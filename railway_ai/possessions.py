@@ -0,0 +1,451 @@
+"""Maintenance possession planning.
+
+A work order asks for a possession of one track section (a network link)
+for a number of hours, with a crew and possibly a machine, at some time
+between its release and due days of the month. :func:`plan_possessions`
+gives every order a start hour. It minimizes the traffic disrupted, which
+is the scheduled train movements over the section during the possession.
+No section may carry two possessions at once, and no hour may need more
+crews or machines than the capacity allows.
+
+Crews, machines and sections are all resources with an hourly capacity (a
+section's is one). Every order keeps a domain: a mask of the start hours
+still open to it. Placing an order takes its resources for its hours, and
+the change is propagated at once (forward checking). Only the orders that
+share one of those resources are re-checked, and only at the starts that
+overlap the placement. They are grouped by duration, so a group costs a
+couple of array operations. The search places the order with the fewest
+open starts next. It tries that order's cheapest start first, or last
+month's start when the order recurs (the warm start). A start that would
+leave another order with no start at all is skipped. Once the time limit
+is reached the remaining orders are placed without that lookahead. An
+order whose domain empties is deferred to the next month, so the plan is
+always feasible. Any time left goes to local search, which moves each
+placed order to its cheapest feasible start and retries deferred orders.
+
+:func:`plan_month` generates a month's work orders from section usage,
+standing in for the maintenance records system: busier sections need more
+work. It builds every section's hourly traffic from the month's
+timetables, warm starts from the previous month's saved plan and saves
+the new plan. Run standalone to plan a month from the command line::
+
+    python -m railway_ai.possessions --month 2026-11 --orders 2000 --time-limit 10
+"""
+import argparse
+import calendar
+import json
+import os
+import time
+from datetime import date, timedelta
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .config import MAINTENANCE_PLANS, MAINTENANCE_TIME_LIMIT, TIMETABLE_CACHE
+from .network import train_moves
+
+# Work type -> (id code, hours, crew, crews needed, machine or None, share of work orders)
+WORK_TYPES = {
+    "Track inspection": ("TI", 2, "Track gang", 1, None, 0.35),
+    "Tamping": ("TM", 6, "Track gang", 1, "Tamper", 0.15),
+    "Rail grinding": ("RG", 4, "Track gang", 1, "Rail grinder", 0.10),
+    "Signal maintenance": ("SM", 3, "Signal team", 1, None, 0.20),
+    "Overhead line repair": ("OL", 5, "Overhead line team", 1, None, 0.10),
+    "Ballast renewal": ("BR", 8, "Track gang", 2, "Ballast train", 0.10),
+}
+# Crews and machines available in every hour
+CAPACITY = {"Track gang": 3, "Signal team": 2, "Overhead line team": 1, "Tamper": 1, "Rail grinder": 1,
+            "Ballast train": 1}
+# Days between a work order's release and its due day, inclusive
+WINDOW_DAYS = (5, 21)
+# Days a work order deferred from last month has this month
+CARRIED_WINDOW_DAYS = 7
+# Starts tried with lookahead before the cheapest is taken anyway
+LOOKAHEAD_TRIES = 8
+
+
+def month_hours(month):
+    """Hours in the month of ``month`` (any date in it)."""
+    return calendar.monthrange(month.year, month.month)[1] * 24
+
+
+def hourly_traffic(network, timetable_for, month, progress=None):
+    """Train movements over every link in every hour of the month: a ``(links, hours)`` array."""
+    first = month.replace(day=1)
+    hours = month_hours(first)
+    traffic = np.zeros((len(network.link_from), hours))
+    for day in range(hours // 24):
+        if progress:
+            progress(0.6 * day / (hours // 24), f"Counting traffic on {first + timedelta(days=day):%d %b}")
+        timetable = timetable_for(first + timedelta(days=day))
+        rows_a, _, _, _, link = train_moves(network, timetable)
+        hour = day * 24 + timetable.departure[rows_a] // 60
+        on = (link >= 0) & (hour < hours)
+        np.add.at(traffic, (link[on], hour[on]), 1)
+    return traffic
+
+
+def work_orders(daily_traffic, month, count=None, seed=None):
+    """A month's work orders as columns: ``id``, ``link``, ``type``, ``hours``, ``release`` and ``due`` days.
+
+    Links draw orders in proportion to their daily traffic plus the mean,
+    so quiet links are inspected too. ``count`` defaults to two per link.
+    An order's id is its link, type and ordinal among that link's orders
+    of that type, so a recurring order keeps its id from month to month.
+    """
+    days = month_hours(month) // 24
+    rng = np.random.default_rng(month.year * 12 + month.month if seed is None else seed)
+    n_links = len(daily_traffic)
+    count = 2 * n_links if count is None else count
+    weight = np.asarray(daily_traffic, dtype=np.float64) + np.mean(daily_traffic) + 1
+    link = rng.choice(n_links, size=count, p=weight / weight.sum())
+    specs = list(WORK_TYPES.values())
+    shares = np.array([spec[5] for spec in specs])
+    kind = rng.choice(len(specs), size=count, p=shares / shares.sum())
+    window = np.minimum(rng.integers(WINDOW_DAYS[0], WINDOW_DAYS[1] + 1, size=count), days)
+    release = (rng.random(count) * (days - window + 1)).astype(np.int64)
+    order = np.lexsort((release, kind, link))
+    link, kind, window, release = link[order], kind[order], window[order], release[order]
+    group = link * len(specs) + kind
+    starts = np.r_[0, np.flatnonzero(np.diff(group)) + 1] if count else np.empty(0, dtype=np.int64)
+    ordinal = np.arange(count) - np.repeat(starts, np.diff(np.r_[starts, count]))
+    return {
+        "id": np.array([f"{specs[k][0]}-{l}-{n}" for l, k, n in zip(link.tolist(), kind.tolist(), ordinal.tolist())],
+                       dtype=object),
+        "link": link,
+        "type": kind,
+        "hours": np.array([specs[k][1] for k in kind.tolist()], dtype=np.int64),
+        "release": release,
+        "due": release + window - 1,
+    }
+
+
+class _Search:
+    """State of one planning run: free capacity per resource and hour, and every order's domain."""
+
+    def __init__(self, orders, traffic, capacity):
+        specs = list(WORK_TYPES.values())
+        kind = np.asarray(orders["type"])
+        self.hours = np.asarray(orders["hours"], dtype=np.int64)
+        self.n = n = len(kind)
+        self.horizon = horizon = traffic.shape[1]
+
+        # Resources: the named crews and machines, then one per section worked on
+        named = list(dict.fromkeys([*capacity, *(s[2] for s in specs), *(s[4] for s in specs if s[4])]))
+        sections, local = np.unique(np.asarray(orders["link"], dtype=np.int64), return_inverse=True)
+        self.free = np.ones((len(named) + len(sections), horizon))
+        self.free[:len(named)] = np.array([capacity.get(name, 0) for name in named], dtype=np.float64)[:, None]
+        crew = np.array([named.index(s[2]) for s in specs])[kind] if n else np.empty(0, dtype=np.int64)
+        machine = np.array([named.index(s[4]) if s[4] else -1 for s in specs])[kind] if n \
+            else np.empty(0, dtype=np.int64)
+        self.resources = np.column_stack([crew, machine, len(named) + local]).astype(np.int64)
+        self.needs = np.column_stack([np.array([s[3] for s in specs])[kind] if n else np.empty(0),
+                                      np.ones(n), np.ones(n)])
+        # Orders using each resource, with what they need of it
+        index, column = np.nonzero(self.resources >= 0)
+        used = self.resources[index, column]
+        order = np.argsort(used, kind="stable")
+        bounds = np.searchsorted(used[order], np.arange(len(self.free) + 1))
+        self.users = {r: (index[order[a:b]], self.needs[index, column][order[a:b]])
+                      for r, (a, b) in enumerate(zip(bounds[:-1], bounds[1:]))}
+
+        # Traffic disrupted by every start of every order, and the starts inside its window
+        starts = np.arange(horizon)
+        lo = np.asarray(orders["release"], dtype=np.int64) * 24
+        hi = np.minimum((np.asarray(orders["due"], dtype=np.int64) + 1) * 24, horizon) - self.hours
+        self.allowed = (starts >= lo[:, None]) & (starts <= hi[:, None])
+        cumulative = np.zeros((len(sections), horizon + 1))
+        np.cumsum(traffic[sections], axis=1, out=cumulative[:, 1:])
+        ends = np.minimum(starts[None, :] + self.hours[:, None], horizon)
+        self.cost = (cumulative[local[:, None], ends] - cumulative[local[:, None], starts[None, :]]).astype(np.float32)
+
+        fits = np.ones(n, dtype=bool)
+        for column in range(3):
+            r = self.resources[:, column]
+            fits &= (r < 0) | (self.free[np.maximum(r, 0), 0] >= self.needs[:, column])
+        self.domain = self.allowed & fits[:, None]
+        self.count = self.domain.sum(axis=1)
+        self.start = np.full(n, -1, dtype=np.int64)
+        self.open = np.ones(n, dtype=bool)
+        self.pruned = 0
+
+    def _take(self, o, s, sign):
+        h = self.hours[o]
+        for r, need in zip(self.resources[o], self.needs[o]):
+            if r >= 0:
+                self.free[r, s:s + h] -= sign * need
+
+    def place(self, o, s, lookahead):
+        """Place order ``o`` at start ``s`` and propagate; with ``lookahead``, refuse if a domain would empty."""
+        h = self.hours[o]
+        changes = []
+        for r, need in zip(self.resources[o], self.needs[o]):
+            if r < 0:
+                continue
+            free = self.free[r].copy()
+            free[s:s + h] -= need
+            users, needs = self.users[r]
+            # Starts in a domain were feasible before, so enough left over the placement changes none of them
+            if not len(users) or free[s:s + h].min() >= needs.max():
+                continue
+            keep = self.open[users] & (users != o)
+            users, needs = users[keep], needs[keep]
+            for duration in np.unique(self.hours[users]).tolist():
+                group = self.hours[users] == duration
+                # Starts whose hours overlap the placement
+                first, last = max(s - duration + 1, 0), min(s + h, self.horizon - duration + 1)
+                if last <= first:
+                    continue
+                lowest = sliding_window_view(free[first:last + duration - 1], duration).min(axis=1)
+                affected = users[group]
+                lost = self.domain[affected, first:last] & (lowest[None, :] < needs[group][:, None])
+                if lookahead and (self.count[affected] == lost.sum(axis=1)).any():
+                    self.pruned += 1
+                    return False
+                changes.append((affected, first, last, lost))
+        self._take(o, s, 1)
+        for affected, first, last, lost in changes:
+            before = self.domain[affected, first:last]
+            after = before & ~lost
+            self.count[affected] -= before.sum(axis=1) - after.sum(axis=1)
+            self.domain[affected, first:last] = after
+        self.start[o] = s
+        self.open[o] = False
+        return True
+
+    def feasible(self, o):
+        """Every start at which order ``o`` fits the current free capacity."""
+        h = self.hours[o]
+        ok = self.allowed[o].copy()
+        ok[self.horizon - h + 1:] = False
+        for r, need in zip(self.resources[o], self.needs[o]):
+            if r >= 0:
+                ok[:self.horizon - h + 1] &= sliding_window_view(self.free[r], h).min(axis=1) >= need
+        return ok
+
+    def construct(self, deadline, warm):
+        """Place every order, most constrained first; returns the orders deferred."""
+        deferred = []
+        # Longer orders first among equally constrained ones
+        tie = self.hours / (self.hours.max() + 1) if self.n else self.hours
+        while self.open.any():
+            o = int(np.argmin(np.where(self.open, self.count - tie, np.inf)))
+            if self.count[o] == 0:
+                self.open[o] = False
+                deferred.append(o)
+                continue
+            candidates = np.flatnonzero(self.domain[o])
+            candidates = candidates[np.argsort(self.cost[o, candidates], kind="stable")]
+            if warm[o] >= 0 and self.domain[o, warm[o]]:
+                candidates = np.r_[warm[o], candidates[candidates != warm[o]]]
+            lookahead = time.perf_counter() < deadline
+            if not lookahead or not any(self.place(o, int(s), True) for s in candidates[:LOOKAHEAD_TRIES]):
+                self.place(o, int(candidates[0]), False)
+        return deferred
+
+    def improve(self, deadline, deferred):
+        """Move placed orders to cheaper starts and place deferred ones until nothing improves."""
+        moves = 0
+        while time.perf_counter() < deadline:
+            improved = False
+            placed = np.flatnonzero(self.start >= 0)
+            current = self.cost[placed, self.start[placed]]
+            # Most disruptive first; an order that disrupts nothing cannot improve
+            order = np.argsort(-current, kind="stable")
+            for o in placed[order][current[order] > 0].tolist():
+                if time.perf_counter() >= deadline:
+                    break
+                s = self.start[o]
+                self._take(o, s, -1)
+                ok = np.flatnonzero(self.feasible(o))
+                best = int(ok[np.argmin(self.cost[o, ok])])
+                if self.cost[o, best] < self.cost[o, s]:
+                    s, improved, moves = best, True, moves + 1
+                self._take(o, s, 1)
+                self.start[o] = s
+            for o in list(deferred):
+                ok = np.flatnonzero(self.feasible(o))
+                if len(ok):
+                    s = int(ok[np.argmin(self.cost[o, ok])])
+                    self._take(o, s, 1)
+                    self.start[o] = s
+                    deferred.remove(o)
+                    improved, moves = True, moves + 1
+            if not improved:
+                break
+        return moves
+
+
+def earliest_plan(orders, traffic, capacity=CAPACITY):
+    """Trains disrupted when each order simply takes its earliest feasible start, in release order."""
+    search = _Search(orders, traffic, capacity)
+    total = 0.0
+    for o in np.argsort(np.asarray(orders["release"]), kind="stable").tolist():
+        ok = np.flatnonzero(search.feasible(o))
+        if len(ok):
+            search._take(o, int(ok[0]), 1)
+            total += float(search.cost[o, ok[0]])
+    return total
+
+
+def plan_possessions(orders, traffic, capacity=CAPACITY, warm_start=None, time_limit=MAINTENANCE_TIME_LIMIT):
+    """Start hours for ``orders`` (see :func:`work_orders`) over the ``(links, hours)`` ``traffic``.
+
+    ``warm_start`` maps order ids to last month's start hour. Returns
+    ``start`` (hour of the month, -1 if deferred) and ``trains``
+    (disrupted, NaN if deferred) per order, with the totals and search
+    statistics.
+    """
+    started = time.perf_counter()
+    deadline = started + time_limit
+    search = _Search(orders, traffic, capacity)
+    warm_start = warm_start or {}
+    warm = np.array([warm_start.get(i, -1) for i in orders["id"]], dtype=np.int64)
+    warm[warm >= search.horizon] = -1
+    deferred = search.construct(deadline, warm)
+    constructed = time.perf_counter() - started
+    moves = search.improve(deadline, deferred)
+
+    placed = search.start >= 0
+    trains = np.full(search.n, np.nan)
+    trains[placed] = search.cost[placed, search.start[placed]]
+    return {
+        "start": search.start,
+        "trains": trains,
+        "total_trains": float(np.nansum(trains)),
+        "deferred": int((~placed).sum()),
+        "warm_starts": int(((warm >= 0) & (search.start == warm)).sum()),
+        "pruned": search.pruned,
+        "moves": moves,
+        "construct_seconds": constructed,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def plan_path(month, plans_dir=MAINTENANCE_PLANS):
+    """File the plan of the month of ``month`` is saved to."""
+    return Path(plans_dir) / f"{month:%Y-%m}.json"
+
+
+def save_plan(plan, plans_dir=MAINTENANCE_PLANS):
+    """Write ``plan`` (from :func:`plan_month`) as its month's plan."""
+    path = plan_path(date.fromisoformat(f"{plan['month']}-01"), plans_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(plan, indent=1))
+    os.replace(tmp, path)
+
+
+def load_plan(month, plans_dir=MAINTENANCE_PLANS):
+    """The saved plan of the month of ``month``, or ``None``."""
+    path = plan_path(month, plans_dir)
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def plan_month(network, timetable_for, month, count=None, capacity=CAPACITY, time_limit=MAINTENANCE_TIME_LIMIT,
+               plans_dir=MAINTENANCE_PLANS, save=True, progress=None):
+    """Plan the possessions of the month of ``month``, warm started from the previous month's plan.
+
+    Orders deferred last month come back with ``CARRIED_WINDOW_DAYS`` from
+    the 1st. Returns (and with ``save``, writes) a JSON-able plan.
+    """
+    month = month.replace(day=1)
+    traffic = hourly_traffic(network, timetable_for, month, progress)
+    orders = work_orders(traffic.sum(axis=1) / (traffic.shape[1] / 24), month, count)
+    previous = load_plan(month - timedelta(days=1), plans_dir) or {"possessions": [], "deferred": []}
+    carried = previous["deferred"]
+    if carried:
+        names = list(WORK_TYPES)
+        kind = np.array([names.index(order["type"]) for order in carried], dtype=np.int64)
+        window = min(CARRIED_WINDOW_DAYS, traffic.shape[1] // 24)
+        # A carried order replaces this month's order of the same id
+        fresh = ~np.isin(orders["id"], [order["id"] for order in carried])
+        orders = {
+            "id": np.r_[orders["id"][fresh], np.array([order["id"] for order in carried], dtype=object)],
+            "link": np.r_[orders["link"][fresh], [order["link"] for order in carried]].astype(np.int64),
+            "type": np.r_[orders["type"][fresh], kind],
+            "hours": np.r_[orders["hours"][fresh], [WORK_TYPES[names[k]][1] for k in kind]].astype(np.int64),
+            "release": np.r_[orders["release"][fresh], np.zeros(len(carried), dtype=np.int64)],
+            "due": np.r_[orders["due"][fresh], np.full(len(carried), window - 1, dtype=np.int64)],
+        }
+    # Same day of the month and hour as last month
+    warm = {p["id"]: (int(p["day"][8:10]) - 1) * 24 + int(p["start"][:2]) for p in previous["possessions"]}
+    if progress:
+        progress(0.6, f"Placing {len(orders['id']):,} work orders")
+    result = plan_possessions(orders, traffic, capacity, warm, time_limit)
+
+    names = list(WORK_TYPES)
+    possessions, deferred = [], []
+    for o in np.argsort(np.where(result["start"] >= 0, result["start"], np.iinfo(np.int64).max),
+                        kind="stable").tolist():
+        link, kind = int(orders["link"][o]), int(orders["type"][o])
+        if result["start"][o] < 0:
+            deferred.append({"id": orders["id"][o], "link": link, "type": names[kind]})
+            continue
+        start = int(result["start"][o])
+        end = start + int(orders["hours"][o])
+        _, _, crew, crews, machine, _ = WORK_TYPES[names[kind]]
+        possessions.append({
+            "id": orders["id"][o],
+            "section": f"{network.names[network.link_from[link]]} – {network.names[network.link_to[link]]}",
+            "link": link,
+            "type": names[kind],
+            "crew": f"{crews} × {crew}",
+            "machine": machine,
+            "day": (month + timedelta(days=start // 24)).isoformat(),
+            "start": f"{start % 24:02d}:00",
+            "end": f"{end % 24:02d}:00",
+            "hours": int(orders["hours"][o]),
+            "trains": int(result["trains"][o]),
+        })
+    plan = {
+        "month": f"{month:%Y-%m}",
+        "orders": len(orders["id"]),
+        "carried_over": len(carried),
+        "scheduled": len(possessions),
+        "trains_affected": int(result["total_trains"]),
+        "earliest_start_trains_affected": int(earliest_plan(orders, traffic, capacity)),
+        "warm_starts": result["warm_starts"],
+        "seconds": round(result["seconds"], 3),
+        "capacity": dict(capacity),
+        "possessions": possessions,
+        "deferred": deferred,
+    }
+    if save:
+        save_plan(plan, plans_dir)
+    return plan
+
+
+def next_month(today=None):
+    """First day of the month after ``today``'s."""
+    today = today or date.today()
+    return (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan a month's maintenance possessions.")
+    parser.add_argument("--month", default=None, help="YYYY-MM (default: next month)")
+    parser.add_argument("--orders", type=int, default=None, help="work orders to generate (default: two per section)")
+    parser.add_argument("--time-limit", type=float, default=MAINTENANCE_TIME_LIMIT, help="seconds")
+    parser.add_argument("--capacity-scale", type=float, default=1.0, help="multiplies every crew and machine count")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+    # Imported here so the planner itself does not depend on the data layer
+    from .data import load_day_timetable
+    from .network import load_network
+
+    month = date.fromisoformat(f"{args.month}-01") if args.month else next_month()
+    capacity = {name: max(1, round(n * args.capacity_scale)) for name, n in CAPACITY.items()}
+    plan = plan_month(load_network(TIMETABLE_CACHE), partial(load_day_timetable, TIMETABLE_CACHE), month,
+                      args.orders, capacity, args.time_limit, save=not args.no_save)
+    print(f"{plan['month']}: {plan['scheduled']:,} of {plan['orders']:,} work orders scheduled "
+          f"({len(plan['deferred']):,} deferred, {plan['warm_starts']:,} kept last month's slot) "
+          f"in {plan['seconds']:.2f} s")
+    print(f"Trains affected: {plan['trains_affected']:,} "
+          f"(earliest-start planning: {plan['earliest_start_trains_affected']:,})")
+
+
+if __name__ == "__main__":
+    main()
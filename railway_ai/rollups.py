@@ -0,0 +1,302 @@
+"""Incremental KPI rollups for the Operations Dashboard.
+
+:class:`Rollups` keeps additive measures of train movements -- count,
+on-time arrivals, delay minutes, severe delays and link-busy minutes -- per
+direction and per line at three resolutions: minute, hour and day. Each
+resolution is a ring of fixed-size buckets (two days of minutes, ninety
+days of hours, five years of days), so memory is bounded and every query
+reads a fixed number of buckets however much history has been ingested.
+A batch of events is added to all three rings with one ``np.add.at`` each;
+a bucket reused by the ring is zeroed when its new period first receives
+data. A network-wide gauge of running trains is kept as a sum and a
+sample count per bucket, so coarser buckets report its mean.
+
+:class:`OperationsRollup` feeds the rollups from the timetable. A day is
+"operated" once by the block-section microsimulator (seeded by its date),
+which turns every movement between two stops into an event at its actual
+arrival time with its arrival delay. Each :meth:`OperationsRollup.advance`
+ingests just the events between the previous call and now, so a dashboard
+rerun costs a binary search and a handful of bucket reads. One rollup is
+shared by the process; a reloaded network or a newly synced feed is
+rebound to it, so the history is kept and only days not yet ingested are
+operated from the new feed.
+"""
+import threading
+
+import numpy as np
+
+from .microsim import Microsimulator
+from .network import train_moves
+from .timetable import day_date
+
+DIRECTIONS = ("Northbound", "Southbound", "Eastbound", "Westbound")
+MEASURES = ("movements", "on_time", "delay", "severe", "busy")
+
+# Resolution name -> (bucket minutes, number of buckets kept)
+RESOLUTIONS = {"minute": (1, 2 * 1440), "hour": (60, 90 * 24), "day": (1440, 5 * 366)}
+
+# An arrival is on time when it is less than this many minutes late; see is_on_time
+ON_TIME_MINUTES = 5
+# Arrival delays counted as disruptions
+SEVERE_MINUTES = 15
+# Days ingested before the first dashboard view, so "vs yesterday" has data
+BACKFILL_DAYS = 1
+INITIAL_KEYS = 16
+
+
+def is_on_time(delay):
+    """Mask of arrival delays (minutes) that count as on time; NaN (not run) is not on time."""
+    return np.asarray(delay) < ON_TIME_MINUTES
+
+
+class _Ring:
+    """Buckets of one resolution: measures per key plus the running-trains gauge."""
+
+    def __init__(self, bucket, slots, n_keys):
+        self.bucket = bucket
+        self.slots = slots
+        self.period = np.full(slots, -1, dtype=np.int64)
+        self.values = np.zeros((len(MEASURES), slots, n_keys))
+        self.gauge = np.zeros((2, slots))
+
+    def grow(self, n_keys):
+        values = np.zeros((len(MEASURES), self.slots, n_keys))
+        values[:, :, :self.values.shape[2]] = self.values
+        self.values = values
+
+    def _claim(self, periods):
+        """Slots of ``periods``, zeroed where they still hold an older period."""
+        slots = periods % self.slots
+        stale = np.unique(slots[self.period[slots] != periods])
+        self.values[:, stale] = 0
+        self.gauge[:, stale] = 0
+        self.period[slots] = periods
+        return slots
+
+    def add(self, minutes, keys, values):
+        periods = minutes.astype(np.int64) // self.bucket
+        # Only the newest period of each slot is kept
+        keep = periods > periods.max() - self.slots
+        slots = self._claim(periods[keep])
+        for m, measure in enumerate(values):
+            for key in keys:
+                np.add.at(self.values[m], (slots, key[keep]), measure[keep])
+
+    def add_gauge(self, minutes, counts):
+        periods = minutes.astype(np.int64) // self.bucket
+        keep = periods > periods.max() - self.slots
+        slots = self._claim(periods[keep])
+        np.add.at(self.gauge[0], slots, counts[keep])
+        np.add.at(self.gauge[1], slots, 1)
+
+    def read(self, end_minute, n):
+        """Periods of the ``n`` buckets up to ``end_minute``, with their slots and validity."""
+        periods = np.arange(int(end_minute) // self.bucket - n + 1, int(end_minute) // self.bucket + 1)
+        slots = periods % self.slots
+        return periods, slots, self.period[slots] == periods
+
+
+class Rollups:
+    """Multi-resolution ring buffers of movement measures per direction and per line."""
+
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.lines = []
+        self._line_key = {}
+        n_keys = len(DIRECTIONS) + INITIAL_KEYS
+        self.rings = {name: _Ring(bucket, slots, n_keys) for name, (bucket, slots) in resolutions.items()}
+        self.start = None
+        self.events = 0
+
+    def _keys(self, lines):
+        """Key indices of line names, registering new lines."""
+        names, codes = np.unique(np.asarray(lines, dtype=object), return_inverse=True)
+        for name in names:
+            if name not in self._line_key:
+                self._line_key[name] = len(DIRECTIONS) + len(self.lines)
+                self.lines.append(name)
+        n_keys = len(DIRECTIONS) + len(self.lines)
+        for ring in self.rings.values():
+            if ring.values.shape[2] < n_keys:
+                ring.grow(max(n_keys, 2 * ring.values.shape[2]))
+        return np.array([self._line_key[name] for name in names], dtype=np.int64)[codes]
+
+    def ingest(self, minute, direction, line, delay, busy):
+        """Add movement events: arrival ``minute`` (absolute), direction index, line name, delay, busy minutes."""
+        if not len(minute):
+            return
+        minute, direction = np.asarray(minute, dtype=np.float64), np.asarray(direction, dtype=np.int64)
+        delay = np.asarray(delay, dtype=np.float64)
+        values = (np.ones(len(minute)), is_on_time(delay).astype(np.float64), np.maximum(delay, 0),
+                  (delay >= SEVERE_MINUTES).astype(np.float64), np.asarray(busy, dtype=np.float64))
+        line_key = self._keys(line)
+        located = direction >= 0
+        for ring in self.rings.values():
+            ring.add(minute, [line_key], values)
+            if located.any():
+                ring.add(minute[located], [direction[located]], [v[located] for v in values])
+        self.events += len(minute)
+        self.start = minute.min() if self.start is None else min(self.start, minute.min())
+
+    def record_running(self, minutes, counts):
+        """Add samples of the number of running trains at absolute ``minutes``."""
+        if len(minutes):
+            for ring in self.rings.values():
+                ring.add_gauge(np.asarray(minutes), np.asarray(counts, dtype=np.float64))
+
+    def series(self, resolution, measure, end_minute, n, keys=DIRECTIONS):
+        """``(period start minutes, values)`` of the last ``n`` buckets of ``keys`` (directions or lines).
+
+        Buckets before the first ingested event are NaN.
+        """
+        ring = self.rings[resolution]
+        periods, slots, valid = ring.read(end_minute, n)
+        columns = [DIRECTIONS.index(k) if k in DIRECTIONS else self._line_key.get(k, -1) for k in keys]
+        values = ring.values[MEASURES.index(measure)][slots][:, np.maximum(columns, 0)]
+        values = np.where(valid[:, None] & (np.asarray(columns) >= 0), values, 0.0)
+        if self.start is not None:
+            values[(periods + 1) * ring.bucket <= self.start] = np.nan
+        return periods * ring.bucket, values
+
+    def total(self, resolution, measure, end_minute, n):
+        """Network total of a measure over the last ``n`` buckets up to ``end_minute``."""
+        ring = self.rings[resolution]
+        _, slots, valid = ring.read(end_minute, n)
+        # Every event is counted under exactly one line, so the line keys sum to the network total
+        values = ring.values[MEASURES.index(measure)][slots[valid]][:, len(DIRECTIONS):]
+        return float(values.sum())
+
+    def running(self, resolution, end_minute, n=1):
+        """Mean number of running trains over the last ``n`` buckets (NaN without samples)."""
+        ring = self.rings[resolution]
+        _, slots, valid = ring.read(end_minute, n)
+        total, samples = ring.gauge[:, slots[valid]].sum(axis=1)
+        return total / samples if samples else float("nan")
+
+
+def _direction(dlat, dlon, latitude):
+    """Direction index of a movement from its latitude/longitude change (-1 if unknown)."""
+    horizontal = np.abs(dlon) * np.cos(np.radians(latitude)) > np.abs(dlat)
+    direction = np.where(horizontal, np.where(dlon >= 0, 2, 3), np.where(dlat >= 0, 0, 1))
+    return np.where(np.isnan(dlat) | np.isnan(dlon), -1, direction)
+
+
+class OperationsRollup:
+    """Rollups of the operated timetable, advanced to the current time on demand."""
+
+    def __init__(self, network, rollups=None, version=None):
+        self.network = network
+        self.version = version
+        self.rollups = rollups or Rollups()
+        self.watermark = None
+        self._days = {}
+        self._lock = threading.Lock()
+
+    def rebind(self, network, version):
+        """Operate days from now on with ``network`` of feed ``version``, keeping the ingested history."""
+        with self._lock:
+            if version != self.version:
+                # Days operated from the old feed; what they already contributed stays in the rollups
+                self._days.clear()
+                self.version = version
+            self.network = network
+
+    def _day(self, day, timetable_for):
+        """Sorted events and train spans of one operated service day."""
+        if day not in self._days:
+            tt = timetable_for(day_date(day))
+            events = {"minute": np.empty(0), "direction": np.empty(0, dtype=np.int64),
+                      "line": np.empty(0, dtype=object), "delay": np.empty(0), "busy": np.empty(0),
+                      "start": np.empty(0), "end": np.empty(0)}
+            if len(tt):
+                delays = Microsimulator(tt).run(24, start_minute=0, seed=int(day))["delays"][0]
+                base = tt.day.astype(np.float64) * 1440
+                rows_a, rows_b, a, b, _ = train_moves(self.network, tt)
+                reached = ~np.isnan(delays[rows_b])
+                rows_a, rows_b, a, b = rows_a[reached], rows_b[reached], a[reached], b[reached]
+                lat, lon = np.append(self.network.lat, np.nan), np.append(self.network.lon, np.nan)
+                arrival = base[rows_b] + tt.arrival[rows_b] + delays[rows_b]
+                order = np.argsort(arrival, kind="stable")
+                rows_a, rows_b, a, b = rows_a[order], rows_b[order], a[order], b[order]
+                # Stops missing from the network index the NaN coordinate appended above
+                events.update(
+                    minute=arrival[order],
+                    direction=_direction(lat[b] - lat[a], lon[b] - lon[a], np.nanmean(lat) if len(a) else 0.0),
+                    line=np.asarray(tt.lines, dtype=object)[tt.line[rows_a]],
+                    delay=delays[rows_b],
+                    busy=(tt.arrival[rows_b] - tt.departure[rows_a]).astype(np.float64),
+                )
+                actual = base + np.where(np.isnan(delays), 0, delays)
+                first = np.full(len(tt.trains), np.inf)
+                last = np.full(len(tt.trains), -np.inf)
+                np.minimum.at(first, tt.train, actual + tt.departure)
+                np.maximum.at(last, tt.train, actual + tt.arrival)
+                ran = np.isfinite(first)
+                events.update(start=np.sort(first[ran]), end=np.sort(last[ran]))
+            for old in [d for d in self._days if d < day - 2]:
+                del self._days[old]
+            self._days[day] = events
+        return self._days[day]
+
+    def advance(self, now, timetable_for):
+        """Ingest everything that happened up to absolute minute ``now``; returns the events added."""
+        with self._lock:
+            if self.watermark is None:
+                self.watermark = (int(now) // 1440 - BACKFILL_DAYS) * 1440
+            if now <= self.watermark:
+                return 0
+            added = 0
+            # Trains of the previous service day may still run after midnight
+            for day in range(int(self.watermark) // 1440 - 1, int(now) // 1440 + 1):
+                events = self._day(day, timetable_for)
+                lo, hi = np.searchsorted(events["minute"], [self.watermark, now], side="right")
+                if hi > lo:
+                    window = slice(lo, hi)
+                    self.rollups.ingest(events["minute"][window], events["direction"][window],
+                                        events["line"][window], events["delay"][window], events["busy"][window])
+                    added += hi - lo
+            minutes = np.arange(int(self.watermark) + 1, int(now) + 1)
+            running = np.zeros(len(minutes))
+            for day in range(int(self.watermark) // 1440 - 1, int(now) // 1440 + 1):
+                events = self._day(day, timetable_for)
+                running += np.searchsorted(events["start"], minutes, side="right") \
+                    - np.searchsorted(events["end"], minutes, side="right")
+            self.rollups.record_running(minutes, running)
+            self.watermark = int(now)
+            return added
+
+    def kpis(self, now):
+        """Dashboard figures at absolute minute ``now`` with their comparison values."""
+        r = self.rollups
+        arrivals, on_time = r.total("hour", "movements", now, 24), r.total("hour", "on_time", now, 24)
+        previous_arrivals = r.total("hour", "movements", now - 1440, 24)
+        previous_on_time = r.total("hour", "on_time", now - 1440, 24)
+        capacity = max(len(self.network.link_from), 1) * 60
+        return {
+            "active_trains": r.running("minute", now),
+            "active_trains_yesterday": r.running("minute", now - 1440),
+            "on_time": 100 * on_time / arrivals if arrivals else float("nan"),
+            "on_time_previous": 100 * previous_on_time / previous_arrivals if previous_arrivals else float("nan"),
+            "utilization": min(100 * r.total("minute", "busy", now, 60) / capacity, 100.0),
+            "utilization_yesterday": min(100 * r.total("minute", "busy", now - 1440, 60) / capacity, 100.0),
+            "disruptions": r.total("minute", "severe", now, 60),
+            "disruptions_previous": r.total("minute", "severe", now - 60, 60),
+        }
+
+
+_rollup = None
+_rollup_lock = threading.Lock()
+
+
+def operations_rollup(network, version=None):
+    """The shared :class:`OperationsRollup`, operating ``network`` of feed ``version``.
+
+    There is one per process: a reloaded network or a newly synced feed
+    is rebound to it, so the dashboard history survives both.
+    """
+    global _rollup
+    with _rollup_lock:
+        if _rollup is None:
+            _rollup = OperationsRollup(network, version=version)
+    if _rollup.network is not network or _rollup.version != version:
+        _rollup.rebind(network, version)
+    return _rollup
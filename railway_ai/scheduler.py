@@ -0,0 +1,154 @@
+"""Recurring Analytics reports, run in background jobs off the page.
+
+A schedule names a report type, a frequency, a file format, the lines
+covered and the recipients. Schedules are kept in a JSON file so they
+survive restarts. :class:`ReportScheduler` checks them from one daemon
+thread every ``CHECK_SECONDS``. Each due schedule is submitted to the
+shared job runner as :func:`railway_ai.tasks.export_report`, covering the
+``FREQUENCIES`` days up to yesterday, and its next run is moved forward.
+No page rerun ever waits for a report. Runs missed while the app was
+down are caught up once, not once per missed period. A schedule whose
+submission fails stays due: its ``last_error`` is recorded in the file and
+it is retried after a back-off that doubles with each consecutive failure.
+"""
+import json
+import os
+import re
+import threading
+import traceback
+import uuid
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from .config import ANALYTICS_STORE, REPORT_SCHEDULES, REPORTS_DIR, TIMETABLE_CACHE
+from .jobs import get_runner
+
+# Frequency -> days between runs, which is also the number of days each report covers
+FREQUENCIES = {"Daily": 1, "Weekly": 7, "Monthly": 30}
+# Scheduled reports run at this time of day
+RUN_AT = time(6, 0)
+CHECK_SECONDS = 30
+# Back-off after a failed submission: doubled per consecutive failure, up to the maximum
+RETRY_SECONDS = 60
+MAX_RETRY_SECONDS = 6 * 3600
+
+
+def report_path(request, fmt, directory=REPORTS_DIR):
+    """File a report request is exported to."""
+    name = re.sub(r"[^a-z0-9]+", "-", request["report_type"].lower()).strip("-")
+    if request["lines"]:
+        name += "_" + re.sub(r"[^a-z0-9]+", "-", "-".join(request["lines"]).lower()).strip("-")[:60]
+    return Path(directory) / f"{name}_{request['start']}_{request['end']}.{fmt}"
+
+
+def submit_export(request, fmt, recipients=(), path=None):
+    """Submit an export job for ``request`` and return it."""
+    # The report engines are imported with the first export, not when the app starts the scheduler
+    from .tasks import export_report
+
+    path = path or report_path(request, fmt)
+    return get_runner().submit(export_report, str(ANALYTICS_STORE), str(TIMETABLE_CACHE), request, fmt, str(path),
+                               tuple(recipients),
+                               params={"request": request, "format": fmt, "recipients": list(recipients)})
+
+
+class ReportScheduler:
+    """Recurring report definitions in ``path`` and the thread that runs them."""
+
+    def __init__(self, path=REPORT_SCHEDULES, submit=submit_export):
+        self.path = Path(path)
+        self.submit = submit
+        self.schedules = json.loads(self.path.read_text()) if self.path.exists() else []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.schedules, indent=1))
+        os.replace(tmp, self.path)
+
+    def add(self, report_type, frequency, fmt, recipients, lines=(), now=None):
+        """Add a schedule; its first run is at the next ``RUN_AT``."""
+        now = now or datetime.now()
+        first = datetime.combine(now.date(), RUN_AT)
+        schedule = {"id": uuid.uuid4().hex[:8], "report_type": report_type, "frequency": frequency,
+                    "format": fmt, "recipients": list(recipients), "lines": list(lines),
+                    "next_run": (first if first > now else first + timedelta(days=1)).isoformat(),
+                    "last_run": None, "job": None, "last_error": None, "failures": 0, "retry_at": None}
+        with self._lock:
+            self.schedules.append(schedule)
+            self._save()
+        return schedule
+
+    def remove(self, schedule_id):
+        with self._lock:
+            self.schedules = [s for s in self.schedules if s["id"] != schedule_id]
+            self._save()
+
+    def run_pending(self, now=None):
+        """Submit every schedule that is due at ``now``; returns the jobs submitted."""
+        now = now or datetime.now()
+        jobs = []
+        changed = False
+        with self._lock:
+            for schedule in self.schedules:
+                due = datetime.fromisoformat(schedule["next_run"])
+                retry_at = schedule.get("retry_at")
+                if due > now or (retry_at and datetime.fromisoformat(retry_at) > now):
+                    continue
+                days = FREQUENCIES[schedule["frequency"]]
+                end = now.date() - timedelta(days=1)
+                request = {"report_type": schedule["report_type"], "lines": schedule["lines"],
+                           "start": (end - timedelta(days=days - 1)).isoformat(), "end": end.isoformat()}
+                changed = True
+                try:
+                    job = self.submit(request, schedule["format"], schedule["recipients"])
+                except Exception as exc:
+                    failures = schedule.get("failures", 0) + 1
+                    wait = min(RETRY_SECONDS * 2 ** (failures - 1), MAX_RETRY_SECONDS)
+                    schedule.update(last_error=f"{now.isoformat(timespec='seconds')} {type(exc).__name__}: {exc}",
+                                    failures=failures,
+                                    retry_at=(now + timedelta(seconds=wait)).isoformat(timespec="seconds"))
+                    continue
+                jobs.append(job)
+                while due <= now:
+                    due += timedelta(days=days)
+                schedule.update(next_run=due.isoformat(), last_run=now.isoformat(timespec="seconds"), job=job.id,
+                                last_error=None, failures=0, retry_at=None)
+            if changed:
+                self._save()
+        return jobs
+
+    def start(self):
+        """Run due schedules from a daemon thread, checking every ``CHECK_SECONDS``."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="report-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(CHECK_SECONDS):
+            try:
+                self.run_pending()
+            except Exception:
+                # Submission errors are recorded per schedule; anything else (e.g. the file cannot be
+                # written) is reported here and the thread carries on with the next check
+                traceback.print_exc()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def report_scheduler():
+    """The process-wide :class:`ReportScheduler`, started on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ReportScheduler().start()
+    return _scheduler
@@ -0,0 +1,566 @@
+"""Hybrid lexical and dense retrieval over the document knowledge base.
+
+Documents are split into chunks (see :mod:`railway_ai.documents`) and
+indexed twice:
+
+* a BM25 inverted index: a sorted vocabulary, and per term a contiguous
+  slice of ``(chunk, term frequency)`` postings;
+* a dense index: one unit vector per chunk, grouped by an inverted file
+  (IVF) of k-means centroids, so a query only scans the vectors of the
+  ``N_PROBE`` lists nearest to it.
+
+No embedding model ships with the app, so chunk vectors are signed hashing
+projections of each chunk's tf-idf terms and of their character trigrams;
+they add fuzzy matching ("crossings" ~ "crossing", "signalling" ~
+"signal") to the exact BM25 terms. Anything producing unit float32
+vectors of ``dim`` columns can replace :func:`embed_terms`.
+
+The index is a list of immutable segments (``<index>/segments/<name>/``)
+plus a generation (``<index>/generations/<name>/``) naming the current
+segments, a live-chunk mask per segment and the document table. Ingestion
+(:mod:`railway_ai.ingest`) only ever writes new segments and a new
+generation, then points ``current.json`` at it with an atomic rename, so
+searches keep running on the previous generation meanwhile. BM25
+statistics are summed over segments at query time (deleted chunks still
+count towards document frequencies until their segment is merged away).
+
+Every array is an ``.npy`` file opened with ``mmap_mode="r"`` and chunk
+texts live in a byte store, so opening an index reads almost nothing and
+a query touches only the postings, lists and texts it needs. Type and
+date filters are evaluated first and restrict both scorers. Relevance is
+a weighted blend of the BM25 and cosine scores, each relative to the
+best hit of the query, so 100% is the best match in the filtered corpus.
+
+Retrieval results are kept in a process-wide :class:`QueryCache`, so the
+reruns Streamlit makes on every widget interaction re-rank the cached
+candidates instead of searching again.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from .documents import DOC_TYPES
+from .timetable import day_date, day_number
+
+EMBED_DIM = 256
+MAX_TERM = 24
+K1 = 1.2
+B = 0.75
+N_PROBE = 8
+# Below this many filtered chunks the dense scorer scans them all instead of probing lists
+EXACT_SCAN = 4096
+CANDIDATES = 200
+LEXICAL_WEIGHT = 0.6
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE = 20_000
+EMBED_BLOCK = 2048
+EXCERPT_CHARS = 320
+# Query cache capacity (entries) and lifetime (seconds)
+QUERY_CACHE_SIZE = 256
+QUERY_CACHE_TTL = 900
+
+# Date Range choices of the search page, in days back from today
+DATE_RANGE_DAYS = {"Last Week": 7, "Last Month": 31, "Last Year": 365, "All Time": None}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its may must of on or shall that the "
+    "their this to was were when where which with within without".split()
+)
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords; a plural "s" is stripped."""
+    return [t[:MAX_TERM] if len(t) <= 3 or t[-1] != "s" or t[-2] == "s" else t[:-1][:MAX_TERM]
+            for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def build_postings(chunk_tokens):
+    """Sorted vocabulary and ``(term, chunk, tf)`` postings sorted by term, then chunk."""
+    vocabulary = {}
+    ids = np.fromiter((vocabulary.setdefault(t, len(vocabulary)) for tokens in chunk_tokens for t in tokens),
+                      dtype=np.int64)
+    # Renumber terms alphabetically so the vocabulary can be binary-searched
+    words = np.array(sorted(vocabulary), dtype=f"<U{MAX_TERM}")
+    rank = np.empty(len(vocabulary), dtype=np.int64)
+    rank[list(vocabulary.values())] = np.searchsorted(words, list(vocabulary))
+    n_chunks = max(len(chunk_tokens), 1)
+    chunk = np.repeat(np.arange(len(chunk_tokens)), [len(tokens) for tokens in chunk_tokens])
+    pairs, tf = np.unique(rank[ids] * n_chunks + chunk, return_counts=True)
+    return words, pairs // n_chunks, pairs % n_chunks, tf.astype(np.float32)
+
+
+def _term_features(terms, dim):
+    """Signed hash buckets of each term and of its character trigrams, as CSR arrays.
+
+    The word itself and its trigrams each carry half of the term's unit weight.
+    """
+    ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    buckets, weights = [], []
+    for i, term in enumerate(terms):
+        padded = f"#{term}#"
+        grams = [padded[j:j + 3] for j in range(len(padded) - 2)]
+        hashes = [zlib.crc32(term.encode())] + [zlib.crc32(g.encode()) for g in grams]
+        gram_weight = 1 / math.sqrt(len(grams))
+        for k, h in enumerate(hashes):
+            buckets.append(h % dim)
+            sign = 1.0 if (h >> 20) & 1 else -1.0
+            weights.append(sign * (1.0 if k == 0 else gram_weight))
+        ptr[i + 1] = len(buckets)
+    return ptr, np.asarray(buckets, dtype=np.int64), np.asarray(weights, dtype=np.float64)
+
+
+def embed_terms(rows, terms, weights, n_rows, features, dim=EMBED_DIM):
+    """Unit vectors of ``n_rows`` rows from ``(row, term, weight)`` triplets.
+
+    ``features`` is the output of :func:`_term_features` over the term ids.
+    """
+    ptr, buckets, feature_weights = features
+    out = np.zeros((n_rows, dim), dtype=np.float32)
+    for start in range(0, n_rows, EMBED_BLOCK):
+        stop = min(start + EMBED_BLOCK, n_rows)
+        keep = (rows >= start) & (rows < stop)
+        row, term, weight = rows[keep] - start, terms[keep], weights[keep]
+        counts = ptr[term + 1] - ptr[term]
+        first = np.repeat(ptr[term], counts)
+        feature = first + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        flat = np.repeat(row, counts) * dim + buckets[feature]
+        values = np.bincount(flat, weights=np.repeat(weight, counts) * feature_weights[feature],
+                             minlength=(stop - start) * dim)
+        out[start:stop] = values.reshape(stop - start, dim)
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.maximum(norms, 1e-12)
+
+
+def _kmeans(vectors, n_lists, seed=0):
+    """Spherical k-means centroids, trained on a sample of the vectors."""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE), replace=False)]
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for d in range(centroids.shape[1]):
+            centroids[:, d] = np.bincount(assign, weights=sample[:, d], minlength=n_lists)
+        empty = np.linalg.norm(centroids, axis=1) == 0
+        centroids[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    return centroids.astype(np.float32)
+
+
+def _write_strings(path, strings):
+    """Store strings as one UTF-8 blob plus an offsets array."""
+    blobs = [s.encode() for s in strings]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in blobs])
+    Path(f"{path}.bin").write_bytes(b"".join(blobs))
+    np.save(f"{path}_offsets.npy", offsets)
+
+
+class _Strings:
+    """Read-only view of a string store; only the requested strings are read from disk."""
+
+    def __init__(self, path):
+        self._offsets = np.load(f"{path}_offsets.npy", mmap_mode="r")
+        size = int(self._offsets[-1])
+        self._data = np.memmap(f"{path}.bin", dtype=np.uint8, mode="r") if size else np.empty(0, np.uint8)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return self._data[int(self._offsets[i]):int(self._offsets[i + 1])].tobytes().decode()
+
+
+def term_idf(df, n_chunks):
+    """BM25 inverse document frequency."""
+    return np.log1p((n_chunks - df + 0.5) / (df + 0.5))
+
+
+def chunk_vectors(words, terms, rows, tfs, n_chunks, idf):
+    """Dense vectors of ``n_chunks`` chunks from their postings, weighting terms by ``idf``."""
+    weights = (1 + np.log(np.maximum(tfs, 1))) * idf[terms] if len(terms) else tfs
+    return embed_terms(rows, terms, weights, n_chunks, _term_features(words.tolist(), EMBED_DIM))
+
+
+def write_segment(path, words, terms, rows, tfs, chunk_len, chunk_doc, chunk_hash, texts, vectors):
+    """Write one immutable index segment.
+
+    ``terms``/``rows``/``tfs`` are postings sorted by term, then chunk,
+    with terms indexing the sorted ``words``; ``chunk_doc`` holds global
+    document numbers and ``chunk_hash`` content hashes.
+    """
+    path = Path(path)
+    path.mkdir(parents=True)
+    n_chunks = len(chunk_len)
+    df = np.bincount(terms, minlength=len(words))
+    np.save(path / "vocabulary.npy", np.asarray(words, dtype=f"<U{MAX_TERM}"))
+    np.save(path / "df.npy", df.astype(np.int32))
+    np.save(path / "term_offsets.npy", np.r_[0, np.cumsum(df)].astype(np.int64))
+    np.save(path / "posting_chunk.npy", np.asarray(rows, dtype=np.int32))
+    np.save(path / "posting_tf.npy", np.asarray(tfs, dtype=np.float32))
+    np.save(path / "chunk_len.npy", np.asarray(chunk_len, dtype=np.int32))
+    np.save(path / "chunk_doc.npy", np.asarray(chunk_doc, dtype=np.int32))
+    np.save(path / "chunk_hash.npy", np.asarray(chunk_hash, dtype=np.uint64))
+    _write_strings(path / "texts", texts)
+
+    # Dense vectors, stored grouped by IVF list
+    n_lists = int(np.clip(2 * math.sqrt(n_chunks), 1, 1024)) if n_chunks else 0
+    if n_chunks:
+        centroids = _kmeans(vectors, min(n_lists, n_chunks))
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+    else:
+        centroids, assign = np.zeros((0, EMBED_DIM), dtype=np.float32), np.empty(0, dtype=np.int64)
+    list_order = np.argsort(assign, kind="stable")
+    position = np.empty(n_chunks, dtype=np.int64)
+    position[list_order] = np.arange(n_chunks)
+    np.save(path / "centroids.npy", centroids)
+    np.save(path / "list_offsets.npy", np.r_[0, np.cumsum(np.bincount(assign, minlength=len(centroids)))])
+    np.save(path / "list_chunk.npy", list_order.astype(np.int32))
+    np.save(path / "vector_position.npy", position)
+    np.save(path / "vectors.npy", np.asarray(vectors, dtype=np.float32)[list_order])
+    (path / "meta.json").write_text(json.dumps({"chunks": n_chunks, "terms": len(words), "dim": EMBED_DIM}))
+
+
+class Segment:
+    """Memory-mapped arrays of one segment."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.name
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        load = lambda name: np.load(self.path / f"{name}.npy", mmap_mode="r")
+        self.vocabulary = load("vocabulary")
+        self.df = load("df")
+        self.term_offsets = load("term_offsets")
+        self.posting_chunk = load("posting_chunk")
+        self.posting_tf = load("posting_tf")
+        self.chunk_len = load("chunk_len")
+        self.chunk_doc = load("chunk_doc")
+        self.chunk_hash = load("chunk_hash")
+        self.centroids = load("centroids")
+        self.list_offsets = load("list_offsets")
+        self.list_chunk = load("list_chunk")
+        self.vector_position = load("vector_position")
+        self.vectors = load("vectors")
+        self.texts = _Strings(self.path / "texts")
+
+    def __len__(self):
+        return self.meta["chunks"]
+
+    def lookup(self, tokens):
+        """Term id of each token in this segment, -1 where absent."""
+        if not len(self.vocabulary):
+            return np.full(len(tokens), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.vocabulary, tokens), len(self.vocabulary) - 1)
+        return np.where(self.vocabulary[positions] == np.asarray(tokens), positions, -1)
+
+    def postings(self, term):
+        lo, hi = int(self.term_offsets[term]), int(self.term_offsets[term + 1])
+        return np.asarray(self.posting_chunk[lo:hi]), np.asarray(self.posting_tf[lo:hi], dtype=np.float64)
+
+    def dense(self, query, allowed):
+        """``(chunks, cosine)`` of the dense candidates, scanning IVF lists near the query."""
+        n_allowed = int(allowed.sum())
+        if n_allowed <= EXACT_SCAN:
+            chunks = np.flatnonzero(allowed)
+            rows = np.asarray(self.vector_position[chunks])
+        else:
+            nearest = np.argsort(self.centroids @ query)[::-1][:N_PROBE]
+            rows = np.concatenate([np.arange(self.list_offsets[l], self.list_offsets[l + 1]) for l in nearest])
+            chunks = np.asarray(self.list_chunk[rows])
+            keep = allowed[chunks]
+            rows, chunks = rows[keep], chunks[keep]
+        return chunks, self.vectors[rows] @ query
+
+    def live_columns(self, live):
+        """Postings, chunk columns, texts and vectors of the live chunks, renumbered densely."""
+        new_id = np.cumsum(live) - 1
+        keep = live[np.asarray(self.posting_chunk)]
+        terms = np.repeat(np.arange(len(self.vocabulary)), np.diff(self.term_offsets))[keep]
+        chunks = np.flatnonzero(live)
+        return {
+            "words": np.asarray(self.vocabulary),
+            "terms": terms,
+            "rows": new_id[np.asarray(self.posting_chunk)[keep]],
+            "tfs": np.asarray(self.posting_tf)[keep],
+            "chunk_len": np.asarray(self.chunk_len)[chunks],
+            "chunk_doc": np.asarray(self.chunk_doc)[chunks],
+            "chunk_hash": np.asarray(self.chunk_hash)[chunks],
+            "texts": [self.texts[i] for i in chunks],
+            "vectors": np.asarray(self.vectors[np.asarray(self.vector_position[chunks])]),
+        }
+
+
+def merge_columns(parts):
+    """Concatenate :meth:`Segment.live_columns` of several segments over a merged vocabulary."""
+    words, inverse = np.unique(np.concatenate([part["words"] for part in parts]), return_inverse=True)
+    term_base = np.cumsum([0] + [len(part["words"]) for part in parts])
+    row_base = np.cumsum([0] + [len(part["chunk_len"]) for part in parts])
+    terms = np.concatenate([inverse[term_base[i] + part["terms"]] for i, part in enumerate(parts)])
+    rows = np.concatenate([row_base[i] + part["rows"] for i, part in enumerate(parts)])
+    tfs = np.concatenate([part["tfs"] for part in parts])
+    order = np.lexsort((rows, terms))
+    return {
+        "words": words, "terms": terms[order], "rows": rows[order], "tfs": tfs[order],
+        "chunk_len": np.concatenate([part["chunk_len"] for part in parts]),
+        "chunk_doc": np.concatenate([part["chunk_doc"] for part in parts]),
+        "chunk_hash": np.concatenate([part["chunk_hash"] for part in parts]),
+        "texts": [text for part in parts for text in part["texts"]],
+        "vectors": np.concatenate([part["vectors"] for part in parts]),
+    }
+
+
+class SearchIndex:
+    """The current generation of a segmented index; see the module docstring."""
+
+    def __init__(self, index_dir):
+        self.index_dir = Path(index_dir)
+        self.generation = json.loads((self.index_dir / "current.json").read_text())["generation"]
+        path = self.index_dir / "generations" / self.generation
+        self.manifest = json.loads((path / "manifest.json").read_text())
+        self.segments = [Segment(self.index_dir / "segments" / name) for name in self.manifest["segments"]]
+        self.live = [np.load(path / f"live_{segment.name}.npy", mmap_mode="r") for segment in self.segments]
+        load = lambda name: np.load(path / f"{name}.npy", mmap_mode="r")
+        self.doc_type = load("doc_type")
+        self.doc_date = load("doc_date")
+        self.doc_added = load("doc_added")
+        self.doc_updated = load("doc_updated")
+        self.doc_live = load("doc_live")
+        self._titles = _Strings(path / "titles")
+        self._ids = _Strings(path / "ids")
+
+    def __len__(self):
+        return self.manifest["chunks"]
+
+    @property
+    def n_documents(self):
+        return self.manifest["documents"]
+
+    def document_counts(self, since):
+        """Live documents per type, with how many were added or updated on or after ``since``."""
+        live = np.asarray(self.doc_live)
+        added = live & (np.asarray(self.doc_added) >= day_number(since))
+        updated = live & (np.asarray(self.doc_updated) >= day_number(since)) & ~added
+        return {
+            doc_type: {"documents": int((live & (self.doc_type == i)).sum()),
+                       "added": int((added & (self.doc_type == i)).sum()),
+                       "updated": int((updated & (self.doc_type == i)).sum())}
+            for i, doc_type in enumerate(DOC_TYPES)
+        }
+
+    def doc_ids(self):
+        """Id of every document number ever indexed (removed ones included)."""
+        return [self._ids[i] for i in range(len(self._ids))]
+
+    def titles(self):
+        return [self._titles[i] for i in range(len(self._titles))]
+
+    def _allowed(self, doc_types, since):
+        """Per segment, the live chunks passing the type and date filters."""
+        keep = np.asarray(self.doc_live).copy()
+        if doc_types:
+            keep &= np.isin(self.doc_type, [DOC_TYPES.index(t) for t in doc_types])
+        if since is not None:
+            keep &= self.doc_date >= day_number(since)
+        return [live & keep[segment.chunk_doc] for segment, live in zip(self.segments, self.live)]
+
+    def search(self, query, doc_types=None, since=None, limit=10, threshold=0.0):
+        """Best-matching documents for ``query``, one result per document.
+
+        ``doc_types`` restricts results to those types (default all) and
+        ``since`` to documents dated on or after it. Results below
+        ``threshold`` relevance are dropped. Each result is a dict with
+        ``title``, ``doc_type``, ``date``, ``excerpt``, ``relevance``,
+        ``lexical``, ``semantic``, ``doc`` (id) and ``chunk``.
+        """
+        return self.rank(self.candidates(query, doc_types, since), limit, threshold)
+
+    def candidates(self, query, doc_types=None, since=None):
+        """Scored candidate chunks of a query: the retrieval half of :meth:`search`.
+
+        Returns a dict of ``segment``, ``chunk``, ``lexical`` and
+        ``semantic`` arrays (empty when nothing matches).
+        """
+        empty = {"segment": np.empty(0, dtype=np.int64), "chunk": np.empty(0, dtype=np.int64),
+                 "lexical": np.empty(0), "semantic": np.empty(0)}
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not len(self):
+            return empty
+        allowed = self._allowed(doc_types, since)
+
+        # Collection statistics are summed over the segments
+        local = [segment.lookup(tokens) for segment in self.segments]
+        df = np.zeros(len(tokens))
+        for segment, ids in zip(self.segments, local):
+            df += np.where(ids >= 0, segment.df[np.maximum(ids, 0)] if len(segment.df) else 0, 0)
+        n_chunks = max(len(self), 1)
+        idf = term_idf(df, n_chunks)
+        rare = term_idf(0, n_chunks)
+        avg_length = max(self.manifest["avg_length"], 1.0)
+        query_vector = embed_terms(np.zeros(len(tokens), dtype=np.int64), np.arange(len(tokens)),
+                                   np.where(df > 0, idf, rare), 1, _term_features(tokens, EMBED_DIM))[0]
+
+        found = {"segment": [], "chunk": [], "lexical": [], "semantic": []}
+        for s, (segment, ids, ok) in enumerate(zip(self.segments, local, allowed)):
+            if not ok.any():
+                continue
+            lexical = np.zeros(len(segment))
+            for t, term in enumerate(ids):
+                if term < 0:
+                    continue
+                chunks, tf = segment.postings(term)
+                keep = ok[chunks]
+                chunks, tf = chunks[keep], tf[keep]
+                norm = K1 * (1 - B + B * segment.chunk_len[chunks] / avg_length)
+                lexical += np.bincount(chunks, weights=idf[t] * tf * (K1 + 1) / (tf + norm), minlength=len(segment))
+            top_lexical = np.argpartition(-lexical, min(CANDIDATES, len(lexical) - 1))[:CANDIDATES]
+            top_lexical = top_lexical[lexical[top_lexical] > 0]
+            dense_chunks, dense_scores = segment.dense(query_vector, ok)
+            chunks = np.union1d(top_lexical, dense_chunks[np.argsort(-dense_scores)[:CANDIDATES]])
+            found["segment"].append(np.full(len(chunks), s))
+            found["chunk"].append(chunks)
+            found["lexical"].append(lexical[chunks])
+            found["semantic"].append(np.maximum(
+                segment.vectors[np.asarray(segment.vector_position[chunks])] @ query_vector, 0))
+        return {key: np.concatenate(values) for key, values in found.items()} if found["chunk"] else empty
+
+    def rank(self, candidates, limit=10, threshold=0.0):
+        """Blend, threshold and group :meth:`candidates` into per-document results."""
+        if not len(candidates["chunk"]):
+            return []
+        lex, semantic = candidates["lexical"], candidates["semantic"]
+        relevance = np.minimum(LEXICAL_WEIGHT * lex / max(lex.max(), 1e-12)
+                               + (1 - LEXICAL_WEIGHT) * semantic / max(semantic.max(), 1e-12), 1.0)
+
+        # Best chunk of each document
+        docs = np.array([self.segments[s].chunk_doc[c] for s, c in zip(candidates["segment"], candidates["chunk"])])
+        order = np.argsort(-relevance, kind="stable")
+        _, first = np.unique(docs[order], return_index=True)
+        best = order[np.sort(first)]
+        results = []
+        for i in best[:limit]:
+            if relevance[i] < threshold:
+                break
+            segment, chunk, doc = self.segments[candidates["segment"][i]], int(candidates["chunk"][i]), int(docs[i])
+            text = segment.texts[chunk]
+            results.append({
+                "title": self._titles[doc],
+                "doc_type": DOC_TYPES[int(self.doc_type[doc])],
+                "date": day_date(self.doc_date[doc]).isoformat(),
+                "excerpt": text if len(text) <= EXCERPT_CHARS else text[:EXCERPT_CHARS].rsplit(" ", 1)[0] + "...",
+                "relevance": float(relevance[i]),
+                "lexical": float(lex[i]),
+                "semantic": float(semantic[i]),
+                "doc": self._ids[doc],
+                "chunk": f"{segment.name}/{chunk}",
+            })
+        return results
+
+
+def write_generation(index_dir, segments, live, documents, manifest):
+    """Write a generation and make it current with an atomic rewrite of ``current.json``.
+
+    ``segments`` are segment names, ``live`` their live-chunk masks and
+    ``documents`` a dict of ``ids``, ``titles``, ``type``, ``date``,
+    ``added``, ``updated`` and ``live`` columns indexed by document number. The
+    previous generation and its segments are kept, so a reader that has
+    just read ``current.json`` can still open them; older ones are deleted.
+    """
+    index_dir = Path(index_dir)
+    previous = json.loads((index_dir / "current.json").read_text())["generation"] \
+        if (index_dir / "current.json").exists() else None
+    name = f"g{time.time_ns()}"
+    path = index_dir / "generations" / name
+    path.mkdir(parents=True)
+    for segment, mask in zip(segments, live):
+        np.save(path / f"live_{segment}.npy", np.asarray(mask, dtype=bool))
+    _write_strings(path / "ids", documents["ids"])
+    _write_strings(path / "titles", documents["titles"])
+    np.save(path / "doc_type.npy", np.asarray(documents["type"], dtype=np.uint8))
+    np.save(path / "doc_date.npy", np.asarray(documents["date"], dtype=np.int32))
+    np.save(path / "doc_added.npy", np.asarray(documents["added"], dtype=np.int32))
+    np.save(path / "doc_updated.npy", np.asarray(documents["updated"], dtype=np.int32))
+    np.save(path / "doc_live.npy", np.asarray(documents["live"], dtype=bool))
+    (path / "manifest.json").write_text(json.dumps(dict(manifest, segments=list(segments)), indent=1))
+
+    tmp = index_dir / "current.json.tmp"
+    tmp.write_text(json.dumps({"generation": name}))
+    os.replace(tmp, index_dir / "current.json")
+
+    keep = {name, previous}
+    used = set(segments)
+    if previous is not None:
+        used |= set(json.loads((index_dir / "generations" / previous / "manifest.json").read_text())["segments"])
+    for old in (index_dir / "generations").iterdir():
+        if old.name not in keep:
+            shutil.rmtree(old, ignore_errors=True)
+    for old in (index_dir / "segments").iterdir() if (index_dir / "segments").exists() else ():
+        if old.name not in used:
+            shutil.rmtree(old, ignore_errors=True)
+    return name
+
+
+def normalize_query(query):
+    """The form of a query retrieval depends on: its distinct tokens, in order."""
+    return " ".join(dict.fromkeys(tokenize(query)))
+
+
+class QueryCache:
+    """LRU cache of :meth:`SearchIndex.candidates` results with a time-to-live.
+
+    Entries are keyed by the normalized query, the document types and the
+    date filter. The cache belongs to one index generation; a lookup
+    against another generation empties it first, so results never outlive
+    the index they came from.
+    """
+
+    def __init__(self, size=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def candidates(self, index, query, doc_types=None, since=None):
+        """``index.candidates(...)``, from the cache when possible. Returns ``(candidates, cached)``."""
+        key = (normalize_query(query), tuple(sorted(doc_types or ())), since)
+        now = time.monotonic()
+        with self._lock:
+            if index.generation != self.generation:
+                self._entries.clear()
+                self.generation = index.generation
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True
+            self._entries.pop(key, None)
+        found = index.candidates(key[0], doc_types, since)
+        with self._lock:
+            self.misses += 1
+            if index.generation == self.generation:
+                self._entries[key] = (now, found)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return found, False
+
+
+query_cache = QueryCache()
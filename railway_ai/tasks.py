@@ -0,0 +1,123 @@
+"""Job entry points behind the Simulation, Timetable Manager, Analytics and Settings views.
+
+Each task takes a ``progress(fraction, message)`` callback and returns a
+picklable result, so it can run in a :mod:`railway_ai.jobs` worker.
+"""
+from datetime import date
+from functools import partial
+from pathlib import Path
+
+from .analytics import OperationsStore, materialize, performance_report
+from .data import load_day_timetable
+from .delays import train_and_evaluate
+from .export import movement_chunks, send_report, write_report
+from .ingest import sync_documents
+from .microsim import Microsimulator
+from .montecarlo import run_monte_carlo
+from .network import load_network
+from .optimizer import optimize
+from .possessions import plan_month
+from .timetable import day_number
+
+
+def simulate_scenario(timetable, params, progress=None):
+    """Baseline and what-if runs of one Simulation page scenario.
+
+    "Traffic Flow" uses the block-section microsimulator; the other types
+    use the Monte Carlo engine. Both runs share the seed, so their
+    difference is the effect of ``params["recovery_margin"]`` and not of
+    noise.
+    """
+    recovery_margin = params["recovery_margin"]
+
+    def report(offset, label):
+        return lambda fraction: progress and progress(offset + fraction / 2, f"Running {label}")
+
+    if params["simulation_type"] == "Traffic Flow":
+        simulator = Microsimulator(timetable)
+        args = dict(seed=params["seed"], weather=params["weather"])
+        baseline = simulator.run(params["horizon"], progress=report(0.0, "baseline"), **args)
+        optimized = simulator.run(params["horizon"], recovery_margin=recovery_margin,
+                                  progress=report(0.5, "optimized"), **args)
+        # Per-stop delays are not shown and can be large for long horizons
+        baseline.pop("delays")
+        optimized.pop("delays")
+        engine = "microsim"
+    else:
+        args = dict(iterations=params["iterations"], seed=params["seed"], confidence=params["confidence"],
+                    horizon=params["horizon"], simulation_type=params["simulation_type"],
+                    weather=params["weather"])
+        baseline = run_monte_carlo(timetable, progress=report(0.0, "baseline"), **args)
+        optimized = run_monte_carlo(timetable, recovery_margin=recovery_margin,
+                                    progress=report(0.5, "optimized"), **args)
+        engine = "montecarlo"
+    return {"engine": engine, "baseline": baseline, "optimized": optimized}
+
+
+def optimize_timetable(timetable, goal, time_budget, progress=None):
+    """Run the anytime optimizer to its time budget and return its final result."""
+    for result in optimize(timetable, goal, time_budget=time_budget):
+        if progress and not result["done"]:
+            progress(result["fraction"], f"Evaluated {result['evaluated']:,} candidate moves - "
+                                         f"best so far: {result['improvement']:.1%} improvement, "
+                                         f"{len(result['retimed'])} trains retimed")
+    return result
+
+
+def sync_knowledge_base(documents_dir, index_dir, progress=None):
+    """Bring the document search index up to date; returns the ingestion report."""
+    return sync_documents(documents_dir, index_dir, progress=progress)
+
+
+def build_operations_history(store_dir, timetable_cache, days, progress=None):
+    """Operate the service days ``days`` and store them for Analytics & Reports."""
+    rows = materialize(OperationsStore(store_dir), days, partial(load_day_timetable, timetable_cache), progress)
+    return {"days": len(days), "movements": rows}
+
+
+def export_report(store_dir, timetable_cache, request, fmt, path, recipients=(), progress=None):
+    """Write an Analytics report to ``path`` as ``fmt`` and mail it to ``recipients``.
+
+    ``request`` holds the ``report_type``, ``start`` and ``end`` dates
+    (ISO strings, the end clipped to the last completed day) and ``lines``.
+    Service days missing from the store are operated first.
+    """
+    def report(offset, share):
+        return lambda fraction, message="": progress and progress(offset + fraction * share, message)
+
+    store = OperationsStore(store_dir)
+    first_day = int(day_number(date.fromisoformat(request["start"])))
+    last_day = min(int(day_number(date.fromisoformat(request["end"]))), int(day_number(date.today())) - 1)
+    missing = store.missing(first_day, last_day)
+    if missing:
+        materialize(store, missing, partial(load_day_timetable, timetable_cache), report(0.0, 0.3))
+    summary = performance_report(store, first_day, last_day, lines=request["lines"])
+    title = f"{request['report_type']} - {request['start']} to {request['end']}"
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    rows = write_report(path, fmt, title, summary,
+                        movement_chunks(store, first_day, last_day, lines=request["lines"], progress=report(0.3, 0.65)))
+    if recipients:
+        if progress:
+            progress(0.97, f"Mailing {len(recipients)} recipients")
+        send_report(path, recipients, title, f"{title}\n\nOverall performance {summary['on_time']:.1f}% over "
+                                            f"{summary['movements']:,} train arrivals. The report is attached.")
+    return {"path": str(path), "rows": rows, "bytes": Path(path).stat().st_size, "recipients": list(recipients)}
+
+
+def train_delay_model(store_dir, timetable_cache, model_path, days, holdout, progress=None):
+    """Train the delay model on the stored history up to yesterday, evaluate it and save it."""
+    last_day = int(day_number(date.today())) - 1
+    model = train_and_evaluate(OperationsStore(store_dir), partial(load_day_timetable, timetable_cache), last_day,
+                               days, holdout, progress)
+    model.save(model_path)
+    return {"observations": model.observations, "sections": len(model.sections), **model.evaluation}
+
+
+def plan_maintenance(timetable_cache, plans_dir, month, count=None, time_limit=None, progress=None):
+    """Plan and save the possessions of ``month`` (ISO date of any day in it), warm started from the month before.
+
+    Returns the plan, so a memoized run can restore a plan file that was removed.
+    """
+    kwargs = {} if time_limit is None else {"time_limit": time_limit}
+    return plan_month(load_network(timetable_cache), partial(load_day_timetable, timetable_cache),
+                      date.fromisoformat(month), count, plans_dir=plans_dir, progress=progress, **kwargs)
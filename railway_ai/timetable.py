@@ -0,0 +1,228 @@
+"""Columnar timetable store.
+
+A timetable is held as one NumPy array per column instead of a list of
+per-stop-event dicts. Times are int32 minutes after midnight of the service
+day (values past 1440 are allowed, as in GTFS), and stations, trains, lines,
+platforms and statuses are small integer codes into category tuples.
+"""
+import hashlib
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+LINES = ("Line 1 - Express", "Line 2 - Regional", "Line 3 - Freight", "Line 4 - High Speed")
+STATUSES = ("On Time", "Delayed", "Early")
+STATIONS = ("Central Station", "North Terminal", "East Junction", "South Plaza", "West End")
+
+# Station order, first departure (minutes), headway and number of trains per line
+LINE_PATTERNS = {
+    "Line 1 - Express": {"route": (0, 1, 2, 3, 4), "first": 300, "headway": 15, "trains": 20},
+    "Line 2 - Regional": {"route": (4, 3, 2, 1, 0), "first": 310, "headway": 20, "trains": 15},
+    "Line 3 - Freight": {"route": (1, 2, 3), "first": 0, "headway": 60, "trains": 24},
+    "Line 4 - High Speed": {"route": (0, 2, 4), "first": 360, "headway": 30, "trains": 30},
+}
+
+RUN_MINUTES = 12
+DWELL_MINUTES = 2
+
+# Day number used for the int32 ``day`` column (days since 1970-01-01)
+_EPOCH = date(1970, 1, 1)
+
+# "HH:MM" labels for every minute of a day, indexed by minute-of-day
+_CLOCK = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(1440)], dtype=object)
+
+
+def day_number(d):
+    """Return the int32 day number used in the ``day`` column for a date."""
+    return np.int32((d - _EPOCH).days)
+
+
+def day_date(n):
+    """Inverse of :func:`day_number`."""
+    return _EPOCH + timedelta(days=int(n))
+
+
+def format_minutes(minutes):
+    """Vectorized ``HH:MM`` formatting of minute-of-day values."""
+    return _CLOCK[np.asarray(minutes) % 1440]
+
+
+class Timetable:
+    """A set of stop events stored column-wise.
+
+    Every column has one entry per stop event. ``train``, ``station`` and
+    ``line`` are codes into ``trains``, ``stations`` and ``lines``; ``status``
+    is a code into ``STATUSES``.
+    """
+
+    COLUMNS = ("train", "station", "line", "seq", "platform", "arrival", "departure", "status", "day")
+    # Column of the Schedule view's table -> the column it is built from
+    FRAME_COLUMNS = {"Train ID": "train", "Line": "line", "Station": "station", "Arrival": "arrival",
+                     "Departure": "departure", "Platform": "platform", "Status": "status"}
+    DTYPES = {
+        "train": np.int32,
+        "station": np.int32,
+        "line": np.int16,
+        "seq": np.int16,
+        "platform": np.int16,
+        "arrival": np.int32,
+        "departure": np.int32,
+        "status": np.int8,
+        "day": np.int32,
+    }
+
+    __slots__ = COLUMNS + ("trains", "stations", "lines")
+
+    def __init__(self, trains, stations, lines=LINES, **columns):
+        self.trains = tuple(trains)
+        self.stations = tuple(stations)
+        self.lines = tuple(lines)
+        n = None
+        for name in self.COLUMNS:
+            values = np.asarray(columns[name], dtype=self.DTYPES[name])
+            if n is None:
+                n = len(values)
+            elif len(values) != n:
+                raise ValueError(f"column {name!r} has {len(values)} rows, expected {n}")
+            setattr(self, name, values)
+
+    def __len__(self):
+        return len(self.arrival)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.COLUMNS)
+
+    def columns(self):
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    def fingerprint(self):
+        """Content hash of the categories and columns, for memo keys."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((self.trains, self.stations, self.lines)).encode())
+        for name in self.COLUMNS:
+            digest.update(np.ascontiguousarray(getattr(self, name)).data)
+        return digest.hexdigest()
+
+    def take(self, index):
+        """Return a new timetable holding the rows selected by ``index`` (mask or positions)."""
+        return Timetable(
+            self.trains, self.stations, self.lines,
+            **{name: values[index] for name, values in self.columns().items()}
+        )
+
+    def compact(self):
+        """Return the timetable with only the trains and stations its rows use, for small slices of a big day."""
+        trains, train = np.unique(self.train, return_inverse=True)
+        stations, station = np.unique(self.station, return_inverse=True)
+        columns = self.columns()
+        columns.update(train=train, station=station)
+        return Timetable([self.trains[i] for i in trains], [self.stations[i] for i in stations], self.lines, **columns)
+
+    def mask(self, line=None, day=None, station=None, status=None):
+        """Boolean row mask for the given filters; ``None`` or "All Lines" means no filter."""
+        keep = np.ones(len(self), dtype=bool)
+        if line is not None and line != "All Lines":
+            if line not in self.lines:
+                return np.zeros(len(self), dtype=bool)
+            keep &= self.line == self.lines.index(line)
+        if day is not None:
+            keep &= self.day == (day if isinstance(day, (int, np.integer)) else day_number(day))
+        if station is not None:
+            if station not in self.stations:
+                return np.zeros(len(self), dtype=bool)
+            keep &= self.station == self.stations.index(station)
+        if status is not None:
+            keep &= self.status == STATUSES.index(status)
+        return keep
+
+    def select(self, line=None, day=None, station=None, status=None):
+        """Filter by line name, service date, station name and status name."""
+        return self.take(self.mask(line=line, day=day, station=station, status=status))
+
+    def sort(self, by=("day", "arrival", "train")):
+        """Return the timetable ordered by the given columns (first key is most significant)."""
+        order = np.lexsort([getattr(self, name) for name in reversed(by)])
+        return self.take(order)
+
+    def sort_key(self, name):
+        """Integer key that orders rows by column ``name`` as shown: code columns by their labels."""
+        values = getattr(self, name)
+        labels = {"train": self.trains, "station": self.stations, "line": self.lines, "status": STATUSES}.get(name)
+        if labels is None:
+            return values
+        rank = np.empty(len(labels), dtype=np.int32)
+        rank[np.argsort(np.array(labels, dtype=object), kind="stable")] = np.arange(len(labels), dtype=np.int32)
+        return rank[values]
+
+    def to_frame(self):
+        """Render as the DataFrame shown by the Schedule view.
+
+        Code columns become ``pd.Categorical`` built from the codes, so no
+        per-row Python objects are created except the clock strings.
+        """
+        return pd.DataFrame({
+            "Train ID": pd.Categorical.from_codes(self.train, self.trains),
+            "Line": pd.Categorical.from_codes(self.line, self.lines),
+            "Station": pd.Categorical.from_codes(self.station, self.stations),
+            "Arrival": format_minutes(self.arrival),
+            "Departure": format_minutes(self.departure),
+            "Platform": self.platform,
+            "Status": pd.Categorical.from_codes(self.status, STATUSES),
+        })
+
+    @classmethod
+    def concat(cls, parts):
+        """Concatenate timetables that share train, station and line categories."""
+        parts = list(parts)
+        first = parts[0]
+        for part in parts[1:]:
+            if (part.trains, part.stations, part.lines) != (first.trains, first.stations, first.lines):
+                raise ValueError("timetables use different categories")
+        return cls(
+            first.trains, first.stations, first.lines,
+            **{name: np.concatenate([getattr(p, name) for p in parts]) for name in cls.COLUMNS}
+        )
+
+
+def synthetic_day(service_date, patterns=None, stations=STATIONS, scale=1, seed=None):
+    """Build the demo timetable for one service day without per-row Python loops.
+
+    ``scale`` multiplies the number of trains per line (with the headway
+    divided accordingly) so the same generator can produce a national-sized
+    day. The random platform and status columns are drawn once per column.
+    """
+    patterns = LINE_PATTERNS if patterns is None else patterns
+    if seed is None:
+        seed = int(day_number(service_date))
+    rng = np.random.default_rng(seed)
+
+    lines = tuple(patterns)
+    per_line = []
+    train_names = []
+    for line_code, line in enumerate(lines):
+        pattern = patterns[line]
+        route = np.asarray(pattern["route"], dtype=np.int32)
+        n_trains = pattern["trains"] * scale
+        starts = pattern["first"] + (np.arange(n_trains) * pattern["headway"]) // scale
+        offset = len(train_names)
+        train_names.extend(f"TR{1000 + offset + i}" for i in range(n_trains))
+
+        n_stops = len(route)
+        arrival = (starts[:, None] + np.arange(n_stops)[None, :] * RUN_MINUTES).ravel()
+        per_line.append({
+            "train": np.repeat(np.arange(offset, offset + n_trains), n_stops),
+            "station": np.tile(route, n_trains),
+            "line": np.full(n_trains * n_stops, line_code),
+            "seq": np.tile(np.arange(n_stops), n_trains),
+            "arrival": arrival,
+            "departure": arrival + DWELL_MINUTES,
+        })
+
+    columns = {name: np.concatenate([p[name] for p in per_line]) for name in per_line[0]}
+    n = len(columns["arrival"])
+    columns["platform"] = rng.integers(1, 6, n)
+    columns["status"] = rng.choice(np.array([0, 0, 0, 1, 2]), n)
+    columns["day"] = np.full(n, day_number(service_date))
+    return Timetable(train_names, stations, lines, **columns)
@@ -0,0 +1,271 @@
+"""Planning engines exposed to the AI Assistant as callable tools.
+
+Each tool is a function ``tool(context, **arguments)`` returning a
+JSON-able dict, registered with :func:`tool` together with the JSON schema
+of its arguments; :func:`tool_schemas` lists them in the OpenAI function
+calling format. The :class:`ToolContext` gives tools the timetable of a
+service date, the network and the document index without importing the
+app.
+
+:func:`run_tool_calls` executes the calls of one assistant turn
+concurrently in a thread pool -- the engines spend their time in NumPy
+and I/O, which release the GIL -- and answers repeated calls from a
+:class:`ToolCache`, so follow-up questions that need the same lookup do
+not recompute it. A failing tool returns ``{"error": ...}`` for the model
+to read instead of failing the turn.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+
+from .conflicts import ConflictDetector
+from .documents import DOC_TYPES
+from .montecarlo import run_monte_carlo
+from .possessions import next_month, plan_month
+from .search import query_cache
+from .timetable import format_minutes
+
+MAX_PARALLEL_TOOLS = 4
+# Assistant rounds of tool calls before it must answer
+MAX_TOOL_ROUNDS = 3
+SIMULATION_ITERATIONS = 200
+MAX_ROWS = 10
+
+_TOOLS = {}
+
+
+def tool(description, **parameters):
+    """Register a tool; ``parameters`` map argument names to JSON schemas.
+
+    A schema with a ``default`` makes its argument optional.
+    """
+    def register(function):
+        required = [name for name, schema in parameters.items() if "default" not in schema]
+        _TOOLS[function.__name__] = (function, {
+            "type": "function",
+            "function": {
+                "name": function.__name__,
+                "description": description,
+                "parameters": {"type": "object", "properties": parameters, "required": required},
+            },
+        })
+        return function
+    return register
+
+
+def tool_schemas():
+    """Schemas of every registered tool, for ``ChatClient.stream(tools=...)``."""
+    return [schema for _, schema in _TOOLS.values()]
+
+
+class ToolContext:
+    """What the tools run against.
+
+    ``timetable_for(service_date)`` returns a day's timetable, ``network``
+    is the rail network and ``search_index()`` opens the document index.
+    """
+
+    def __init__(self, timetable_for, network, search_index, today=None):
+        self.timetable_for = timetable_for
+        self.network = network
+        self.search_index = search_index
+        self.today = today or date.today()
+
+    def timetable(self, service_date=None):
+        return self.timetable_for(date.fromisoformat(service_date) if service_date else self.today)
+
+
+class ToolCache:
+    """Results of earlier tool calls, keyed by tool name and arguments."""
+
+    def __init__(self):
+        self._results = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name, arguments):
+        return name, json.dumps(arguments, sort_keys=True)
+
+    def get(self, name, arguments):
+        with self._lock:
+            return self._results.get(self.key(name, arguments))
+
+    def put(self, name, arguments, result):
+        with self._lock:
+            self._results[self.key(name, arguments)] = result
+
+    def __len__(self):
+        return len(self._results)
+
+
+_DATE = {"type": "string", "description": "Service date as YYYY-MM-DD (default today)", "default": None}
+
+
+@tool("Size and shape of a day's timetable: trains, stop events, lines, busiest stations and peak hour.",
+      service_date=_DATE)
+def timetable_summary(context, service_date=None):
+    tt = context.timetable(service_date)
+    if not len(tt):
+        return {"trains": 0, "stop_events": 0}
+    busiest = np.bincount(tt.station, minlength=len(tt.stations))
+    hours = np.bincount(tt.departure // 60 % 24, minlength=24)
+    trains_per_line = np.bincount(tt.line[np.unique(tt.train, return_index=True)[1]], minlength=len(tt.lines))
+    return {
+        "service_date": service_date or context.today.isoformat(),
+        "trains": int(len(np.unique(tt.train))),
+        "stop_events": len(tt),
+        "stations": int(np.count_nonzero(busiest)),
+        "first_departure": format_minutes(int(tt.departure.min())),
+        "last_arrival": format_minutes(int(tt.arrival.max())),
+        "peak_hour": f"{int(hours.argmax()):02d}:00",
+        "peak_hour_departures": int(hours.max()),
+        "trains_per_line": {tt.lines[i]: int(n) for i, n in enumerate(trains_per_line) if n},
+        "busiest_stations": [{"station": tt.stations[i], "stop_events": int(busiest[i])}
+                             for i in np.argsort(-busiest)[:5] if busiest[i]],
+    }
+
+
+@tool("Platform double-occupancies, headway shortfalls and overtakings in a day's timetable.",
+      service_date=_DATE)
+def find_conflicts(context, service_date=None):
+    found = ConflictDetector(context.timetable(service_date)).detect()
+    return {
+        "service_date": service_date or context.today.isoformat(),
+        "conflicts": len(found),
+        "by_type": {str(kind): int(n) for kind, n in found["Type"].value_counts().items()},
+        "conflict_minutes": float(found["Minutes"].sum()) if len(found) else 0.0,
+        "first": [{column.lower().replace(" ", "_"): (value.item() if hasattr(value, "item") else value)
+                   for column, value in row.items()} for row in found.head(MAX_ROWS).to_dict("records")],
+    }
+
+
+@tool("Monte Carlo delay propagation over a day's timetable: expected on-time share and delay minutes.",
+      service_date=_DATE,
+      scenario={"type": "string", "enum": ["Traffic Flow", "Disruption Recovery", "Capacity Planning",
+                                           "Energy Optimization"], "default": "Traffic Flow"},
+      weather={"type": "boolean", "description": "Include adverse weather", "default": False},
+      recovery_margin={"type": "number", "description": "Extra running time supplement, e.g. 0.05",
+                       "default": 0.0})
+def simulate_delays(context, service_date=None, scenario="Traffic Flow", weather=False, recovery_margin=0.0):
+    result = run_monte_carlo(context.timetable(service_date), iterations=SIMULATION_ITERATIONS,
+                             simulation_type=scenario, weather=weather, recovery_margin=recovery_margin, workers=1)
+    on_time, mean_delay = result["on_time"]["median"], result["mean_delay"]["median"]
+    worst = int(np.argmax(mean_delay)) if len(mean_delay) else 0
+    return {
+        "scenario": scenario,
+        "trains": result["trains"],
+        "iterations": result["iterations"],
+        "on_time_percent": float(on_time.mean()) if len(on_time) else None,
+        "mean_delay_minutes": float(mean_delay.mean()) if len(mean_delay) else None,
+        "worst_hour": f"{int(result['hours'][worst]) % 24:02d}:00" if len(mean_delay) else None,
+        "total_delay_minutes_p50": float(result["delay_minutes"]["median"]),
+        "total_delay_minutes_p95": float(result["delay_minutes"]["upper"]),
+    }
+
+
+@tool("Fastest routes between two stations over the rail network, optionally avoiding closed links.",
+      origin={"type": "string", "description": "Station name"},
+      destination={"type": "string", "description": "Station name"},
+      avoid={"type": "array", "items": {"type": "array", "items": {"type": "string"}},
+             "description": "Closed links as [station, station] pairs", "default": []})
+def find_route(context, origin, destination, avoid=()):
+    network = context.network
+    try:
+        plan = network.reroute(origin, destination, [tuple(pair) for pair in avoid])
+    except KeyError as exc:
+        return {"error": f"unknown station {exc}", "stations": network.names[:MAX_ROWS]}
+    return {
+        "normal": plan["normal"] and {"route": " → ".join(plan["normal"]["names"]),
+                                      "minutes": plan["normal"]["minutes"], "km": round(plan["normal"]["km"], 1)},
+        "alternatives": [{"route": " → ".join(route["names"]), "minutes": route["minutes"],
+                          "km": round(route["km"], 1), "extra_minutes": route["extra_minutes"]}
+                         for route in plan["alternatives"]],
+    }
+
+
+@tool("Search regulations, standards, procedures, manuals and reports; returns the best passages.",
+      query={"type": "string"},
+      doc_types={"type": "array", "items": {"type": "string", "enum": list(DOC_TYPES)}, "default": []})
+def search_documents(context, query, doc_types=()):
+    index = context.search_index()
+    candidates, _ = query_cache.candidates(index, query, doc_types=list(doc_types))
+    return {"results": [{key: result[key] for key in ("title", "doc_type", "date", "relevance", "excerpt")}
+                        for result in index.rank(candidates, limit=5, threshold=0.3)]}
+
+
+@tool("Plan a month's maintenance possessions around the timetable within crew and machine limits; "
+      "returns trains affected, deferred work and the most disruptive possessions.",
+      month={"type": "string", "description": "Month as YYYY-MM (default next month)", "default": None})
+def plan_maintenance(context, month=None):
+    first = date.fromisoformat(f"{month}-01") if month else next_month(context.today)
+    plan = plan_month(context.network, context.timetable_for, first)
+    by_type = {}
+    for possession in plan["possessions"]:
+        by_type[possession["type"]] = by_type.get(possession["type"], 0) + 1
+    return {
+        "month": plan["month"],
+        "work_orders": plan["orders"],
+        "scheduled": plan["scheduled"],
+        "deferred": len(plan["deferred"]),
+        "trains_affected": plan["trains_affected"],
+        "trains_affected_at_earliest_starts": plan["earliest_start_trains_affected"],
+        "by_type": by_type,
+        "most_disruptive": [{key: p[key] for key in ("section", "type", "day", "start", "end", "trains")}
+                            for p in sorted(plan["possessions"], key=lambda p: -p["trains"])[:MAX_ROWS]],
+    }
+
+
+def _call(context, name, arguments):
+    if name not in _TOOLS:
+        return {"error": f"unknown tool {name!r}"}
+    try:
+        return _TOOLS[name][0](context, **arguments)
+    except Exception as exc:
+        return {"error": f"{type(exc).__name__}: {exc}"}
+
+
+def run_tool_calls(calls, context, cache=None, workers=MAX_PARALLEL_TOOLS):
+    """Execute tool calls concurrently; returns one record per call, in order.
+
+    ``calls`` are dicts of ``id``, ``name`` and ``arguments`` (JSON
+    string). Each record adds the parsed ``arguments``, the ``result``,
+    ``seconds`` and whether it was ``cached``. Identical calls run once.
+    """
+    cache = cache if cache is not None else ToolCache()
+    records, pending = [], {}
+    for call in calls:
+        try:
+            arguments = json.loads(call["arguments"] or "{}")
+        except ValueError:
+            arguments = None
+        record = {"id": call["id"], "name": call["name"], "arguments": call["arguments"], "result": None,
+                  "seconds": 0.0, "cached": False}
+        records.append(record)
+        if not isinstance(arguments, dict):
+            record["result"] = {"error": "arguments are not a JSON object"}
+            continue
+        result = cache.get(call["name"], arguments)
+        if result is not None:
+            record.update(result=result, cached=True)
+        else:
+            pending.setdefault(ToolCache.key(call["name"], arguments), (call["name"], arguments, []))[2].append(record)
+
+    def run(name, arguments):
+        started = time.perf_counter()
+        return _call(context, name, arguments), time.perf_counter() - started
+
+    if pending:
+        with ThreadPoolExecutor(min(workers, len(pending))) as pool:
+            futures = {key: pool.submit(run, name, arguments) for key, (name, arguments, _) in pending.items()}
+            for key, future in futures.items():
+                name, arguments, waiting = pending[key]
+                result, seconds = future.result()
+                if "error" not in result:
+                    cache.put(name, arguments, result)
+                for record in waiting:
+                    record.update(result=result, seconds=seconds)
+    return records
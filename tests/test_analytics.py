@@ -0,0 +1,37 @@
+"""Analytics and dashboard rollups share one on-time definition."""
+import json
+
+import numpy as np
+
+from railway_ai.analytics import BREAKDOWN, COLUMNS, OperationsStore, categorize, performance_report
+from railway_ai.rollups import ON_TIME_MINUTES, Rollups
+
+DELAYS = np.array([-1.0, 0.5, 3.0, ON_TIME_MINUTES - 0.01, ON_TIME_MINUTES, 12.0, np.nan])
+
+
+def test_breakdown_boundaries():
+    assert [BREAKDOWN[c] for c in categorize(DELAYS)] == [
+        "On-Time", "On-Time", "Delays < 5min", "Delays < 5min", "Delays ≥ 5min", "Delays ≥ 5min", "Cancelled"]
+
+
+def test_report_and_dashboard_agree(tmp_path):
+    store = OperationsStore(tmp_path)
+    n = len(DELAYS)
+    # A stored day with one movement per delay
+    part = store.partition(100)
+    part.mkdir(parents=True)
+    events = {"line": np.zeros(n), "station": np.arange(n), "scheduled": np.arange(n) * 10, "delay": DELAYS,
+              "origin": np.zeros(n), "upstream": np.zeros(n), "run": np.full(n, 3)}
+    for name, dtype in COLUMNS.items():
+        np.save(part / f"{name}.npy", events[name].astype(dtype))
+    (part / "meta.json").write_text(json.dumps({"day": 100, "rows": n, "lines": ["Main Line"], "stations": []}))
+    report = performance_report(store, 100, 100)
+
+    rollups = Rollups()
+    ran = ~np.isnan(DELAYS)
+    rollups.ingest(np.arange(n)[ran], np.zeros(ran.sum()), ["Main Line"] * int(ran.sum()), DELAYS[ran],
+                   np.zeros(ran.sum()))
+    on_time = rollups.total("hour", "on_time", n, 1)
+    assert on_time == 4
+    assert report["line_on_time"]["Main Line"] == 100 * on_time / n
+    assert report["on_time"] == 100 * on_time / n
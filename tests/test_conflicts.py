@@ -0,0 +1,73 @@
+"""Conflict detection: the sweeps against brute force, and incremental edits against a full re-check."""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from railway_ai.conflicts import ConflictDetector, headway_violations, sweep_overlaps
+from railway_ai.timetable import synthetic_day
+
+
+def brute_overlaps(group, start, end):
+    """Every interval overlapping one that starts before it, with the overlap with the latest-ending one."""
+    order = np.lexsort((start, group))
+    found = {}
+    for position, j in enumerate(order):
+        earlier = [i for i in order[:position] if group[i] == group[j]]
+        reach = max((end[i] for i in earlier), default=None)
+        if reach is not None and start[j] < reach:
+            found[int(j)] = int(min(reach, end[j]) - start[j])
+    return found
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_overlaps_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+    group = rng.integers(0, 6, n)
+    start = rng.integers(0, 600, n)
+    end = start + rng.integers(1, 30, n)
+    holder, intruder, overlap = sweep_overlaps(group, start, end)
+    assert dict(zip(intruder.tolist(), overlap.tolist())) == brute_overlaps(group, start, end)
+    assert (group[holder] == group[intruder]).all()
+    assert (start[holder] <= start[intruder]).all() and (start[intruder] < end[holder]).all()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_headway_violations_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+    group = rng.integers(0, 6, n)
+    entry = rng.integers(0, 600, n)
+    exit = entry + rng.integers(1, 20, n)
+    leader, follower, kind, shortfall = headway_violations(group, entry, exit, min_headway=3)
+
+    expected = set()
+    for g in np.unique(group):
+        members = np.flatnonzero(group == g)
+        members = members[np.lexsort((exit[members], entry[members]))]
+        for a, b in zip(members[:-1], members[1:]):
+            if exit[b] < exit[a]:
+                expected.add((int(a), int(b), 1, int(exit[a] - exit[b])))
+            elif entry[b] - entry[a] < 3:
+                expected.add((int(a), int(b), 0, int(3 - (entry[b] - entry[a]))))
+    assert set(zip(leader.tolist(), follower.tolist(), kind.tolist(), shortfall.tolist())) == expected
+
+
+def conflict_set(frame):
+    return set(map(tuple, frame[["Type", "Train A", "Train B", "Start", "Minutes"]].astype(str).to_numpy()))
+
+
+def test_incremental_edits_match_full_check():
+    timetable = synthetic_day(date(2026, 10, 19))
+    detector = ConflictDetector(timetable)
+    detector.detect()
+    rng = np.random.default_rng(0)
+    for train in rng.choice(len(timetable.trains), 10, replace=False).tolist():
+        detector.move_train(train, int(rng.integers(-10, 11)))
+    rows = rng.choice(len(timetable), 20, replace=False)
+    detector.set_platform(rows, rng.integers(1, 6, len(rows)))
+
+    edited = timetable.take(np.arange(len(timetable)))
+    edited.arrival, edited.departure, edited.platform = detector.arrival, detector.departure, detector.platform
+    assert conflict_set(detector.conflicts()) == conflict_set(ConflictDetector(edited).detect())
@@ -0,0 +1,64 @@
+"""Conversation: paging across the in-memory tail and the file, and the context token budget."""
+import pytest
+
+from railway_ai import conversation
+from railway_ai.conversation import MEMORY_MESSAGES, Conversation, digest, estimate_tokens
+
+
+def message(i, words=1):
+    return {"role": "user" if i % 2 == 0 else "assistant", "content": " ".join([f"m{i}"] * words)}
+
+
+def fill(directory, count, words=1):
+    chat = Conversation(directory)
+    for i in range(count):
+        chat.append(message(i, words))
+    return chat
+
+
+def summary_lines(summary):
+    return [line[2:] for line in summary.splitlines()[1:]]
+
+
+def test_messages_page_across_memory_and_disk(tmp_path):
+    chat = fill(tmp_path, 250)
+    expected = [message(i) for i in range(250)]
+    first_in_memory = 250 - MEMORY_MESSAGES
+    for start, stop in [(0, 20), (first_in_memory - 10, first_in_memory + 10), (first_in_memory, 250),
+                        (240, None), (-5, 3), (245, 400), (30, 30)]:
+        assert chat.messages(start, stop) == expected[max(start, 0):stop]
+    assert chat.window(30) == expected[-30:] and chat.last == expected[-1]
+
+    reopened = Conversation(tmp_path, chat.id)
+    assert len(reopened) == 250
+    assert reopened.messages(first_in_memory - 10, first_in_memory + 10) == expected[140:160]
+
+
+@pytest.mark.parametrize("count, words", [(250, 1), (250, 40), (30, 1)])
+def test_context_fits_the_budget(tmp_path, count, words):
+    chat = fill(tmp_path, count, words)
+    budget, summary_budget = 3000, 600
+    summary, recent = chat.context(budget, summary_budget)
+    assert recent == [message(i, words) for i in range(count - len(recent), count)]
+    assert sum(estimate_tokens(m) for m in recent) <= budget - summary_budget
+    older = count - len(recent)
+    if not older:
+        assert summary is None
+        return
+    # The summary holds the newest earlier messages, up to the one just before ``recent``
+    lines = summary_lines(summary)
+    assert lines and lines == [digest(message(i, words)) for i in range(older - len(lines), older)]
+    assert sum(len(line) // 4 + 1 for line in lines) <= summary_budget
+    assert summary.startswith(f"Summary of the earlier conversation ({older} messages")
+
+
+def test_summary_reaches_past_the_kept_digests(tmp_path, monkeypatch):
+    # All of the in-memory tail fits the budget, so every summary line is older than memory
+    full = fill(tmp_path / "full", 600)
+    monkeypatch.setattr(conversation, "MAX_DIGESTS", MEMORY_MESSAGES + 10)
+    short = fill(tmp_path / "short", 600)
+    summary, recent = short.context()
+    assert len(recent) == MEMORY_MESSAGES
+    assert len(summary_lines(summary)) > 10
+    assert (summary, recent) == full.context()
+    assert (summary, recent) == Conversation(tmp_path / "short", short.id).context()
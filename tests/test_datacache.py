@@ -0,0 +1,82 @@
+"""DataCache: LRU eviction by size, shared loads and namespace invalidation."""
+import threading
+
+import numpy as np
+import pytest
+
+from railway_ai.datacache import DataCache
+
+KB = 1024
+
+
+def block(kb=1):
+    return np.zeros(kb * KB, dtype=np.uint8)
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = DataCache(3 * KB)
+    for key in "abc":
+        cache.get("timetable", key, block)
+    cache.get("timetable", "a", pytest.fail)
+    cache.get("timetable", "d", block)
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= 3 * KB
+    loads = []
+    cache.get("timetable", "b", lambda: loads.append("b") or block())
+    cache.get("timetable", "d", pytest.fail)
+    assert loads == ["b"]
+
+
+def test_value_larger_than_budget_is_returned_but_not_kept():
+    cache = DataCache(2 * KB)
+    cache.get("network", "small", block)
+    assert len(cache.get("network", "big", lambda: block(4))) == 4 * KB
+    assert cache.stats()["entries"] == 1 and cache.stats()["evictions"] == 0
+
+
+def test_concurrent_requests_share_one_load():
+    cache = DataCache(10 * KB)
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return block()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("timetable", "day", load))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1 and len(results) == 4 and all(r is results[0] for r in results)
+
+
+def test_invalidate_drops_namespace_and_in_flight_loads():
+    cache = DataCache(10 * KB)
+    cache.get("timetable", "monday", block)
+    cache.get("network", "demo", block)
+    assert cache.invalidate("timetable") == 1
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == KB
+
+    # A load that started before the invalidation is returned but not cached
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return block()
+
+    thread = threading.Thread(target=cache.get, args=("timetable", "tuesday", slow))
+    thread.start()
+    started.wait(5)
+    cache.invalidate("timetable")
+    release.set()
+    thread.join(5)
+    loads = []
+    cache.get("timetable", "tuesday", lambda: loads.append(1) or block())
+    assert loads == [1]
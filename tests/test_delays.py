@@ -0,0 +1,54 @@
+"""Delay model: exact online updates and the live predictor's learn-once rule."""
+from datetime import date
+
+import numpy as np
+
+from railway_ai.delays import DelayModel, LivePredictor, N_FEATURES
+from railway_ai.timetable import day_number, synthetic_day
+
+DAY = date(2026, 10, 5)
+
+
+def predictor(model):
+    return LivePredictor(synthetic_day(DAY), day_number(DAY), model)
+
+
+def test_untrained_model_predicts_persistence():
+    model = DelayModel()
+    sections, lines = model.codes(np.array([0, 1]), np.array([1, 0]), np.array([0, 0]), ["A", "B"], ["L"])
+    upstream = np.array([0.0, 7.5])
+    x = model.design(upstream, np.array([4.0, 6.0]), np.array([480.0, 1000.0]), sections, lines)
+    assert x.shape == (2, N_FEATURES)
+    assert np.allclose(model.predict(x), upstream)
+
+
+def test_clock_moving_back_does_not_learn_twice():
+    model = DelayModel()
+    live = predictor(model)
+    live.update(600)
+    learned = model.observations
+    assert learned > 0
+    live.update(500)
+    live.update(600)
+    assert model.observations == learned
+    live.update(700)
+    assert model.observations > learned
+
+
+def test_rebuilt_predictor_does_not_learn_twice():
+    model = DelayModel()
+    predictor(model).update(600)
+    learned = model.observations
+    # A rebuilt predictor (same model and day) still shows the running trains
+    scored = predictor(model).update(600)
+    assert model.observations == learned
+    assert len(scored["train"]) > 0
+
+
+def test_replay_matches_single_pass():
+    stepped, single = DelayModel(), DelayModel()
+    live = predictor(stepped)
+    for minute in (300, 600, 450, 900):
+        live.update(minute)
+    predictor(single).update(900)
+    assert stepped.observations == single.observations
@@ -0,0 +1,68 @@
+"""Report export: the streamed .xlsx is a valid workbook (checked as a zip of XML parts)."""
+import zipfile
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+from railway_ai.export import XlsxWriter
+
+MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+TYPES = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+
+def sheet_rows(book, part):
+    rows = []
+    for row in ElementTree.fromstring(book.read(part)).iter(f"{MAIN}row"):
+        cells = []
+        for cell in row:
+            text = cell.find(f"{MAIN}is/{MAIN}t")
+            value = cell.find(f"{MAIN}v")
+            cells.append(text.text if text is not None else float(value.text) if value is not None else None)
+        rows.append(cells)
+    return rows
+
+
+def test_xlsx_is_a_valid_workbook(tmp_path):
+    path = tmp_path / "report.xlsx"
+    movements = pd.DataFrame({
+        "Station": ["Central <Station>", "West & End", "Ünion \"Square\""] * 3,
+        "Delay (min)": np.array([0.5, np.nan, 12.0] * 3),
+    })
+    writer = XlsxWriter(path, sheet_rows=4)
+    writer.table("Summary", ("Item", "Value"))
+    writer.write(pd.DataFrame({"Item": ["Movements"], "Value": [9]}))
+    writer.table("Movements", movements.columns)
+    writer.write(movements.iloc[:5])
+    writer.write(movements.iloc[5:])
+    writer.close()
+
+    with zipfile.ZipFile(path) as book:
+        assert book.testzip() is None
+        names = set(book.namelist())
+        # Every part parses as XML
+        for name in names:
+            ElementTree.fromstring(book.read(name))
+
+        types = ElementTree.fromstring(book.read("[Content_Types].xml"))
+        overrides = {o.get("PartName").lstrip("/") for o in types.iter(f"{TYPES}Override")}
+        assert overrides <= names and "xl/workbook.xml" in overrides
+        root = ElementTree.fromstring(book.read("_rels/.rels")).find(f"{RELS}Relationship")
+        assert root.get("Target") == "xl/workbook.xml"
+
+        workbook = ElementTree.fromstring(book.read("xl/workbook.xml"))
+        targets = {r.get("Id"): "xl/" + r.get("Target")
+                   for r in ElementTree.fromstring(book.read("xl/_rels/workbook.xml.rels"))}
+        sheets = [(s.get("name"), targets[s.get(R_ID)]) for s in workbook.iter(f"{MAIN}sheet")]
+        assert [name for name, _ in sheets] == ["Summary", "Movements", "Movements (2)", "Movements (3)"]
+        assert {part for _, part in sheets} <= overrides
+
+        assert sheet_rows(book, sheets[0][1]) == [["Item", "Value"], ["Movements", 9.0]]
+        body = []
+        for _, part in sheets[1:]:
+            rows = sheet_rows(book, part)
+            assert rows[0] == ["Station", "Delay (min)"] and len(rows) <= 5
+            body += rows[1:]
+    assert body == [[s, None if np.isnan(d) else d] for s, d in movements.itertuples(index=False)]
@@ -0,0 +1,98 @@
+"""GTFS import: chunked table cache, incremental sync and service-day filtering."""
+from datetime import date
+
+import pytest
+
+from railway_ai.gtfs_import import load_timetable, read_table, sync_feed
+
+# 2026-10-19 is a Monday, 2026-10-24 a Saturday
+MONDAY = date(2026, 10, 19)
+SATURDAY = date(2026, 10, 24)
+
+
+def stop_time_rows(trip, start_hour, stops=("A", "B", "C")):
+    return [f"{trip},{start_hour:02d}:{10 * i:02d}:00,{start_hour:02d}:{10 * i + 1:02d}:00,{stop},{i + 1}\n"
+            for i, stop in enumerate(stops)]
+
+
+@pytest.fixture
+def feed(tmp_path):
+    directory = tmp_path / "feed"
+    directory.mkdir()
+    (directory / "stops.txt").write_text(
+        "stop_id,stop_name,platform_code\nA,Alpha,1\nB,Bravo,2\nC,Charlie,\n")
+    (directory / "routes.txt").write_text("route_id,route_short_name,route_long_name\nR1,R1,Main Line\n")
+    (directory / "trips.txt").write_text(
+        "route_id,service_id,trip_id,trip_short_name\nR1,WK,T1,101\nR1,WK,T2,102\nR1,SA,T3,301\n")
+    (directory / "calendar.txt").write_text(
+        "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+        "WK,1,1,1,1,1,0,0,20260101,20261231\nSA,0,0,0,0,0,1,0,20260101,20261231\n")
+    (directory / "stop_times.txt").write_text(
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+        + "".join(stop_time_rows("T1", 6) + stop_time_rows("T2", 7) + stop_time_rows("T3", 8)))
+    return directory
+
+
+def test_small_tables_are_cached_in_chunks(feed, tmp_path):
+    cache = tmp_path / "cache"
+    sync_feed(feed, cache, chunk_rows=1)
+    trips = read_table(cache, "trips.txt")
+    assert trips["trip_id"].tolist() == ["T1", "T2", "T3"]
+    assert list(trips.index) == [0, 1, 2]
+
+
+def test_resync_is_incremental(feed, tmp_path):
+    cache = tmp_path / "cache"
+    first = sync_feed(feed, cache, chunk_rows=2)
+    assert "stop_times.txt" in first["rebuilt"] and first["rows"] == 9
+    assert sync_feed(feed, cache)["rows"] == 0
+
+    with open(feed / "stop_times.txt", "a") as f:
+        f.writelines(stop_time_rows("T2", 9, stops=("C",)))
+    appended = sync_feed(feed, cache)
+    assert appended["appended"] == ["stop_times.txt"] and appended["rows"] == 1
+    assert "trips.txt" in appended["unchanged"]
+
+    text = (feed / "stop_times.txt").read_text()
+    (feed / "stop_times.txt").write_text(text.replace("T1,06:20:00", "T1,06:25:00"))
+    rebuilt = sync_feed(feed, cache)
+    assert rebuilt["rebuilt"] == ["stop_times.txt"] and rebuilt["partitions"] >= 1
+    timetable = load_timetable(cache, MONDAY)
+    charlie = timetable.stations.index("Charlie")
+    t1 = timetable.trains.index("101")
+    arrivals = timetable.arrival[(timetable.train == t1) & (timetable.station == charlie)]
+    assert arrivals.tolist() == [6 * 60 + 25]
+
+
+def test_load_timetable_keeps_only_running_trips(feed, tmp_path):
+    cache = tmp_path / "cache"
+    sync_feed(feed, cache, chunk_rows=2)
+    weekday = load_timetable(cache, MONDAY)
+    assert sorted(weekday.trains) == ["101", "102"]
+    assert len(weekday.train) == 6
+    assert weekday.lines == ("Main Line",)
+    saturday = load_timetable(cache, SATURDAY)
+    assert saturday.trains == ("301",)
+    assert sorted(saturday.arrival.tolist()) == [8 * 60, 8 * 60 + 10, 8 * 60 + 20]
+
+
+def platform_feed(feed):
+    """The fixture feed with Alpha split into two platform stops, A1 and A2, and a parent station for Charlie."""
+    (feed / "stops.txt").write_text(
+        "stop_id,stop_name,platform_code,parent_station\n"
+        "A1,Alpha,1,\nA2,Alpha,2,\nB,Bravo,2,\nCS,Charlie,,\nC,Charlie Platform 1,1,CS\n")
+    text = (feed / "stop_times.txt").read_text()
+    (feed / "stop_times.txt").write_text(text.replace("T2,07:00:00,07:01:00,A", "T2,07:00:00,07:01:00,A2")
+                                         .replace(",A,", ",A1,"))
+    return feed
+
+
+def test_platform_stops_are_one_station(feed, tmp_path):
+    cache = tmp_path / "cache"
+    sync_feed(platform_feed(feed), cache)
+    timetable = load_timetable(cache, MONDAY)
+    assert sorted(timetable.stations) == ["Alpha", "Bravo", "Charlie"]
+    alpha = timetable.select(station="Alpha")
+    assert sorted(alpha.trains[t] for t in alpha.train) == ["101", "102"]
+    assert sorted(alpha.platform.tolist()) == [1, 2]
+    assert len(timetable.select(station="Charlie")) == 2
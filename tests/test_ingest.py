@@ -0,0 +1,54 @@
+"""Document ingestion: incremental sync and the first-index wait."""
+import os
+import threading
+import time
+
+import pytest
+
+from railway_ai import ingest
+from railway_ai.ingest import IngestionRunning, load_search_index, pending_changes, sync_documents
+
+
+@pytest.fixture
+def documents(tmp_path):
+    directory = tmp_path / "documents"
+    directory.mkdir()
+    (directory / "possessions.txt").write_text("Engineering possessions close a section of line to traffic.")
+    (directory / "signals.txt").write_text("Signal maintenance is carried out at night between the last and first trains.")
+    return directory
+
+
+def test_sync_is_incremental(documents, tmp_path):
+    index_dir = tmp_path / "index"
+    first = sync_documents(documents, index_dir)
+    assert first["added"] == 2
+    assert pending_changes(documents, index_dir) == 0
+    (documents / "signals.txt").write_text("Signal maintenance now also covers level crossing barriers.")
+    (documents / "possessions.txt").unlink()
+    assert pending_changes(documents, index_dir) == 2
+    second = sync_documents(documents, index_dir)
+    assert (second["added"], second["changed"], second["removed"]) == (0, 1, 1)
+    assert sync_documents(documents, index_dir)["chunks_indexed"] == 0
+
+
+def test_first_search_gives_up_on_a_held_lock(documents, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "FIRST_INDEX_WAIT", 0.5)
+    index_dir = tmp_path / "index"
+    index_dir.mkdir()
+    (index_dir / "ingest.lock").write_text(str(os.getpid()))
+    started = time.monotonic()
+    with pytest.raises(IngestionRunning):
+        load_search_index(documents, index_dir)
+    assert time.monotonic() - started < 5
+
+
+def test_first_search_takes_over_an_ingestion_that_published_nothing(documents, tmp_path):
+    index_dir = tmp_path / "index"
+    index_dir.mkdir()
+    lock = index_dir / "ingest.lock"
+    lock.write_text(str(os.getpid()))
+    # The other ingestion fails: its lock goes away without a current generation
+    threading.Timer(0.5, lock.unlink).start()
+    index = load_search_index(documents, index_dir)
+    assert (index_dir / "current.json").exists()
+    assert [result["title"] for result in index.search("possessions")][:1] == ["possessions"]
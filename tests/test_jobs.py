@@ -0,0 +1,70 @@
+"""Job runner: queueing, cancellation, the disk memo and worker start-up."""
+import time
+
+import pytest
+
+from railway_ai.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobRunner
+
+
+def nap(seconds, value, progress=None):
+    """A task that sleeps in small steps, reporting progress (and so noticing cancellation)."""
+    steps = max(int(seconds / 0.05), 1)
+    for step in range(steps):
+        progress(step / steps, f"step {step}")
+        time.sleep(seconds / steps)
+    return value
+
+
+def crash(progress=None):
+    raise ValueError("boom")
+
+
+def wait(job, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, f"job still {job.state}"
+        time.sleep(0.05)
+    return job
+
+
+@pytest.fixture
+def runner(tmp_path):
+    return JobRunner(tmp_path / "jobs", max_running=1)
+
+
+def test_queued_job_starts_when_polled(runner):
+    first = runner.submit(nap, 0.3, "a", params={"n": 1})
+    second = runner.submit(nap, 0.1, "b", params={"n": 2})
+    assert second.state == QUEUED
+    # Only the second job is followed, as follow_job does; nothing calls submit or get again
+    assert wait(second).state == DONE
+    assert second.result() == "b"
+    assert first.poll() == DONE
+
+
+def test_same_params_share_a_job_and_the_memo(runner, tmp_path):
+    job = runner.submit(nap, 0.1, 7, params={"n": 1})
+    assert runner.submit(nap, 0.1, 7, params={"n": 1}) is job
+    wait(job)
+    # A new runner over the same directory answers from the disk memo without running
+    again = JobRunner(tmp_path / "jobs").submit(nap, 0.1, 7, params={"n": 1})
+    assert again.cached and again.state == DONE and again.result() == 7
+
+
+def test_cancel_running_and_queued(runner):
+    running = runner.submit(nap, 30, None, params={"n": 1})
+    queued = runner.submit(nap, 30, None, params={"n": 2})
+    deadline = time.monotonic() + 60
+    while running.poll() != RUNNING or running.progress == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    queued.cancel()
+    running.cancel()
+    assert wait(running).state == CANCELLED
+    assert queued.state == CANCELLED
+
+
+def test_failure_is_reported(runner):
+    job = wait(runner.submit(crash, params={}))
+    assert job.state == FAILED
+    assert "boom" in job.error
@@ -0,0 +1,127 @@
+"""Network routing against brute force, and feed stations joined to the timetable by station key."""
+import heapq
+from datetime import date
+
+import numpy as np
+import pytest
+
+from railway_ai.gtfs_import import load_timetable, sync_feed
+from railway_ai.network import Network, link_traffic, network_from_cache, train_moves
+
+
+def random_network(n, extra, seed):
+    rng = np.random.default_rng(seed)
+    # A random spanning tree plus extra links, so long degree-2 chains and junctions both occur
+    link_from = [int(rng.integers(i)) for i in range(1, n)]
+    link_to = list(range(1, n))
+    pairs = set(zip(np.minimum(link_from, link_to), np.maximum(link_from, link_to)))
+    while len(pairs) < n - 1 + extra:
+        a, b = sorted(rng.choice(n, 2, replace=False).tolist())
+        if (a, b) not in pairs:
+            pairs.add((a, b))
+            link_from.append(a)
+            link_to.append(b)
+    minutes = rng.integers(1, 20, len(link_from))
+    return Network([f"S{i}" for i in range(n)], rng.uniform(40, 41, n), rng.uniform(-74, -73, n),
+                   link_from, link_to, minutes)
+
+
+def dijkstra(network, source, target, closed=()):
+    best = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if v == target:
+            return d
+        if d > best[v]:
+            continue
+        for arc in range(network.indptr[v], network.indptr[v + 1]):
+            if network.link[arc] in closed:
+                continue
+            w, nd = network.indices[arc], d + network.weight[arc]
+            if nd < best.get(w, np.inf):
+                best[w] = nd
+                heapq.heappush(heap, (nd, w))
+    return None
+
+
+def simple_path_minutes(network, source, target):
+    found = []
+
+    def extend(v, seen, minutes):
+        if v == target:
+            found.append(minutes)
+            return
+        for arc in range(network.indptr[v], network.indptr[v + 1]):
+            w = int(network.indices[arc])
+            if w not in seen:
+                extend(w, seen | {w}, minutes + network.weight[arc])
+
+    extend(source, {source}, 0.0)
+    return sorted(found)
+
+
+def check_route(network, route, source, target):
+    nodes = route["nodes"]
+    assert nodes[0] == source and nodes[-1] == target and len(set(nodes)) == len(nodes)
+    for (a, b), link in zip(zip(nodes[:-1], nodes[1:]), route["links"]):
+        assert {int(network.link_from[link]), int(network.link_to[link])} == {a, b}
+    assert route["minutes"] == pytest.approx(network.minutes[route["links"]].sum())
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_shortest_paths_match_dijkstra(seed):
+    network = random_network(80, 30, seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(60):
+        source, target = (int(v) for v in rng.choice(len(network), 2, replace=False))
+        closed = set(rng.choice(len(network.link_from), 5, replace=False).tolist())
+        for shut in ((), closed):
+            route = network.shortest_path(source, target, closed=list(shut))
+            expected = dijkstra(network, source, target, shut)
+            if expected is None:
+                assert route is None
+            else:
+                check_route(network, route, source, target)
+                assert route["minutes"] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_k_shortest_paths_match_all_simple_paths(seed):
+    network = random_network(12, 8, seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(20):
+        source, target = (int(v) for v in rng.choice(len(network), 2, replace=False))
+        routes = network.k_shortest_paths(source, target, k=4)
+        for route in routes:
+            check_route(network, route, source, target)
+        expected = simple_path_minutes(network, source, target)[:4]
+        assert [r["minutes"] for r in routes] == pytest.approx(expected)
+
+
+def test_duplicate_station_names_are_rejected():
+    with pytest.raises(ValueError, match="Alpha"):
+        Network(["Alpha", "Bravo", "Alpha"], [0, 0, 0], [0, 1, 2], [0, 1], [1, 2], [5, 5])
+
+
+def test_platform_stops_join_the_network(tmp_path):
+    feed = tmp_path / "feed"
+    feed.mkdir()
+    (feed / "stops.txt").write_text("stop_id,stop_name,stop_lat,stop_lon,platform_code\n"
+                                    "A1,Alpha,40.0,-74.0,1\nA2,Alpha,40.0,-74.0,2\nC,Charlie,40.1,-74.0,1\n")
+    (feed / "routes.txt").write_text("route_id,route_short_name,route_long_name\nR1,R1,Main Line\n")
+    (feed / "trips.txt").write_text("route_id,service_id,trip_id\nR1,WK,T1\nR1,WK,T2\n")
+    (feed / "stop_times.txt").write_text(
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+        "T1,06:00:00,06:01:00,A1,1\nT1,06:10:00,06:11:00,C,2\n"
+        "T2,07:00:00,07:01:00,A2,1\nT2,07:12:00,07:13:00,C,2\n")
+    cache = tmp_path / "cache"
+    sync_feed(feed, cache)
+    network = network_from_cache(cache)
+    assert sorted(network.names) == ["Alpha", "Charlie"] and len(network.link_from) == 1
+    assert network.shortest_path("Alpha", "Charlie")["minutes"] == 9
+
+    timetable = load_timetable(cache, date(2026, 10, 19))
+    _, _, a, b, link = train_moves(network, timetable)
+    assert (a >= 0).all() and (b >= 0).all() and (link == 0).all()
+    assert link_traffic(network, timetable).tolist() == [2]
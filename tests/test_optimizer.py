@@ -0,0 +1,72 @@
+"""Optimizer: incremental scoring, worker sync and best-so-far progress."""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from railway_ai import optimizer
+from railway_ai.optimizer import GOALS, CostModel, _random_move, optimize
+from railway_ai.timetable import synthetic_day
+
+# Terms that do not depend on the planned times; unweighted terms are not kept up to date
+PAIRWISE_TERMS = ("platform", "headway", "peak", "regularity")
+
+
+@pytest.fixture(scope="module")
+def timetable():
+    return synthetic_day(date(2026, 10, 19))
+
+
+def random_moves(model, count, seed=0):
+    rng = np.random.default_rng(seed)
+    moves = []
+    while len(moves) < count:
+        move = _random_move(model, model.hot_rows(), rng)
+        if model.legal(move):
+            moves.append(move)
+    return moves
+
+
+@pytest.mark.parametrize("goal", GOALS)
+def test_delta_matches_apply(timetable, goal):
+    model = CostModel(timetable, GOALS[goal])
+    for move in random_moves(model, 60):
+        if not model.legal(move):
+            continue
+        before = model.total
+        delta = model.delta(move)
+        model.apply(move)
+        assert model.total - before == pytest.approx(delta, abs=1e-6)
+    # The incrementally kept terms match the same timetable scored from scratch
+    fresh = CostModel(model.to_timetable(), GOALS[goal])
+    for term in set(PAIRWISE_TERMS) & set(GOALS[goal]):
+        assert model.terms[term] == pytest.approx(fresh.terms[term], abs=1e-6)
+
+
+def test_worker_is_sent_only_missing_moves(timetable):
+    weights = GOALS["Minimize Delays"]
+    optimizer._init_worker(timetable.trains, timetable.stations, timetable.lines, timetable.columns(), weights, 3)
+    model = CostModel(timetable, weights, 3)
+    log = random_moves(model, 6, seed=1)
+    probe = random_moves(model, 5, seed=2)
+
+    _, applied, scores = optimizer._evaluate_batch(0, log[:4], probe)
+    assert applied == 4
+    # A tail starting past what the worker has applied is refused
+    assert optimizer._evaluate_batch(5, log[5:], probe)[2] is None
+    _, applied, scores = optimizer._evaluate_batch(4, log[4:], probe)
+    assert applied == 6
+    for move in log:
+        model.apply(move)
+    assert scores == pytest.approx([model.delta(move) for move in probe])
+
+
+def test_progress_carries_best_retimings(timetable):
+    updates = list(optimize(timetable, time_budget=1.0, workers=1, report_every=0.0))
+    final = updates[-1]
+    assert final["done"] and not any(u["done"] for u in updates[:-1])
+    assert all("retimed" in u and "replatformed" in u for u in updates)
+    shifts = final["timetable"].departure - timetable.departure
+    retimed = {timetable.trains[t]: int(s) for t, s in zip(timetable.train, shifts) if s}
+    assert final["retimed"] == retimed
+    assert final["replatformed"] == int((final["timetable"].platform != timetable.platform).sum())
@@ -0,0 +1,67 @@
+"""Possession planning: every plan respects windows, section exclusivity and crew/machine capacity."""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from railway_ai.possessions import CAPACITY, WORK_TYPES, earliest_plan, month_hours, plan_possessions, work_orders
+
+MONTH = date(2026, 11, 1)
+LINKS = 40
+
+
+@pytest.fixture(scope="module")
+def traffic():
+    rng = np.random.default_rng(0)
+    hours = month_hours(MONTH)
+    # Busy days, quiet nights
+    daily = np.tile(np.r_[np.zeros(5), np.full(18, 6.0), np.ones(1)], hours // 24)
+    return rng.poisson(daily[None, :] * rng.uniform(0.2, 3, (LINKS, 1))).astype(np.float64)
+
+
+def check_feasible(orders, plan, capacity, hours):
+    specs = list(WORK_TYPES.values())
+    start, placed = plan["start"], plan["start"] >= 0
+    lo = orders["release"] * 24
+    hi = np.minimum((orders["due"] + 1) * 24, hours) - orders["hours"]
+    assert ((start[placed] >= lo[placed]) & (start[placed] <= hi[placed])).all()
+
+    used = {name: np.zeros(hours) for name in capacity}
+    section = np.zeros((LINKS, hours))
+    for o in np.flatnonzero(placed).tolist():
+        code, length, crew, crews, machine, _ = specs[orders["type"][o]]
+        window = slice(start[o], start[o] + length)
+        used[crew][window] += crews
+        if machine:
+            used[machine][window] += 1
+        section[orders["link"][o], window] += 1
+    for name, limit in capacity.items():
+        assert used[name].max() <= limit, name
+    assert section.max() <= 1
+
+
+@pytest.mark.parametrize("count, capacity, deferrals", [
+    (150, CAPACITY, False),
+    # Scarce crews and machines force deferrals
+    (400, {**CAPACITY, "Track gang": 1, "Tamper": 1, "Ballast train": 1}, True),
+])
+def test_plan_is_feasible(traffic, count, capacity, deferrals):
+    orders = work_orders(traffic.sum(axis=1) / (traffic.shape[1] / 24), MONTH, count, seed=1)
+    plan = plan_possessions(orders, traffic, capacity, time_limit=1.0)
+    check_feasible(orders, plan, capacity, traffic.shape[1])
+    placed = plan["start"] >= 0
+    assert plan["deferred"] == int((~placed).sum()) and (plan["deferred"] > 0) == deferrals
+    assert plan["total_trains"] == pytest.approx(np.nansum(plan["trains"]))
+    assert np.isnan(plan["trains"][~placed]).all()
+
+
+def test_plan_beats_earliest_start_and_reuses_warm_start(traffic):
+    orders = work_orders(traffic.sum(axis=1) / (traffic.shape[1] / 24), MONTH, 150, seed=1)
+    plan = plan_possessions(orders, traffic, time_limit=1.0)
+    assert plan["deferred"] == 0
+    assert plan["total_trains"] <= earliest_plan(orders, traffic)
+
+    warm = {i: int(s) for i, s in zip(orders["id"], plan["start"])}
+    again = plan_possessions(orders, traffic, warm_start=warm, time_limit=1.0)
+    assert again["warm_starts"] == len(orders["id"])
+    assert again["total_trains"] <= plan["total_trains"]
@@ -0,0 +1,35 @@
+"""Dashboard rollups: one shared rollup whose history survives network reloads and feed syncs."""
+from datetime import date
+
+import pytest
+
+from railway_ai import rollups
+from railway_ai.network import demo_network
+from railway_ai.rollups import operations_rollup
+from railway_ai.timetable import day_number, synthetic_day
+
+NOW = int(day_number(date(2026, 10, 17))) * 1440 + 9 * 60
+
+
+@pytest.fixture(autouse=True)
+def fresh_rollup(monkeypatch):
+    monkeypatch.setattr(rollups, "_rollup", None)
+
+
+def test_history_survives_reload_and_feed_change():
+    rollup = operations_rollup(demo_network(), version=None)
+    rollup.advance(NOW, synthetic_day)
+    movements = rollup.rollups.total("day", "movements", NOW, 2)
+    assert movements > 0
+
+    # The same feed reloaded: same rollup, nothing re-ingested
+    reloaded = demo_network()
+    assert operations_rollup(reloaded, version=None) is rollup and rollup.network is reloaded
+    assert rollup.advance(NOW, synthetic_day) == 0
+
+    # A new feed: history kept, days operated again from the new timetables
+    assert operations_rollup(reloaded, version=1) is rollup
+    assert rollup.version == 1 and not rollup._days
+    assert rollup.rollups.total("day", "movements", NOW, 2) == movements
+    assert rollup.advance(NOW + 60, synthetic_day) > 0
+    assert rollup.rollups.total("day", "movements", NOW + 60, 2) > movements
@@ -0,0 +1,46 @@
+"""Report scheduler: due runs, and failed submissions recorded and retried with back-off."""
+import json
+from datetime import datetime, timedelta
+
+from railway_ai.scheduler import RETRY_SECONDS, ReportScheduler
+
+
+class Submitter:
+    def __init__(self):
+        self.failing = False
+        self.requests = []
+
+    def __call__(self, request, fmt, recipients):
+        if self.failing:
+            raise ConnectionRefusedError("mail server down")
+        self.requests.append(request)
+        return type("Job", (), {"id": f"job{len(self.requests)}"})()
+
+
+def test_failed_submission_backs_off_and_recovers(tmp_path):
+    path = tmp_path / "schedules.json"
+    submit = Submitter()
+    scheduler = ReportScheduler(path, submit=submit)
+    now = datetime(2026, 10, 17, 5, 0)
+    schedule = scheduler.add("Service Performance", "Daily", "csv", ["planner@example.org"], now=now)
+    run_at = datetime.fromisoformat(schedule["next_run"])
+
+    submit.failing = True
+    assert scheduler.run_pending(run_at) == []
+    saved = json.loads(path.read_text())[0]
+    assert "ConnectionRefusedError: mail server down" in saved["last_error"]
+    assert saved["failures"] == 1 and saved["next_run"] == schedule["next_run"]
+
+    # Not retried before the back-off, which doubles after another failure
+    assert scheduler.run_pending(run_at + timedelta(seconds=RETRY_SECONDS - 1)) == []
+    assert scheduler.schedules[0]["failures"] == 1
+    second = run_at + timedelta(seconds=RETRY_SECONDS)
+    scheduler.run_pending(second)
+    assert datetime.fromisoformat(scheduler.schedules[0]["retry_at"]) == second + timedelta(seconds=2 * RETRY_SECONDS)
+
+    submit.failing = False
+    jobs = scheduler.run_pending(second + timedelta(seconds=2 * RETRY_SECONDS))
+    assert len(jobs) == 1 and submit.requests[0]["end"] == "2026-10-16"
+    saved = json.loads(path.read_text())[0]
+    assert saved["last_error"] is None and saved["failures"] == 0
+    assert saved["next_run"] == (run_at + timedelta(days=1)).isoformat()
@@ -0,0 +1,59 @@
+"""Timetable columns: filtering and sorting against the same operations in pandas."""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from railway_ai.timetable import STATUSES, Timetable, day_number, synthetic_day
+
+DAY = date(2026, 10, 19)
+
+
+@pytest.fixture(scope="module")
+def timetable():
+    return Timetable.concat([synthetic_day(DAY), synthetic_day(DAY.replace(day=20))])
+
+
+@pytest.fixture(scope="module")
+def frame(timetable):
+    frame = timetable.to_frame()
+    frame["Day"] = timetable.day
+    return frame
+
+
+@pytest.mark.parametrize("filters", [
+    {"line": "Line 2 - Regional"},
+    {"station": "Central Station", "status": "Delayed"},
+    {"line": "All Lines", "day": DAY},
+    {"line": "Line 1 - Express", "day": DAY.replace(day=20)},
+    {"line": "No Such Line"},
+])
+def test_select_matches_pandas(timetable, frame, filters):
+    expected = frame
+    if filters.get("line", "All Lines") != "All Lines":
+        expected = expected[expected["Line"] == filters["line"]]
+    if "station" in filters:
+        expected = expected[expected["Station"] == filters["station"]]
+    if "status" in filters:
+        expected = expected[expected["Status"] == filters["status"]]
+    if "day" in filters:
+        expected = expected[expected["Day"] == day_number(filters["day"])]
+    selected = timetable.select(**filters).to_frame()
+    pd.testing.assert_frame_equal(selected, expected.drop(columns="Day").reset_index(drop=True))
+
+
+def test_sort_matches_pandas(timetable, frame):
+    ordered = timetable.sort(("day", "arrival", "train"))
+    assert (np.diff(ordered.day) >= 0).all()
+    expected = frame.assign(train=timetable.train).sort_values(["Day", "Arrival", "train"], kind="stable")
+    assert ordered.to_frame()["Train ID"].tolist() == expected["Train ID"].tolist()
+    assert ordered.to_frame()["Arrival"].tolist() == expected["Arrival"].tolist()
+
+
+def test_sort_key_orders_by_label(timetable):
+    order = np.argsort(timetable.sort_key("station"), kind="stable")
+    names = np.asarray(timetable.stations, dtype=object)[timetable.station[order]]
+    assert names.tolist() == sorted(names.tolist())
+    statuses = np.asarray(STATUSES, dtype=object)[timetable.status[np.argsort(timetable.sort_key("status"))]]
+    assert statuses.tolist() == sorted(statuses.tolist())
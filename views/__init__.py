@@ -0,0 +1,81 @@
+"""The app's pages, imported only when first shown.
+
+Each view is a module of this package with a ``render()`` function. ``app.py``
+draws the shell (page setup, styles, sidebar, footer) and hands the main
+area to :func:`render`. That function imports the view's module the first
+time any session opens it, together with the engines and plotting libraries
+the view uses. Streamlit reruns re-execute ``app.py`` but not modules that
+are already imported, so a view costs its import once per server process.
+After that each rerun pays only for ``render()``.
+
+Every view has two budgets in ``VIEWS``: one for its first import (the
+cold start of that page) and one for each render. :func:`render` measures
+both, and :func:`timings` reports them with the number of renders over
+budget. Render times include waiting on a background job the view
+follows.
+"""
+import importlib
+import sys
+import threading
+import time
+
+# View name -> (menu icon, module, import budget ms, render budget ms)
+VIEWS = {
+    "Dashboard": ("📊", "views.dashboard", 1500, 400),
+    "AI Assistant": ("🤖", "views.assistant", 1000, 300),
+    "Timetable Manager": ("📅", "views.timetables", 1500, 500),
+    "Network Visualization": ("🗺️", "views.network", 1500, 500),
+    "Document Intelligence": ("📚", "views.documents", 800, 300),
+    "Simulation & Optimization": ("⚡", "views.simulation", 1500, 300),
+    "Analytics & Reports": ("📈", "views.analytics", 1500, 500),
+    "Settings": ("⚙️", "views.settings", 800, 300),
+}
+
+_timings = {}
+_lock = threading.Lock()
+
+
+def render(name):
+    """Draw view ``name``, importing its module on first use and recording both timings."""
+    _, module_name, _, _ = VIEWS[name]
+    module = sys.modules.get(module_name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        with _lock:
+            _timings.setdefault(name, _empty())["import_ms"] = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    try:
+        module.render()
+    finally:
+        # st.rerun() and st.stop() leave through an exception; the time until then still counts
+        elapsed = (time.perf_counter() - started) * 1000
+        with _lock:
+            stats = _timings.setdefault(name, _empty())
+            stats["renders"] += 1
+            stats["last_ms"] = elapsed
+            stats["max_ms"] = max(stats["max_ms"], elapsed)
+            stats["over_budget"] += elapsed > VIEWS[name][3]
+
+
+def _empty():
+    return {"import_ms": None, "renders": 0, "last_ms": None, "max_ms": 0.0, "over_budget": 0}
+
+
+def timings():
+    """One row per view with its measured import and render times against the budgets."""
+    with _lock:
+        rows = []
+        for name, (_, _, import_budget, render_budget) in VIEWS.items():
+            stats = _timings.get(name, _empty())
+            rows.append({
+                "View": name,
+                "Import (ms)": None if stats["import_ms"] is None else round(stats["import_ms"]),
+                "Import budget (ms)": import_budget,
+                "Last render (ms)": None if stats["last_ms"] is None else round(stats["last_ms"]),
+                "Slowest render (ms)": round(stats["max_ms"]) if stats["renders"] else None,
+                "Render budget (ms)": render_budget,
+                "Renders": stats["renders"],
+                "Over budget": stats["over_budget"],
+            })
+    return rows
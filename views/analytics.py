@@ -0,0 +1,191 @@
+"""Analytics & Reports: performance reports from the analytics store, exports and schedules."""
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+
+from railway_ai.analytics import OperationsStore, performance_report
+from railway_ai.config import ANALYTICS_STORE, TIMETABLE_CACHE
+from railway_ai.data import current_timetable
+from railway_ai.export import MIME_TYPES
+from railway_ai.jobs import DONE, get_runner
+from railway_ai.scheduler import FREQUENCIES, report_scheduler, submit_export
+from railway_ai.tasks import build_operations_history
+from railway_ai.timetable import day_number
+from views.common import follow_job
+
+# Analytics export formats, and the largest file offered as a browser download
+EXPORT_FORMATS = {"PDF": "pdf", "Excel": "xlsx", "CSV": "csv"}
+DOWNLOAD_LIMIT_BYTES = 200 * 2**20
+
+
+def render():
+    scheduler = report_scheduler()
+    st.markdown('<h1 class="main-header">Analytics & Reporting Dashboard</h1>', unsafe_allow_html=True)
+
+    # Report type selection
+    report_type = st.selectbox(
+        "Select Report Type",
+        ["Executive Summary", "Performance Analysis", "Financial Report", "Safety Metrics", "Custom Report"]
+    )
+
+    # Date range selection
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Start Date", datetime.now() - timedelta(days=30))
+    with col2:
+        end_date = st.date_input("End Date", datetime.now())
+
+    lines = st.multiselect("Lines", current_timetable(datetime.now().date()).lines, placeholder="All lines")
+
+    # Generate report button; days not yet in the analytics store are operated in a background job first
+    analytics = OperationsStore(ANALYTICS_STORE)
+    if st.button("Generate Report", type="primary"):
+        st.session_state.analytics_request = (report_type, start_date, end_date, tuple(lines))
+        st.session_state.pop("analytics_report", None)
+        # History ends with the last completed service day
+        first_day = int(day_number(start_date))
+        last_day = min(int(day_number(end_date)), int(day_number(datetime.now().date())) - 1)
+        missing = analytics.missing(first_day, last_day)
+        if missing:
+            job = get_runner().submit(build_operations_history, str(ANALYTICS_STORE), str(TIMETABLE_CACHE),
+                                      missing, params={"days": missing})
+            st.session_state.analytics_job = job.id
+        else:
+            st.session_state.pop("analytics_job", None)
+
+    job = follow_job("analytics_job", "Operations history backfill")
+    request = st.session_state.get("analytics_request")
+    report = None
+    if request is not None and (job is None or job.state == DONE):
+        report_type, start_date, end_date, lines = request
+        # The report is scanned once per request and backfill, not on every rerun of the page
+        key = (request, job.id if job else None)
+        cached = st.session_state.get("analytics_report")
+        if cached is not None and cached[0] == key:
+            _, report, elapsed = cached
+        else:
+            first_day = int(day_number(start_date))
+            last_day = min(int(day_number(end_date)), int(day_number(datetime.now().date())) - 1)
+            t0 = time.perf_counter()
+            report = performance_report(analytics, first_day, last_day, lines=lines)
+            elapsed = time.perf_counter() - t0
+            st.session_state.analytics_report = (key, report, elapsed)
+
+        if not report["movements"]:
+            st.warning("No operated service days in the selected range; the history ends yesterday.")
+            report = None
+
+    if report is not None:
+        st.success(f"Report generated from {report['movements']:,} train movements on "
+                   f"{np.count_nonzero(report['daily_movements'])} service days in {elapsed:.2f} s")
+
+        st.markdown(f"## {report_type} - {start_date} to {end_date}")
+        if lines:
+            st.caption("Lines: " + ", ".join(lines))
+
+        # KPI Overview
+        st.markdown("### Key Performance Indicators")
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric("Overall Performance", f"{report['on_time']:.1f}%")
+        with col2:
+            st.metric("Train Arrivals", f"{report['movements']:,}")
+        with col3:
+            st.metric("Average Delay", f"{report['mean_delay']:.1f} min")
+        with col4:
+            st.metric("Severe Delays", f"{report['severe']:,}")
+
+        # Charts
+        col1, col2 = st.columns(2)
+
+        with col1:
+            # Performance trend
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=report["days"], y=report["daily_on_time"], mode='lines', name='Performance'))
+            fig.update_layout(title="Daily Performance Trend", xaxis_title="Date", yaxis_title="Performance %")
+            st.plotly_chart(fig, use_container_width=True)
+
+        with col2:
+            # Category breakdown
+            fig = go.Figure(data=[go.Pie(labels=list(report["breakdown"]), values=list(report["breakdown"].values()))])
+            fig.update_layout(title="Service Performance Breakdown")
+            st.plotly_chart(fig, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            fig = go.Figure(data=[go.Bar(x=list(report["delay_buckets"]), y=list(report["delay_buckets"].values()))])
+            fig.update_layout(title="Arrival Delay Distribution", xaxis_title="Delay", yaxis_title="Arrivals")
+            st.plotly_chart(fig, use_container_width=True)
+
+        with col2:
+            fig = go.Figure(data=[go.Bar(x=list(report["line_on_time"]), y=list(report["line_on_time"].values()))])
+            fig.update_layout(title="Performance by Line", yaxis_title="Performance %")
+            st.plotly_chart(fig, use_container_width=True)
+
+        # Export options; files are written in background jobs, streamed day by day
+        st.markdown("### Export Options")
+        export_request = {"report_type": report_type, "start": start_date.isoformat(), "end": end_date.isoformat(),
+                          "lines": list(lines)}
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            if st.button("📄 Export PDF", use_container_width=True):
+                st.session_state.export_job = submit_export(export_request, "pdf").id
+        with col2:
+            if st.button("📊 Export Excel", use_container_width=True):
+                st.session_state.export_job = submit_export(export_request, "xlsx").id
+        with col3:
+            if st.button("🗒️ Export CSV", use_container_width=True):
+                st.session_state.export_job = submit_export(export_request, "csv").id
+        with col4.popover("📧 Email Report", use_container_width=True):
+            recipients = st.text_input("Recipients", placeholder="planner@example.org, ...", key="email_recipients")
+            email_format = st.selectbox("Format", list(EXPORT_FORMATS), key="email_format")
+            if st.button("Send", key="send_report", disabled=not recipients.strip()):
+                st.session_state.export_job = submit_export(export_request, EXPORT_FORMATS[email_format],
+                                                            recipients.replace(",", " ").split()).id
+        with col5.popover("📅 Schedule Reports", use_container_width=True):
+            frequency = st.selectbox("Frequency", list(FREQUENCIES), key="schedule_frequency")
+            schedule_format = st.selectbox("Format", list(EXPORT_FORMATS), key="schedule_format")
+            schedule_recipients = st.text_input("Recipients", placeholder="planner@example.org, ...",
+                                                key="schedule_recipients")
+            if st.button("Add Schedule", key="add_schedule", disabled=not schedule_recipients.strip()):
+                scheduler.add(report_type, frequency, EXPORT_FORMATS[schedule_format],
+                              schedule_recipients.replace(",", " ").split(), lines)
+
+        job = follow_job("export_job", "Report export")
+        if job is not None and job.state == DONE:
+            export = job.result()
+            path = Path(export["path"])
+            detail = f"{export['rows']:,} movements, " if export["rows"] else ""
+            size = export["bytes"]
+            detail += f"{size / 2**20:,.1f} MB" if size >= 2**20 else f"{size / 1024:.0f} KB"
+            if export["recipients"]:
+                st.success(f"Report mailed to {', '.join(export['recipients'])} ({path.name}, {detail})")
+            elif not path.exists():
+                st.warning(f"{path.name} has been removed from the reports folder.")
+            elif export["bytes"] > DOWNLOAD_LIMIT_BYTES:
+                st.info(f"{path.name} ({detail}) is too large to download here; "
+                        f"it was saved to {path}")
+            else:
+                st.download_button(f"⬇️ Download {path.name} ({detail})",
+                                   data=path.read_bytes(), file_name=path.name, mime=MIME_TYPES[path.suffix[1:]])
+
+    if scheduler.schedules:
+        st.markdown("### Scheduled Reports")
+        for schedule in list(scheduler.schedules):
+            col1, col2 = st.columns([5, 1])
+            lines_covered = ", ".join(schedule["lines"]) or "all lines"
+            col1.markdown(f"**{schedule['frequency']} {schedule['report_type']}** ({schedule['format'].upper()}, "
+                          f"{lines_covered}) to {', '.join(schedule['recipients'])} - next run "
+                          f"{datetime.fromisoformat(schedule['next_run']):%d %b %H:%M}")
+            if schedule.get("last_error"):
+                col1.caption(f"⚠️ Last attempt failed ({schedule['last_error']}); retrying "
+                             f"{datetime.fromisoformat(schedule['retry_at']):%d %b %H:%M}")
+            if col2.button("Remove", key=f"remove_schedule_{schedule['id']}"):
+                scheduler.remove(schedule["id"])
+                st.rerun()
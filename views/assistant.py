@@ -0,0 +1,97 @@
+"""AI Assistant: the chat, answered by the configured model with the planning engines as tools."""
+import streamlit as st
+
+from railway_ai.config import CONVERSATIONS_DIR, DOCUMENTS_DIR, SEARCH_INDEX
+from railway_ai.conversation import PAGE_MESSAGES, Conversation
+from railway_ai.data import current_network, current_timetable
+from railway_ai.ingest import load_search_index
+from railway_ai.llm import LLMError, chat_messages, get_client, tool_messages
+from railway_ai.tools import MAX_TOOL_ROUNDS, ToolCache, ToolContext, run_tool_calls, tool_schemas
+
+
+def show_tool_calls(calls):
+    """Collapsed list of the tools an assistant answer used, with their timings."""
+    with st.expander(f"🔧 Used {len(calls)} planning tools"):
+        for call in calls:
+            timing = "cached" if call["cached"] else f"{call['seconds']:.2f} s"
+            st.markdown(f"**{call['name']}** `{call['arguments']}` - {timing}")
+            st.json(call["result"], expanded=False)
+
+
+def render():
+    if 'conversation' not in st.session_state:
+        st.session_state.conversation = Conversation(CONVERSATIONS_DIR)
+        st.session_state.chat_window = PAGE_MESSAGES
+        # Tool results of this conversation, reused by follow-up questions
+        st.session_state.tool_cache = ToolCache()
+
+    st.markdown('<h1 class="main-header">AI Railway Planning Assistant</h1>', unsafe_allow_html=True)
+
+    # Example prompts
+    st.markdown("### Quick Prompts")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        if st.button("🚂 Optimize morning schedule", use_container_width=True):
+            st.session_state.conversation.append({"role": "user", "content": "Optimize the morning schedule for maximum efficiency"})
+
+    with col2:
+        if st.button("📊 Analyze last week's delays", use_container_width=True):
+            st.session_state.conversation.append({"role": "user", "content": "Analyze all delays from last week and identify patterns"})
+
+    with col3:
+        if st.button("🔧 Maintenance planning", use_container_width=True):
+            st.session_state.conversation.append({"role": "user", "content": "Plan next month's maintenance possessions with the least traffic impact"})
+
+    # Chat interface
+    st.markdown("### Chat with AI Assistant")
+
+    # Display the latest chat messages; older ones stay on disk until asked for
+    conversation = st.session_state.conversation
+    hidden = len(conversation) - st.session_state.chat_window
+    if hidden > 0:
+        st.button(f"⬆️ Load earlier messages ({hidden:,} more)", key="load_earlier",
+                  on_click=lambda: st.session_state.update(chat_window=st.session_state.chat_window + PAGE_MESSAGES))
+    for message in conversation.window(min(st.session_state.chat_window, len(conversation))):
+        with st.chat_message(message["role"]):
+            if message.get("tools"):
+                show_tool_calls(message["tools"])
+            st.write(message["content"])
+
+    # Chat input
+    if prompt := st.chat_input("Ask anything about railway operations..."):
+        conversation.append({"role": "user", "content": prompt})
+
+        with st.chat_message("user"):
+            st.write(prompt)
+
+    # Answer the last prompt (typed or quick), streaming the reply as it is generated
+    if conversation.last and conversation.last["role"] == "user":
+        with st.chat_message("assistant"):
+            client = get_client(st.session_state.ai_model)
+            context = ToolContext(current_timetable, current_network(),
+                                  lambda: load_search_index(DOCUMENTS_DIR, SEARCH_INDEX))
+            # A token-budgeted summary of older turns plus the recent ones
+            summary, recent = conversation.context()
+            messages = chat_messages(recent, summary)
+            response, calls = "", []
+            try:
+                # The model may call tools for a few rounds; each round's calls run concurrently
+                for round_number in range(MAX_TOOL_ROUNDS + 1):
+                    reply = client.stream(messages, temperature=st.session_state.ai_temperature,
+                                          tools=tool_schemas() if round_number < MAX_TOOL_ROUNDS else None)
+                    text = st.write_stream(reply)
+                    response += text if isinstance(text, str) else ""
+                    if not reply.tool_calls:
+                        break
+                    with st.status(f"Running {', '.join(c['name'] for c in reply.tool_calls)}...") as status:
+                        records = run_tool_calls(reply.tool_calls, context, st.session_state.tool_cache)
+                        status.update(label=f"Ran {len(records)} tools", state="complete")
+                    calls += records
+                    messages += tool_messages(records)
+                    response += "\n\n"
+            except LLMError as exc:
+                response = None
+                st.error(f"{st.session_state.ai_model} is unavailable: {exc}")
+        if response:
+            conversation.append({"role": "assistant", "content": response.strip(), "tools": calls})
@@ -0,0 +1,73 @@
+"""Helpers shared by several views: background job progress, the timetable sync and the maintenance plan."""
+import time
+from datetime import timedelta
+
+import streamlit as st
+
+from railway_ai.config import GTFS_FEED, MAINTENANCE_PLANS, TIMETABLE_CACHE
+from railway_ai.data import feed_version, invalidate, maintenance_plan
+from railway_ai.gtfs_import import sync_feed
+from railway_ai.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, get_runner
+from railway_ai.possessions import plan_path, save_plan
+
+
+def sync_timetables():
+    """Apply the latest national timetable feed to the local columnar cache."""
+    if not GTFS_FEED.exists():
+        st.warning(f"No timetable feed found at {GTFS_FEED}")
+        return
+    with st.spinner("Synchronizing timetables..."):
+        report = sync_feed(GTFS_FEED, TIMETABLE_CACHE)
+    invalidate("National Timetable Database")
+    st.success(
+        f"Timetables synchronized! {len(report['rebuilt'])} files re-imported, "
+        f"{len(report['appended'])} appended, {len(report['unchanged'])} unchanged "
+        f"({report['rows']:,} stop events parsed)."
+    )
+
+
+def follow_job(state_key, label):
+    """Show the background job stored under ``state_key`` with live progress and a Cancel button.
+
+    Blocks (polling) while the job runs; the job itself lives in a worker
+    process, so leaving the page does not stop it. Returns the job, or
+    ``None`` if none was submitted.
+    """
+    job_id = st.session_state.get(state_key)
+    job = get_runner().get(job_id) if job_id else None
+    if job is None:
+        return None
+    if job.poll() in (QUEUED, RUNNING):
+        col1, col2 = st.columns([5, 1])
+        progress_bar = col1.progress(job.progress, text=job.message or f"{label} queued...")
+        if col2.button("✖ Cancel", key=f"cancel_{state_key}"):
+            job.cancel()
+        while not job.finished:
+            progress_bar.progress(job.progress, text=job.message or f"{label}...")
+            time.sleep(0.25)
+        st.rerun()
+    if job.state == FAILED:
+        st.error(f"{label} failed: {job.error.strip().splitlines()[-1]}")
+    elif job.state == CANCELLED:
+        st.warning(f"{label} cancelled.")
+    return job
+
+
+def current_maintenance_plan(today):
+    """This month's possession plan, or ``None`` while a background job plans it."""
+    plan = maintenance_plan(today)
+    if plan is None:
+        # The task module brings every engine with it; it is loaded only when a month has no plan yet
+        from railway_ai.tasks import plan_maintenance
+
+        # Submissions share one job until the feed or last month's plan (the warm start) change
+        month = today.replace(day=1)
+        previous = plan_path(month - timedelta(days=1))
+        job = get_runner().submit(plan_maintenance, str(TIMETABLE_CACHE), str(MAINTENANCE_PLANS), month.isoformat(),
+                                  params={"month": month.isoformat(), "feed": feed_version(),
+                                          "previous": previous.stat().st_mtime_ns if previous.exists() else None})
+        if job.poll() == DONE:
+            # Same inputs, same plan: a memoized run restores a plan file that has been removed
+            plan = job.result()
+            save_plan(plan)
+    return plan
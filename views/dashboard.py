@@ -0,0 +1,160 @@
+"""Dashboard: live operations KPIs, the movement chart and the network state."""
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from railway_ai.data import current_network, current_timetable, feed_version
+from railway_ai.network import link_traffic, suggest_reroute
+from railway_ai.rollups import DIRECTIONS, operations_rollup
+from railway_ai.timetable import day_number, format_minutes
+from views.common import current_maintenance_plan
+
+# Dashboard movement chart resolutions: rollup resolution and number of buckets shown
+DASHBOARD_SERIES = {"Last 2 Hours": ("minute", 120), "Last 24 Hours": ("hour", 24), "Last 30 Days": ("day", 30)}
+
+
+def render():
+    st.markdown('<h1 class="main-header">Railway Operations Dashboard</h1>', unsafe_allow_html=True)
+
+    # Key metrics, read from the incrementally maintained rollups
+    network = current_network()
+    now = datetime.now()
+    now_minute = int(day_number(now.date())) * 1440 + now.hour * 60 + now.minute
+    rollup = operations_rollup(network, feed_version())
+    rollup.advance(now_minute, current_timetable)
+    kpis = rollup.kpis(now_minute)
+
+    def change(value, previous, unit=""):
+        return f"{value - previous:+.1f}{unit}" if np.isfinite(value) and np.isfinite(previous) else None
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric(
+            label="Active Trains",
+            value=f"{kpis['active_trains']:.0f}" if np.isfinite(kpis["active_trains"]) else "–",
+            delta=f"{kpis['active_trains'] - kpis['active_trains_yesterday']:+.0f} from yesterday"
+            if np.isfinite(kpis["active_trains"] - kpis["active_trains_yesterday"]) else None,
+            delta_color="normal"
+        )
+
+    with col2:
+        st.metric(
+            label="On-Time Performance",
+            value=f"{kpis['on_time']:.1f}%" if np.isfinite(kpis["on_time"]) else "–",
+            delta=change(kpis["on_time"], kpis["on_time_previous"], "%"),
+            delta_color="normal"
+        )
+
+    with col3:
+        st.metric(
+            label="Network Utilization",
+            value=f"{kpis['utilization']:.1f}%",
+            delta=change(kpis["utilization"], kpis["utilization_yesterday"], "%"),
+            delta_color="inverse"
+        )
+
+    with col4:
+        st.metric(
+            label="Active Disruptions",
+            value=f"{kpis['disruptions']:.0f}",
+            delta=f"{kpis['disruptions'] - kpis['disruptions_previous']:+.0f}",
+            delta_color="inverse"
+        )
+
+    # Train movements by direction at the chosen resolution
+    st.markdown("### Real-Time Train Movements")
+    resolution = st.radio("Resolution", list(DASHBOARD_SERIES), index=1, horizontal=True,
+                          label_visibility="collapsed")
+    bucket_name, n_buckets = DASHBOARD_SERIES[resolution]
+    starts, counts = rollup.rollups.series(bucket_name, "movements", now_minute, n_buckets)
+    times = pd.to_datetime(starts * 60, unit="s")
+
+    fig = go.Figure()
+    for i, direction in enumerate(DIRECTIONS):
+        fig.add_trace(go.Scatter(
+            x=times,
+            y=counts[:, i],
+            mode='lines+markers',
+            name=direction,
+            line=dict(width=3)
+        ))
+
+    fig.update_layout(
+        title="Train Movements by Direction",
+        xaxis_title="Time",
+        yaxis_title=f"Arrivals per {bucket_name}",
+        hovermode='x unified',
+        height=400
+    )
+
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Current issues and AI recommendations
+    col1, col2 = st.columns([1, 1])
+
+    # The busiest section of today's timetable is the one under maintenance
+    today = current_timetable(datetime.now().date())
+    traffic = link_traffic(network, today)
+    closed_link = int(traffic.argmax()) if len(traffic) else None
+    closed_section = (f"{network.names[network.link_from[closed_link]]} – "
+                      f"{network.names[network.link_to[closed_link]]}" if closed_link is not None else "Track 3-4")
+
+    with col1:
+        st.markdown("### ⚠️ Current Issues")
+        issues = [
+            {"type": "Delay", "location": "Central Station", "impact": "High", "trains": 5},
+            {"type": "Maintenance", "location": closed_section, "impact": "Medium",
+             "trains": int(traffic[closed_link]) if closed_link is not None else 2},
+            {"type": "Weather", "location": "Northern Line", "impact": "Low", "trains": 1}
+        ]
+
+        for issue in issues:
+            if issue["impact"] == "High":
+                st.error(f"**{issue['type']}** at {issue['location']} - Affecting {issue['trains']} trains")
+            elif issue["impact"] == "Medium":
+                st.warning(f"**{issue['type']}** at {issue['location']} - Affecting {issue['trains']} trains")
+            else:
+                st.info(f"**{issue['type']}** at {issue['location']} - Affecting {issue['trains']} trains")
+
+    with col2:
+        st.markdown("### 🤖 AI Recommendations")
+        now = datetime.now()
+        plan = suggest_reroute(network, today, closed_link, after_minute=now.hour * 60 + now.minute) \
+            if closed_link is not None else None
+        if plan is None:
+            reroute = f"**No trains affected** by the {closed_section} closure"
+        elif plan["alternatives"]:
+            best = plan["alternatives"][0]
+            via = ", ".join(best["names"][1:-1]) or "the parallel track"
+            reroute = (f"**Reroute Train {plan['train']}** ({format_minutes(plan['departure'])} from "
+                       f"{plan['source']}) via {via} to avoid the {closed_section} closure "
+                       f"(+{best['extra_minutes']:.0f} min)")
+        else:
+            reroute = (f"**Hold Train {plan['train']}** at {plan['source']} - no route around the "
+                       f"{closed_section} closure")
+        plan = current_maintenance_plan(now.date())
+        ahead = [p for p in plan["possessions"] if f"{p['day']} {p['start']}" >= f"{now:%Y-%m-%d %H}:00"] \
+            if plan else []
+        if ahead:
+            possession = ahead[0]
+            maintenance = (f"**Preventive Maintenance**: {possession['type'].lower()} of {possession['section']} "
+                           f"on {date.fromisoformat(possession['day']):%d %b}, {possession['start']}-"
+                           f"{possession['end']} ({possession['trains']} trains affected); {len(ahead)} "
+                           f"possessions left this month affect {sum(p['trains'] for p in ahead):,} trains")
+        elif plan:
+            maintenance = f"**Preventive Maintenance**: no possessions left in the {now:%B} plan"
+        else:
+            maintenance = f"**Preventive Maintenance**: the {now:%B} possession plan is being prepared"
+        st.markdown('<div class="ai-response">', unsafe_allow_html=True)
+        st.markdown(f"""
+        **Optimization Opportunities Detected:**
+
+        1. {reroute}
+        2. **Adjust Schedule** for Northern Line - 5 min intervals recommended
+        3. {maintenance}
+        """)
+        st.markdown('</div>', unsafe_allow_html=True)
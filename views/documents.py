@@ -0,0 +1,74 @@
+"""Document Intelligence: search over regulations, standards and manuals."""
+import time
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from railway_ai.config import DOCUMENTS_DIR, SEARCH_INDEX
+from railway_ai.documents import DOC_TYPES
+from railway_ai.ingest import load_search_index
+from railway_ai.search import DATE_RANGE_DAYS, query_cache
+
+
+def render():
+    st.markdown('<h1 class="main-header">Document Intelligence & RAG System</h1>', unsafe_allow_html=True)
+
+    # Document search interface
+    st.markdown("### 🔍 Intelligent Document Search")
+
+    search_query = st.text_input("Search regulations, standards, and operational documents", placeholder="e.g., safety protocols for level crossings")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        doc_type = st.multiselect("Document Type", DOC_TYPES, format_func=lambda t: f"{t}s")
+    with col2:
+        date_range = st.select_slider("Date Range", list(DATE_RANGE_DAYS), value="All Time")
+    with col3:
+        relevance = st.slider("Relevance Threshold", 0.0, 1.0, 0.7)
+
+    if st.button("Search Documents", type="primary") or search_query:
+        with st.spinner("Searching through knowledge base..."):
+            index = load_search_index(DOCUMENTS_DIR, SEARCH_INDEX)
+            days = DATE_RANGE_DAYS[date_range]
+            since = datetime.now().date() - timedelta(days=days) if days is not None else None
+            t0 = time.perf_counter()
+            # Reruns (slider moves, result buttons) re-rank the cached retrieval
+            candidates, cached = query_cache.candidates(index, search_query, doc_types=doc_type, since=since)
+            results = index.rank(candidates, threshold=relevance)
+            elapsed = (time.perf_counter() - t0) * 1000
+
+        st.markdown("### Search Results")
+        st.caption(f"{len(results)} documents from {len(index):,} indexed passages in {elapsed:.1f} ms"
+                   + (" (cached)" if cached else ""))
+        if not results:
+            st.info("No documents match the query and filters above the relevance threshold.")
+        for result in results:
+            with st.expander(f"{result['title']} (Relevance: {result['relevance']:.0%})"):
+                st.markdown(f"**Type:** {result['doc_type']} | **Date:** {result['date']}")
+                st.markdown(f"_{result['excerpt']}_")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.button("View Full Document", key=f"view_{result['doc']}")
+                with col2:
+                    st.button("Add to Workspace", key=f"add_{result['doc']}")
+                with col3:
+                    st.button("Generate Summary", key=f"summary_{result['doc']}")
+
+    # Knowledge base stats
+    st.markdown("### 📚 Knowledge Base Statistics")
+    col1, col2, col3, col4 = st.columns(4)
+
+    index = load_search_index(DOCUMENTS_DIR, SEARCH_INDEX)
+    counts = index.document_counts(datetime.now().date() - timedelta(days=30))
+    synced = datetime.fromisoformat(index.manifest["synced"])
+
+    with col1:
+        st.metric("Total Documents", f"{index.n_documents:,}",
+                  f"{sum(c['added'] for c in counts.values()):,} added this month")
+    with col2:
+        st.metric("Regulations", f"{counts['Regulation']['documents']:,}",
+                  f"{counts['Regulation']['updated']:,} updated")
+    with col3:
+        st.metric("Standards", f"{counts['Standard']['documents']:,}", f"{counts['Standard']['added']:,} new")
+    with col4:
+        st.metric("Last Sync", synced.strftime("%d %b %H:%M"), "✓")
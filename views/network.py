@@ -0,0 +1,172 @@
+"""Network Visualization: the network map with live trains and link traffic."""
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from railway_ai.data import current_network, current_timetable
+from railway_ai.delays import live_predictor
+from railway_ai.live import live_trains
+from railway_ai.mapview import network_map
+from railway_ai.timetable import format_minutes
+from views.common import current_maintenance_plan
+
+# Seconds between live-train refreshes on the Network Visualization page
+LIVE_REFRESH_SECONDS = 5
+# Trains listed under Predicted Delays, most delayed first
+PREDICTED_DELAYS_SHOWN = 10
+
+
+def live_network_map(network, fig, stats, tracker, center, zoom, predictor=None):
+    """Network map whose live-train layers refresh on a timer, without rerunning the page.
+
+    ``fig`` is the cached static layer; only its train traces are updated.
+    With a delay ``predictor``, every running train is scored at each
+    refresh and the predicted delay at its next stop joins its label.
+    """
+    t0 = time.perf_counter()
+    now = datetime.now()
+    minute = now.hour * 60 + now.minute + now.second / 60
+    positions = tracker.update(minute) if tracker else None
+    forecast = predictor.update(minute) if predictor is not None and positions is not None else None
+    if forecast is not None:
+        expected = np.full(len(predictor.timetable.trains), np.nan)
+        expected[forecast["code"]] = forecast["predicted"]
+        positions = dict(positions, train=np.array([
+            name if np.isnan(delay) else f"{name} (next stop {delay:+.0f} min)"
+            for name, delay in zip(positions["train"], expected[positions["code"]])
+        ], dtype=object))
+    trains = network_map(network).update_trains(fig, positions, center, zoom, tracker=tracker)
+    st.plotly_chart(fig, use_container_width=True, key="network_map")
+    detail = "clustered stations" if stats["clustered"] else "stations"
+    hidden = f" ({trains['hidden_trains']:,} more hidden at this zoom)" if trains["hidden_trains"] else ""
+    live = f" - {trains['trains']:,} live trains{hidden} updated in {(time.perf_counter() - t0) * 1000:.0f} ms" \
+        if tracker else ""
+    st.caption(f"{stats['track_points']:,} track points, {stats['stations']:,} {detail} "
+               f"({stats['kb']:,.0f} KB, built in {stats['ms']:.0f} ms){live}")
+
+    if forecast is not None:
+        st.markdown("### ⏱️ Predicted Delays")
+        worst = np.argsort(-forecast["predicted"], kind="stable")[:PREDICTED_DELAYS_SHOWN]
+        st.dataframe(pd.DataFrame({
+            "Train": forecast["train"][worst],
+            "Next Stop": forecast["next_station"][worst],
+            "Due": format_minutes(forecast["scheduled"][worst]),
+            "Delay Now (min)": np.round(forecast["delay"][worst], 1),
+            "Predicted (min)": np.round(forecast["predicted"][worst], 1),
+        }), use_container_width=True, hide_index=True)
+        st.caption(f"{len(forecast['predicted']):,} running trains scored in {forecast['ms']:.1f} ms; "
+                   f"the model learned from {forecast['learned']:,} arrivals since the last refresh")
+
+
+def render():
+    st.markdown('<h1 class="main-header">Railway Network Visualization</h1>', unsafe_allow_html=True)
+
+    # Network view controls
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        view_type = st.selectbox("View Type", ["Geographic", "Schematic", "3D View"])
+
+    with col2:
+        show_trains = st.checkbox("Show Live Trains", value=True)
+
+    with col3:
+        show_disruptions = st.checkbox("Show Disruptions", value=True)
+
+    with col4:
+        if st.button("🔄 Refresh", type="primary"):
+            st.session_state.pop("network_map_key", None)
+            st.success("Network data refreshed!")
+
+    network = current_network()
+
+    # Reroute planner: alternatives between two stations around closed sections
+    st.markdown("### 🔀 Reroute Planner")
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        route_from = st.selectbox("From", network.names, index=0)
+    with col2:
+        route_to = st.selectbox("To", network.names, index=min(1, len(network) - 1))
+    with col3:
+        n_routes = st.number_input("Alternatives", 1, 5, 3)
+
+    normal = network.shortest_path(route_from, route_to)
+    alternatives = []
+    if normal is None:
+        st.warning(f"No route between {route_from} and {route_to}.")
+    else:
+        sections = [f"{a} – {b}" for a, b in zip(normal["names"][:-1], normal["names"][1:])]
+        closed = st.multiselect("Closed sections on the normal route", sections)
+        closed_links = [normal["links"][sections.index(label)] for label in closed]
+        t0 = time.perf_counter()
+        alternatives = network.reroute(route_from, route_to, closed_links, k=int(n_routes))["alternatives"]
+        elapsed = (time.perf_counter() - t0) * 1000
+        if alternatives:
+            st.dataframe(pd.DataFrame({
+                "Route": [" → ".join(route["names"]) for route in alternatives],
+                "Minutes": [route["minutes"] for route in alternatives],
+                "Extra (min)": [route["extra_minutes"] for route in alternatives],
+                "Distance (km)": [round(route["km"], 1) for route in alternatives],
+            }), use_container_width=True)
+        else:
+            st.error("No detour available - the closures disconnect these stations.")
+        st.caption(f"Searched {len(network):,} stations in {elapsed:.1f} ms")
+
+    # Create network visualization
+    st.markdown("### Railway Network Map")
+
+    # Default to the busiest junction with known coordinates
+    located = np.flatnonzero(np.isfinite(network.lat) & np.isfinite(network.lon))
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        focus = st.selectbox("Centre Map On", [network.names[v] for v in located] or ["New York"],
+                             index=int(np.argmax(network.degree[located])) if len(located) else 0)
+    with col2:
+        zoom = st.slider("Zoom", 3, 15, 10)
+    node = network.node(focus) if len(located) else None
+    center = (float(network.lat[node]), float(network.lon[node])) if node is not None else (40.7128, -74.0060)
+
+    # The static layer is rebuilt only when the view changes; the fragment refreshes the trains
+    highlight = alternatives[0]["nodes"] if alternatives else None
+    view_key = (id(network), focus, zoom, tuple(highlight or ()))
+    if st.session_state.get("network_map_key") != view_key:
+        t0 = time.perf_counter()
+        fig, stats = network_map(network).static_figure(center, zoom, highlight=highlight)
+        stats["kb"] = len(fig.to_json()) / 1024
+        stats["ms"] = (time.perf_counter() - t0) * 1000
+        st.session_state.network_map = (fig, stats)
+        st.session_state.network_map_key = view_key
+    fig, stats = st.session_state.network_map
+
+    service_date = datetime.now().date()
+    today = current_timetable(service_date)
+    tracker = live_trains(network, today) if show_trains else None
+    refresh = LIVE_REFRESH_SECONDS if show_trains else None
+    predictor = live_predictor(today, service_date) if show_trains and st.session_state.delay_predictions else None
+    st.fragment(live_network_map, run_every=refresh)(network, fig, stats, tracker, center, zoom, predictor)
+
+    # Network statistics
+    st.markdown("### Network Statistics")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Total Track Length", f"{network.track_km:,.0f} km")
+        st.metric("Stations", f"{len(network):,}")
+
+    with col2:
+        st.metric("Daily Passengers", "1.2M")
+        st.metric("Active Signals", "3,421")
+
+    with col3:
+        st.metric("Network Health", "96.7%")
+        plan = current_maintenance_plan(service_date)
+        if plan:
+            # Sections with a possession still ahead this month
+            due = {p["section"] for p in plan["possessions"] if p["day"] >= service_date.isoformat()}
+            st.metric("Maintenance Due", f"{len(due)} sections",
+                      help=f"{len(plan['deferred'])} work orders deferred to next month" if plan["deferred"] else None)
+        else:
+            st.metric("Maintenance Due", "Planning...")
@@ -0,0 +1,157 @@
+"""Settings: general, AI, data source and user settings."""
+from datetime import date, datetime
+
+import streamlit as st
+
+import views
+from railway_ai.config import (
+    ANALYTICS_STORE, DELAY_MODEL, DOCUMENTS_DIR, LLM_BACKENDS, SEARCH_INDEX, TIMETABLE_CACHE,
+)
+from railway_ai.data import data_cache, invalidate, user_table
+from railway_ai.delays import HOLDOUT_DAYS, TRAIN_DAYS, delay_model
+from railway_ai.ingest import load_search_index, pending_changes
+from railway_ai.jobs import DONE, QUEUED, RUNNING, get_runner
+from views.common import follow_job, sync_timetables
+
+# Choices of the "Primary AI Model" setting
+AI_MODELS = list(LLM_BACKENDS)
+
+
+def render():
+    st.markdown('<h1 class="main-header">System Settings</h1>', unsafe_allow_html=True)
+
+    # Settings tabs
+    tab1, tab2, tab3, tab4 = st.tabs(["General", "AI Configuration", "Data Sources", "User Management"])
+
+    with tab1:
+        st.markdown("### General Settings")
+        st.text_input("Organization Name", value="National Railway Corporation")
+        st.selectbox("Language", ["English", "German", "French", "Spanish"])
+        st.selectbox("Time Zone", ["UTC", "CET", "EST", "PST"])
+        st.selectbox("Units", ["Metric", "Imperial"])
+
+        st.markdown("### Notification Preferences")
+        st.checkbox("Email Notifications", value=True)
+        st.checkbox("SMS Alerts for Critical Events", value=True)
+        st.checkbox("Daily Summary Reports", value=True)
+
+        st.markdown("### View Performance")
+        st.caption("First import of each page in this server process and its render times, against their budgets")
+        st.dataframe(views.timings(), use_container_width=True, hide_index=True)
+
+    with tab2:
+        st.markdown("### AI Model Configuration")
+        st.session_state.ai_model = st.selectbox("Primary AI Model", AI_MODELS,
+                                                 index=AI_MODELS.index(st.session_state.ai_model))
+        st.session_state.ai_temperature = st.slider("Response Creativity", 0.0, 1.0,
+                                                    st.session_state.ai_temperature)
+        st.slider("Safety Threshold", 0.0, 1.0, 0.95)
+
+        st.markdown("### AI Features")
+        st.checkbox("Automatic Schedule Optimization", value=True)
+        st.checkbox("Predictive Maintenance Alerts", value=True)
+        st.session_state.delay_predictions = st.checkbox("Real-time Delay Predictions",
+                                                         value=st.session_state.delay_predictions)
+        st.checkbox("Energy Optimization", value=True)
+
+        model = delay_model()
+        if model.evaluation:
+            status = (f"Delay model: {model.observations:,} movements over {len(model.sections):,} sections; "
+                      f"held-out error {model.evaluation['mae']:.2f} min against "
+                      f"{model.evaluation['baseline_mae']:.2f} min if delays persisted")
+        else:
+            status = "Delay model: not trained yet; it assumes delays persist and learns from live arrivals"
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.caption(status)
+        with col2:
+            if st.button("Retrain Delay Model", use_container_width=True):
+                from railway_ai.tasks import train_delay_model
+
+                # Trains on the days up to yesterday, so one run a day is enough
+                job = get_runner().submit(train_delay_model, str(ANALYTICS_STORE), str(TIMETABLE_CACHE),
+                                          str(DELAY_MODEL), TRAIN_DAYS, HOLDOUT_DAYS,
+                                          params={"through": str(date.today()), "days": TRAIN_DAYS,
+                                                  "holdout": HOLDOUT_DAYS})
+                st.session_state.delay_model_job = job.id
+        job = follow_job("delay_model_job", "Delay model training")
+        if job is not None and job.state == DONE:
+            result = job.result()
+            st.success(f"Delay model trained on {result['observations']:,} movements: held-out error "
+                       f"{result['mae']:.2f} min against {result['baseline_mae']:.2f} min if delays persisted.")
+
+    with tab3:
+        st.markdown("### Connected Data Sources")
+
+        index = load_search_index(DOCUMENTS_DIR, SEARCH_INDEX)
+        ingest_id = st.session_state.get("ingest_job")
+        ingest = get_runner().get(ingest_id) if ingest_id else None
+        if ingest is not None and ingest.poll() in (QUEUED, RUNNING):
+            regulatory = {"name": "Regulatory Database", "status": "Syncing", "last_sync": "In progress"}
+        else:
+            regulatory = {"name": "Regulatory Database", "status": "Connected",
+                          "last_sync": datetime.fromisoformat(index.manifest["synced"]).strftime("%d %b %H:%M")}
+
+        data_sources = [
+            {"name": "National Timetable Database", "status": "Connected", "last_sync": "2 min ago"},
+            {"name": "Network Infrastructure DB", "status": "Connected", "last_sync": "5 min ago"},
+            {"name": "Weather API", "status": "Connected", "last_sync": "Real-time"},
+            {"name": "Maintenance Records", "status": "Connected", "last_sync": "1 hour ago"},
+            regulatory
+        ]
+
+        for source in data_sources:
+            col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+            with col1:
+                st.text(source["name"])
+            with col2:
+                if source["status"] == "Connected":
+                    st.success(source["status"])
+                else:
+                    st.warning(source["status"])
+            with col3:
+                st.text(source["last_sync"])
+            with col4:
+                if st.button("Sync", key=f"sync_{source['name']}"):
+                    invalidate(source["name"])
+                    if source["name"] == "National Timetable Database":
+                        sync_timetables()
+                    elif source["name"] == "Regulatory Database":
+                        # The task module brings every engine with it; Settings loads it only to sync
+                        from railway_ai.tasks import sync_knowledge_base
+
+                        # The pending count and generation key the job, so an unchanged corpus is not re-scanned
+                        params = {"generation": index.generation, "pending": pending_changes(DOCUMENTS_DIR, SEARCH_INDEX)}
+                        job = get_runner().submit(sync_knowledge_base, str(DOCUMENTS_DIR), str(SEARCH_INDEX),
+                                                  params=params)
+                        st.session_state.ingest_job = job.id
+
+        cache = data_cache.stats()
+        lookups = cache["hits"] + cache["misses"]
+        st.caption(f"Shared data cache: {cache['entries']} entries, {cache['bytes'] / 2**20:,.1f} of "
+                   f"{cache['max_bytes'] / 2**20:,.0f} MB, {cache['hits'] / max(lookups, 1):.0%} hit rate, "
+                   f"{cache['evictions']} evictions")
+
+        job = follow_job("ingest_job", "Knowledge base sync")
+        if job is not None and job.state == DONE:
+            report = job.result()
+            st.success(f"Knowledge base synchronized: {report['added']:,} documents added, {report['changed']:,} "
+                       f"changed and {report['removed']:,} removed; {report['chunks_indexed']:,} passages "
+                       f"indexed, {report['chunks_reused']:,} reused in {report['seconds']:.1f} s")
+
+    with tab4:
+        st.markdown("### User Management")
+        st.text_input("Search Users", placeholder="Enter name or email")
+
+        # User table
+        users = user_table()
+
+        st.dataframe(users, use_container_width=True)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.button("➕ Add User", use_container_width=True)
+        with col2:
+            st.button("✏️ Edit Permissions", use_container_width=True)
+        with col3:
+            st.button("📊 Usage Report", use_container_width=True)
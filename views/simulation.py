@@ -0,0 +1,164 @@
+"""Simulation & Optimization: baseline and what-if scenario runs in background jobs."""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from railway_ai.data import current_timetable
+from railway_ai.jobs import DONE, get_runner
+from railway_ai.tasks import simulate_scenario
+from views.common import follow_job
+
+# Extra running time supplement evaluated as the "Optimized" simulation scenario
+RECOVERY_MARGIN = 0.05
+
+
+def render():
+    st.markdown('<h1 class="main-header">Simulation & Optimization Engine</h1>', unsafe_allow_html=True)
+
+    # Simulation controls
+    st.markdown("### 🎮 Simulation Parameters")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        simulation_type = st.selectbox(
+            "Simulation Type",
+            ["Traffic Flow", "Disruption Recovery", "Capacity Planning", "Energy Optimization"]
+        )
+
+    with col2:
+        time_horizon = st.selectbox(
+            "Time Horizon",
+            ["1 Hour", "6 Hours", "1 Day", "1 Week", "1 Month"]
+        )
+
+    with col3:
+        confidence_level = st.slider("Confidence Level", 80, 99, 95)
+
+    # Advanced settings
+    with st.expander("Advanced Settings"):
+        col1, col2 = st.columns(2)
+        with col1:
+            iterations = st.number_input("Monte Carlo Iterations", 100, 10000, 1000)
+            algorithm = st.selectbox("Algorithm", ["Genetic Algorithm", "Simulated Annealing", "Particle Swarm"])
+        with col2:
+            random_seed = st.number_input("Random Seed", 0, 9999, 42)
+            include_weather = st.checkbox("Include Weather Patterns", value=True)
+
+    # Run simulation button
+    if st.button("🚀 Run Simulation", type="primary", use_container_width=True):
+        # Everything that changes the result is part of the memo key
+        timetable = current_timetable(datetime.now().date())
+        params = {"simulation_type": simulation_type, "horizon": time_horizon, "confidence": confidence_level,
+                  "iterations": int(iterations), "algorithm": algorithm, "seed": int(random_seed),
+                  "weather": include_weather, "recovery_margin": RECOVERY_MARGIN}
+        job = get_runner().submit(simulate_scenario, timetable, params, params=params, timetable=timetable)
+        st.session_state.simulation_job = job.id
+        st.session_state.simulation_params = params
+
+    job = follow_job("simulation_job", "Simulation")
+    if job is not None and job.state == DONE:
+        params = st.session_state.simulation_params
+        confidence = params["confidence"]
+        outcome = job.result()
+        baseline, optimized = outcome["baseline"], outcome["optimized"]
+        if job.cached:
+            st.caption("Loaded from the result cache - identical scenario already simulated.")
+
+        st.markdown("### 📊 Simulation Results")
+        if outcome["engine"] == "microsim":
+            st.caption(f"{baseline['events'] + optimized['events']:,} events simulated "
+                       f"in {baseline['wall_seconds'] + optimized['wall_seconds']:.1f}s")
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                fig = go.Figure()
+                for name, result, color in [("Baseline", baseline, "red"), ("Optimized", optimized, "green")]:
+                    fig.add_trace(go.Scatter(x=result["hours"], y=result["on_time"], name=name,
+                                             line=dict(color=color, width=2)))
+                fig.update_layout(
+                    title="Network Performance Comparison",
+                    xaxis_title="Time (hours)",
+                    yaxis_title="On-Time Arrivals (%)",
+                    hovermode='x unified'
+                )
+                st.plotly_chart(fig, use_container_width=True)
+
+                st.markdown("#### Busiest Sections")
+                sections = pd.DataFrame({
+                    "Baseline": baseline["section_utilization"],
+                    "Optimized": optimized["section_utilization"],
+                }).sort_values("Baseline", ascending=False).head(10)
+                st.dataframe((sections * 100).round(1).rename(columns=lambda c: f"{c} Occupancy (%)"),
+                             use_container_width=True)
+
+            with col2:
+                st.markdown("### Key Findings")
+                gain = optimized["overall_on_time"] - baseline["overall_on_time"]
+                st.metric("Performance Gain", f"{gain:+.1f} pts", "on-time arrivals")
+                st.metric("Expected On-Time", f"{optimized['overall_on_time']:.1f}%",
+                          f"{optimized['trains']:,} trains simulated")
+                st.metric("Delay Minutes", f"{optimized['delay_minutes']:,.0f}",
+                          f"{optimized['delay_minutes'] - baseline['delay_minutes']:+,.0f} vs baseline",
+                          delta_color="inverse")
+                if baseline["overflows"]:
+                    st.warning(f"{baseline['overflows']:,} trains found no free platform and were held "
+                               "on overflow tracks")
+        else:
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                # On-time performance bands at the chosen confidence level
+                fig = go.Figure()
+                for name, result, color in [("Baseline", baseline, "red"), ("Optimized", optimized, "green")]:
+                    band = result["on_time"]
+                    x = result["hours"]
+                    fig.add_trace(go.Scatter(
+                        x=np.concatenate([x, x[::-1]]),
+                        y=np.concatenate([band["upper"], band["lower"][::-1]]),
+                        fill='toself', line=dict(width=0), opacity=0.2, fillcolor=color,
+                        name=f'{name} {confidence}% band', hoverinfo='skip'
+                    ))
+                    fig.add_trace(go.Scatter(x=x, y=band["median"], name=name, line=dict(color=color, width=2)))
+                fig.update_layout(
+                    title="Network Performance Comparison",
+                    xaxis_title="Time (hours)",
+                    yaxis_title="On-Time Arrivals (%)",
+                    hovermode='x unified'
+                )
+                st.plotly_chart(fig, use_container_width=True)
+
+            with col2:
+                st.markdown("### Key Findings")
+                base_on_time = baseline["on_time"]["median"].mean()
+                opt_on_time = optimized["on_time"]["median"].mean()
+                st.metric("Performance Gain", f"{opt_on_time - base_on_time:+.1f} pts", "on-time arrivals")
+                st.metric("Expected On-Time", f"{opt_on_time:.1f}%", f"{confidence}% band: "
+                          f"{optimized['on_time']['lower'].mean():.1f}-{optimized['on_time']['upper'].mean():.1f}%")
+                st.metric(f"Delay Minutes (P{(100 + confidence) / 2:g})",
+                          f"{optimized['delay_minutes']['upper']:,.0f}",
+                          f"{optimized['delay_minutes']['upper'] - baseline['delay_minutes']['upper']:+,.0f} vs baseline",
+                          delta_color="inverse")
+
+        with col2:
+            st.markdown("### Recommendations")
+            st.info(f"1. Add {RECOVERY_MARGIN:.0%} running time supplements on congested lines")
+            st.info("2. Optimize platform assignments")
+            st.info("3. Adjust maintenance windows")
+
+    # Optimization scenarios
+    st.markdown("### 💡 Pre-configured Scenarios")
+
+    scenarios = [
+        {"name": "Rush Hour Optimization", "desc": "Maximize throughput during peak hours", "icon": "🏃"},
+        {"name": "Energy Efficiency", "desc": "Minimize energy consumption", "icon": "🔋"},
+        {"name": "Delay Recovery", "desc": "Optimal recovery from major disruptions", "icon": "🔧"},
+        {"name": "Weekend Service", "desc": "Balance maintenance and passenger service", "icon": "🏗️"}
+    ]
+
+    cols = st.columns(2)
+    for i, scenario in enumerate(scenarios):
+        with cols[i % 2]:
+            if st.button(f"{scenario['icon']} {scenario['name']}", key=f"scenario_{i}", use_container_width=True):
+                st.info(f"Loading scenario: {scenario['desc']}")
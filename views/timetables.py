@@ -0,0 +1,163 @@
+"""Timetable Manager: the day's schedule, conflict detection, the Gantt chart and the optimizer."""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from railway_ai.conflicts import ConflictDetector
+from railway_ai.data import current_timetable, feed_version, schedule_page, schedule_rows, timetable_gantt
+from railway_ai.gantt import MAX_BARS
+from railway_ai.jobs import DONE, get_runner
+from railway_ai.tasks import optimize_timetable
+from railway_ai.timetable import STATUSES, Timetable
+from views.common import follow_job
+
+# Rows of the Schedule table sent to the browser at a time
+PAGE_SIZES = [500, 1000, 5000]
+# Last hour of the Gantt time window; GTFS times run past midnight
+GANTT_HOURS = 30
+# Status -> chip color in the Schedule table
+STATUS_COLORS = {"On Time": "#d1fae5", "Delayed": "#fee2e2", "Early": "#dbeafe"}
+
+# One shared single-item list per status; the table's Status cells index into it
+_STATUS_CHIPS = np.empty(len(STATUSES), dtype=object)
+_STATUS_CHIPS[:] = [[status] for status in STATUSES]
+
+
+def render():
+    st.markdown('<h1 class="main-header">Intelligent Timetable Management</h1>', unsafe_allow_html=True)
+
+    # Timetable controls
+    col1, col2, col3 = st.columns([2, 1, 1])
+
+    with col2:
+        selected_date = st.date_input("Date", datetime.now())
+
+    # Columnar timetable for the selected day; the line choices are its lines
+    timetable = current_timetable(selected_date)
+
+    with col1:
+        selected_line = st.selectbox("Select Railway Line", ("All Lines",) + timetable.lines)
+
+    with col3:
+        view_mode = st.radio("View Mode", ["Schedule", "Gantt Chart"])
+
+    if view_mode == "Schedule":
+        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+        with col1:
+            station = st.selectbox("Station", ("All Stations",) + timetable.stations)
+        with col2:
+            status = st.selectbox("Status", ("All Statuses",) + STATUSES)
+        with col3:
+            sort_by = st.selectbox("Sort by", list(Timetable.FRAME_COLUMNS), index=3)
+        with col4:
+            page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1)
+            descending = st.checkbox("Descending")
+
+        # Filtering and sorting happen on the columnar timetable; only the page shown is sent to the browser
+        rows = schedule_rows(selected_date, selected_line, None if station == "All Stations" else station,
+                             None if status == "All Statuses" else status, sort_by, descending)
+        pages = max(1, -(-len(rows) // page_size))
+        page = st.number_input(f"Page (of {pages:,})", 1, pages, 1)
+        offset = (page - 1) * page_size
+        df_timetable = schedule_page(selected_date, rows, offset, page_size)
+        df_timetable["Status"] = _STATUS_CHIPS[df_timetable["Status"].cat.codes.to_numpy()]
+        st.caption(f"Stop events {min(offset + 1, len(rows)):,}–{offset + len(df_timetable):,} of {len(rows):,}")
+        st.dataframe(
+            df_timetable, use_container_width=True, height=400, hide_index=True,
+            column_config={"Status": st.column_config.MultiselectColumn(
+                "Status", options=STATUSES, color=[STATUS_COLORS[s] for s in STATUSES])},
+        )
+
+        # Conflict detection runs over the whole day since all lines share platforms and track
+        st.markdown("### ⚠️ Conflict Detection")
+        # A newly synced feed changes the day's timetable, so the detector is rebuilt for it too
+        conflict_key = (selected_date, feed_version())
+        if st.session_state.get("conflict_key") != conflict_key:
+            st.session_state.conflict_detector = ConflictDetector(timetable)
+            st.session_state.conflict_detector.detect()
+            st.session_state.conflict_key = conflict_key
+        detector = st.session_state.conflict_detector
+
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            moved_train = st.selectbox("Train", detector.timetable.trains)
+        with col2:
+            shift_minutes = st.number_input("Shift (min)", -120, 120, 0)
+        with col3:
+            if st.button("Apply Shift", use_container_width=True):
+                # Only the platforms and sections this train uses are re-checked
+                detector.move_train(moved_train, shift_minutes)
+
+        conflicts = detector.conflicts()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Platform Conflicts", int((conflicts["Type"] == "Platform").sum()))
+        with col2:
+            st.metric("Headway Violations", int((conflicts["Type"] == "Headway").sum()))
+        with col3:
+            st.metric("Overtaking Conflicts", int((conflicts["Type"] == "Overtaking").sum()))
+        st.dataframe(conflicts, use_container_width=True, height=300)
+
+    else:  # Gantt Chart view
+        st.markdown("### Train Schedule Visualization")
+
+        gantt = timetable_gantt(selected_date)
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            first_hour, last_hour = st.slider("Time window", 0, GANTT_HOURS, (0, 24), format="%d:00")
+        with col2:
+            detail = st.radio("Detail", ["Auto", "Trains", "Occupancy"], horizontal=True)
+        with col3:
+            offset = st.number_input("First train row", 0, max(len(gantt) - 1, 0), 0, step=MAX_BARS)
+
+        # Only the trains in the window (or per-line occupancy when zoomed out) reach the browser
+        fig, stats = gantt.figure(first_hour * 60, max(last_hour, first_hour + 1) * 60, offset, detail)
+        st.plotly_chart(fig, use_container_width=True)
+        if stats["mode"] == "trains":
+            st.caption(f"Train rows {min(offset + 1, stats['rows']):,}–{offset + stats['shown']:,} of "
+                       f"{stats['rows']:,} in and around the window")
+        else:
+            st.caption(f"{stats['trains']:,} trains in the window, shown as per-line occupancy in "
+                       f"{stats['bin_minutes']}-minute bins; narrow the window to {MAX_BARS:,} trains or fewer, "
+                       f"or choose Trains, to see each train")
+
+    # AI optimization panel
+    st.markdown("### 🤖 AI Timetable Optimization")
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        optimization_goal = st.selectbox(
+            "Optimization Goal",
+            ["Minimize Delays", "Maximize Throughput", "Energy Efficiency", "Passenger Comfort"]
+        )
+        time_budget = st.slider("Time Budget (seconds)", 1, 60, 5)
+
+    with col2:
+        run_optimization = st.button("Run AI Optimization", type="primary")
+
+    if run_optimization:
+        # Runs in a worker process; an identical earlier run is served from the result memo
+        job = get_runner().submit(optimize_timetable, timetable, optimization_goal, time_budget,
+                                  params={"goal": optimization_goal, "time_budget": time_budget},
+                                  timetable=timetable)
+        st.session_state.optimization_job = job.id
+
+    job = follow_job("optimization_job", "Optimization")
+    if job is not None and job.state == DONE:
+        result = job.result()
+        before = sum(result["conflicts_before"].values())
+        after = sum(result["conflicts_after"].values())
+        st.success(f"Optimization complete! {result['improvement']:.1%} improvement in selected metric achieved.")
+        st.markdown(
+            f'<div class="ai-response">New optimized timetable ready for review. '
+            f'Conflicts: {before} → {after}. {len(result["retimed"])} trains retimed, '
+            f'{result["replatformed"]} stops moved to another platform.</div>',
+            unsafe_allow_html=True
+        )
+        if result["retimed"]:
+            st.dataframe(
+                pd.DataFrame(list(result["retimed"].items()), columns=["Train ID", "Shift (min)"]),
+                use_container_width=True
+            )